@@ -31,6 +31,7 @@ logger = logging.getLogger(__name__)
 
 from calc_technical_scores import TechnicalScoreCalculator
 from enhanced_sentiment_analyzer import EnhancedSentimentAnalyzer
+from change_tracker import ChangeTracker
 
 # Add the current directory to the path for imports
 sys.path.append(os.path.dirname(__file__))
@@ -55,6 +56,8 @@ class FundamentalScoreCalculator:
         self.technical_calculator = TechnicalScoreCalculator()
         self.sentiment_analyzer = EnhancedSentimentAnalyzer()
         self.db_connection = None
+        self._snapshot_available = None
+        self.change_tracker = ChangeTracker()
         self.calculation_batch_id = f"fund_scores_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         # Enhanced industry-specific adjustments for better AI alignment
@@ -508,6 +511,14 @@ class FundamentalScoreCalculator:
         try:
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    if self._snapshot_available is None:
+                        cursor.execute("SELECT to_regclass('ticker_latest_snapshot') IS NOT NULL AS available")
+                        self._snapshot_available = cursor.fetchone()['available']
+                    if self._snapshot_available:
+                        cursor.execute("SELECT close FROM ticker_latest_snapshot WHERE ticker = %s", (ticker,))
+                        result = cursor.fetchone()
+                        if result:
+                            return result['close']
                     query = "SELECT close FROM daily_charts WHERE ticker = %s ORDER BY date DESC LIMIT 1"
                     cursor.execute(query, (ticker,))
                     result = cursor.fetchone()
@@ -1700,17 +1711,78 @@ class FundamentalScoreCalculator:
             logger.error(f"Error storing fundamental scores for {ticker}: {e}")
             return False
     
-    def calculate_scores_for_tickers(self, tickers: List[str]) -> Dict[str, Any]:
+    def carry_forward_scores(self, tickers: List[str]) -> int:
+        """
+        Copy each ticker's latest company_scores_historical row to CURRENT_DATE
+        
+        Used for tickers skipped as unchanged so the history keeps one row per
+        ticker per day. Existing rows for today are left untouched.
+        
+        Returns:
+            Number of rows written
+        """
+        if not tickers:
+            return 0
+        
+        columns = """
+            fundamental_health_score, fundamental_health_grade, fundamental_health_components,
+            fundamental_risk_score, fundamental_risk_level, fundamental_risk_components,
+            value_investment_score, value_rating, value_components,
+            technical_health_score, technical_health_grade, technical_health_components,
+            trading_signal_score, trading_signal_rating, trading_signal_components,
+            technical_risk_score, technical_risk_level, technical_risk_components,
+            overall_score, overall_grade,
+            fundamental_red_flags, fundamental_yellow_flags,
+            technical_red_flags, technical_yellow_flags
+        """
+        query = f"""
+        INSERT INTO company_scores_historical (ticker, date_calculated, {columns})
+        SELECT DISTINCT ON (ticker) ticker, CURRENT_DATE, {columns}
+        FROM company_scores_historical
+        WHERE ticker = ANY(%s) AND date_calculated < CURRENT_DATE
+        ORDER BY ticker, date_calculated DESC
+        ON CONFLICT (ticker, date_calculated) DO NOTHING
+        """
+        try:
+            conn = self.get_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, (list(tickers),))
+                    written = cursor.rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            logger.info(f"Carried forward scores for {written}/{len(tickers)} unchanged tickers")
+            return written
+        except Exception as e:
+            logger.error(f"Error carrying forward scores for {len(tickers)} tickers: {e}")
+            return 0
+
+    def calculate_scores_for_tickers(self, tickers: List[str], force: bool = False) -> Dict[str, Any]:
         """
         Calculate fundamental scores for multiple tickers
+        
+        Tickers whose fundamentals and price are unchanged since their last
+        scoring run are skipped unless force is set; their latest scores are
+        carried forward to today's company_scores_historical row.
         """
         results = {
             'successful': [],
             'failed': [],
+            'skipped': [],
             'summary': {}
         }
         
         start_time = time.time()
+        requested_count = len(tickers)
+        
+        dirty_report = None
+        if not force:
+            dirty, dirty_report = self.change_tracker.dirty_set('fundamental_scores', tickers)
+            dirty_set = set(dirty)
+            results['skipped'] = [ticker for ticker in tickers if ticker not in dirty_set]
+            tickers = dirty
+            self.carry_forward_scores(results['skipped'])
         
         for ticker in tickers:
             try:
@@ -1731,15 +1803,21 @@ class FundamentalScoreCalculator:
                 logger.error(f"Error calculating scores for {ticker}: {e}")
                 results['failed'].append(ticker)
         
+        if dirty_report:
+            self.change_tracker.mark_computed('fundamental_scores', [r['ticker'] for r in results['successful']])
+        
         # Calculate summary
         total_time = time.time() - start_time
         results['summary'] = {
-            'total_tickers': len(tickers),
+            'total_tickers': requested_count,
+            'computed_tickers': len(tickers),
             'successful': len(results['successful']),
             'failed': len(results['failed']),
-            'success_rate': len(results['successful']) / len(tickers) * 100,
+            'skipped': len(results['skipped']),
+            'success_rate': len(results['successful']) / len(tickers) * 100 if tickers else 0.0,
             'total_time_seconds': round(total_time, 2),
-            'average_time_per_ticker': round(total_time / len(tickers), 3)
+            'average_time_per_ticker': round(total_time / len(tickers), 3) if tickers else 0.0,
+            'dirty_set': dirty_report.to_dict() if dirty_report else None
         }
         
         return results
@@ -16,13 +16,13 @@ import numpy as np
 from datetime import datetime, date
 from typing import Dict, List, Optional, Tuple, Any
 import psycopg2
-from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
-from sklearn.cluster import KMeans
 
 # Add daily_run to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'daily_run'))
 
+from price_frame import PriceFrame
+
 # Load environment variables
 load_dotenv()
 
@@ -61,11 +61,10 @@ class UniversalTechnicalScoreCalculator:
                 raise
         return self.db_connection
     
-    def get_clean_ticker_data(self, ticker: str, days: int = 60) -> Optional[pd.DataFrame]:
+    def get_clean_ticker_data(self, ticker: str, days: int = 60) -> Optional[PriceFrame]:
         """Get clean ticker data with intelligent scaling corruption fix"""
         try:
             conn = self.get_db_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             query = """
             SELECT date, open, high, low, close, volume
@@ -75,61 +74,57 @@ class UniversalTechnicalScoreCalculator:
             LIMIT %s
             """
             
-            cursor.execute(query, (ticker, days))
-            results = cursor.fetchall()
+            # Plain tuples straight into float64 arrays (oldest first), no per-row dicts
+            with conn.cursor() as cursor:
+                cursor.execute(query, (ticker, days))
+                prices = PriceFrame.from_cursor(cursor)
             
-            if not results:
+            if prices.empty:
                 logger.warning(f"No data found for {ticker}")
                 return None
             
-            df = pd.DataFrame(results, columns=['date', 'open', 'high', 'low', 'close', 'volume'])
-            df = df.sort_values('date').reset_index(drop=True)
-            
-            # Ensure price columns are float to prevent dtype warnings during calculations
-            price_cols = ['open', 'high', 'low', 'close', 'volume']
-            for col in price_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
-            
             # Apply intelligent scaling corruption fix
-            df_fixed = self._apply_intelligent_scaling_fix(df, ticker)
-            
-            return df_fixed
+            return self._apply_intelligent_scaling_fix(prices, ticker)
             
         except Exception as e:
             logger.error(f"Error getting data for {ticker}: {e}")
             return None
     
-    def _apply_intelligent_scaling_fix(self, df: pd.DataFrame, ticker: str) -> pd.DataFrame:
-        """Apply proven intelligent scaling corruption fix"""
-        df_fixed = df.copy()
+    def _apply_intelligent_scaling_fix(self, prices: PriceFrame, ticker: str) -> PriceFrame:
+        """
+        Apply proven intelligent scaling corruption fix
+        
+        Only a column that gets corrected is copied; the others stay shared with `prices`.
+        """
+        fixed = {}
         price_cols = ['open', 'high', 'low', 'close']
         
         # Method 1: Detect sudden 100x scaling jumps
-        scaling_detected = False
         for col in price_cols:
-            # Ensure column is float type to avoid dtype warnings
-            df_fixed[col] = df_fixed[col].astype(float)
-            values = df_fixed[col].values
-            for i in range(1, len(values)):
-                ratio = values[i] / values[i-1]
-                if 0.005 < ratio < 0.02:  # 100x scaling down (cents to dollars)
-                    logger.info(f"🔧 {ticker}: Detected 100x scaling corruption (cents→dollars) at day {i}")
-                    df_fixed.loc[:i-1, col] = df_fixed.loc[:i-1, col] / 100
-                    scaling_detected = True
-                    break
-                elif 50 < ratio < 200:  # 100x scaling up (dollars to cents)  
-                    logger.info(f"🔧 {ticker}: Detected 100x scaling corruption (dollars→cents) at day {i}")
-                    df_fixed.loc[i:, col] = df_fixed.loc[i:, col] / 100
-                    scaling_detected = True
-                    break
+            values = getattr(prices, col)
+            if len(values) < 2:
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratios = values[1:] / values[:-1]
+            down = (0.005 < ratios) & (ratios < 0.02)  # 100x scaling down (cents to dollars)
+            up = (50 < ratios) & (ratios < 200)  # 100x scaling up (dollars to cents)
+            jumps = np.flatnonzero(down | up)
+            if not len(jumps):
+                continue
+            i = jumps[0] + 1
+            values = values.copy()
+            if down[i - 1]:
+                logger.info(f"🔧 {ticker}: Detected 100x scaling corruption (cents→dollars) at day {i}")
+                values[:i] /= 100
+            else:
+                logger.info(f"🔧 {ticker}: Detected 100x scaling corruption (dollars→cents) at day {i}")
+                values[i:] /= 100
+            fixed[col] = values
         
         # Method 2: Detect bimodal distribution if no jumps found
-        if not scaling_detected:
+        if not fixed:
             for col in price_cols:
-                # Ensure column is float type to avoid dtype warnings
-                df_fixed[col] = df_fixed[col].astype(float)
-                values = df_fixed[col].values
+                values = getattr(prices, col)
                 if len(values) < 10:
                     continue
                     
@@ -145,6 +140,8 @@ class UniversalTechnicalScoreCalculator:
                         continue  # Skip if prices are too similar
                     
                     # Use clustering to detect two distinct price groups
+                    # (sklearn is imported here: it costs more than the rest of startup)
+                    from sklearn.cluster import KMeans
                     with warnings.catch_warnings():
                         warnings.filterwarnings("ignore", category=UserWarning)
                         warnings.filterwarnings("ignore", category=RuntimeWarning)
@@ -181,21 +178,20 @@ class UniversalTechnicalScoreCalculator:
                         if higher_mean > 1000 and lower_mean < 500:
                             logger.info(f"🔧 {ticker}: Detected bimodal price distribution corruption")
                             
-                            if cluster_0_mean > cluster_1_mean:
-                                df_fixed.loc[clusters == 0, col] = df_fixed.loc[clusters == 0, col] / 100
-                            else:
-                                df_fixed.loc[clusters == 1, col] = df_fixed.loc[clusters == 1, col] / 100
-                            scaling_detected = True
+                            values = values.copy()
+                            values[cluster_0_indices if cluster_0_mean > cluster_1_mean else cluster_1_indices] /= 100
+                            fixed[col] = values
                             break
                 except Exception as e:
                     # Log specific clustering errors for debugging if needed
                     # logger.debug(f"Clustering failed for {ticker}.{col}: {e}")
                     continue
         
-        if scaling_detected:
+        if fixed:
             logger.info(f"✅ {ticker}: Price scaling corruption fixed successfully")
+            return prices.replace(**fixed)
         
-        return df_fixed
+        return prices
     
     def calculate_universal_rsi(self, df: pd.DataFrame, target_range: tuple = (30, 70)) -> float:
         """Calculate RSI with universal accuracy optimization"""
@@ -497,12 +493,13 @@ class UniversalTechnicalScoreCalculator:
             logger.error(f"Error calculating CCI: {e}")
             return 0.0
     
-    def calculate_enhanced_technical_scores(self, ticker: str) -> Optional[Dict[str, Any]]:
+    def calculate_enhanced_technical_scores(self, ticker: str, prices: Optional[PriceFrame] = None) -> Optional[Dict[str, Any]]:
         """
         Calculate enhanced technical scores using universal accuracy system
         
         Args:
             ticker: Stock ticker symbol
+            prices: Price window the caller already loaded (oldest first); read from daily_charts if None
             
         Returns:
             Dictionary containing technical scores and indicators
@@ -511,7 +508,10 @@ class UniversalTechnicalScoreCalculator:
             logger.info(f"🔧 Calculating universal technical scores for {ticker}")
             
             # Get clean price data
-            df = self.get_clean_ticker_data(ticker, 60)
+            if prices is None:
+                df = self.get_clean_ticker_data(ticker, 60)
+            else:
+                df = self._apply_intelligent_scaling_fix(prices.tail(60), ticker) if len(prices) else None
             if df is None or len(df) < 20:
                 logger.warning(f"Insufficient data for {ticker}")
                 return None
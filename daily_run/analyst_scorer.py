@@ -462,7 +462,11 @@ class AnalystScorer:
     def get_current_price(self, ticker: str) -> Optional[float]:
         """Get current price for a ticker"""
         try:
-            # First check if the daily_charts table exists
+            snapshot = self.db.get_latest_snapshot(ticker)
+            if snapshot is not None:
+                return float(snapshot['close']) if snapshot['close'] is not None else None
+            
+            # No snapshot yet: fall back to daily_charts if the table exists
             table_check_query = """
             SELECT EXISTS (
                 SELECT FROM information_schema.tables 
@@ -96,8 +96,15 @@ class AnalystScoringManager:
         
         return True  # Assume OK if we can't check
     
-    def calculate_all_analyst_scores(self, service_manager=None) -> Dict:
-        """Calculate analyst scores for all active tickers"""
+    def calculate_all_analyst_scores(self, service_manager=None, budget=None) -> Dict:
+        """
+        Calculate analyst scores for all active tickers.
+        
+        Args:
+            service_manager: Multi-service manager (used for the rate limit check)
+            budget: Optional PhaseBudget from the request planner; tickers past
+                    the budget are deferred to the next run
+        """
         logger.info("📊 STARTING ANALYST SCORE CALCULATIONS")
         start_time = time.time()
         
@@ -122,8 +129,14 @@ class AnalystScoringManager:
             # Process tickers
             successful_calculations = 0
             failed_calculations = 0
+            deferred = 0
             
             for i, ticker in enumerate(tickers, 1):
+                if budget is not None and not budget.try_spend(budget.item_cost('finnhub'), 'finnhub'):
+                    deferred = len(tickers) - i + 1
+                    logger.warning(f"⚠️ Analyst API budget exhausted, deferring {deferred} tickers to the next run")
+                    break
+                
                 result = self._process_single_ticker(ticker, i, len(tickers))
                 if result['success']:
                     successful_calculations += 1
@@ -137,7 +150,11 @@ class AnalystScoringManager:
             total_time = time.time() - start_time
             logger.info(f"📊 ANALYST SCORES COMPLETED: {successful_calculations}/{len(tickers)} successful in {total_time/60:.1f} minutes")
             
-            return self._create_result('completed', None, start_time, successful_calculations, failed_calculations, len(tickers))
+            result = self._create_result('completed', None, start_time, successful_calculations, failed_calculations, len(tickers))
+            result['deferred_tickers'] = deferred
+            if budget is not None:
+                result['api_calls_used'] = budget.spent_calls
+            return result
             
         except Exception as e:
             total_time = time.time() - start_time
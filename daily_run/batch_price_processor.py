@@ -12,27 +12,54 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import os
 import collections
+import threading
 import traceback
 
 from common_imports import *
 from database import DatabaseManager
 from error_handler import ErrorHandler, ErrorSeverity
 from monitoring import SystemMonitor
+from service_registry import LazyService, ServiceRegistry
+from log_pipeline import configure_logging
 
 logger = logging.getLogger(__name__)
 
-# Setup file logging for batch price processor
-log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs')
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, 'batch_price_processor.log')
 
-# Add file handler if not already present
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename == os.path.abspath(log_file) for h in logger.handlers):
-    file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+def __getattr__(name: str):
+    # Provider classes are imported on first use (see common_imports)
+    if name in ('YahooFinanceService', 'AlphaVantageService', 'FinnhubService'):
+        return get_service_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _provider(class_name: str):
+    """Factory building a provider class looked up on this module at build time"""
+    return lambda: getattr(sys.modules[__name__], class_name)()
+
+
+def _fmp_service():
+    from fmp_service import FMPService
+    fmp_service = FMPService()
+    # Ensure it has required attributes
+    if not hasattr(fmp_service, 'base_url'):
+        fmp_service.base_url = "https://financialmodelingprep.com/api/v3"
+    if not hasattr(fmp_service, 'api_key'):
+        fmp_service.api_key = os.getenv('FMP_API_KEY')
+    logger.info("FMP service initialized for batch processing")
+    return fmp_service
+
+
+# Tickers a provider can return per API call (per-ticker providers are 1)
+PROVIDER_BATCH_LIMITS = {
+    'FMP': 100,
+    'Yahoo Finance': 100,
+    'Alpha Vantage': 1,
+    'Finnhub': 1
+}
+
+# Success ratio assumed for a provider that has not been asked yet; below
+# any working provider's, so an untried one never outranks a proven one
+UNTRIED_SUCCESS_RATIO = 0.5
 
 
 class BatchPriceProcessor:
@@ -41,6 +68,11 @@ class BatchPriceProcessor:
     Stores daily prices in the daily_charts table.
     """
     
+    yahoo_service = LazyService()
+    alpha_vantage_service = LazyService()
+    finnhub_service = LazyService()
+    fmp_service = LazyService()
+    
     def __init__(self, db: DatabaseManager, max_batch_size: int = 100, 
                  max_workers: int = 5, delay_between_batches: float = 1.0):
         self.db = db
@@ -50,38 +82,20 @@ class BatchPriceProcessor:
         self.error_handler = ErrorHandler("batch_price_processor")
         self.monitoring = SystemMonitor()
         
-        # Initialize services
-        try:
-            self.yahoo_service = YahooFinanceService()
-        except:
-            self.yahoo_service = None
-            logger.warning("Yahoo Finance service not available")
-            
-        try:
-            self.alpha_vantage_service = AlphaVantageService()
-        except:
-            self.alpha_vantage_service = None
-            logger.warning("Alpha Vantage service not available")
-            
-        try:
-            self.finnhub_service = FinnhubService()
-        except:
-            self.finnhub_service = None
-            logger.warning("Finnhub service not available")
+        # Per-provider coverage, shared by the batch worker threads
+        self._stats_lock = threading.Lock()
+        self._coverage_stats = {}
+        self._service_success_counter = collections.Counter()
+        self._service_failure_counter = collections.Counter()
+        self._service_last_error = {}
         
-        # Initialize FMP service (preferred for batch operations)
-        try:
-            from fmp_service import FMPService
-            self.fmp_service = FMPService()
-            # Ensure it has required attributes
-            if not hasattr(self.fmp_service, 'base_url'):
-                self.fmp_service.base_url = "https://financialmodelingprep.com/api/v3"
-            if not hasattr(self.fmp_service, 'api_key'):
-                self.fmp_service.api_key = os.getenv('FMP_API_KEY')
-            logger.info("FMP service initialized for batch processing")
-        except Exception as e:
-            logger.warning(f"FMP service not available: {e}")
-            self.fmp_service = None
+        # Provider clients are built on first use
+        self.services = ServiceRegistry('batch_price_processor')
+        self.services.register('yahoo_service', _provider('YahooFinanceService'))
+        self.services.register('alpha_vantage_service', _provider('AlphaVantageService'))
+        self.services.register('finnhub_service', _provider('FinnhubService'))
+        # FMP is preferred for batch operations
+        self.services.register('fmp_service', _fmp_service)
         
         # Service priority for pricing data (FMP first as requested)
         self.service_priority = [
@@ -111,6 +125,8 @@ class BatchPriceProcessor:
         self._service_success_counter = collections.Counter()
         self._service_failure_counter = collections.Counter()
         self._service_last_error = {}
+        with self._stats_lock:
+            self._coverage_stats = {}
         
         try:
             # Split tickers into batches
@@ -166,6 +182,10 @@ class BatchPriceProcessor:
             logger.info(f"[SUMMARY] Service failure counts: {dict(self._service_failure_counter)}")
             for service, err in self._service_last_error.items():
                 logger.info(f"[SUMMARY] Last error for {service}: {err}")
+            for service, stats in self.get_coverage_stats().items():
+                logger.info(f"[SUMMARY] {service} coverage: {stats['returned']}/{stats['requested']} tickers "
+                            f"({stats['coverage']:.1%}) in ~{stats['api_calls']} API calls")
+                self.monitoring.record_metric(f"price_coverage_{service.lower().replace(' ', '_')}", stats['coverage'])
             return results
             
         except Exception as e:
@@ -178,84 +198,123 @@ class BatchPriceProcessor:
     def _process_single_batch(self, tickers: List[str], batch_num: int) -> Dict[str, Dict]:
         """
         Process a single batch of tickers using fallback services.
-        Logs service order, attempts, and fallbacks for transparency.
-        Yahoo Finance gets 3 retries before falling back to next service.
+        
+        Each provider is only asked for the tickers still missing after the
+        previous ones, and partial results are merged. The residual set is
+        routed to the untried provider expected to return the most tickers
+        per call, so a few missing quotes cost one small batch call instead
+        of a full re-fetch or one call per ticker.
         Args:
             tickers: List of ticker symbols for this batch
             batch_num: Batch number for logging
         Returns:
             Dictionary mapping ticker to price data
         """
-        logger.info(f"Batch {batch_num}: Service order: {[s[0] for s in self.service_priority]}")
         logger.info(f"Batch {batch_num}: Processing {len(tickers)} tickers")
         
-        for service_name, service_func in self.service_priority:
+        results = {}
+        remaining = list(tickers)
+        tried = set()
+        
+        while remaining:
+            service = self._select_service_for_residual(tried)
+            if service is None:
+                break
+            service_name, service_func = service
+            tried.add(service_name)
+            
+            logger.info(f"Batch {batch_num}: Trying {service_name} for {len(remaining)} tickers")
+            service_results = self._fetch_from_service(service_name, service_func, remaining, batch_num)
+            
+            remaining_set = set(remaining)
+            new_results = {t: data for t, data in service_results.items() if t in remaining_set and t not in results}
+            results.update(new_results)
+            self._record_coverage(service_name, len(remaining), len(new_results))
+            
+            remaining = [t for t in remaining if t not in results]
+            if new_results:
+                logger.info(f"Batch {batch_num}: {service_name} returned {len(new_results)} tickers, {len(remaining)} still missing")
+        
+        if remaining:
+            logger.warning(f"Batch {batch_num}: No price data from any service for {len(remaining)} tickers: {remaining[:10]}")
+        if not results:
+            logger.error(f"Batch {batch_num}: All services failed for this batch. No price data available.")
+        return results
+    
+    def _select_service_for_residual(self, tried: set) -> Optional[tuple]:
+        """
+        Pick the untried service expected to return the most tickers per call:
+        its configured batch limit times its observed success ratio
+        (returned/requested, UNTRIED_SUCCESS_RATIO before it has been used).
+        The size of the residual it last served does not count against it.
+        Ties keep service_priority order.
+        """
+        candidates = [(name, func) for name, func in self.service_priority if name not in tried]
+        if not candidates:
+            return None
+        
+        def expected_per_call(service):
+            name = service[0]
+            success_ratio = UNTRIED_SUCCESS_RATIO
+            with self._stats_lock:
+                stats = self._coverage_stats.get(name)
+                if stats and stats['requested']:
+                    success_ratio = stats['returned'] / stats['requested']
+            return PROVIDER_BATCH_LIMITS.get(name, 1) * success_ratio
+        
+        # max() keeps the first of equal candidates, i.e. service_priority order
+        return max(candidates, key=expected_per_call)
+    
+    def _fetch_from_service(self, service_name: str, service_func, tickers: List[str], batch_num: int) -> Dict[str, Dict]:
+        """
+        Call one service for the given tickers.
+        Yahoo Finance gets 3 attempts, other services one.
+        """
+        max_retries = 3 if service_name == 'Yahoo Finance' else 1
+        for attempt in range(1, max_retries + 1):
             try:
-                logger.info(f"Batch {batch_num}: Trying {service_name}")
-                
-                # Special handling for Yahoo Finance - retry 3 times
-                if service_name == 'Yahoo Finance':
-                    max_retries = 3
-                    for attempt in range(1, max_retries + 1):
-                        try:
-                            logger.info(f"Batch {batch_num}: Yahoo Finance attempt {attempt}/{max_retries}")
-                            results = service_func(tickers)
-                            if results:
-                                logger.info(f"Batch {batch_num}: Yahoo Finance succeeded on attempt {attempt} for {len(results)} tickers")
-                                self._service_success_counter[service_name] += 1
-                                return results
-                            else:
-                                logger.warning(f"Batch {batch_num}: Yahoo Finance returned no results on attempt {attempt}")
-                                if attempt < max_retries:
-                                    time.sleep(1)  # Wait 1 second between retries
-                                    continue
-                                else:
-                                    logger.warning(f"Batch {batch_num}: Yahoo Finance failed all {max_retries} attempts, falling back")
-                                    self._service_failure_counter[service_name] += 1
-                                    self._service_last_error[service_name] = 'No results after 3 attempts.'
-                        except Exception as e:
-                            logger.warning(f"Batch {batch_num}: Yahoo Finance attempt {attempt} failed with error: {e}")
-                            import traceback
-                            logger.warning(f"Batch {batch_num}: Yahoo Finance traceback: {traceback.format_exc()}")
-                            if attempt < max_retries:
-                                time.sleep(1)  # Wait 1 second between retries
-                                continue
-                            else:
-                                logger.warning(f"Batch {batch_num}: Yahoo Finance failed all {max_retries} attempts, falling back to next service")
-                                self._service_failure_counter[service_name] += 1
-                                self._service_last_error[service_name] = str(e)
-                                break
-                else:
-                    # Other services get one attempt
-                    try:
-                        results = service_func(tickers)
-                        if results:
-                            logger.info(f"Batch {batch_num}: {service_name} succeeded for {len(results)} tickers")
-                            self._service_success_counter[service_name] += 1
-                            return results
-                        else:
-                            logger.warning(f"Batch {batch_num}: {service_name} returned no results, falling back")
-                            self._service_failure_counter[service_name] += 1
-                            self._service_last_error[service_name] = 'No results.'
-                            logger.warning(f"Batch {batch_num}: {service_name} full response: {results}")
-                    except Exception as e:
-                        logger.warning(f"Batch {batch_num}: {service_name} failed with error: {e}. Falling back to next service.")
-                        import traceback
-                        logger.warning(f"Batch {batch_num}: {service_name} traceback: {traceback.format_exc()}")
-                        self._service_failure_counter[service_name] += 1
-                        self._service_last_error[service_name] = str(e)
-                        continue
+                results = service_func(tickers)
+                if results:
+                    self._service_success_counter[service_name] += 1
+                    return results
+                logger.warning(f"Batch {batch_num}: {service_name} returned no results (attempt {attempt}/{max_retries})")
+                self._service_last_error[service_name] = f'No results after {attempt} attempts.'
             except Exception as e:
-                logger.warning(f"Batch {batch_num}: {service_name} failed with error: {e}. Falling back to next service.")
-                import traceback
-                logger.warning(f"Batch {batch_num}: {service_name} traceback: {traceback.format_exc()}")
-                self._service_failure_counter[service_name] += 1
+                logger.warning(f"Batch {batch_num}: {service_name} attempt {attempt} failed with error: {e}")
+                logger.debug("Batch %s: %s traceback", batch_num, service_name, exc_info=True)
                 self._service_last_error[service_name] = str(e)
-                continue
-                
-        logger.error(f"Batch {batch_num}: All services failed for this batch. No price data available.")
+            if attempt < max_retries:
+                time.sleep(1)  # Wait 1 second between retries
+        
+        self._service_failure_counter[service_name] += 1
         return {}
     
+    def _record_coverage(self, service_name: str, requested: int, returned: int):
+        """Accumulate per-provider coverage and estimated API calls"""
+        limit = PROVIDER_BATCH_LIMITS.get(service_name, 1)
+        api_calls = (requested + limit - 1) // limit
+        with self._stats_lock:
+            stats = self._coverage_stats.setdefault(
+                service_name, {'requested': 0, 'returned': 0, 'api_calls': 0}
+            )
+            stats['requested'] += requested
+            stats['returned'] += returned
+            stats['api_calls'] += api_calls
+    
+    def get_coverage_stats(self) -> Dict[str, Dict]:
+        """
+        Per-provider coverage statistics for the last process_batch_prices run.
+        
+        Returns:
+            Dictionary mapping service name to requested/returned tickers,
+            estimated API calls and coverage ratio
+        """
+        with self._stats_lock:
+            return {
+                name: dict(stats, coverage=round(stats['returned'] / stats['requested'], 4) if stats['requested'] else 0.0)
+                for name, stats in self._coverage_stats.items()
+            }
+    
     def _get_fmp_batch_prices(self, tickers: List[str]) -> Dict[str, Dict]:
         """Get batch prices from FMP (up to 100 symbols per call)"""
         try:
@@ -266,9 +325,9 @@ class BatchPriceProcessor:
             # Small delay for FMP to be safe
             time.sleep(0.5)
             
-            logger.info(f"[FMP DEBUG] Requesting batch quotes for: {tickers}")
+            logger.debug("[FMP DEBUG] Requesting batch quotes for: %s", tickers)
             response = self.fmp_service.fetch_batch_quotes(tickers)
-            logger.info(f"[FMP DEBUG] Raw response: {str(response)[:500]}")
+            logger.debug("[FMP DEBUG] Raw response: %.500s", response)
             results = self._parse_fmp_batch_response(response, tickers)
             if not results:
                 logger.warning(f"[FMP DEBUG] No results returned for tickers: {tickers}")
@@ -288,9 +347,9 @@ class BatchPriceProcessor:
             # Reduced delay since Yahoo is no longer primary
             time.sleep(1)
             
-            logger.info(f"[YAHOO DEBUG] Requesting batch quotes for: {tickers}")
+            logger.debug("[YAHOO DEBUG] Requesting batch quotes for: %s", tickers)
             results = self.yahoo_service.get_batch_data(tickers, 'pricing')
-            logger.info(f"[YAHOO DEBUG] Raw response: {str(results)[:500]}")
+            logger.debug("[YAHOO DEBUG] Raw response: %.500s", results)
             if not results:
                 logger.warning(f"[YAHOO DEBUG] No results returned for tickers: {tickers}")
             return results
@@ -316,11 +375,11 @@ class BatchPriceProcessor:
                         'symbol': ticker,
                         'apikey': self.alpha_vantage_service.api_key
                     }
-                    logger.info(f"[ALPHA VANTAGE DEBUG] Requesting single quote for {ticker}")
+                    logger.debug("[ALPHA VANTAGE DEBUG] Requesting single quote for %s", ticker)
                     response = requests.get(url, params=params)
                     response.raise_for_status()
                     data = response.json()
-                    logger.info(f"[ALPHA VANTAGE DEBUG] Raw API response for {ticker}: {data}")
+                    logger.debug("[ALPHA VANTAGE DEBUG] Raw API response for %s: %s", ticker, data)
                     
                     # Parse individual response
                     if 'Global Quote' in data:
@@ -479,83 +538,36 @@ class BatchPriceProcessor:
     
     def store_daily_prices(self, price_data: Dict[str, Dict]):
         """
-        Store daily prices in the daily_charts table using efficient batch insert.
+        Store daily prices in the daily_charts table with one binary COPY upsert.
         Args:
-            price_data: Dictionary mapping ticker to price data
+            price_data: Dictionary mapping ticker to price data, as parsed from the providers
         """
         if not price_data:
             logger.warning("No price data to store")
             return
             
         logger.info(f"Storing {len(price_data)} daily price records")
-        logger.info(f"[PRICE DEBUG] Raw price data received: {price_data}")
+        logger.debug("[PRICE DEBUG] Raw price data received: %s", price_data)
         start_time = time.time()
         
         try:
-            today_str = date.today().strftime('%Y-%m-%d')
-            
-            # Prepare batch data for insertion
-            batch_values = []
-            successful_prep = 0
-            
-            for ticker, data in price_data.items():
-                # Handle different field names from different services
-                close_val = data.get('close') or data.get('close_price') or data.get('price')
-                if close_val:
-                    try:
-                        close_val = float(close_val)
-                        # For now, use close price for all OHLC since we only have close from batch APIs
-                        open_val = float(data.get('open', close_val))
-                        high_val = float(data.get('high', close_val))
-                        low_val = float(data.get('low', close_val))
-                        volume = data.get('volume', 0) or 0
-                        
-                        batch_values.append((
-                            ticker,
-                            today_str,  # Use string format to match VARCHAR column
-                            open_val,
-                            high_val,
-                            low_val,
-                            close_val,
-                            volume
-                        ))
-                        successful_prep += 1
-                    except Exception as e:
-                        logger.error(f"Error preparing price data for {ticker}: {e}")
-                        continue
-            
-            if not batch_values:
+            # Provider field names (close/close_price/price) are resolved by the ingest path
+            counts = self.db.upsert_daily_quotes(price_data)
+            if not counts['staged']:
                 logger.warning("No valid price data to store after preparation")
                 return
             
-            logger.info(f"Prepared {successful_prep} records for batch insert")
-            
-            # Execute batch insert using executemany for efficiency
-            batch_query = """
-                INSERT INTO daily_charts (
-                    ticker, date, open, high, low, close, volume
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ticker, date) 
-                DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume
-            """
-            
-            # Use batch insert method from database manager
-            successful_inserts = self.db.execute_batch(batch_query, batch_values)
-            
-            processing_time = time.time() - start_time
-            logger.info(f"✅ Successfully stored {successful_inserts}/{len(price_data)} daily price records in {processing_time:.2f}s")
+            successful_inserts = counts['inserted'] + counts['updated']
+            logger.info(f"✅ Successfully stored {successful_inserts}/{len(price_data)} daily price records "
+                        f"in {counts['seconds']:.2f}s ({counts['skipped']} without a usable price)")
             self.monitoring.record_metric('daily_prices_stored', successful_inserts)
+            self.monitoring.record_metric('daily_prices_store_seconds', counts['seconds'])
             
         except Exception as e:
             processing_time = time.time() - start_time
             logger.error(f"❌ Error storing daily prices after {processing_time:.2f}s: {e}")
-            self.error_handler.handle_error(
-                "Failed to store daily prices", e, ErrorSeverity.HIGH
+            self.error_handler.log_error(
+                "Failed to store daily prices", ErrorSeverity.ERROR, e
             )
 
     def get_latest_daily_price(self, ticker: str) -> Optional[Dict]:
@@ -596,7 +608,8 @@ class BatchPriceProcessor:
             FROM daily_charts 
             WHERE ticker IN ({placeholders}) AND date = %s
             """
-            params = tickers + [target_date]
+            # ISO string rather than a typed date, so it also matches a TEXT date column
+            params = tickers + [target_date.isoformat() if hasattr(target_date, 'isoformat') else target_date]
             results = self.db.execute_query(query, params)
             return {row[0]: {
                 'ticker': row[0],
@@ -611,7 +624,8 @@ class BatchPriceProcessor:
 
 def main():
     """Test the batch price processor"""
-    logging.basicConfig(level=logging.INFO)
+    configure_logging(log_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs',
+                                            'batch_price_processor.log'))
     
     # Test tickers
     test_tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA']
@@ -0,0 +1,232 @@
+"""
+Bulk History Backfill
+
+Downloads daily OHLCV history for hundreds of tickers per yfinance request
+(group_by='ticker', threads=True), unpacks the multi-index frame into
+daily_charts rows with vectorized pandas operations and writes them with COPY.
+Tickers that are missing from the bulk result are handed to a per-ticker
+fallback (the multi-provider path in DailyTradingSystem).
+"""
+
+import logging
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .database import DatabaseManager
+    from .bulk_ingest import OHLCV_COLUMNS, upsert_price_history
+except ImportError:
+    from database import DatabaseManager
+    from bulk_ingest import OHLCV_COLUMNS, upsert_price_history
+
+logger = logging.getLogger(__name__)
+
+# Tickers per yfinance download request
+BULK_BATCH_SIZE = 200
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close']
+HISTORY_COLUMNS = OHLCV_COLUMNS
+
+
+def history_frame_to_rows(data: pd.DataFrame, tickers: List[str]) -> pd.DataFrame:
+    """
+    Unpack a yfinance download frame into long-format daily_charts rows.
+
+    Prices are scaled to integer cents and dates formatted as 'YYYY-MM-DD'
+    to match the daily_charts storage format. Rows with any missing OHLC
+    value are dropped.
+
+    Args:
+        data: Frame returned by yf.download (multi-index columns for several
+              tickers, flat columns for a single ticker)
+        tickers: Tickers requested in the download
+
+    Returns:
+        DataFrame with columns HISTORY_COLUMNS
+    """
+    if data is None or data.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    if isinstance(data.columns, pd.MultiIndex):
+        # group_by='ticker' puts the ticker on level 0, the default puts it on level 1
+        ticker_level = 0 if set(PRICE_FIELDS).issubset(data.columns.get_level_values(1)) else 1
+        long_df = data.stack(level=ticker_level)
+        long_df.index = long_df.index.set_names(['date', 'ticker'])
+        long_df = long_df.reset_index()
+    elif set(PRICE_FIELDS).issubset(data.columns) and len(tickers) == 1:
+        long_df = data.reset_index()
+        long_df = long_df.rename(columns={long_df.columns[0]: 'date'})
+        long_df['ticker'] = tickers[0]
+    else:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    if 'Volume' not in long_df.columns:
+        long_df['Volume'] = np.nan
+
+    long_df = long_df.dropna(subset=PRICE_FIELDS)
+    if long_df.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    rows = pd.DataFrame({
+        'ticker': long_df['ticker'].astype(str).to_numpy(),
+        'date': pd.to_datetime(long_df['date']).dt.strftime('%Y-%m-%d').to_numpy(),
+    })
+    for field in PRICE_FIELDS:
+        rows[field.lower()] = np.round(long_df[field].to_numpy(dtype='float64') * 100).astype('int64')
+    rows['volume'] = pd.array(np.round(long_df['Volume'].to_numpy(dtype='float64')), dtype='Int64')
+
+    return rows[HISTORY_COLUMNS].reset_index(drop=True)
+
+
+class BulkHistoryBackfill:
+    """
+    Bulk backfill of daily_charts history using multi-ticker yfinance downloads.
+    """
+
+    def __init__(self, db: DatabaseManager = None, batch_size: int = BULK_BATCH_SIZE,
+                 pause_between_batches: float = 2.0, downloader: Callable = None):
+        """
+        Args:
+            db: Database manager used for the COPY writes
+            batch_size: Tickers per download request
+            pause_between_batches: Seconds to wait between download requests
+            downloader: Optional replacement for yf.download (used in tests)
+        """
+        self.db = db or DatabaseManager()
+        self.batch_size = batch_size
+        self.pause_between_batches = pause_between_batches
+        self.downloader = downloader
+
+    def download_history(self, tickers: List[str], start_date: date,
+                         end_date: date) -> Optional[pd.DataFrame]:
+        """
+        Download daily history for a batch of tickers in a single request.
+
+        Returns:
+            Raw yfinance frame, or None when the request failed
+        """
+        downloader = self.downloader
+        if downloader is None:
+            import yfinance as yf
+            downloader = yf.download
+
+        try:
+            return downloader(
+                tickers, start=start_date, end=end_date + timedelta(days=1),
+                group_by='ticker', threads=True, auto_adjust=False, progress=False
+            )
+        except Exception as e:
+            logger.warning(f"Bulk history download failed for {len(tickers)} tickers: {e}")
+            return None
+
+    def write_rows(self, rows: pd.DataFrame) -> int:
+        """
+        Write history rows into daily_charts via the shared COPY loader.
+
+        Existing (ticker, date) rows are left untouched, the same policy as
+        DailyTradingSystem._store_historical_data.
+
+        Returns:
+            Number of rows inserted
+        """
+        if rows is None or rows.empty:
+            return 0
+
+        with self.db.get_cursor() as cursor:
+            counts = upsert_price_history(cursor, 'daily_charts', rows[HISTORY_COLUMNS], overwrite=False)
+        return counts['inserted']
+
+    def backfill(self, tickers: List[str], days: int = 200,
+                 fallback: Optional[Callable[[str], bool]] = None,
+                 should_continue: Optional[Callable[[List[str]], bool]] = None) -> Dict:
+        """
+        Backfill history for all tickers, falling back per ticker only where needed.
+
+        Args:
+            tickers: Tickers to backfill
+            days: Trading days of history wanted per ticker
+            fallback: Optional per-ticker fetcher, called for tickers that are
+                      missing from the bulk result; returns True on success
+            should_continue: Optional gate called with each batch right before
+                             its download request; returning False stops the
+                             backfill (e.g. API budget or time limit reached).
+                             The batches not requested are reported as
+                             skipped_tickers and never reach the fallback.
+
+        Returns:
+            Dictionary with bulk and fallback statistics
+        """
+        start_time = time.time()
+        end_date = date.today()
+        # Trading days -> calendar days, with slack for holidays
+        start_date = end_date - timedelta(days=int(days * 7 / 5) + 10)
+
+        loaded_tickers = set()
+        rows_written = 0
+        download_requests = 0
+        skipped_tickers: List[str] = []
+
+        batches = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+        logger.info(f"Bulk history backfill: {len(tickers)} tickers in {len(batches)} requests ({days} days)")
+
+        for batch_num, batch in enumerate(batches, 1):
+            if should_continue is not None and not should_continue(batch):
+                skipped_tickers = [t for pending in batches[batch_num - 1:] for t in pending]
+                logger.info(f"Bulk history backfill stopped before batch {batch_num}/{len(batches)}: "
+                            f"{len(skipped_tickers)} tickers left for a later run")
+                break
+
+            data = self.download_history(batch, start_date, end_date)
+            download_requests += 1
+
+            rows = history_frame_to_rows(data, batch)
+            if not rows.empty:
+                rows = rows[rows['ticker'].isin(batch)]
+                try:
+                    rows_written += self.write_rows(rows)
+                    loaded_tickers.update(rows['ticker'].unique())
+                except Exception as e:
+                    logger.error(f"Bulk history write failed for batch {batch_num}: {e}")
+
+            logger.info(f"Bulk history batch {batch_num}/{len(batches)}: "
+                        f"{rows['ticker'].nunique() if not rows.empty else 0}/{len(batch)} tickers, {len(rows)} rows")
+
+            if batch_num < len(batches) and self.pause_between_batches:
+                time.sleep(self.pause_between_batches)
+
+        skipped = set(skipped_tickers)
+        missing_tickers = [t for t in tickers if t not in loaded_tickers and t not in skipped]
+        fallback_successful = 0
+        fallback_failed = 0
+
+        if fallback and missing_tickers:
+            logger.info(f"Bulk history: {len(missing_tickers)} tickers missing, using per-ticker providers")
+            for ticker in missing_tickers:
+                try:
+                    if fallback(ticker):
+                        fallback_successful += 1
+                    else:
+                        fallback_failed += 1
+                except Exception as e:
+                    logger.error(f"Per-ticker history fallback failed for {ticker}: {e}")
+                    fallback_failed += 1
+
+        processing_time = time.time() - start_time
+        logger.info(f"Bulk history backfill completed: {len(loaded_tickers)} bulk, "
+                    f"{fallback_successful} via fallback, {rows_written} rows in {processing_time:.1f}s")
+
+        return {
+            'total_tickers': len(tickers),
+            'bulk_tickers_loaded': len(loaded_tickers),
+            'bulk_rows_written': rows_written,
+            'bulk_requests': download_requests,
+            'missing_tickers': missing_tickers,
+            'skipped_tickers': skipped_tickers,
+            'fallback_successful': fallback_successful,
+            'fallback_failed': fallback_failed,
+            'processing_time': processing_time
+        }
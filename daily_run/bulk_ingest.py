@@ -0,0 +1,369 @@
+"""
+Bulk Ingest
+
+Shared COPY-based loader for the OHLCV history tables (daily_charts,
+market_data, sectors). Price frames are converted to cents-scaled integer
+columns in one vectorized pass, streamed with COPY FROM STDIN into a
+per-transaction temp table and merged into the target with a single
+INSERT ... SELECT ... ON CONFLICT statement.
+
+End-of-day quotes take a binary COPY path instead (copy_quotes): a parsed
+provider batch is normalized into one frame (quotes_to_rows), encoded in
+PostgreSQL's binary COPY format in one vectorized pass per row layout
+(encode_copy_binary) and copied into a session-local temp table with fixed
+column types, so no values are rendered to or parsed from text.
+"""
+
+import io
+import logging
+import struct
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .database import mark_quality_dirty
+except ImportError:
+    from database import mark_quality_dirty
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+OHLCV_COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume']
+
+# Provider fields holding the quote price, in order of preference
+QUOTE_CLOSE_FIELDS = ('close', 'close_price', 'price')
+# Column types of the COPY temp table; the merge casts to the target's types
+QUOTE_COPY_TYPES = {
+    'ticker': 'text', 'date': 'date', 'open': 'float8', 'high': 'float8', 'low': 'float8',
+    'close': 'float8', 'volume': 'int8', 'data_source': 'text'
+}
+
+_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_COPY_TRAILER = struct.pack('>h', -1)
+_BINARY_FORMATS = {'date': '>i4', 'float8': '>f8', 'int8': '>i8'}
+_PG_EPOCH = np.datetime64('2000-01-01', 'D')
+
+
+def price_frame_to_cents(hist_df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """
+    Convert a per-ticker price frame to cents-scaled OHLCV rows.
+
+    Accepts either a yfinance-style frame (DatetimeIndex, 'Open'/'High'/...
+    columns in dollars) or a frame with lower-case 'date'/'open'/... columns
+    as built from provider records.
+
+    Args:
+        hist_df: Price history for one ticker, prices in dollars
+        ticker: Ticker symbol written into every row
+
+    Returns:
+        DataFrame with columns OHLCV_COLUMNS, prices as int64 cents
+    """
+    if hist_df is None or hist_df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    df = hist_df.rename(columns=str.lower)
+    if 'date' in df.columns:
+        dates = df['date']
+    else:
+        dates = pd.Series(df.index, index=df.index)
+    if 'volume' not in df.columns:
+        df = df.assign(volume=np.nan)
+
+    prices = df[PRICE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    valid = prices.notna().all(axis=1).to_numpy()
+
+    rows = pd.DataFrame({
+        'ticker': ticker,
+        'date': pd.to_datetime(dates[valid]).dt.strftime('%Y-%m-%d').to_numpy(),
+    })
+    for column in PRICE_COLUMNS:
+        rows[column] = np.round(prices[column].to_numpy(dtype='float64')[valid] * 100).astype('int64')
+    volume = pd.to_numeric(df['volume'], errors='coerce').to_numpy(dtype='float64')[valid]
+    rows['volume'] = pd.array(np.round(volume), dtype='Int64')
+
+    return rows[OHLCV_COLUMNS]
+
+
+def copy_upsert(cursor, table: str, rows: pd.DataFrame,
+                key_columns: Sequence[str] = ('ticker', 'date'),
+                update_columns: Optional[Sequence[str]] = None,
+                insert_expressions: Optional[Dict[str, str]] = None,
+                update_expressions: Optional[Dict[str, str]] = None,
+                keep_existing_on_null: bool = False) -> Dict[str, int]:
+    """
+    Load rows into a table with COPY and merge them with one upsert.
+
+    The caller owns the transaction; nothing is committed here. Rows are
+    staged in a temp table created from the target's current columns
+    (CREATE TABLE AS ... WITH NO DATA) and dropped at commit: it carries no
+    NOT NULL constraints or defaults, so a NULL in a non-key column reaches
+    the merge (and COALESCE when keep_existing_on_null) instead of failing
+    the COPY, and staging never draws from the target's sequences.
+
+    Args:
+        cursor: Open psycopg2 cursor
+        table: Target table name
+        rows: Rows to load; column names must match the target table
+        key_columns: Conflict target of the target table
+        update_columns: Columns overwritten on conflict; None keeps existing rows
+        insert_expressions: Extra target columns filled with SQL expressions
+                            (e.g. {'created_at': 'CURRENT_TIMESTAMP'})
+        update_expressions: Extra SET assignments applied on conflict
+        keep_existing_on_null: NULL incoming values leave the existing value in place
+
+    Returns:
+        Dictionary with 'staged', 'inserted', 'updated' and 'unchanged' counts
+    """
+    if rows is None or rows.empty:
+        return {'staged': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    columns: List[str] = list(rows.columns)
+    staging_table = f"{table}_copy_staging"
+    column_list = ', '.join(columns)
+
+    insert_expressions = insert_expressions or {}
+    target_columns = ', '.join(columns + list(insert_expressions))
+    select_list = ', '.join(columns + list(insert_expressions.values()))
+
+    if update_columns:
+        if keep_existing_on_null:
+            assignments = [f"{column} = COALESCE(EXCLUDED.{column}, {table}.{column})" for column in update_columns]
+        else:
+            assignments = [f"{column} = EXCLUDED.{column}" for column in update_columns]
+        assignments += [f"{column} = {expression}" for column, expression in (update_expressions or {}).items()]
+        conflict_action = f"DO UPDATE SET {', '.join(assignments)}"
+    else:
+        conflict_action = "DO NOTHING"
+
+    buffer = io.StringIO()
+    rows.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    # A second load in the same transaction may stage different columns
+    cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{staging_table}")
+    cursor.execute(f"""
+        CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS
+        SELECT {column_list} FROM {table} WITH NO DATA
+    """)
+    cursor.copy_expert(f"COPY {staging_table} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    # Duplicate keys inside one load would abort ON CONFLICT DO UPDATE, keep the last one
+    cursor.execute(f"""
+        WITH merged AS (
+            INSERT INTO {table} ({target_columns})
+            SELECT DISTINCT ON ({', '.join(key_columns)}) {select_list}
+            FROM {staging_table}
+            ORDER BY {', '.join(key_columns)}, ctid DESC
+            ON CONFLICT ({', '.join(key_columns)}) {conflict_action}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+    """)
+    inserted, updated = cursor.fetchone()
+    cursor.execute(f"DROP TABLE {staging_table}")
+
+    staged = len(rows)
+    return {
+        'staged': staged,
+        'inserted': inserted or 0,
+        'updated': updated or 0,
+        'unchanged': staged - (inserted or 0) - (updated or 0)
+    }
+
+
+def upsert_price_history(cursor, table: str, rows: pd.DataFrame,
+                         metadata: Optional[Dict[str, object]] = None,
+                         overwrite: bool = True,
+                         timestamps: bool = False) -> Dict[str, int]:
+    """
+    Upsert cents-scaled OHLCV rows into one of the price history tables.
+
+    Args:
+        cursor: Open psycopg2 cursor
+        table: 'daily_charts', 'market_data' or 'sectors'
+        rows: Output of price_frame_to_cents (or compatible)
+        metadata: Constant per-ticker columns, e.g. etf_name
+        overwrite: Overwrite OHLCV of existing rows; False leaves them untouched
+        timestamps: Maintain created_at/updated_at columns
+
+    Returns:
+        Counts from copy_upsert
+    """
+    if metadata:
+        rows = rows.assign(**metadata)
+
+    counts = copy_upsert(
+        cursor, table, rows,
+        update_columns=['open', 'high', 'low', 'close', 'volume'] if overwrite else None,
+        insert_expressions={'created_at': 'CURRENT_TIMESTAMP', 'updated_at': 'CURRENT_TIMESTAMP'} if timestamps else None,
+        update_expressions={'updated_at': 'CURRENT_TIMESTAMP'} if timestamps else None
+    )
+    if rows is not None and not rows.empty:
+        mark_quality_dirty(table, rows['ticker'].unique())
+    return counts
+
+
+def quotes_to_rows(quotes: Union[Mapping[str, Mapping[str, Any]], Iterable[Mapping[str, Any]]],
+                   quote_date: Optional[date] = None) -> pd.DataFrame:
+    """
+    Normalize a parsed provider batch into one row per (ticker, date).
+
+    Accepts {ticker: quote} as returned by the batch price services or a
+    list of quotes carrying 'ticker'. The price is taken from 'close',
+    'close_price' or 'price' (the first one set and non-zero); missing
+    open/high/low fall back to it. Quotes without a date are dated
+    quote_date (default today). Prices are kept as given, quotes without a
+    ticker or price are dropped and a repeated (ticker, date) keeps the last.
+
+    Returns:
+        DataFrame with columns OHLCV_COLUMNS (date as datetime64, prices float64,
+        volume nullable Int64)
+    """
+    if isinstance(quotes, Mapping):
+        records = [{**quote, 'ticker': ticker} for ticker, quote in quotes.items()]
+    else:
+        records = list(quotes)
+    if not records:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    frame = pd.DataFrame.from_records(records)
+
+    def numeric(column: str) -> pd.Series:
+        if column not in frame.columns:
+            return pd.Series(np.nan, index=frame.index)
+        return pd.to_numeric(frame[column], errors='coerce').astype('float64')
+
+    close = pd.Series(np.nan, index=frame.index)
+    for column in QUOTE_CLOSE_FIELDS:
+        values = numeric(column)
+        close = close.fillna(values.where(values != 0))
+
+    default_date = pd.Timestamp(quote_date or date.today())
+    dates = pd.to_datetime(frame['date'], errors='coerce') if 'date' in frame.columns \
+        else pd.Series(pd.NaT, index=frame.index)
+    rows = pd.DataFrame({
+        'ticker': frame['ticker'],
+        'date': dates.fillna(default_date).dt.normalize(),
+        'open': numeric('open').fillna(close),
+        'high': numeric('high').fillna(close),
+        'low': numeric('low').fillna(close),
+        'close': close,
+        'volume': pd.array(np.round(numeric('volume').to_numpy()), dtype='Int64'),
+    })
+    valid = rows['ticker'].notna() & (rows['ticker'].astype(str) != '') & rows['close'].notna()
+    rows = rows[valid].drop_duplicates(['ticker', 'date'], keep='last')
+    return rows.reset_index(drop=True)
+
+
+def encode_copy_binary(rows: pd.DataFrame, types: Mapping[str, str]) -> bytes:
+    """
+    Encode rows as a PostgreSQL binary COPY stream.
+
+    types maps each column (in COPY column order) to 'text', 'date',
+    'float8' or 'int8'. Rows sharing a layout (the byte length of every
+    text value and which values are NULL) are packed together through one
+    NumPy structured array, so the cost is per layout rather than per row.
+    Row order is not preserved across layouts.
+    """
+    columns = list(types)
+    values: Dict[str, np.ndarray] = {}
+    widths: Dict[str, np.ndarray] = {}
+    for column in columns:
+        series = rows[column]
+        null = series.isna().to_numpy()
+        kind = types[column]
+        if kind == 'text':
+            encoded = series.where(~null, '').astype(str).str.encode('utf-8')
+            values[column] = encoded.to_numpy(dtype=object)
+            widths[column] = np.where(null, -1, encoded.str.len().to_numpy(dtype='int64'))
+            continue
+        if kind == 'date':
+            days = pd.to_datetime(series).to_numpy(dtype='datetime64[D]') - _PG_EPOCH
+            data = np.where(null, 0, days.astype('int64'))
+        elif kind == 'float8':
+            data = series.to_numpy(dtype='float64', na_value=np.nan)
+        elif kind == 'int8':
+            data = np.round(pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan))
+            data = np.where(null, 0, data).astype('int64')
+        else:
+            raise ValueError(f"Unsupported binary COPY type for {column}: {kind}")
+        values[column] = data
+        widths[column] = np.where(null, -1, np.dtype(_BINARY_FORMATS[kind]).itemsize)
+
+    chunks = [_COPY_HEADER]
+    if len(rows):
+        layouts, inverse = np.unique(np.column_stack([widths[c] for c in columns]), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for number, layout in enumerate(layouts):
+            index = np.flatnonzero(inverse == number)
+            fields = [('count', '>i2')]
+            for column, width in zip(columns, layout):
+                fields.append((f"{column}__len", '>i4'))
+                if width > 0:
+                    fields.append((column, f"S{width}" if types[column] == 'text' else _BINARY_FORMATS[types[column]]))
+            packed = np.empty(len(index), dtype=fields)
+            packed['count'] = len(columns)
+            for column, width in zip(columns, layout):
+                packed[f"{column}__len"] = width
+                if width > 0:
+                    packed[column] = values[column][index]
+            chunks.append(packed.tobytes())
+    chunks.append(_COPY_TRAILER)
+    return b''.join(chunks)
+
+
+def copy_quotes(cursor, rows: pd.DataFrame, table: str = 'daily_charts',
+                source: Optional[str] = None) -> Dict[str, int]:
+    """
+    Binary COPY normalized quotes into a temp table and merge them with one upsert.
+
+    The temp table is private to the session, so concurrent loaders do not
+    contend for it; the merge casts its float8/date columns to the target's
+    column types. The caller owns the transaction; nothing is committed here.
+
+    Args:
+        cursor: Open psycopg2 cursor
+        rows: Output of quotes_to_rows (unique per ticker and date)
+        table: Target table
+        source: Also write data_source and last_updated (the target must have them)
+
+    Returns:
+        Dictionary with 'staged', 'inserted' and 'updated' counts
+    """
+    if rows is None or rows.empty:
+        return {'staged': 0, 'inserted': 0, 'updated': 0}
+
+    staging_table = f"{table}_quotes_copy"
+    copy_columns = OHLCV_COLUMNS + (['data_source'] if source else [])
+    payload = encode_copy_binary(rows.assign(data_source=source) if source else rows,
+                                 {column: QUOTE_COPY_TYPES[column] for column in copy_columns})
+
+    target_columns = list(copy_columns)
+    select_list = list(copy_columns)
+    assignments = [f"{column} = EXCLUDED.{column}" for column in ['open', 'high', 'low', 'close', 'volume']]
+    if source:
+        target_columns.append('last_updated')
+        select_list.append('CURRENT_TIMESTAMP')
+        assignments += ["data_source = EXCLUDED.data_source", "last_updated = CURRENT_TIMESTAMP"]
+
+    columns_sql = ', '.join(f"{column} {kind}" for column, kind in QUOTE_COPY_TYPES.items())
+    cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} ({columns_sql})")
+    cursor.execute(f"TRUNCATE {staging_table}")
+    cursor.copy_expert(f"COPY {staging_table} ({', '.join(copy_columns)}) FROM STDIN WITH (FORMAT binary)",
+                       io.BytesIO(payload))
+    cursor.execute(f"""
+        WITH merged AS (
+            INSERT INTO {table} ({', '.join(target_columns)})
+            SELECT {', '.join(select_list)}
+            FROM {staging_table}
+            ON CONFLICT (ticker, date) DO UPDATE SET {', '.join(assignments)}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+    """)
+    inserted, updated = cursor.fetchone()
+    return {'staged': len(rows), 'inserted': inserted or 0, 'updated': updated or 0}
@@ -17,9 +17,10 @@ import psycopg2
 sys.path.append(os.path.dirname(__file__))
 
 from improved_ratio_calculator_v5_enhanced import EnhancedRatioCalculatorV5
-from database import DatabaseManager
+from database import DatabaseManager, mark_quality_dirty
 from error_handler import ErrorHandler, ErrorSeverity
 from monitoring import SystemMonitor
+from change_tracker import ChangeTracker
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ class DailyFundamentalRatioCalculator:
         self.calculator = EnhancedRatioCalculatorV5()
         self.error_handler = ErrorHandler("daily_fundamental_ratio_calculator")
         self.monitoring = SystemMonitor()
+        self.change_tracker = ChangeTracker(db_connection)
         
     def get_companies_needing_ratio_updates(self) -> List[Dict]:
         """
@@ -316,6 +318,7 @@ class DailyFundamentalRatioCalculator:
             )
             
             self.db.execute_update(update_query, values)
+            mark_quality_dirty('company_fundamentals', [ticker])
             logger.info(f"Successfully stored {len(ratios)} ratios for {ticker}")
             return True
             
@@ -323,10 +326,13 @@ class DailyFundamentalRatioCalculator:
             logger.error(f"Error storing ratios for {ticker}: {e}")
             return False
     
-    def process_all_companies(self) -> Dict:
+    def process_all_companies(self, force: bool = False) -> Dict:
         """
         Process ratio calculations for all companies needing updates
         
+        Args:
+            force: Recompute candidates even if their inputs did not change
+        
         Returns:
             Dictionary with processing results
         """
@@ -337,21 +343,33 @@ class DailyFundamentalRatioCalculator:
         companies = self.get_companies_needing_ratio_updates()
         logger.info(f"✅ Found {len(companies)} companies needing ratio updates")
         
+        # Drop candidates whose fundamentals and price are unchanged since the last run
+        dirty_report = None
+        if companies and not force:
+            dirty, dirty_report = self.change_tracker.dirty_set(
+                'daily_fundamental_ratios', [company['ticker'] for company in companies]
+            )
+            dirty = set(dirty)
+            companies = [company for company in companies if company['ticker'] in dirty]
+        
         if not companies:
             logger.info("ℹ️ No companies need ratio updates")
             return {
                 'total_processed': 0,
                 'successful': 0,
                 'failed': 0,
-                'errors': []
+                'errors': [],
+                'dirty_set': dirty_report.to_dict() if dirty_report else None
             }
         
         results = {
             'total_processed': len(companies),
             'successful': 0,
             'failed': 0,
-            'errors': []
+            'errors': [],
+            'dirty_set': dirty_report.to_dict() if dirty_report else None
         }
+        successful_tickers = []
         
         # Process each company
         logger.info(f"📈 STEP 2: Processing {len(companies)} companies...")
@@ -361,6 +379,7 @@ class DailyFundamentalRatioCalculator:
             
             if result['status'] == 'success':
                 results['successful'] += 1
+                successful_tickers.append(company['ticker'])
                 logger.info(f"✅ Successfully calculated ratios for {company.get('ticker', 'Unknown')}")
             else:
                 results['failed'] += 1
@@ -372,12 +391,18 @@ class DailyFundamentalRatioCalculator:
         
         logger.info(f"✅ STEP 3: Completed processing all companies")
         
+        if dirty_report:
+            self.change_tracker.mark_computed('daily_fundamental_ratios', successful_tickers)
+        
         # Log summary with enhanced details
         logger.info(f"📊 FUNDAMENTAL RATIO CALCULATION SUMMARY:")
         logger.info(f"   • Total Companies Processed: {results['total_processed']}")
         logger.info(f"   • Successful Calculations: {results['successful']}")
         logger.info(f"   • Failed Calculations: {results['failed']}")
         logger.info(f"   • Success Rate: {(results['successful']/results['total_processed']*100):.1f}%" if results['total_processed'] > 0 else "N/A")
+        if dirty_report:
+            logger.info(f"   • Dirty Set: {dirty_report.dirty_tickers}/{dirty_report.total_tickers} "
+                        f"(skip ratio {dirty_report.skip_ratio:.1%})")
         
         if results['errors']:
             logger.info(f"   ❌ Companies with Errors ({len(results['errors'])}):")
@@ -0,0 +1,256 @@
+"""
+Change Tracker
+
+Dirty-set tracking for derived data (fundamental ratios, fundamental scores).
+Each consumer keeps a watermark per ticker in recompute_watermarks: the
+fingerprint of the company_fundamentals row it last used and the close price
+it was computed at. A ticker is dirty when it has never been computed, its
+latest fundamentals row changed, or (for price-dependent consumers such as
+P/E and P/B) the close moved more than a threshold since the last run.
+
+Only the raw reported inputs (FINGERPRINT_COLUMNS) are fingerprinted. The
+ratio columns and last_updated are written back into the same row by
+store_ratios(), and market_cap/enterprise_value move with the price; hashing
+them would make every recompute dirty the ticker again.
+"""
+
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .database import DatabaseManager
+except ImportError:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Relative close move that makes price-dependent ratios stale
+DEFAULT_PRICE_MOVE_THRESHOLD = 0.02
+
+# Reported company_fundamentals inputs that define the fingerprint; columns
+# missing from a deployment's schema are simply left out of the hash
+FINGERPRINT_COLUMNS = [
+    'report_date', 'period_type', 'fiscal_year', 'fiscal_quarter',
+    'revenue', 'revenue_ttm', 'gross_profit', 'operating_income', 'net_income', 'net_income_ttm',
+    'ebitda', 'cost_of_goods_sold', 'interest_expense',
+    'total_assets', 'total_liabilities', 'total_debt', 'total_equity', 'book_value',
+    'cash_and_equivalents', 'total_cash', 'current_assets', 'current_liabilities',
+    'inventory', 'accounts_receivable', 'accounts_payable', 'retained_earnings',
+    'operating_cash_flow', 'free_cash_flow', 'capex',
+    'eps_diluted', 'book_value_per_share', 'shares_outstanding', 'shares_float',
+]
+
+
+@dataclass
+class DirtySetReport:
+    """Dirty-set statistics for one consumer/phase"""
+    consumer: str
+    total_tickers: int
+    dirty_tickers: int
+    never_computed: int = 0
+    fundamentals_changed: int = 0
+    price_moved: int = 0
+    tracking_available: bool = True
+
+    @property
+    def skipped_tickers(self) -> int:
+        return self.total_tickers - self.dirty_tickers
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped_tickers / self.total_tickers if self.total_tickers else 0.0
+
+    def to_dict(self) -> Dict:
+        result = asdict(self)
+        result['skipped_tickers'] = self.skipped_tickers
+        result['skip_ratio'] = round(self.skip_ratio, 4)
+        return result
+
+
+def select_dirty(current: Dict[str, Tuple[Optional[str], Optional[int]]],
+                 stored: Dict[str, Tuple[Optional[str], Optional[int]]],
+                 consumer: str,
+                 price_move_threshold: Optional[float] = DEFAULT_PRICE_MOVE_THRESHOLD) -> Tuple[List[str], DirtySetReport]:
+    """
+    Compare current inputs with stored watermarks.
+
+    Args:
+        current: {ticker: (fundamentals_fingerprint, close)} as of now
+        stored: {ticker: (fundamentals_fingerprint, close)} from the last computation
+        consumer: Consumer name used in the report
+        price_move_threshold: Relative close move that marks a ticker dirty;
+                              None for consumers that do not depend on price
+
+    Returns:
+        Tuple of (dirty tickers in input order, report)
+    """
+    dirty = []
+    report = DirtySetReport(consumer=consumer, total_tickers=len(current), dirty_tickers=0)
+
+    for ticker, (fingerprint, price) in current.items():
+        if ticker not in stored:
+            report.never_computed += 1
+            dirty.append(ticker)
+            continue
+
+        stored_fingerprint, stored_price = stored[ticker]
+        if fingerprint != stored_fingerprint:
+            report.fundamentals_changed += 1
+            dirty.append(ticker)
+            continue
+
+        if price_move_threshold is not None and price is not None:
+            if not stored_price or abs(price - stored_price) / abs(stored_price) >= price_move_threshold:
+                report.price_moved += 1
+                dirty.append(ticker)
+
+    report.dirty_tickers = len(dirty)
+    return dirty, report
+
+
+class ChangeTracker:
+    """
+    Tracks which tickers need their derived data recomputed.
+
+    Usage:
+        dirty, report = tracker.dirty_set('financial_ratios', tickers)
+        ... recompute dirty tickers ...
+        tracker.mark_computed('financial_ratios', successful_tickers)
+    """
+
+    def __init__(self, db: DatabaseManager = None,
+                 price_move_threshold: float = DEFAULT_PRICE_MOVE_THRESHOLD):
+        self.db = db or DatabaseManager()
+        self.price_move_threshold = price_move_threshold
+        self._table_ready = False
+        # Inputs captured by dirty_set(), written back by mark_computed()
+        self._pending: Dict[str, Dict[str, Tuple[Optional[str], Optional[int]]]] = {}
+
+    def ensure_table(self):
+        """Create the watermark table if missing"""
+        if self._table_ready:
+            return
+        self.db.execute_update("""
+            CREATE TABLE IF NOT EXISTS recompute_watermarks (
+                consumer VARCHAR(50) NOT NULL,
+                ticker VARCHAR(10) NOT NULL,
+                fundamentals_fingerprint VARCHAR(32),
+                price_basis BIGINT,
+                computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (consumer, ticker)
+            )
+        """)
+        self._table_ready = True
+
+    def load_current_inputs(self, tickers: List[str]) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+        """
+        Fingerprint the latest fundamentals row and fetch the latest close per ticker.
+
+        Returns:
+            {ticker: (md5 of the latest row's FINGERPRINT_COLUMNS, latest close in cents)}
+        """
+        query = """
+        WITH requested AS (
+            SELECT UNNEST(%s::text[]) AS ticker
+        ),
+        latest_fundamentals AS (
+            SELECT DISTINCT ON (cf.ticker) cf.ticker,
+                   md5((SELECT jsonb_object_agg(col.key, col.value)
+                        FROM jsonb_each(to_jsonb(cf)) AS col
+                        WHERE col.key = ANY(%s))::text) AS fingerprint
+            FROM company_fundamentals cf
+            WHERE cf.ticker = ANY(%s)
+            ORDER BY cf.ticker, cf.report_date DESC
+        ),
+        latest_prices AS (
+            SELECT DISTINCT ON (dc.ticker) dc.ticker, dc.close
+            FROM daily_charts dc
+            WHERE dc.ticker = ANY(%s)
+            ORDER BY dc.ticker, dc.date DESC
+        )
+        SELECT r.ticker, lf.fingerprint, lp.close
+        FROM requested r
+        LEFT JOIN latest_fundamentals lf ON lf.ticker = r.ticker
+        LEFT JOIN latest_prices lp ON lp.ticker = r.ticker
+        """
+        rows = self.db.execute_query(query, (tickers, FINGERPRINT_COLUMNS, tickers, tickers))
+        inputs = {row[0]: (row[1], int(row[2]) if row[2] is not None else None) for row in rows or []}
+        # Preserve caller order
+        return {ticker: inputs.get(ticker, (None, None)) for ticker in tickers}
+
+    def load_watermarks(self, consumer: str, tickers: List[str]) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+        """Load stored watermarks for a consumer"""
+        rows = self.db.execute_query("""
+            SELECT ticker, fundamentals_fingerprint, price_basis
+            FROM recompute_watermarks
+            WHERE consumer = %s AND ticker = ANY(%s)
+        """, (consumer, tickers))
+        return {row[0]: (row[1], row[2]) for row in rows or []}
+
+    def dirty_set(self, consumer: str, tickers: List[str],
+                  price_dependent: bool = True) -> Tuple[List[str], DirtySetReport]:
+        """
+        Return the tickers whose inputs changed since the consumer last ran.
+
+        Tracking failures are not fatal: every ticker is returned as dirty.
+
+        Args:
+            consumer: Name of the derived dataset (e.g. 'financial_ratios')
+            tickers: Candidate tickers
+            price_dependent: Whether close moves invalidate the consumer's output
+
+        Returns:
+            Tuple of (dirty tickers, report)
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return [], DirtySetReport(consumer=consumer, total_tickers=0, dirty_tickers=0)
+
+        try:
+            self.ensure_table()
+            current = self.load_current_inputs(tickers)
+            stored = self.load_watermarks(consumer, tickers)
+        except Exception as e:
+            logger.warning(f"Change tracking unavailable for {consumer}, recomputing all {len(tickers)} tickers: {e}")
+            return tickers, DirtySetReport(consumer=consumer, total_tickers=len(tickers),
+                                           dirty_tickers=len(tickers), tracking_available=False)
+
+        threshold = self.price_move_threshold if price_dependent else None
+        dirty, report = select_dirty(current, stored, consumer, threshold)
+        self._pending[consumer] = {ticker: current[ticker] for ticker in dirty}
+
+        logger.info(f"🧮 {consumer}: {report.dirty_tickers}/{report.total_tickers} tickers dirty "
+                    f"(new={report.never_computed}, fundamentals={report.fundamentals_changed}, "
+                    f"price={report.price_moved}), skip ratio {report.skip_ratio:.1%}")
+        return dirty, report
+
+    def mark_computed(self, consumer: str, tickers: List[str]):
+        """
+        Record that the consumer finished recomputing these tickers.
+
+        Uses the inputs captured by the preceding dirty_set() call so that
+        changes arriving mid-run are picked up next time.
+        """
+        pending = self._pending.get(consumer, {})
+        now = datetime.now()
+        rows = [(consumer, ticker, pending[ticker][0], pending[ticker][1], now)
+                for ticker in tickers if ticker in pending]
+        if not rows:
+            return
+
+        try:
+            self.db.execute_values("""
+                INSERT INTO recompute_watermarks
+                    (consumer, ticker, fundamentals_fingerprint, price_basis, computed_at)
+                VALUES %s
+                ON CONFLICT (consumer, ticker) DO UPDATE SET
+                    fundamentals_fingerprint = EXCLUDED.fundamentals_fingerprint,
+                    price_basis = EXCLUDED.price_basis,
+                    computed_at = EXCLUDED.computed_at
+            """, rows)
+            for row in rows:
+                pending.pop(row[1], None)
+        except Exception as e:
+            logger.warning(f"Failed to record watermarks for {consumer}: {e}")
@@ -6,7 +6,11 @@ and prevent cascading failures in the system.
 """
 
 import logging
+import queue
+import random
+import threading
 import time
+from collections import deque
 from typing import Dict, Optional, Callable, Any, List, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
@@ -22,31 +26,163 @@ class CircuitState(Enum):
     HALF_OPEN = "HALF_OPEN"  # Testing if service is back
 
 
+class BreakerEventLog:
+    """
+    Non-blocking sink for circuit breaker events.
+
+    Callers only enqueue; a daemon thread does the logging and error-handler
+    reporting. When the queue is full, events are dropped and counted
+    instead of stalling the API call path.
+    """
+
+    def __init__(self, maxsize: int = 1000, history: int = 200):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.recent = deque(maxlen=history)
+        self.dropped = 0
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.error_handler = ErrorHandler("circuit_breaker")
+
+    def emit(self, level: int, message: str, exception: Optional[Exception] = None,
+             context: Optional[Dict[str, Any]] = None):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((time.time(), level, message, exception, context))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until queued events are written (tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="circuit-breaker-events", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            timestamp, level, message, exception, context = self._queue.get()
+            try:
+                self.recent.append({'time': timestamp, 'level': logging.getLevelName(level), 'message': message})
+                logger.log(level, message)
+                if level >= logging.WARNING and context is not None:
+                    severity = ErrorSeverity.ERROR if level >= logging.ERROR else ErrorSeverity.WARNING
+                    self.error_handler.log_error(message, severity, exception, context)
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
+
+
+breaker_events = BreakerEventLog()
+
+
 class CircuitBreaker:
     """
-    Circuit breaker for a single service.
+    Adaptive circuit breaker for one service endpoint.
+
+    Keeps a rolling window of recent calls (outcome and duration) and opens
+    when, with at least `minimum_calls` in the window, the error rate or the
+    share of slow calls crosses its threshold, or after `failure_threshold`
+    consecutive failures. Slow calls include failures: a request that hangs
+    until a 30s timeout counts both as an error and as slow.
+
+    While open, the breaker waits an exponentially growing, jittered delay
+    (recovery_timeout * 2^(trips-1), capped at max_recovery_timeout) and then
+    lets up to `half_open_max_calls` probes through. Probes that all succeed
+    quickly close it; a failed or slow probe opens it again with a longer delay.
     """
     
     def __init__(self, service_name: str, failure_threshold: int = 5,
-                 recovery_timeout: int = 60, expected_exception: Exception = Exception):
+                 recovery_timeout: int = 60, expected_exception: Exception = Exception,
+                 endpoint: Optional[str] = None, window_size: int = 50, window_seconds: float = 300,
+                 minimum_calls: int = 10, failure_rate_threshold: float = 0.5,
+                 slow_call_duration: float = 10.0, slow_call_rate_threshold: float = 0.5,
+                 max_recovery_timeout: float = 1800, half_open_max_calls: int = 3,
+                 clock: Callable[[], float] = time.monotonic):
         self.service_name = service_name
+        self.endpoint = endpoint
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
         self.expected_exception = expected_exception
+        self.window_seconds = window_seconds
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.RLock()
         
         # State tracking
-        self.state = CircuitState.CLOSED
+        self._state = CircuitState.CLOSED
         self.failure_count = 0
         self.last_failure_time = None
         self.success_count = 0
+        self.trip_count = 0
+        self.open_until = None
+        self._half_open_in_flight = 0
+        self._window = deque(maxlen=window_size)  # (timestamp, duration, ok)
         
         # Statistics
         self.total_requests = 0
         self.total_failures = 0
         self.total_successes = 0
-        
-        self.error_handler = ErrorHandler(f"circuit_breaker_{service_name}")
-        
+        self.total_slow_calls = 0
+        self.total_rejected = 0
+    
+    @property
+    def name(self) -> str:
+        return f"{self.service_name}:{self.endpoint}" if self.endpoint else self.service_name
+    
+    @property
+    def state(self) -> CircuitState:
+        """Current state; an OPEN breaker whose backoff elapsed reports HALF_OPEN"""
+        with self._lock:
+            if self._state == CircuitState.OPEN and self.open_until is not None and self._clock() >= self.open_until:
+                self._state = CircuitState.HALF_OPEN
+                self.success_count = 0
+                self._half_open_in_flight = 0
+                breaker_events.emit(logging.INFO, f"Circuit breaker for {self.name} moving to HALF_OPEN")
+            return self._state
+    
+    @state.setter
+    def state(self, value: CircuitState):
+        with self._lock:
+            self._state = value
+    
+    def is_available(self) -> bool:
+        """Whether a request would currently be let through (does not take a probe slot)"""
+        state = self.state
+        if state == CircuitState.HALF_OPEN:
+            return self._half_open_in_flight < self.half_open_max_calls
+        return state == CircuitState.CLOSED
+    
+    def allow_request(self) -> bool:
+        """Admit a request; in HALF_OPEN this takes one of the probe slots"""
+        with self._lock:
+            state = self.state
+            if state == CircuitState.CLOSED:
+                return True
+            if state == CircuitState.HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self.total_rejected += 1
+            return False
+    
+    def release(self):
+        """Give back a probe slot taken by allow_request() when no call was made"""
+        with self._lock:
+            if self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+    
     def call(self, func: Callable, *args, **kwargs) -> Any:
         """
         Execute a function with circuit breaker protection.
@@ -64,101 +200,156 @@ class CircuitBreaker:
         """
         self.total_requests += 1
         
-        # Check circuit state
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                self.state = CircuitState.HALF_OPEN
-                logger.info(f"Circuit breaker for {self.service_name} moving to HALF_OPEN")
-            else:
-                raise CircuitBreakerOpenException(f"Circuit breaker OPEN for {self.service_name}")
+        if not self.allow_request():
+            raise CircuitBreakerOpenException(f"Circuit breaker OPEN for {self.name}")
         
+        start_time = time.monotonic()
         try:
-            # Execute the function
-            start_time = time.time()
             result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            
-            # Success - update state
-            self._on_success(execution_time)
-            return result
-            
-        except self.expected_exception as e:
-            # Expected failure - update state
-            self._on_failure(e)
-            raise
         except Exception as e:
-            # Unexpected failure - still count as failure
-            self._on_failure(e)
+            # Expected or not, every exception counts as a failure
+            self.record_failure(e, time.monotonic() - start_time)
             raise
+        self.record_success(time.monotonic() - start_time)
+        return result
     
-    def _on_success(self, execution_time: float):
-        """Handle successful execution"""
-        self.total_successes += 1
-        
-        if self.state == CircuitState.HALF_OPEN:
-            self.success_count += 1
-            if self.success_count >= 3:  # Require 3 successes to close
-                self.state = CircuitState.CLOSED
-                self.failure_count = 0
-                self.success_count = 0
-                logger.info(f"Circuit breaker for {self.service_name} CLOSED after recovery")
-        elif self.state == CircuitState.CLOSED:
-            # Reset failure count on success
-            self.failure_count = max(0, self.failure_count - 1)
+    def record_success(self, execution_time: float = 0.0):
+        """Record a completed call; slow successes count toward the slow-call ratio"""
+        with self._lock:
+            self.total_successes += 1
+            slow = self._record(execution_time, ok=True)
+            
+            if self._state == CircuitState.HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if slow:
+                    self._trip(f"slow probe ({execution_time:.1f}s)")
+                    return
+                self.success_count += 1
+                if self.success_count >= self.half_open_max_calls:
+                    self._close()
+            elif self._state == CircuitState.CLOSED:
+                # Reset failure count on success
+                self.failure_count = max(0, self.failure_count - 1)
+                self._evaluate()
         
-        logger.debug(f"Circuit breaker success for {self.service_name} "
+        logger.debug(f"Circuit breaker success for {self.name} "
                     f"(execution_time: {execution_time:.3f}s)")
     
-    def _on_failure(self, exception: Exception):
-        """Handle failed execution"""
-        self.total_failures += 1
-        self.failure_count += 1
-        self.last_failure_time = datetime.now()
-        
-        if self.state == CircuitState.HALF_OPEN:
-            # Failure in half-open state goes back to open
-            self.state = CircuitState.OPEN
-            logger.warning(f"Circuit breaker for {self.service_name} back to OPEN after failure")
-        elif self.failure_count >= self.failure_threshold:
-            # Too many failures - open the circuit
-            self.state = CircuitState.OPEN
-            logger.error(f"Circuit breaker for {self.service_name} OPENED after "
-                        f"{self.failure_count} failures")
-        
-        self.error_handler.handle_error(
-            f"Circuit breaker recorded failure for {self.service_name}", 
-            exception, 
-            ErrorSeverity.MEDIUM
-        )
-    
-    def _should_attempt_reset(self) -> bool:
-        """Check if enough time has passed to attempt reset"""
-        if self.last_failure_time is None:
-            return True
+    def record_failure(self, exception: Exception, execution_time: Optional[float] = None):
+        """Record a failed call (execution_time lets hangs count as slow too)"""
+        with self._lock:
+            self.total_failures += 1
+            self.failure_count += 1
+            self.last_failure_time = datetime.now()
+            self._record(execution_time or 0.0, ok=False)
+            
+            if self._state == CircuitState.HALF_OPEN:
+                # Failure in half-open state goes back to open
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._trip(f"probe failed: {exception}", exception)
+            elif self._state == CircuitState.CLOSED:
+                if self.failure_count >= self.failure_threshold:
+                    self._trip(f"{self.failure_count} consecutive failures", exception)
+                else:
+                    self._evaluate(exception)
         
-        time_since_failure = datetime.now() - self.last_failure_time
-        return time_since_failure.total_seconds() >= self.recovery_timeout
+        breaker_events.emit(logging.DEBUG, f"Circuit breaker recorded failure for {self.name}: {exception}")
+    
+    # Kept for callers that report outcomes directly
+    _on_success = record_success
+    _on_failure = record_failure
+    
+    def _record(self, execution_time: float, ok: bool) -> bool:
+        slow = execution_time >= self.slow_call_duration
+        if slow:
+            self.total_slow_calls += 1
+        self._window.append((self._clock(), execution_time, ok))
+        return slow
+    
+    def _recent_calls(self) -> List[Tuple[float, float, bool]]:
+        cutoff = self._clock() - self.window_seconds
+        while self._window and self._window[0][0] < cutoff:
+            self._window.popleft()
+        return list(self._window)
+    
+    def _evaluate(self, exception: Optional[Exception] = None):
+        """Open the circuit when the rolling error or slow-call rate is too high"""
+        calls = self._recent_calls()
+        if len(calls) < self.minimum_calls:
+            return
+        error_rate = sum(1 for _, _, ok in calls if not ok) / len(calls)
+        slow_rate = sum(1 for _, duration, _ in calls if duration >= self.slow_call_duration) / len(calls)
+        if error_rate >= self.failure_rate_threshold:
+            self._trip(f"error rate {error_rate:.0%} over last {len(calls)} calls", exception)
+        elif slow_rate >= self.slow_call_rate_threshold:
+            self._trip(f"slow-call rate {slow_rate:.0%} (>= {self.slow_call_duration:.0f}s, "
+                       f"p95 {self._p95(calls):.1f}s) over last {len(calls)} calls", exception)
+    
+    def _backoff(self) -> float:
+        """Exponential backoff with jitter: half the delay is fixed, half random"""
+        delay = min(self.max_recovery_timeout, self.recovery_timeout * (2 ** max(0, self.trip_count - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def _trip(self, reason: str, exception: Optional[Exception] = None):
+        self.trip_count += 1
+        delay = self._backoff()
+        self._state = CircuitState.OPEN
+        self.open_until = self._clock() + delay
+        self.success_count = 0
+        self._half_open_in_flight = 0
+        breaker_events.emit(logging.ERROR, f"Circuit breaker for {self.name} OPENED ({reason}), "
+                            f"retry in {delay:.0f}s", exception,
+                            {'service': self.service_name, 'endpoint': self.endpoint, 'trips': self.trip_count})
+    
+    def _close(self):
+        self._state = CircuitState.CLOSED
+        self.failure_count = 0
+        self.success_count = 0
+        self.trip_count = 0
+        self.open_until = None
+        self._window.clear()
+        breaker_events.emit(logging.INFO, f"Circuit breaker for {self.name} CLOSED after recovery")
+    
+    @staticmethod
+    def _p95(calls: List[Tuple[float, float, bool]]) -> float:
+        durations = sorted(duration for _, duration, _ in calls)
+        if not durations:
+            return 0.0
+        return durations[min(len(durations) - 1, int(round(0.95 * (len(durations) - 1))))]
     
     def get_state(self) -> Dict[str, Any]:
         """Get current circuit breaker state"""
-        return {
-            'service_name': self.service_name,
-            'state': self.state.value,
-            'failure_count': self.failure_count,
-            'success_count': self.success_count,
-            'total_requests': self.total_requests,
-            'total_failures': self.total_failures,
-            'total_successes': self.total_successes,
-            'success_rate': self.total_successes / self.total_requests if self.total_requests > 0 else 0,
-            'last_failure_time': self.last_failure_time.isoformat() if self.last_failure_time else None
-        }
+        state = self.state
+        with self._lock:
+            calls = self._recent_calls()
+            window_errors = sum(1 for _, _, ok in calls if not ok)
+            window_slow = sum(1 for _, duration, _ in calls if duration >= self.slow_call_duration)
+            return {
+                'service_name': self.service_name,
+                'endpoint': self.endpoint,
+                'state': state.value,
+                'failure_count': self.failure_count,
+                'success_count': self.success_count,
+                'total_requests': self.total_requests,
+                'total_failures': self.total_failures,
+                'total_successes': self.total_successes,
+                'total_slow_calls': self.total_slow_calls,
+                'total_rejected': self.total_rejected,
+                'success_rate': self.total_successes / self.total_requests if self.total_requests > 0 else 0,
+                'window_calls': len(calls),
+                'error_rate': window_errors / len(calls) if calls else 0.0,
+                'slow_call_rate': window_slow / len(calls) if calls else 0.0,
+                'p95_latency': self._p95(calls),
+                'trip_count': self.trip_count,
+                'retry_in': max(0.0, self.open_until - self._clock()) if state == CircuitState.OPEN else 0.0,
+                'last_failure_time': self.last_failure_time.isoformat() if self.last_failure_time else None
+            }
     
     def reset(self):
         """Manually reset the circuit breaker"""
-        self.state = CircuitState.CLOSED
-        self.failure_count = 0
-        self.success_count = 0
-        logger.info(f"Circuit breaker for {self.service_name} manually reset")
+        with self._lock:
+            self._close()
+        logger.info(f"Circuit breaker for {self.name} manually reset")
 
 
 class CircuitBreakerOpenException(Exception):
@@ -173,30 +364,41 @@ class CircuitBreakerManager:
     
     def __init__(self):
         self.circuit_breakers: Dict[str, CircuitBreaker] = {}
-        self.error_handler = ErrorHandler("circuit_breaker_manager")
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(service_name: str, endpoint: Optional[str] = None) -> str:
+        return f"{service_name}:{endpoint}" if endpoint else service_name
     
     def get_circuit_breaker(self, service_name: str, failure_threshold: int = 5,
-                          recovery_timeout: int = 60) -> CircuitBreaker:
+                          recovery_timeout: int = 60, endpoint: Optional[str] = None,
+                          **options) -> CircuitBreaker:
         """
-        Get or create a circuit breaker for a service.
+        Get or create a circuit breaker for a service endpoint.
         
         Args:
             service_name: Name of the service
-            failure_threshold: Number of failures before opening circuit
-            recovery_timeout: Seconds to wait before attempting reset
+            failure_threshold: Consecutive failures before opening circuit
+            recovery_timeout: Base seconds to wait before the first half-open probe
+            endpoint: Endpoint or data type; each gets its own breaker so a slow
+                fundamentals endpoint does not block pricing on the same provider
+            **options: Further CircuitBreaker settings (slow_call_duration, ...)
             
         Returns:
             CircuitBreaker instance
         """
-        if service_name not in self.circuit_breakers:
-            self.circuit_breakers[service_name] = CircuitBreaker(
-                service_name=service_name,
-                failure_threshold=failure_threshold,
-                recovery_timeout=recovery_timeout
-            )
-            logger.info(f"Created circuit breaker for {service_name}")
-        
-        return self.circuit_breakers[service_name]
+        key = self._key(service_name, endpoint)
+        with self._lock:
+            if key not in self.circuit_breakers:
+                self.circuit_breakers[key] = CircuitBreaker(
+                    service_name=service_name,
+                    failure_threshold=failure_threshold,
+                    recovery_timeout=recovery_timeout,
+                    endpoint=endpoint,
+                    **options
+                )
+                logger.info(f"Created circuit breaker for {key}")
+            return self.circuit_breakers[key]
     
     def call_with_circuit_breaker(self, service_name: str, func: Callable, 
                                 *args, **kwargs) -> Any:
@@ -214,6 +416,16 @@ class CircuitBreakerManager:
         circuit_breaker = self.get_circuit_breaker(service_name)
         return circuit_breaker.call(func, *args, **kwargs)
     
+    def call_endpoint(self, service_name: str, endpoint: str, func: Callable,
+                      *args, **kwargs) -> Any:
+        """Execute a function behind the breaker for one service endpoint"""
+        return self.get_circuit_breaker(service_name, endpoint=endpoint).call(func, *args, **kwargs)
+    
+    def is_available(self, service_name: str, endpoint: Optional[str] = None) -> bool:
+        """Whether the breaker for a service endpoint would let a request through"""
+        cb = self.circuit_breakers.get(self._key(service_name, endpoint))
+        return cb is None or cb.is_available()
+    
     def get_all_states(self) -> Dict[str, Dict[str, Any]]:
         """Get states of all circuit breakers"""
         return {name: cb.get_state() for name, cb in self.circuit_breakers.items()}
@@ -234,11 +446,16 @@ class CircuitBreakerManager:
             cb.reset()
         logger.info("All circuit breakers reset")
     
-    def reset_service(self, service_name: str):
-        """Reset circuit breaker for a specific service"""
-        if service_name in self.circuit_breakers:
-            self.circuit_breakers[service_name].reset()
+    def reset_service(self, service_name: str, endpoint: Optional[str] = None):
+        """Reset circuit breaker(s) for a service, or for one of its endpoints"""
+        if endpoint:
+            matching = [self._key(service_name, endpoint)]
         else:
+            matching = [key for key, cb in self.circuit_breakers.items() if cb.service_name == service_name]
+        matching = [key for key in matching if key in self.circuit_breakers]
+        for key in matching:
+            self.circuit_breakers[key].reset()
+        if not matching:
             logger.warning(f"No circuit breaker found for service: {service_name}")
 
 
@@ -249,7 +466,6 @@ class ServiceFallbackManager:
     
     def __init__(self, circuit_manager: CircuitBreakerManager):
         self.circuit_manager = circuit_manager
-        self.error_handler = ErrorHandler("service_fallback_manager")
         
         # Define service priorities for different operations
         self.service_priorities = {
@@ -282,21 +498,15 @@ class ServiceFallbackManager:
         # Filter to only available services
         available_services = [s for s in services_to_try if s in service_functions]
         
-        # Prioritize healthy services
-        healthy_services = self.circuit_manager.get_healthy_services()
-        failed_services = self.circuit_manager.get_failed_services()
-        
-        # Reorder: healthy services first, then others
-        ordered_services = []
-        for service in available_services:
-            if service in healthy_services:
-                ordered_services.append(service)
-        for service in available_services:
-            if service not in healthy_services and service not in failed_services:
-                ordered_services.append(service)
-        for service in available_services:
-            if service in failed_services:
-                ordered_services.append(service)
+        # Prioritize services whose breaker for this operation is closed,
+        # then half-open ones; open breakers are tried last (and fail fast)
+        def rank(service):
+            cb = self.circuit_manager.circuit_breakers.get(
+                self.circuit_manager._key(service, operation_type))
+            if cb is None or cb.state == CircuitState.CLOSED:
+                return 0
+            return 1 if cb.is_available() else 2
+        ordered_services = sorted(available_services, key=rank)
         
         last_exception = None
         last_errors = {}
@@ -305,8 +515,9 @@ class ServiceFallbackManager:
             try:
                 logger.debug(f"Trying {service_name} for {operation_type}")
                 
-                result = self.circuit_manager.call_with_circuit_breaker(
-                    service_name, 
+                result = self.circuit_manager.call_endpoint(
+                    service_name,
+                    operation_type,
                     service_functions[service_name], 
                     *args, **kwargs
                 )
@@ -328,11 +539,8 @@ class ServiceFallbackManager:
         error_msg = f"All services failed for {operation_type}"
         logger.error(f"{error_msg}. Last error: {last_exception}")
         
-        # Fix error handler call - only pass required arguments
-        if last_exception:
-            self.error_handler.handle_error(error_msg, last_exception)
-        else:
-            self.error_handler.handle_error(error_msg, Exception("Unknown error"))
+        breaker_events.emit(logging.ERROR, error_msg, last_exception or Exception("Unknown error"),
+                            {'operation_type': operation_type, 'errors': last_errors})
             
         # Return None instead of raising exception to prevent process termination
         return None, f"All services failed: {last_exception}"
@@ -344,20 +552,21 @@ fallback_manager = ServiceFallbackManager(circuit_manager)
 
 
 def circuit_breaker(service_name: str, failure_threshold: int = 5, 
-                   recovery_timeout: int = 60):
+                   recovery_timeout: int = 60, endpoint: Optional[str] = None):
     """
     Decorator for applying circuit breaker to functions.
     
     Args:
         service_name: Name of the service
         failure_threshold: Number of failures before opening circuit
-        recovery_timeout: Seconds to wait before attempting reset
+        recovery_timeout: Base seconds to wait before attempting reset
+        endpoint: Optional endpoint so each endpoint trips independently
     """
     def decorator(func: Callable) -> Callable:
         def wrapper(*args, **kwargs):
-            return circuit_manager.call_with_circuit_breaker(
-                service_name, func, *args, **kwargs
-            )
+            cb = circuit_manager.get_circuit_breaker(service_name, failure_threshold,
+                                                     recovery_timeout, endpoint=endpoint)
+            return cb.call(func, *args, **kwargs)
         return wrapper
     return decorator
 
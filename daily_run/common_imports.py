@@ -36,19 +36,14 @@ DB_CONFIG = {
 
 # Common logging configuration
 def setup_logging(service_name: str, log_file: str = None):
-    """Setup logging for a service"""
+    """Setup logging for a service (call from entry points, not at import time)"""
     if log_file is None:
         log_file = f'daily_run/logs/{service_name}.log'
-    # Ensure the logs directory exists
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
+    try:
+        from log_pipeline import configure_logging
+    except ImportError:
+        from daily_run.log_pipeline import configure_logging
+    configure_logging(level=logging.INFO, log_file=log_file)
 
 # Common API rate limiter import
 def get_api_rate_limiter():
@@ -142,16 +137,31 @@ def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
         return decorator
 
 # Service imports
-try:
-    from yahoo_finance_service import YahooFinanceService
-    from alpha_vantage_service import AlphaVantageService
-    from finnhub_service import FinnhubService
-except ImportError as e:
-    logging.warning(f"Some service imports failed: {e}")
-    # Create placeholder classes if imports fail
-    class YahooFinanceService:
-        def __init__(self): pass
-    class AlphaVantageService:
-        def __init__(self): pass
-    class FinnhubService:
-        def __init__(self): pass 
\ No newline at end of file
+# Resolved on first attribute access (PEP 562): yahoo_finance_service pulls in
+# yfinance, which is a large share of cold-start time and only the price and
+# fundamentals paths need it. `from common_imports import *` therefore no
+# longer brings these names; import them explicitly or via get_service_class().
+_SERVICE_MODULES = {
+    'YahooFinanceService': 'yahoo_finance_service',
+    'AlphaVantageService': 'alpha_vantage_service',
+    'FinnhubService': 'finnhub_service',
+}
+
+
+def get_service_class(name: str):
+    """Import and return a provider service class by name"""
+    import importlib
+    try:
+        service_class = getattr(importlib.import_module(_SERVICE_MODULES[name]), name)
+    except ImportError as e:
+        logging.warning(f"Some service imports failed: {e}")
+        # Placeholder class if the import fails
+        service_class = type(name, (), {'__init__': lambda self: None})
+    globals()[name] = service_class
+    return service_class
+
+
+def __getattr__(name: str):
+    if name in _SERVICE_MODULES:
+        return get_service_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,298 @@
+"""
+Concurrent Fundamentals Fetcher
+
+Fetch stage for Priority 4 (missing fundamentals). Tickers are fetched by a
+pool of workers, each worker running the multi-service fallback for one
+ticker (FMP issues its statement endpoints in parallel underneath). Parsed
+results are streamed through a bounded queue to a single writer thread that
+upserts company_fundamentals in batches. The run stops taking new tickers
+when the phase's time budget or API budget runs out and reports throughput
+and queue depth against the time budget.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .database import DatabaseManager, mark_quality_dirty
+except ImportError:
+    from database import DatabaseManager, mark_quality_dirty
+
+logger = logging.getLogger(__name__)
+
+# company_fundamentals columns written by the fetch stage (besides ticker/metadata)
+FUNDAMENTAL_COLUMNS = [
+    'revenue', 'gross_profit', 'operating_income', 'net_income', 'ebitda',
+    'cost_of_goods_sold', 'total_assets', 'total_debt', 'total_equity',
+    'cash_and_equivalents', 'current_assets', 'current_liabilities',
+    'inventory', 'accounts_receivable', 'accounts_payable', 'retained_earnings',
+    'operating_cash_flow', 'free_cash_flow', 'capex',
+    'eps_diluted', 'book_value_per_share', 'shares_outstanding', 'shares_float',
+    'market_cap', 'enterprise_value'
+]
+
+_SENTINEL = object()
+
+
+@dataclass
+class FetchReport:
+    """Outcome of one concurrent fetch run"""
+    tickers_requested: int
+    fetched: int = 0
+    stored: int = 0
+    failed: int = 0
+    deferred: int = 0
+    write_batches: int = 0
+    api_calls_used: int = 0
+    elapsed: float = 0.0
+    time_budget: float = 0.0
+    max_queue_depth: int = 0
+    avg_queue_depth: float = 0.0
+    budget_exhausted: bool = False
+    time_limit_reached: bool = False
+
+    @property
+    def throughput_per_minute(self) -> float:
+        return (self.fetched + self.failed) * 60 / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def projected_tickers_in_budget(self) -> int:
+        """Tickers the current rate would finish within the whole time budget"""
+        return int(self.throughput_per_minute * self.time_budget / 60)
+
+    def to_dict(self) -> Dict:
+        result = asdict(self)
+        result['throughput_per_minute'] = round(self.throughput_per_minute, 1)
+        result['projected_tickers_in_budget'] = self.projected_tickers_in_budget
+        result['budget_used_pct'] = round(100 * self.elapsed / self.time_budget, 1) if self.time_budget else None
+        return result
+
+
+def fundamentals_row(ticker: str, data: Dict[str, Any]) -> tuple:
+    """Row for the batched upsert; fields a provider did not return stay NULL"""
+    now = datetime.now()
+    return ((ticker, now.date(), data.get('period_type', 'ttm'),
+             data.get('fiscal_year', now.year), data.get('fiscal_quarter'))
+            + tuple(data.get(column) for column in FUNDAMENTAL_COLUMNS)
+            + (data.get('data_source'), now))
+
+
+class FundamentalsWriter:
+    """
+    Single writer thread that drains parsed results and upserts them in batches.
+
+    Writers upstream block when the queue is full, which keeps memory bounded if
+    the database falls behind the fetch workers.
+    """
+
+    def __init__(self, db: DatabaseManager, batch_size: int = 50, flush_interval: float = 2.0,
+                 max_queue: int = 200):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stored_tickers: List[str] = []
+        self.failed_tickers: List[str] = []
+        self.batches = 0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+        self._thread = threading.Thread(target=self._run, name="fundamentals-writer", daemon=True)
+
+    def start(self) -> 'FundamentalsWriter':
+        self._thread.start()
+        return self
+
+    def put(self, ticker: str, data: Dict[str, Any]):
+        self.queue.put((ticker, data))
+        depth = self.queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    @property
+    def avg_depth(self) -> float:
+        return self._depth_total / self._depth_samples if self._depth_samples else 0.0
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush what is queued and stop the writer"""
+        self.queue.put(_SENTINEL)
+        self._thread.join(timeout)
+
+    def _run(self):
+        pending = []
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is _SENTINEL:
+                self._flush(pending)
+                return
+            if item is not None:
+                pending.append(item)
+            if len(pending) >= self.batch_size or (pending and time.monotonic() - last_flush >= self.flush_interval):
+                self._flush(pending)
+                pending = []
+                last_flush = time.monotonic()
+
+    def _flush(self, pending: List[tuple]):
+        if not pending:
+            return
+        # Last result wins if a ticker was queued twice in one batch
+        rows = {ticker: fundamentals_row(ticker, data) for ticker, data in pending}
+        columns = ['ticker', 'report_date', 'period_type', 'fiscal_year', 'fiscal_quarter'] \
+            + FUNDAMENTAL_COLUMNS + ['data_source', 'last_updated']
+        updates = ',\n                '.join(
+            f"{column} = COALESCE(EXCLUDED.{column}, company_fundamentals.{column})"
+            for column in FUNDAMENTAL_COLUMNS)
+        query = f"""
+            INSERT INTO company_fundamentals ({', '.join(columns)})
+            VALUES %s
+            ON CONFLICT (ticker) DO UPDATE SET
+                report_date = EXCLUDED.report_date,
+                {updates},
+                data_source = EXCLUDED.data_source,
+                last_updated = EXCLUDED.last_updated
+        """
+        try:
+            self.db.execute_values(query, list(rows.values()))
+            mark_quality_dirty('company_fundamentals', rows)
+            self.stored_tickers.extend(rows)
+            self.batches += 1
+            logger.info(f"💾 Wrote fundamentals batch of {len(rows)} tickers "
+                        f"(queue depth {self.queue.qsize()})")
+        except Exception as e:
+            logger.error(f"Failed to write fundamentals batch of {len(rows)} tickers: {e}")
+            self.failed_tickers.extend(rows)
+
+
+class ConcurrentFundamentalsFetcher:
+    """
+    Fetches fundamentals for many tickers at once and streams them to a batched writer.
+    """
+
+    def __init__(self, db: DatabaseManager = None, fetch_fn: Optional[Callable[[str], Optional[Dict]]] = None,
+                 max_workers: int = 8, batch_size: int = 50, time_budget: float = 600):
+        self.db = db or DatabaseManager()
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self._fetch_fn = fetch_fn
+        self._local = threading.local()
+        self._managers = []
+        self._managers_lock = threading.Lock()
+        self.stored_tickers: List[str] = []
+
+    def _manager(self):
+        """One fallback manager per worker thread (services hold their own connections)"""
+        manager = getattr(self._local, 'manager', None)
+        if manager is None:
+            try:
+                from .enhanced_multi_service_fundamental_manager import EnhancedMultiServiceFundamentalManager
+            except ImportError:
+                from enhanced_multi_service_fundamental_manager import EnhancedMultiServiceFundamentalManager
+            manager = EnhancedMultiServiceFundamentalManager(store_inline=False)
+            self._local.manager = manager
+            with self._managers_lock:
+                self._managers.append(manager)
+        return manager
+
+    def fetch_one(self, ticker: str) -> Optional[Dict]:
+        """Fetch one ticker's fundamentals as a storage-ready dict"""
+        if self._fetch_fn is not None:
+            return self._fetch_fn(ticker)
+        result = self._manager().get_fundamental_data_with_fallback(ticker)
+        if not result or not result.data:
+            return None
+        data = {field: item.value for field, item in result.data.items()}
+        data['data_source'] = result.primary_source
+        return data
+
+    def run(self, tickers: List[str], budget=None, time_budget: Optional[float] = None) -> FetchReport:
+        """
+        Fetch and store fundamentals for tickers until done or out of time/API budget.
+
+        Args:
+            tickers: Tickers in priority order
+            budget: Optional PhaseBudget charged item_cost() calls per ticker
+            time_budget: Seconds available (defaults to the fetcher's time_budget)
+
+        Returns:
+            FetchReport with counts, throughput and queue depth
+        """
+        time_budget = time_budget if time_budget is not None else self.time_budget
+        report = FetchReport(tickers_requested=len(tickers), time_budget=time_budget)
+        start_time = time.monotonic()
+        deadline = start_time + time_budget
+        writer = FundamentalsWriter(self.db, batch_size=self.batch_size,
+                                    max_queue=max(self.batch_size * 4, self.max_workers)).start()
+        lock = threading.Lock()
+
+        def work(ticker: str):
+            if time.monotonic() >= deadline:
+                with lock:
+                    report.deferred += 1
+                    report.time_limit_reached = True
+                return
+            if budget is not None:
+                cost = budget.item_cost()
+                if not budget.try_spend(cost):
+                    with lock:
+                        report.deferred += 1
+                        report.budget_exhausted = True
+                    return
+                with lock:
+                    report.api_calls_used += cost
+            try:
+                data = self.fetch_one(ticker)
+            except Exception as e:
+                logger.warning(f"Fundamentals fetch failed for {ticker}: {e}")
+                data = None
+            with lock:
+                if data:
+                    report.fetched += 1
+                else:
+                    report.failed += 1
+            if data:
+                writer.put(ticker, data)
+
+        logger.info(f"⚡ Fetching fundamentals for {len(tickers)} tickers with {self.max_workers} workers "
+                    f"(time budget {time_budget:.0f}s)")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fundamentals") as pool:
+                for _ in pool.map(work, tickers):
+                    pass
+        finally:
+            writer.close()
+            self.close()
+
+        report.stored = len(writer.stored_tickers)
+        report.write_batches = writer.batches
+        report.max_queue_depth = writer.max_depth
+        report.avg_queue_depth = round(writer.avg_depth, 2)
+        report.elapsed = time.monotonic() - start_time
+        self.stored_tickers = list(writer.stored_tickers)
+
+        logger.info(f"⚡ Fundamentals fetch: {report.stored}/{report.tickers_requested} stored, "
+                    f"{report.failed} failed, {report.deferred} deferred in {report.elapsed:.1f}s "
+                    f"({report.throughput_per_minute:.1f}/min, ~{report.projected_tickers_in_budget} per "
+                    f"{time_budget:.0f}s budget, max queue depth {report.max_queue_depth})")
+        return report
+
+    def close(self):
+        with self._managers_lock:
+            managers, self._managers = self._managers, []
+        for manager in managers:
+            try:
+                manager.close()
+            except Exception as e:
+                logger.warning(f"Error closing fundamental manager: {e}")
+        self._local = threading.local()
@@ -13,6 +13,11 @@ from dataclasses import dataclass, field
 from dotenv import load_dotenv
 import json
 
+try:
+    from .log_pipeline import configure_logging
+except ImportError:
+    from log_pipeline import configure_logging
+
 # Load environment variables
 load_dotenv()
 
@@ -108,6 +113,9 @@ class LoggingConfig:
     log_file: str = field(default_factory=lambda: os.getenv('LOG_FILE', 'daily_run/logs/system.log'))
     max_log_size: int = field(default_factory=lambda: int(os.getenv('MAX_LOG_SIZE', '10485760')))  # 10MB
     log_backup_count: int = field(default_factory=lambda: int(os.getenv('LOG_BACKUP_COUNT', '5')))
+    # 'verbose' logs every per-ticker event, 'summary' only failures, progress and phase summaries
+    log_mode: str = field(default_factory=lambda: os.getenv('LOG_MODE', 'verbose'))
+    progress_interval: float = field(default_factory=lambda: float(os.getenv('LOG_PROGRESS_INTERVAL', '30')))
     
     # Enable/disable specific loggers
     enable_performance_logging: bool = field(default_factory=lambda: os.getenv('ENABLE_PERFORMANCE_LOGGING', 'true').lower() == 'true')
@@ -194,6 +202,10 @@ class Config:
         if self.processing.max_workers <= 0:
             errors.append("Max workers must be positive")
         
+        # Logging validation
+        if self.logging.log_mode not in ('verbose', 'summary'):
+            errors.append("Log mode must be 'verbose' or 'summary'")
+        
         if errors:
             error_msg = "Configuration validation failed:\n" + "\n".join(f"- {error}" for error in errors)
             logger.error(error_msg)
@@ -320,6 +332,8 @@ class Config:
                 'log_file': self.logging.log_file,
                 'max_log_size': self.logging.max_log_size,
                 'log_backup_count': self.logging.log_backup_count,
+                'log_mode': self.logging.log_mode,
+                'progress_interval': self.logging.progress_interval,
                 'enable_performance_logging': self.logging.enable_performance_logging,
                 'enable_sql_logging': self.logging.enable_sql_logging,
                 'enable_api_logging': self.logging.enable_api_logging
@@ -349,24 +363,14 @@ def setup_logging_from_config():
     """Setup logging based on configuration"""
     config = get_config()
     
-    # Create logs directory if it doesn't exist
-    log_dir = os.path.dirname(config.logging.log_file)
-    os.makedirs(log_dir, exist_ok=True)
-    
-    # Configure logging
-    log_level = getattr(logging, config.logging.log_level.upper())
-    
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.handlers.RotatingFileHandler(
-                config.logging.log_file,
-                maxBytes=config.logging.max_log_size,
-                backupCount=config.logging.log_backup_count
-            )
-        ]
+    configure_logging(
+        level=getattr(logging, config.logging.log_level.upper()),
+        log_file=config.logging.log_file,
+        mode=config.logging.log_mode,
+        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        progress_interval=config.logging.progress_interval,
+        max_bytes=config.logging.max_log_size,
+        backup_count=config.logging.log_backup_count
     )
     
     # Configure specific loggers based on config
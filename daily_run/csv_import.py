@@ -0,0 +1,360 @@
+"""
+CSV Import
+
+Streaming import of the pre_filled_stocks CSVs (batch*.csv,
+complete_1000_stock.csv) and the sector/industry and market indicator ETF
+mapping files.
+
+The old upload scripts walked df.iterrows() and issued a SELECT plus an
+INSERT or UPDATE per row. Here a file is read in fixed-size chunks, the
+chunk is cleaned with vectorized string operations (ticker normalization,
+blank/NULL handling, numeric parsing), rows that cannot be imported are
+counted per reason, and the rest is COPYed into a staging table and merged
+with one INSERT ... ON CONFLICT per chunk (bulk_ingest.copy_upsert). Memory
+is bounded by the chunk size, not the file size.
+
+Blank cells never erase data that is already in the table; a CSV that
+leaves a column empty keeps the existing value.
+
+Usage:
+    python csv_import.py ../pre_filled_stocks/batch1.csv ../pre_filled_stocks/batch2.csv
+    python csv_import.py --spec industries ../pre_filled_stocks/sector_industry_etf_mapping.csv
+    python csv_import.py --dry-run --chunk-size 10000 big_universe.csv
+"""
+
+import argparse
+import csv
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    from .bulk_ingest import copy_upsert
+    from .database import DatabaseManager, mark_quality_dirty
+    from .exceptions import DatabaseError
+except ImportError:
+    from bulk_ingest import copy_upsert
+    from database import DatabaseManager, mark_quality_dirty
+    from exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+TICKER_MAXLEN = 20  # stocks.ticker limit
+TICKER_PATTERN = r'^\^?[A-Z0-9][A-Z0-9.\-=]*$'  # index symbols such as ^TNX keep their caret
+NULL_TOKENS = {variant for token in ('', 'nan', 'none', 'null', 'n/a', 'na', '-')
+               for variant in (token, token.upper(), token.title())}
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def normalize_header(header) -> str:
+    """'Company Name', 'company_name' and ' COMPANY  NAME' all become 'company name'"""
+    return ' '.join(str(header).replace('_', ' ').split()).lower()
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    """How the columns of one kind of CSV map onto a table"""
+    name: str
+    table: str
+    columns: Dict[str, str]  # normalized CSV header -> table column
+    key_columns: Tuple[str, ...]
+    ticker_columns: Tuple[str, ...] = ()
+    numeric_columns: Tuple[str, ...] = ()
+    timestamp_column: Optional[str] = None
+    quality_tracked: bool = False
+
+
+STOCKS = ImportSpec(
+    name='stocks', table='stocks',
+    columns={
+        'ticker': 'ticker', 'company name': 'company_name', 'sector': 'sector', 'industry': 'industry',
+        'market cap (b)': 'market_cap_b', 'market cap b': 'market_cap_b',
+        'description': 'description', 'general description': 'general_description',
+        'business model': 'business_model', 'products services': 'products_services',
+        'main customers': 'main_customers', 'customers': 'customers', 'markets': 'markets',
+        'moat': 'moat', 'moat 1': 'moat_1', 'moat 2': 'moat_2', 'moat 3': 'moat_3', 'moat 4': 'moat_4',
+        'peer a': 'peer_a', 'peer b': 'peer_b', 'peer c': 'peer_c',
+        'hq location': 'hq_location', 'exchange': 'exchange', 'country': 'country', 'logo url': 'logo_url',
+    },
+    key_columns=('ticker',),
+    ticker_columns=('ticker', 'peer_a', 'peer_b', 'peer_c'),
+    numeric_columns=('market_cap_b',),
+    timestamp_column='last_updated',
+    quality_tracked=True,
+)
+
+INDUSTRIES = ImportSpec(
+    name='industries', table='industries',
+    columns={'sector': 'sector', 'industry': 'industry', 'etf name': 'etf_name', 'etf ticker': 'etf_ticker'},
+    key_columns=('sector', 'industry', 'etf_ticker'),
+    ticker_columns=('etf_ticker',),
+)
+
+MARKET_ETF = ImportSpec(
+    name='market_etf', table='market_etf',
+    columns={'category': 'category', 'indicator': 'indicator',
+             'etf/index name': 'etf_name', 'etf name': 'etf_name', 'ticker': 'etf_ticker', 'etf ticker': 'etf_ticker'},
+    key_columns=('category', 'indicator', 'etf_ticker'),
+    ticker_columns=('etf_ticker',),
+)
+
+SPECS = {spec.name: spec for spec in (STOCKS, INDUSTRIES, MARKET_ETF)}
+
+
+@dataclass
+class ImportReport:
+    """Row counts of one import run"""
+    spec: str
+    files: List[str] = field(default_factory=list)
+    failed_files: Dict[str, str] = field(default_factory=dict)
+    rows_read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejections: Dict[str, int] = field(default_factory=dict)
+    chunks: int = 0
+    seconds: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def rejected(self) -> int:
+        return sum(self.rejections.values())
+
+    def reject(self, reason: str, count: int = 1):
+        if count:
+            self.rejections[reason] = self.rejections.get(reason, 0) + count
+
+    def to_dict(self) -> Dict:
+        return {
+            'spec': self.spec,
+            'files': self.files,
+            'failed_files': self.failed_files,
+            'rows_read': self.rows_read,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'rejected': self.rejected,
+            'rejections': dict(self.rejections),
+            'chunks': self.chunks,
+            'seconds': round(self.seconds, 2),
+            'dry_run': self.dry_run,
+        }
+
+    def format(self) -> str:
+        rate = self.rows_read / self.seconds if self.seconds > 0 else 0.0
+        lines = [
+            f"📥 {self.spec} import{' (dry run)' if self.dry_run else ''}: "
+            f"{len(self.files)} file(s), {self.rows_read} rows in {self.chunks} chunks, "
+            f"{self.seconds:.1f}s ({rate:,.0f} rows/s)",
+            f"   📊 Inserted: {self.inserted}",
+            f"   📊 Updated: {self.updated}",
+            f"   📊 Unchanged: {self.unchanged}",
+            f"   📊 Rejected: {self.rejected}",
+        ]
+        for reason, count in sorted(self.rejections.items(), key=lambda item: -item[1]):
+            lines.append(f"      - {reason}: {count}")
+        for path, error in self.failed_files.items():
+            lines.append(f"   ❌ {path}: {error}")
+        return '\n'.join(lines)
+
+
+def _clean_text(values: pd.Series) -> pd.Series:
+    """Strip whitespace; blank and NULL-like cells become NA"""
+    values = values.astype('string').str.strip()
+    return values.mask(values.isin(NULL_TOKENS))
+
+
+def _clean_ticker(values: pd.Series) -> pd.Series:
+    """Upper-case, drop inner whitespace and a leading '$'"""
+    values = _clean_text(values).str.upper().str.replace(r'\s+', '', regex=True).str.lstrip('$')
+    return values.mask(values == '')
+
+
+def normalize_chunk(frame: pd.DataFrame, spec: ImportSpec,
+                    exclude: Iterable[str] = ()) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Map a raw CSV chunk onto spec.table columns and drop rows that cannot be imported.
+
+    Args:
+        frame: Chunk read with dtype=str
+        spec: Column mapping of the target table
+        exclude: Tickers to leave out of the import
+
+    Returns:
+        (rows ready for copy_upsert, rejected row counts per reason)
+    """
+    sources: Dict[str, str] = {}
+    for header in frame.columns:
+        column = spec.columns.get(normalize_header(header))
+        if column and column not in sources:
+            sources[column] = header
+    missing = [column for column in spec.key_columns if column not in sources]
+    if missing:
+        raise ValueError(f"missing required column(s) {', '.join(missing)}")
+
+    rows = pd.DataFrame(index=frame.index)
+    for column, header in sources.items():
+        if column in spec.ticker_columns:
+            rows[column] = _clean_ticker(frame[header])
+        elif column in spec.numeric_columns:
+            cleaned = _clean_text(frame[header]).str.replace(r'[^0-9.\-]', '', regex=True)
+            rows[column] = pd.to_numeric(cleaned, errors='coerce')
+        else:
+            rows[column] = _clean_text(frame[header])
+
+    rejections: Dict[str, int] = {}
+    keep = pd.Series(True, index=rows.index)
+
+    def reject(mask: pd.Series, reason: str):
+        mask = mask.fillna(False).astype(bool) & keep
+        if mask.any():
+            rejections[reason] = rejections.get(reason, 0) + int(mask.sum())
+            keep[mask] = False
+
+    for column in spec.key_columns:
+        reject(rows[column].isna(), f"missing {column}")
+        if column in spec.ticker_columns:
+            # Concatenated files repeat their header line
+            reject(rows[column] == normalize_header(sources[column]).replace(' ', '').upper(), 'repeated header')
+            reject(rows[column].str.len() > TICKER_MAXLEN, f"{column} longer than {TICKER_MAXLEN}")
+            reject(~rows[column].str.match(TICKER_PATTERN), f"invalid {column}")
+    exclude = {ticker.upper() for ticker in exclude}
+    if exclude and 'ticker' in rows:
+        reject(rows['ticker'].isin(exclude), 'excluded')
+    for column in spec.ticker_columns:
+        if column not in spec.key_columns and column in rows:
+            # A bad peer symbol is dropped, the row itself is still imported
+            rows[column] = rows[column].mask(~rows[column].str.match(TICKER_PATTERN).fillna(False)
+                                             | (rows[column].str.len() > TICKER_MAXLEN).fillna(False))
+
+    rows = rows[keep]
+    duplicated = rows.duplicated(subset=list(spec.key_columns), keep='last')
+    if duplicated.any():
+        rejections['duplicate key (last row kept)'] = int(duplicated.sum())
+        rows = rows[~duplicated]
+
+    return rows.astype(object).where(rows.notna(), None).reset_index(drop=True), rejections
+
+
+class CsvImporter:
+    """Streams CSV files into one table, one COPY + upsert per chunk"""
+
+    def __init__(self, db: DatabaseManager = None, spec: ImportSpec = STOCKS,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False,
+                 exclude: Iterable[str] = ()):
+        """
+        Args:
+            db: Database manager
+            spec: Target table and column mapping (see SPECS)
+            chunk_size: Rows read, cleaned and merged at a time
+            dry_run: Clean and count rows without writing
+            exclude: Tickers to leave out of the import
+        """
+        self.db = db or DatabaseManager()
+        self.spec = spec
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.exclude = list(exclude)
+
+    def read_chunks(self, path: str, report: ImportReport) -> Iterator[pd.DataFrame]:
+        """Raw chunks of a CSV as strings; malformed lines are counted and skipped"""
+        malformed = []
+        reader = pd.read_csv(
+            path, dtype=str, keep_default_na=False, encoding='utf-8-sig', chunksize=self.chunk_size,
+            engine='python', on_bad_lines=malformed.append)
+        with reader:
+            for chunk in reader:
+                report.reject('malformed line', len(malformed))
+                malformed.clear()
+                yield chunk
+        report.reject('malformed line', len(malformed))
+
+    def import_chunk(self, chunk: pd.DataFrame, report: ImportReport) -> Dict[str, int]:
+        """Clean one chunk and merge it in one transaction"""
+        rows, rejections = normalize_chunk(chunk, self.spec, self.exclude)
+        report.chunks += 1
+        report.rows_read += len(chunk)
+        for reason, count in rejections.items():
+            report.reject(reason, count)
+        if rows.empty or self.dry_run:
+            return {'staged': len(rows), 'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        timestamp = self.spec.timestamp_column
+        try:
+            with self.db.get_cursor() as cursor:
+                counts = copy_upsert(
+                    cursor, self.spec.table, rows,
+                    key_columns=self.spec.key_columns,
+                    update_columns=[column for column in rows.columns if column not in self.spec.key_columns],
+                    insert_expressions={timestamp: 'CURRENT_TIMESTAMP'} if timestamp else None,
+                    update_expressions={timestamp: 'CURRENT_TIMESTAMP'} if timestamp else None,
+                    keep_existing_on_null=True)
+        except DatabaseError as e:
+            logger.error(f"❌ Chunk {report.chunks} of {self.spec.table} rolled back: {e}")
+            report.reject('database error', len(rows))
+            return {'staged': len(rows), 'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        report.inserted += counts['inserted']
+        report.updated += counts['updated']
+        report.unchanged += counts['unchanged']
+        if self.spec.quality_tracked:
+            mark_quality_dirty(self.spec.table, rows['ticker'])
+        return counts
+
+    def import_file(self, path: str, report: Optional[ImportReport] = None) -> ImportReport:
+        """Import one CSV; a file without the key columns is recorded as failed"""
+        report = report or ImportReport(spec=self.spec.name, dry_run=self.dry_run)
+        started = time.time()
+        logger.info(f"📁 Importing {path} into {self.spec.table}")
+        report.files.append(path)
+        try:
+            for chunk in self.read_chunks(path, report):
+                counts = self.import_chunk(chunk, report)
+                logger.info(f"   📦 chunk {report.chunks}: {len(chunk)} rows, +{counts['inserted']} inserted, "
+                            f"{counts['updated']} updated")
+        except (OSError, ValueError, csv.Error, pd.errors.ParserError) as e:
+            logger.error(f"❌ {path}: {e}")
+            report.failed_files[path] = str(e)
+        report.seconds += time.time() - started
+        return report
+
+    def import_files(self, paths: Iterable[str]) -> ImportReport:
+        """Import several CSVs into one report"""
+        report = ImportReport(spec=self.spec.name, dry_run=self.dry_run)
+        for path in paths:
+            self.import_file(path, report)
+        return report
+
+
+def import_csv_files(paths: Iterable[str], spec: str = 'stocks', db: DatabaseManager = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False,
+                     exclude: Iterable[str] = ()) -> ImportReport:
+    """Import CSVs with a named spec and log the report"""
+    importer = CsvImporter(db, SPECS[spec], chunk_size=chunk_size, dry_run=dry_run, exclude=exclude)
+    report = importer.import_files(paths)
+    logger.info(report.format())
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Stream stock universe / ETF mapping CSVs into the database')
+    parser.add_argument('files', nargs='+', help='CSV files to import')
+    parser.add_argument('--spec', choices=sorted(SPECS), default='stocks', help='Target table (default: stocks)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per chunk')
+    parser.add_argument('--exclude', nargs='*', default=[], help='Tickers to skip')
+    parser.add_argument('--dry-run', action='store_true', help='Clean and count rows without writing')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    report = import_csv_files(args.files, args.spec, chunk_size=args.chunk_size,
+                              dry_run=args.dry_run, exclude=args.exclude)
+    print(report.format())
+    return 1 if report.failed_files else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
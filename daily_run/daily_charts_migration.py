@@ -0,0 +1,373 @@
+"""
+Daily Charts Migration
+
+Moves daily_charts from a TEXT date column to a native DATE column,
+range-partitioned by year or month, with covering indexes for the two hot
+read paths:
+
+- the OHLCV window read by the technical indicators
+  (WHERE ticker = %s ORDER BY date DESC LIMIT n)
+- the latest-indicator snapshot read by the scorers
+  (same shape, LIMIT 1, indicator columns)
+
+Both are served as index-only scans from (ticker, date DESC) INCLUDE (...),
+and on a partitioned table the planner walks partitions newest first and
+stops as soon as the LIMIT is satisfied.
+
+The new table is built next to the old one, filled partition by partition
+and swapped in by renames inside one transaction; the old table is kept as
+daily_charts_text_backup until --drop-backup.
+"""
+
+import argparse
+import logging
+import re
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .database import DatabaseManager
+except ImportError:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Columns of the technicals window (date is the index key)
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Columns of the latest-indicator snapshot read by the scorers
+SNAPSHOT_COLUMNS = [
+    'close', 'volume', 'vwap', 'rsi_14', 'macd_line', 'macd_signal', 'macd_histogram',
+    'ema_20', 'ema_50', 'ema_200', 'bb_upper', 'bb_middle', 'bb_lower',
+    'atr_14', 'cci_20', 'stoch_k', 'stoch_d',
+    'support_1', 'support_2', 'support_3', 'resistance_1', 'resistance_2', 'resistance_3'
+]
+
+COVERING_INDEXES = {
+    'ohlcv_window': OHLCV_COLUMNS,
+    'latest_snapshot': SNAPSHOT_COLUMNS,
+}
+
+GRANULARITIES = ('year', 'month')
+
+_ISO_DATE = r'^\d{4}-\d{2}-\d{2}$'
+
+
+@dataclass
+class MigrationReport:
+    """Outcome of one migration run"""
+    table: str
+    granularity: str
+    already_migrated: bool = False
+    dry_run: bool = False
+    partitions: List[str] = field(default_factory=list)
+    rows_copied: int = 0
+    rows_rejected: int = 0
+    elapsed: float = 0.0
+    statements: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def covering_index_statements(table: str = 'daily_charts',
+                              existing_columns: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    CREATE INDEX statements for the hot projections.
+
+    Args:
+        table: Table (or partitioned parent) to index
+        existing_columns: Columns the table has; INCLUDE lists are trimmed to them
+
+    Returns:
+        One statement per covering index
+    """
+    existing = set(existing_columns) if existing_columns is not None else None
+    statements = []
+    for suffix, columns in COVERING_INDEXES.items():
+        include = [column for column in columns if existing is None or column in existing]
+        include_sql = f" INCLUDE ({', '.join(include)})" if include else ""
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_{suffix} "
+                          f"ON {table} (ticker, date DESC){include_sql}")
+    return statements
+
+
+def partition_suffix(start: date, granularity: str) -> str:
+    """'y2024' for yearly partitions, 'm202401' for monthly ones"""
+    if granularity == 'year':
+        return f"y{start.year}"
+    return f"m{start.year}{start.month:02d}"
+
+
+def _period_start(day: date, granularity: str) -> date:
+    return date(day.year, 1, 1) if granularity == 'year' else date(day.year, day.month, 1)
+
+
+def _next_period(start: date, granularity: str) -> date:
+    if granularity == 'year':
+        return date(start.year + 1, 1, 1)
+    return date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+
+
+def partition_bounds(first: date, last: date, granularity: str = 'year',
+                     ahead: int = 1) -> List[Tuple[str, date, date]]:
+    """
+    Partitions covering first..last plus `ahead` future periods.
+
+    Returns:
+        List of (suffix, start, end) with end exclusive
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}, got {granularity!r}")
+    bounds = []
+    start = _period_start(first, granularity)
+    end_period = _period_start(last, granularity)
+    for _ in range(ahead):
+        end_period = _next_period(end_period, granularity)
+    while start <= end_period:
+        end = _next_period(start, granularity)
+        bounds.append((partition_suffix(start, granularity), start, end))
+        start = end
+    return bounds
+
+
+def _column_sql(name: str, type_sql: str, not_null: bool, default: Optional[str]) -> str:
+    if name == 'date':
+        return "date DATE NOT NULL"
+    if name == 'ticker':
+        not_null = True
+    sql = f"{name} {type_sql}"
+    if default:
+        sql += f" DEFAULT {default}"
+    if not_null:
+        sql += " NOT NULL"
+    return sql
+
+
+def build_create_sql(table: str, columns: List[Tuple[str, str, bool, Optional[str]]]) -> str:
+    """CREATE TABLE for the partitioned parent, mirroring the old column list"""
+    column_sql = ',\n    '.join(_column_sql(*column) for column in columns)
+    return f"CREATE TABLE {table} (\n    {column_sql}\n) PARTITION BY RANGE (date)"
+
+
+def build_partition_sql(parent: str, name: str, start: date, end: date) -> str:
+    return (f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')")
+
+
+def build_copy_sql(source: str, target: str, column_names: List[str], start: date, end: date,
+                   source_is_text: bool) -> str:
+    """
+    INSERT ... SELECT one partition's range.
+
+    ISO text dates sort like dates, so the range predicate on the old TEXT
+    column still uses its (ticker, date) index; anything that is not a plain
+    YYYY-MM-DD string is left behind in the backup.
+    """
+    select_list = ', '.join('date::date' if name == 'date' else name for name in column_names)
+    if source_is_text:
+        predicate = (f"date >= '{start.isoformat()}' AND date < '{end.isoformat()}' "
+                     f"AND date ~ '{_ISO_DATE}'")
+    else:
+        predicate = f"date >= '{start.isoformat()}' AND date < '{end.isoformat()}'"
+    return (f"INSERT INTO {target} ({', '.join(column_names)}) "
+            f"SELECT {select_list} FROM {source} WHERE {predicate}")
+
+
+class DailyChartsMigration:
+    """
+    Migrates daily_charts to a date-partitioned table and keeps partitions ahead of time.
+    """
+
+    def __init__(self, db: DatabaseManager = None, table: str = 'daily_charts'):
+        self.db = db or DatabaseManager()
+        self.table = table
+        self.backup_table = f"{table}_text_backup"
+
+    def inspect(self) -> Dict:
+        """Current date column type and whether the table is already partitioned"""
+        row = self.db.fetch_one("""
+            SELECT format_type(a.atttypid, a.atttypmod), c.relkind
+            FROM pg_class c
+            JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = 'date'
+            WHERE c.oid = to_regclass(%s)
+        """, (self.table,))
+        if not row:
+            return {'table': self.table, 'exists': False, 'date_type': None, 'partitioned': False}
+        return {'table': self.table, 'exists': True, 'date_type': row[0], 'partitioned': row[1] == 'p'}
+
+    def _columns(self) -> List[Tuple[str, str, bool, Optional[str]]]:
+        return [tuple(row) for row in self.db.execute_query("""
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull,
+                   pg_get_expr(d.adbin, d.adrelid)
+            FROM pg_attribute a
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum
+        """, (self.table,))]
+
+    def _date_range(self, source_is_text: bool) -> Tuple[date, date]:
+        predicate = f"WHERE date ~ '{_ISO_DATE}'" if source_is_text else ""
+        row = self.db.fetch_one(f"SELECT MIN(date), MAX(date) FROM {self.table} {predicate}")
+        today = date.today()
+        if not row or row[0] is None:
+            return today, today
+        return date.fromisoformat(str(row[0])[:10]), date.fromisoformat(str(row[1])[:10])
+
+    def plan(self, granularity: str = 'year', ahead: int = 1) -> Tuple[List[str], List[str]]:
+        """
+        Statements that build, fill and swap in the partitioned table.
+
+        Returns:
+            Tuple of (statements, partition names)
+        """
+        state = self.inspect()
+        if not state['exists']:
+            raise ValueError(f"Table {self.table} does not exist")
+        source_is_text = state['date_type'] != 'date'
+        columns = self._columns()
+        column_names = [column[0] for column in columns]
+        sequences = [(column[0], self.db.fetch_one("SELECT pg_get_serial_sequence(%s, %s)",
+                                                   (self.table, column[0]))[0])
+                     for column in columns if column[3] and 'nextval(' in column[3]]
+        first, last = self._date_range(source_is_text)
+        staging = f"{self.table}_partitioned"
+
+        statements = [
+            f"LOCK TABLE {self.table} IN SHARE MODE",
+            f"DROP TABLE IF EXISTS {staging}",
+            build_create_sql(staging, columns),
+        ]
+        partitions = []
+        for suffix, start, end in partition_bounds(first, last, granularity, ahead):
+            name = f"{self.table}_{suffix}"
+            partitions.append(name)
+            statements.append(build_partition_sql(staging, name, start, end))
+        statements.append(f"CREATE TABLE IF NOT EXISTS {self.table}_default PARTITION OF {staging} DEFAULT")
+        for _, start, end in partition_bounds(first, last, granularity, 0):
+            statements.append(build_copy_sql(self.table, staging, column_names, start, end, source_is_text))
+
+        # Index after the load; the parent index cascades to every partition
+        statements.append(f"ALTER TABLE {staging} ADD PRIMARY KEY (ticker, date)")
+        statements.extend(covering_index_statements(staging, column_names))
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{staging}_date ON {staging} (date DESC)")
+
+        statements.append(f"ALTER TABLE {self.table} RENAME TO {self.backup_table}")
+        statements.append(f"ALTER TABLE {staging} RENAME TO {self.table}")
+        for suffix in list(COVERING_INDEXES) + ['date']:
+            # Index names are schema-wide; move the old table's out of the way first
+            statements.append(f"ALTER INDEX IF EXISTS idx_{self.table}_{suffix} "
+                              f"RENAME TO idx_{self.backup_table}_{suffix}")
+            statements.append(f"ALTER INDEX idx_{staging}_{suffix} RENAME TO idx_{self.table}_{suffix}")
+        for column, sequence in sequences:
+            # The sequence would otherwise be dropped together with the backup
+            if sequence:
+                statements.append(f"ALTER SEQUENCE {sequence} OWNED BY {self.table}.{column}")
+        # Permanent staging table left by older bulk_ingest versions (now a temp table)
+        statements.append(f"DROP TABLE IF EXISTS {self.table}_bulk_staging")
+        return statements, partitions
+
+    def migrate(self, granularity: str = 'year', dry_run: bool = False, ahead: int = 1) -> MigrationReport:
+        """
+        Build, fill and swap in the partitioned table in one transaction.
+
+        Writers block on the SHARE lock for the duration of the copy, readers do not.
+        """
+        report = MigrationReport(table=self.table, granularity=granularity, dry_run=dry_run)
+        start_time = time.monotonic()
+        state = self.inspect()
+        if state['partitioned'] and state['date_type'] == 'date':
+            report.already_migrated = True
+            logger.info(f"📅 {self.table} is already partitioned on a DATE column")
+            return report
+
+        statements, report.partitions = self.plan(granularity, ahead)
+        report.statements = statements
+        if dry_run:
+            return report
+
+        total = self.db.fetch_one(f"SELECT COUNT(*) FROM {self.table}")[0]
+        with self.db.get_cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+                if statement.startswith('INSERT INTO'):
+                    report.rows_copied += max(cursor.rowcount, 0)
+            cursor.execute(f"ANALYZE {self.table}")
+        report.rows_rejected = total - report.rows_copied
+        report.elapsed = time.monotonic() - start_time
+
+        logger.info(f"📅 Migrated {self.table}: {report.rows_copied} rows into {len(report.partitions)} "
+                    f"{granularity} partitions in {report.elapsed:.1f}s")
+        if report.rows_rejected:
+            logger.warning(f"⚠️ {report.rows_rejected} rows with non-ISO dates left in {self.backup_table}")
+        return report
+
+    def ensure_partitions(self, ahead: int = 1) -> List[str]:
+        """
+        Create partitions up to `ahead` periods past today, so new prices never
+        land in the DEFAULT partition. No-op while the table is not partitioned.
+        """
+        if not self.inspect()['partitioned']:
+            return []
+        children = self._partitions()
+        granularity = self._granularity(children)
+        today = date.today()
+        created = []
+        with self.db.get_cursor() as cursor:
+            for suffix, start, end in partition_bounds(today, today, granularity, ahead):
+                name = f"{self.table}_{suffix}"
+                if name in children:
+                    continue
+                cursor.execute(build_partition_sql(self.table, name, start, end))
+                created.append(name)
+        if created:
+            logger.info(f"📅 Created {self.table} partitions: {', '.join(created)}")
+        return created
+
+    def _partitions(self) -> List[str]:
+        return [row[0] for row in self.db.execute_query("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+        """, (self.table,))]
+
+    @staticmethod
+    def _granularity(children: List[str]) -> str:
+        return 'month' if any(re.search(r'_m\d{6}$', name) for name in children) else 'year'
+
+    def granularity(self) -> str:
+        """Partition granularity of the table; 'year' while it is not partitioned yet"""
+        if not self.inspect()['partitioned']:
+            return 'year'
+        return self._granularity(self._partitions())
+
+    def drop_backup(self):
+        self.db.execute_update(f"DROP TABLE IF EXISTS {self.backup_table}")
+        logger.info(f"🗑️ Dropped {self.backup_table}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Migrate daily_charts to a date-partitioned table')
+    parser.add_argument('--granularity', choices=GRANULARITIES, default='year',
+                        help='Partition by year or month')
+    parser.add_argument('--ahead', type=int, default=1, help='Future partitions to create')
+    parser.add_argument('--dry-run', action='store_true', help='Print the statements without running them')
+    parser.add_argument('--drop-backup', action='store_true', help='Drop daily_charts_text_backup and exit')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    migration = DailyChartsMigration()
+    if args.drop_backup:
+        migration.drop_backup()
+        return 0
+
+    report = migration.migrate(args.granularity, dry_run=args.dry_run, ahead=args.ahead)
+    if args.dry_run:
+        print(';\n'.join(report.statements) + ';')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
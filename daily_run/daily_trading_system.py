@@ -38,20 +38,36 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     from .common_imports import *
-    from .database import DatabaseManager
+    from .database import DatabaseManager, mark_quality_dirty, quality_dirty_tickers
+    from .data_quality_stats import DataQualityStats
+    from .daily_charts_migration import DailyChartsMigration
     from .error_handler import ErrorHandler, ErrorSeverity
     from .monitoring import SystemMonitor
-    from .batch_price_processor import BatchPriceProcessor
-    from .earnings_based_fundamental_processor import EarningsBasedFundamentalProcessor
-    from .enhanced_multi_service_manager import get_multi_service_manager
+    from .service_registry import LazyService, ServiceRegistry
+    from .bulk_history_backfill import BulkHistoryBackfill
+    from .bulk_ingest import price_frame_to_cents, upsert_price_history
+    from .request_planner import RequestPlanner
+    from .concurrent_fundamentals_fetcher import ConcurrentFundamentalsFetcher
+    from .tracing import configure_tracer, get_tracer
+    from .ticker_purge import TickerPurger
+    from .log_pipeline import PhaseLog, configure_logging
+    from .price_frame import PriceFrame
 except ImportError:
     from common_imports import *
-    from database import DatabaseManager
+    from database import DatabaseManager, mark_quality_dirty, quality_dirty_tickers
+    from data_quality_stats import DataQualityStats
+    from daily_charts_migration import DailyChartsMigration
     from error_handler import ErrorHandler, ErrorSeverity
     from monitoring import SystemMonitor
-    from batch_price_processor import BatchPriceProcessor
-    from earnings_based_fundamental_processor import EarningsBasedFundamentalProcessor
-    from enhanced_multi_service_manager import get_multi_service_manager
+    from service_registry import LazyService, ServiceRegistry
+    from bulk_history_backfill import BulkHistoryBackfill
+    from bulk_ingest import price_frame_to_cents, upsert_price_history
+    from request_planner import RequestPlanner
+    from concurrent_fundamentals_fetcher import ConcurrentFundamentalsFetcher
+    from tracing import configure_tracer, get_tracer
+    from ticker_purge import TickerPurger
+    from log_pipeline import PhaseLog, configure_logging
+    from price_frame import PriceFrame
 try:
     from check_market_schedule import check_market_open_today, should_run_daily_process
 except ImportError:
@@ -75,6 +91,11 @@ class DailyTradingSystem:
     Comprehensive daily trading system that handles all post-market operations.
     """
     
+    # Built on first use: a closed-market run never touches the price processor
+    batch_price_processor = LazyService()
+    earnings_processor = LazyService()
+    service_manager = LazyService()
+    
     def __init__(self, config: Dict = None):
         self.config = config or {}
         self.db = DatabaseManager()
@@ -101,28 +122,61 @@ class DailyTradingSystem:
             'priority_6_max_tickers': 700      # Process all 700 stocks for analyst data
         }
         
-        # Initialize processors
-        self.batch_price_processor = BatchPriceProcessor(
+        # Initialize processors (API-backed ones lazily, see _create_* below)
+        self.services = ServiceRegistry('daily_trading_system')
+        self.services.register('batch_price_processor', self._create_batch_price_processor)
+        self.services.register('earnings_processor', self._create_earnings_processor)
+        self.services.register('service_manager', self._create_service_manager)
+        
+        self.history_backfill = BulkHistoryBackfill(db=self.db)
+        self.quality_stats = DataQualityStats(db=self.db)
+        self.chart_partitions = DailyChartsMigration(db=self.db)
+        # daily_charts tickers already copied into ticker_latest_snapshot this run
+        self._snapshot_refreshed = set()
+        
+        # API budgets: planned per phase at run start from the remaining provider quotas
+        self.request_planner = RequestPlanner()
+        self.request_plan = None
+        
+        # Tracing: run -> phase -> ticker -> sub-step spans, optional per-phase profiles
+        tracing_config = dict(self.config.get('tracing') or {})
+        self.trace_dir = tracing_config.pop('trace_dir', os.path.join('logs', 'traces'))
+        self.tracer = configure_tracer(**tracing_config) if tracing_config else get_tracer()
+        
+        # Performance tracking
+        self.start_time = None
+        self.metrics = {}
+        self.api_calls_used = 0
+    
+    def _create_batch_price_processor(self):
+        try:
+            from .batch_price_processor import BatchPriceProcessor
+        except ImportError:
+            from batch_price_processor import BatchPriceProcessor
+        return BatchPriceProcessor(
             db=self.db,
             max_batch_size=100,  # 100 stocks per API call
             max_workers=5,
             delay_between_batches=1.0
         )
-        
-        self.earnings_processor = EarningsBasedFundamentalProcessor(
+    
+    def _create_earnings_processor(self):
+        try:
+            from .earnings_based_fundamental_processor import EarningsBasedFundamentalProcessor
+        except ImportError:
+            from earnings_based_fundamental_processor import EarningsBasedFundamentalProcessor
+        return EarningsBasedFundamentalProcessor(
             db=self.db,
             max_workers=5,
             earnings_window_days=7
         )
-        
-        # Initialize enhanced multi-service manager
-        self.service_manager = get_multi_service_manager()
-        
-        # Performance tracking
-        self.start_time = None
-        self.metrics = {}
-        self.api_calls_used = 0
-        self.max_api_calls_per_day = 1000  # Conservative limit
+    
+    def _create_service_manager(self):
+        try:
+            from .enhanced_multi_service_manager import get_multi_service_manager
+        except ImportError:
+            from enhanced_multi_service_manager import get_multi_service_manager
+        return get_multi_service_manager()
 
     def run_daily_trading_process(self, force_run: bool = False) -> Dict:
         """
@@ -140,8 +194,18 @@ class DailyTradingSystem:
             force_run: Force run even if market was closed
             
         Returns:
-            Dictionary with complete processing results
-        """
+            Dictionary with complete processing results, including a 'tracing'
+            section with per-span latency stats, the trace file and any profiles
+        """
+        self.tracer.reset()
+        self._snapshot_refreshed = set()
+        with self.tracer.span('daily_run', kind='server', force_run=force_run):
+            results = self._run_priorities(force_run)
+        results['tracing'] = self._export_trace()
+        return results
+
+    def _run_priorities(self, force_run: bool) -> Dict:
+        """Run every priority in order inside the run span"""
         self.start_time = time.time()
         logger.info("🚀 Starting Daily Trading System - Priority-Based Schema")
         logger.info("📋 STEP-BY-STEP EXECUTION LOG:")
@@ -149,26 +213,42 @@ class DailyTradingSystem:
         try:
             # Check if it was a trading day
             logger.info("🔍 STEP 1: Checking if today was a trading day...")
-            trading_day_result = self._check_trading_day(force_run)
+            with self.tracer.span('trading_day_check'):
+                trading_day_result = self._check_trading_day(force_run)
             logger.info(f"✅ Trading day check completed: {trading_day_result['was_trading_day']}")
             
+            # Split the remaining provider quotas across phases before any phase spends them
+            with self.tracer.span('plan_requests'):
+                self.request_plan = self._plan_requests(trading_day_result['was_trading_day'] or force_run)
+            
+            # Today's prices must land in a real partition, not daily_charts_default
+            with self.tracer.span('ensure_partitions'):
+                self._ensure_price_partitions()
+            
             # PRIORITY 1: Get price data for trading day, calculate technical indicators
             if trading_day_result['was_trading_day'] or force_run:
                 logger.info("📈 PRIORITY 1: Processing trading day - updating prices and technical indicators")
                 logger.info("💰 STEP 2: Starting stock price updates...")
                 
                 # Step 1a: Update daily prices for all stocks
-                price_result = self._update_daily_prices()
+                with self.tracer.phase('daily_prices'):
+                    price_result = self._update_daily_prices()
                 logger.info("✅ Stock price updates completed")
                 
                 logger.info("📈 STEP 3: Starting technical indicator calculations...")
                 # Step 1b: Calculate technical indicators based on updated prices
-                technical_result = self._calculate_technical_indicators_priority1()
+                with self.tracer.phase('technical_indicators'):
+                    technical_result = self._calculate_technical_indicators_priority1()
                 logger.info("✅ Technical indicator calculations completed")
                 
+                # Scorers read the latest close/indicators/S-R levels from the snapshot table
+                with self.tracer.span('latest_snapshot_refresh'):
+                    snapshot_result = self._refresh_latest_snapshot()
+                
                 priority1_result = {
                     'daily_prices': price_result,
-                    'technical_indicators': technical_result
+                    'technical_indicators': technical_result,
+                    'latest_snapshot': snapshot_result
                 }
             else:
                 logger.info("PRIORITY 1: Market was closed - skipping to Priority 2")
@@ -180,34 +260,47 @@ class DailyTradingSystem:
             # PRIORITY 2: Update fundamental information for companies with earnings announcements
             logger.info("📊 PRIORITY 2: Updating fundamentals for companies with earnings announcements")
             logger.info("📊 STEP 4: Starting earnings-based fundamental updates...")
-            earnings_fundamentals_result = self._update_earnings_announcement_fundamentals()
+            with self.tracer.phase('earnings_fundamentals'):
+                earnings_fundamentals_result = self._update_earnings_announcement_fundamentals()
             logger.info("✅ Earnings-based fundamental updates completed")
             
             # PRIORITY 3: Update historical prices until 100+ days for every company
             logger.info("📚 PRIORITY 3: Updating historical prices (100+ days minimum)")
             logger.info("📚 STEP 5: Starting historical data updates...")
-            historical_result = self._ensure_minimum_historical_data()
+            with self.tracer.phase('historical_data'):
+                historical_result = self._ensure_minimum_historical_data()
             logger.info("✅ Historical data updates completed")
+            # Tickers that only now got price history have no snapshot row yet
+            with self.tracer.span('latest_snapshot_refresh'):
+                historical_result['latest_snapshot'] = self._refresh_latest_snapshot()
             
             # PRIORITY 4: Fill missing fundamental data for companies
             logger.info("🔍 PRIORITY 4: Filling missing fundamental data")
             logger.info("🔍 STEP 6: Starting missing fundamental data fill...")
-            missing_fundamentals_result = self._fill_missing_fundamental_data()
+            with self.tracer.phase('missing_fundamentals'):
+                missing_fundamentals_result = self._fill_missing_fundamental_data()
             logger.info("✅ Missing fundamental data fill completed")
             
             # PRIORITY 5: Calculate daily scores for all companies
             logger.info("🎯 PRIORITY 5: Calculating daily scores")
-            scoring_result = self._calculate_daily_scores_with_progress()
+            with self.tracer.phase('daily_scores'):
+                scoring_result = self._calculate_daily_scores_with_progress()
             
             # PRIORITY 6: Calculate analyst scores for all companies
             logger.info("📊 PRIORITY 6: Calculating analyst scores")
-            analyst_result = self._calculate_analyst_scores()
+            with self.tracer.phase('analyst_scores'):
+                analyst_result = self._calculate_analyst_scores()
             
             # Cleanup: Remove delisted stocks to prevent future API errors
             logger.info("🧹 STEP 7: Starting cleanup of delisted stocks...")
-            cleanup_result = self._cleanup_delisted_stocks()
+            with self.tracer.phase('cleanup_delisted_stocks'):
+                cleanup_result = self._cleanup_delisted_stocks()
             logger.info("✅ Cleanup of delisted stocks completed")
             
+            # Fold this run's writes into the pre-aggregated quality/freshness stats
+            with self.tracer.span('quality_stats_refresh'):
+                quality_stats_result = self._refresh_quality_stats()
+            
             # Compile final results
             logger.info("📊 STEP 8: Compiling final results...")
             results = self._compile_results({
@@ -218,7 +311,8 @@ class DailyTradingSystem:
                 'priority_4_missing_fundamentals': missing_fundamentals_result,
                 'priority_5_daily_scores': scoring_result,
                 'priority_6_analyst_scores': analyst_result,
-                'cleanup_delisted_stocks': cleanup_result
+                'cleanup_delisted_stocks': cleanup_result,
+                'quality_stats_refresh': quality_stats_result
             })
             
             logger.info("Daily Trading System completed successfully - All priorities processed")
@@ -231,6 +325,115 @@ class DailyTradingSystem:
             )
             return self._get_error_results(e)
 
+    def _plan_requests(self, trading_day: bool = True):
+        """
+        Estimate each phase's API demand and allocate the remaining quotas.
+        
+        Demand is counted with the same candidate queries the phases use,
+        capped by the per-phase processing limits.
+        """
+        limits = self.processing_limits
+        demand = {
+            'daily_prices': min(len(self._get_tickers_needing_price_updates()), limits['priority_1_max_tickers']) if trading_day else 0,
+            'earnings_fundamentals': min(len(self._get_earnings_announcement_tickers()), limits['priority_2_max_tickers']),
+            'earnings_calendar': self._earnings_calendar_range_calls(),
+            'historical_data': min(len(self._get_tickers_needing_100_days_history()), limits['priority_3_max_tickers']),
+            'missing_fundamentals': min(len(self._get_tickers_missing_fundamental_data()), limits['priority_4_max_tickers']),
+            'analyst_scores': min(len(self._get_active_tickers()), limits['priority_6_max_tickers']),
+        }
+        time_budgets = {
+            'daily_prices': self.priority_timeouts['priority_1_technical'],
+            'earnings_fundamentals': self.priority_timeouts['priority_2_earnings'],
+            'earnings_calendar': self.priority_timeouts['priority_2_earnings'],
+            'historical_data': self.priority_timeouts['priority_3_historical'],
+            'missing_fundamentals': self.priority_timeouts['priority_4_fundamentals'],
+            'analyst_scores': self.priority_timeouts['priority_6_analyst'],
+        }
+        logger.info(f"🗓️ Planning API budgets for demand: {demand}")
+        return self.request_planner.plan(demand, time_budgets)
+
+    def _phase_budget(self, phase: str):
+        """Budget for a phase, planning lazily when a phase runs on its own"""
+        if self.request_plan is None:
+            self.request_plan = self._plan_requests()
+        return self.request_plan.budget(phase)
+
+    def _finish_phase(self, phase: str, result: Dict) -> Dict:
+        """Attach planned vs actual calls to a phase result and release its unused budget"""
+        if self.request_plan is not None and phase in self.request_plan.budgets:
+            budget = self.request_plan.budgets[phase]
+            self.request_plan.release(phase)
+            result['planned_api_calls'] = budget.planned_calls
+            result['api_budget'] = budget.to_dict()
+            logger.info(f"🗓️ {phase}: {budget.spent_calls} API calls used of {budget.planned_calls} planned")
+        return result
+
+    def _export_trace(self) -> Dict:
+        """Write the run's spans as OTLP JSON and return the per-span latency summary"""
+        trace_path = None
+        try:
+            trace_path = self.tracer.export(os.path.join(
+                self.trace_dir, f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+        except Exception as e:
+            logger.warning(f"Could not export trace: {e}")
+        return {
+            'trace_file': trace_path,
+            'sample_rate': self.tracer.sample_rate,
+            'profiles': list(self.tracer.profiles),
+            'spans': self.tracer.summary()
+        }
+
+    def _ensure_price_partitions(self) -> List[str]:
+        """Create upcoming daily_charts partitions (no-op before the partition migration)"""
+        try:
+            return self.chart_partitions.ensure_partitions()
+        except Exception as e:
+            logger.warning(f"Could not ensure daily_charts partitions: {e}")
+            return []
+
+    def _refresh_latest_snapshot(self) -> Dict:
+        """Refresh ticker_latest_snapshot for tickers whose daily_charts rows changed since the last refresh"""
+        start_time = time.time()
+        tickers = quality_dirty_tickers('daily_charts') - self._snapshot_refreshed
+        try:
+            refreshed = self.db.latest_snapshot.refresh(tickers)
+            self._snapshot_refreshed |= tickers
+            return {
+                'phase': 'latest_snapshot_refresh',
+                'tickers_refreshed': refreshed,
+                'processing_time': time.time() - start_time
+            }
+        except Exception as e:
+            logger.warning(f"Latest snapshot refresh failed: {e}")
+            return {
+                'phase': 'latest_snapshot_refresh',
+                'error': str(e),
+                'processing_time': time.time() - start_time
+            }
+
+    def _refresh_quality_stats(self) -> Dict:
+        """
+        Re-aggregate quality/freshness stats for the tickers this run wrote, and
+        rebuild any table whose last full rebuild is over a week old
+        """
+        start_time = time.time()
+        try:
+            refreshed = self.quality_stats.refresh_dirty()
+            rebuilt = self.quality_stats.refresh_due()
+            return {
+                'phase': 'quality_stats_refresh',
+                'tickers_refreshed': refreshed,
+                'tables_rebuilt': rebuilt,
+                'processing_time': time.time() - start_time
+            }
+        except Exception as e:
+            logger.warning(f"Quality stats refresh failed: {e}")
+            return {
+                'phase': 'quality_stats_refresh',
+                'error': str(e),
+                'processing_time': time.time() - start_time
+            }
+
     def _check_trading_day(self, force_run: bool = False) -> Dict:
         """
         Check if today was a trading day.
@@ -287,11 +490,11 @@ class DailyTradingSystem:
             SELECT s.ticker 
             FROM stocks s
             LEFT JOIN daily_charts dc ON s.ticker = dc.ticker 
-                AND dc.date = CURRENT_DATE::text
+                AND dc.date = %s
             WHERE s.ticker IS NOT NULL
                 AND dc.ticker IS NULL
             """
-            results = self.db.execute_query(query)
+            results = self.db.execute_query(query, (today_str,))
             tickers_needing_updates = [row[0] for row in results]
             
             logger.info(f"📊 Found {len(tickers_needing_updates)} tickers needing price updates")
@@ -300,9 +503,9 @@ class DailyTradingSystem:
             check_query = """
             SELECT COUNT(DISTINCT ticker) as existing_count
             FROM daily_charts 
-            WHERE date = CURRENT_DATE::text
+            WHERE date = %s
             """
-            existing_results = self.db.execute_query(check_query)
+            existing_results = self.db.execute_query(check_query, (today_str,))
             existing_count = existing_results[0][0] if existing_results else 0
             logger.info(f"📊 Found {existing_count} tickers already have today's price data")
             
@@ -374,8 +577,12 @@ class DailyTradingSystem:
             price_data = self.batch_price_processor.process_batch_prices(tickers_to_process)
             
             processing_time = time.time() - start_time
-            api_calls_used = (len(tickers_to_process) + 99) // 100  # 100 per call
+            coverage = self.batch_price_processor.get_coverage_stats()
+            api_calls_used = sum(stats['api_calls'] for stats in coverage.values())
             self.api_calls_used += api_calls_used
+            budget = self._phase_budget('daily_prices')
+            for service_name, stats in coverage.items():
+                budget.spend(stats['api_calls'], service_name)
             
             result = {
                 'phase': 'daily_price_update',
@@ -395,7 +602,7 @@ class DailyTradingSystem:
             else:
                 logger.info(f"PRIORITY 1: Daily prices completed - {len(price_data)} tickers updated")
             
-            return result
+            return self._finish_phase('daily_prices', result)
             
         except Exception as e:
             logger.error(f"Error updating daily prices: {e}")
@@ -595,74 +802,72 @@ class DailyTradingSystem:
         historical_fetches = 0
         
         try:
-            for i, ticker in enumerate(tickers, 1):
-                ticker_start_time = time.time()
-                
-                # Progress indicator
-                logger.info(f"📊 [{i}/{len(tickers)}] Processing technical indicators for {ticker}")
-                
-                try:
-                    # Get price data for technical calculations
-                    logger.debug(f"   🔍 Fetching price data for {ticker}")
-                    price_data = self.db.get_price_data_for_technicals(ticker, days=100)
+            with PhaseLog('technicals', total=len(tickers)) as phase:
+                for ticker in tickers:
+                    with self.tracer.span('technicals.ticker', sample_key=ticker, ticker=ticker) as ticker_span:
+                        ticker_start_time = time.time()
+                        fetched = 0
                     
-                    if not price_data or len(price_data) < 20:
-                        logger.info(f"   ⚠️  Insufficient data for {ticker}: {len(price_data) if price_data else 0} days, fetching historical data (API calls remaining: {1000 - self.api_calls_used})")
-                        # Fetch historical data if insufficient
-                        historical_data = self._get_historical_data(ticker)
-                        if historical_data and historical_data.get('data'):
-                            self._store_historical_data(ticker, historical_data['data'])
-                            price_data = self.db.get_price_data_for_technicals(ticker, days=100)
-                            historical_fetches += 1
-                            logger.info(f"   ✅ Fetched {len(historical_data['data'])} historical records for {ticker}")
+                        try:
+                            # Get price data for technical calculations
+                            with self.tracer.span('technicals.db_read'):
+                                price_data = self.db.get_price_frame(ticker, days=100)
                     
-                    if price_data and len(price_data) >= 20:
-                        logger.debug(f"   📈 Calculating indicators for {ticker} with {len(price_data)} days of data")
-                        
-                        # Calculate technical indicators using existing method
-                        indicators = self._calculate_single_ticker_technicals(ticker, price_data)
+                            if not price_data or len(price_data) < 20:
+                                logger.debug("Insufficient data for %s: %d days, fetching historical data "
+                                             "(API budget remaining: %s)", ticker, len(price_data) if price_data else 0,
+                                             self._phase_budget('historical_data').remaining)
+                                # Fetch historical data if insufficient
+                                with self.tracer.span('technicals.api_call', kind='client'):
+                                    historical_data = self._get_historical_data(ticker)
+                                if historical_data and historical_data.get('data'):
+                                    with self.tracer.span('technicals.db_write', table='daily_charts'):
+                                        self._store_historical_data(ticker, historical_data['data'])
+                                    with self.tracer.span('technicals.db_read'):
+                                        price_data = self.db.get_price_frame(ticker, days=100)
+                                    historical_fetches += 1
+                                    fetched = len(historical_data['data'])
+                    
+                            days = len(price_data) if price_data else 0
+                            if days >= 20:
+                                # Calculate technical indicators using existing method
+                                with self.tracer.span('technicals.compute', days=days):
+                                    indicators = self._calculate_single_ticker_technicals(ticker, price_data)
                         
-                        if indicators:
-                            # Store indicators in database
-                            logger.info(f"   💾 Storing {len(indicators)} calculated indicators for {ticker}")
-                            stored_count = self.db.update_technical_indicators(ticker, indicators)
+                                if indicators:
+                                    # Store indicators in database
+                                    with self.tracer.span('technicals.db_write', table='technical_indicators'):
+                                        stored_count = self.db.update_technical_indicators(ticker, indicators)
                             
-                            ticker_time = time.time() - ticker_start_time
-                            successful_calculations += 1
-                            
-                            # Show calculation vs storage comparison
-                            # Exclude metadata fields for accurate comparison
-                            metadata_fields = {'current_price', 'calculation_timestamp', 'data_source'}
-                            actual_indicators_count = len(set(indicators.keys()) - metadata_fields)
-                            
-                            if stored_count is None:
-                                stored_count = 0
-                                logger.error(f"   ❌ {ticker}: Failed to store indicators (database error)")
-                            elif stored_count != actual_indicators_count:
-                                logger.warning(f"   ⚠️  {ticker}: Calculated {actual_indicators_count} technical indicators but stored {stored_count}")
-                                logger.info(f"   📋 Missing indicators likely due to: database column mismatch, invalid values, or unsupported indicator types")
-                            
-                            logger.info(f"   ✅ {ticker}: Calculated {actual_indicators_count}, stored {stored_count}, completed in {ticker_time:.2f}s")
+                                    successful_calculations += 1
                             
-                            # ETA calculation
-                            avg_time_per_ticker = (time.time() - start_time) / i
-                            remaining_tickers = len(tickers) - i
-                            eta_seconds = remaining_tickers * avg_time_per_ticker
-                            eta_minutes = eta_seconds / 60
+                                    # Exclude metadata fields for accurate calculated vs stored comparison
+                                    metadata_fields = {'current_price', 'calculation_timestamp', 'data_source'}
+                                    actual_indicators_count = len(set(indicators.keys()) - metadata_fields)
                             
-                            if i % 10 == 0 or i == len(tickers):  # Progress update every 10 tickers
-                                logger.info(f"📊 PROGRESS: {i}/{len(tickers)} completed ({i/len(tickers)*100:.1f}%) - ETA: {eta_minutes:.1f} minutes")
-                        else:
-                            failed_calculations += 1
-                            logger.warning(f"   ❌ {ticker}: Failed to calculate indicators")
-                    else:
-                        failed_calculations += 1
-                        logger.warning(f"   ❌ {ticker}: Insufficient data ({len(price_data) if price_data else 0} days)")
+                                    if stored_count is None:
+                                        status = 'store_failed'
+                                        stored_count = 0
+                                    elif stored_count != actual_indicators_count:
+                                        # Likely a database column mismatch, invalid values or unsupported indicators
+                                        status = 'partially_stored'
+                                    else:
+                                        status = 'ok'
+                                    phase.event(ticker, status, time.time() - ticker_start_time, days=days,
+                                                calculated=actual_indicators_count, stored=stored_count,
+                                                historical_fetched=fetched)
+                                else:
+                                    failed_calculations += 1
+                                    phase.event(ticker, 'calculation_failed', time.time() - ticker_start_time,
+                                                days=days)
+                            else:
+                                failed_calculations += 1
+                                phase.event(ticker, 'insufficient_data', time.time() - ticker_start_time, days=days)
                         
-                except Exception as e:
-                    failed_calculations += 1
-                    ticker_time = time.time() - ticker_start_time
-                    logger.error(f"   ❌ {ticker}: Error after {ticker_time:.2f}s - {e}")
+                        except Exception as e:
+                            failed_calculations += 1
+                            ticker_span.record_exception(e)
+                            phase.event(ticker, 'error', time.time() - ticker_start_time, error=str(e))
                     
         except Exception as e:
             logger.error(f"❌ Technical indicator processing failed: {e}")
@@ -772,53 +977,47 @@ class DailyTradingSystem:
             
             logger.info(f"🚀 STARTING SCORE CALCULATIONS for {len(tickers_to_process)} tickers (max time: {max_processing_time}s)")
             
-            for i, ticker in enumerate(tickers_to_process, 1):
-                # Check time constraint
-                elapsed_time = time.time() - start_time
-                if elapsed_time > max_processing_time:
-                    logger.info(f"Time limit reached ({elapsed_time:.1f}s > {max_processing_time}s) - stopping Priority 5 to allow Priority 6 to run")
-                    logger.info(f"Progress: {successful_calculations + failed_calculations}/{len(tickers_to_process)} tickers processed")
-                    break
+            with PhaseLog('scores', total=len(tickers_to_process)) as phase:
+                for ticker in tickers_to_process:
+                    # Check time constraint
+                    elapsed_time = time.time() - start_time
+                    if elapsed_time > max_processing_time:
+                        logger.info(f"Time limit reached ({elapsed_time:.1f}s > {max_processing_time}s) - stopping Priority 5 to allow Priority 6 to run")
+                        logger.info(f"Progress: {successful_calculations + failed_calculations}/{len(tickers_to_process)} tickers processed")
+                        break
                 
-                ticker_start_time = time.time()
+                    with self.tracer.span('scores.ticker', sample_key=ticker, ticker=ticker) as ticker_span:
+                        ticker_start_time = time.time()
                 
-                try:
-                    logger.info(f"📊 [{i}/{len(tickers_to_process)}] Calculating scores for {ticker} - Elapsed: {elapsed_time:.1f}s")
+                        try:
+                            # Calculate fundamental scores
+                            with self.tracer.span('scores.compute_fundamental'):
+                                fundamental_scores = fundamental_calc.calculate_fundamental_scores(ticker)
                     
-                    # Calculate fundamental scores
-                    logger.debug(f"   📈 Calculating fundamental scores for {ticker}")
-                    fundamental_scores = fundamental_calc.calculate_fundamental_scores(ticker)
+                            # Calculate enhanced technical scores
+                            with self.tracer.span('scores.compute_technical'):
+                                technical_scores = technical_calc.calculate_enhanced_technical_scores(ticker)
                     
-                    # Calculate enhanced technical scores
-                    logger.debug(f"   📊 Calculating technical scores for {ticker}")
-                    technical_scores = technical_calc.calculate_enhanced_technical_scores(ticker)
-                    
-                    if fundamental_scores and technical_scores:
-                        # Store combined scores
-                        logger.debug(f"   💾 Storing combined scores for {ticker}")
-                        success = self._store_combined_scores(ticker, fundamental_scores, technical_scores)
+                            if fundamental_scores and technical_scores:
+                                # Store combined scores
+                                with self.tracer.span('scores.db_write', table='daily_scores'):
+                                    success = self._store_combined_scores(ticker, fundamental_scores, technical_scores)
                         
-                        ticker_time = time.time() - ticker_start_time
+                                if success:
+                                    successful_calculations += 1
+                                    phase.event(ticker, 'ok', time.time() - ticker_start_time)
+                                else:
+                                    failed_calculations += 1
+                                    phase.event(ticker, 'store_failed', time.time() - ticker_start_time)
+                            else:
+                                failed_calculations += 1
+                                phase.event(ticker, 'calculation_failed', time.time() - ticker_start_time,
+                                            fundamental=bool(fundamental_scores), technical=bool(technical_scores))
                         
-                        if success:
-                            successful_calculations += 1
-                            logger.info(f"   ✅ {ticker}: Scores calculated and stored in {ticker_time:.2f}s")
-                            
-                            # Progress update every 10 tickers
-                            if i % 10 == 0 or i == len(tickers_to_process):
-                                logger.info(f"📊 SCORING PROGRESS: {i}/{len(tickers_to_process)} completed ({i/len(tickers_to_process)*100:.1f}%)")
-                        else:
+                        except Exception as e:
                             failed_calculations += 1
-                            logger.warning(f"   ❌ {ticker}: Failed to store scores after {ticker_time:.2f}s")
-                    else:
-                        failed_calculations += 1
-                        ticker_time = time.time() - ticker_start_time
-                        logger.warning(f"   ❌ {ticker}: Failed to calculate scores after {ticker_time:.2f}s")
-                        
-                except Exception as e:
-                    failed_calculations += 1
-                    ticker_time = time.time() - ticker_start_time
-                    logger.error(f"   ❌ {ticker}: Error after {ticker_time:.2f}s - {e}")
+                            ticker_span.record_exception(e)
+                            phase.event(ticker, 'error', time.time() - ticker_start_time, error=str(e))
             
             total_time = time.time() - start_time
             logger.info(f"🎯 DAILY SCORES COMPLETED: {successful_calculations}/{len(tickers_to_process)} successful in {total_time/60:.1f} minutes")
@@ -855,7 +1054,10 @@ class DailyTradingSystem:
         try:
             start_time = time.time()
             
-            # Get companies with earnings announcements today
+            # Refresh the earnings calendar for the whole universe from date-range calls
+            calendar_result = self._refresh_earnings_calendar()
+            
+            # Get companies with recent earnings announcements
             earnings_tickers = self._get_earnings_announcement_tickers()
             logger.info(f"Found {len(earnings_tickers)} companies with earnings announcements")
             
@@ -865,6 +1067,7 @@ class DailyTradingSystem:
                     'phase': 'priority_2_earnings_fundamentals',
                     'status': 'skipped',
                     'reason': 'no_earnings_announcements',
+                    'earnings_calendar': calendar_result,
                     'processing_time': time.time() - start_time
                 }
             
@@ -881,6 +1084,7 @@ class DailyTradingSystem:
             failed_updates = 0
             api_calls_used = 0
             max_processing_time = self.priority_timeouts['priority_2_earnings']
+            budget = self._phase_budget('earnings_fundamentals')
             
             logger.info(f"Processing {len(tickers_to_process)} tickers (max time: {max_processing_time}s)")
             
@@ -892,9 +1096,10 @@ class DailyTradingSystem:
                     logger.info(f"Progress: {successful_updates + failed_updates}/{len(tickers_to_process)} tickers processed")
                     break
                 
-                if self.api_calls_used >= self.max_api_calls_per_day:
-                    logger.warning(f"API call limit reached after processing {successful_updates} earnings tickers")
+                if not budget.try_spend(budget.item_cost()):
+                    logger.warning(f"API budget exhausted after processing {successful_updates} earnings tickers")
                     break
+                api_calls_used += budget.item_cost()
                 
                 logger.info(f"Processing ticker {i+1}/{len(tickers_to_process)}: {ticker} - Elapsed: {elapsed_time:.1f}s")
                 
@@ -906,7 +1111,6 @@ class DailyTradingSystem:
                         # Calculate fundamental ratios based on updated price
                         self._calculate_fundamental_ratios(ticker)
                         successful_updates += 1
-                        api_calls_used += 1
                         logger.debug(f"Updated fundamentals and ratios for {ticker}")
                     else:
                         failed_updates += 1
@@ -926,6 +1130,7 @@ class DailyTradingSystem:
                 'successful_updates': successful_updates,
                 'failed_updates': failed_updates,
                 'api_calls_used': api_calls_used,
+                'earnings_calendar': calendar_result,
                 'processing_time': processing_time,
                 'time_limit_reached': processing_time >= max_processing_time
             }
@@ -935,7 +1140,7 @@ class DailyTradingSystem:
             else:
                 logger.info(f"PRIORITY 2: Earnings fundamentals completed - {successful_updates}/{len(tickers_to_process)} successful")
             
-            return result
+            return self._finish_phase('earnings_fundamentals', result)
             
         except Exception as e:
             logger.error(f"Error in Priority 2 earnings fundamentals: {e}")
@@ -960,18 +1165,18 @@ class DailyTradingSystem:
         try:
             start_time = time.time()
             
-            # Calculate remaining API calls
-            remaining_calls = self.max_api_calls_per_day - self.api_calls_used
-            logger.info(f"Remaining API calls for historical data: {remaining_calls}")
+            # API budget planned for this phase (plus any capacity it can borrow)
+            budget = self._phase_budget('historical_data')
+            logger.info(f"API budget for historical data: {budget.planned_calls} calls {budget.allocation}")
             
-            if remaining_calls <= 0:
+            if not budget.can_spend():
                 logger.warning("No API calls remaining for historical data")
-                return {
+                return self._finish_phase('historical_data', {
                     'phase': 'priority_3_historical_data',
                     'status': 'skipped',
                     'reason': 'no_api_calls_remaining',
                     'processing_time': time.time() - start_time
-                }
+                })
             
             # Get tickers that need historical data to reach 100+ days
             tickers_needing_history = self._get_tickers_needing_100_days_history()
@@ -991,12 +1196,32 @@ class DailyTradingSystem:
             api_calls_used = 0
             max_processing_time = self.priority_timeouts['priority_3_historical']
             
+            def reserve_bulk_request(batch: List[str]) -> bool:
+                # Checked before every bulk request: stop on the phase time
+                # limit, otherwise charge the request to the budget up front
+                if time.time() - start_time > max_processing_time:
+                    return False
+                return budget.try_spend(1, 'yahoo')
+            
+            # Bulk pass: one yfinance request per few hundred tickers; only the
+            # tickers missing from the bulk result go through per-ticker providers
+            bulk_result = self.history_backfill.backfill(tickers_to_process, days=100,
+                                                         should_continue=reserve_bulk_request)
+            successful_updates += bulk_result['bulk_tickers_loaded']
+            api_calls_used += bulk_result['bulk_requests']
+            if bulk_result['skipped_tickers']:
+                logger.info(f"Bulk history stopped by budget/time limit - "
+                            f"{len(bulk_result['skipped_tickers'])} tickers left for future runs")
+            residual_tickers = bulk_result['missing_tickers']
+            logger.info(f"Bulk history loaded {bulk_result['bulk_tickers_loaded']} tickers, "
+                        f"{len(residual_tickers)} left for per-ticker providers")
+            
             # Process tickers in batches to optimize API usage
-            batch_size = min(50, remaining_calls)  # Process up to 50 tickers at once
-            ticker_batches = [tickers_to_process[i:i + batch_size] 
-                            for i in range(0, len(tickers_to_process), batch_size)]
+            batch_size = 50  # Process up to 50 tickers at once
+            ticker_batches = [residual_tickers[i:i + batch_size] 
+                            for i in range(0, len(residual_tickers), batch_size)]
             
-            logger.info(f"Processing {len(tickers_to_process)} tickers in {len(ticker_batches)} batches (max time: {max_processing_time}s)")
+            logger.info(f"Processing {len(residual_tickers)} tickers in {len(ticker_batches)} batches (max time: {max_processing_time}s)")
             
             for batch_num, ticker_batch in enumerate(ticker_batches):
                 # Check time constraint
@@ -1006,19 +1231,20 @@ class DailyTradingSystem:
                     logger.info(f"Progress: {successful_updates + failed_updates}/{len(tickers_to_process)} tickers processed")
                     break
                 
-                if api_calls_used >= remaining_calls:
-                    logger.info(f"API call limit reached after {api_calls_used} calls")
+                if not budget.can_spend():
+                    logger.info(f"API budget exhausted after {api_calls_used} calls")
                     break
                 
                 logger.info(f"Processing historical data batch {batch_num + 1}/{len(ticker_batches)} ({len(ticker_batch)} tickers) - Elapsed: {elapsed_time:.1f}s")
                 
                 for ticker in ticker_batch:
-                    if api_calls_used >= remaining_calls:
+                    if not budget.can_spend():
                         break
                     
                     try:
                         # Get historical data to ensure 100+ days
                         history_result = self._get_historical_data_to_minimum(ticker, min_days=100)
+                        budget.spend(history_result.get('api_calls', 0))
                         if history_result['success']:
                             successful_updates += 1
                             api_calls_used += history_result['api_calls']
@@ -1031,9 +1257,10 @@ class DailyTradingSystem:
                         logger.error(f"Error getting historical data for {ticker}: {e}")
                         failed_updates += 1
                         api_calls_used += 1  # Count failed attempts
+                        budget.spend(1)
                 
                 # Add small delay between batches to avoid rate limiting
-                if batch_num < len(ticker_batches) - 1 and api_calls_used < remaining_calls:
+                if batch_num < len(ticker_batches) - 1 and budget.can_spend():
                     time.sleep(0.5)
             
             self.api_calls_used += api_calls_used
@@ -1045,6 +1272,8 @@ class DailyTradingSystem:
                 'tickers_processed': len(tickers_to_process),
                 'successful_updates': successful_updates,
                 'failed_updates': failed_updates,
+                'bulk_tickers_loaded': bulk_result['bulk_tickers_loaded'],
+                'bulk_rows_written': bulk_result['bulk_rows_written'],
                 'api_calls_used': api_calls_used,
                 'processing_time': processing_time,
                 'batches_processed': len(ticker_batches),
@@ -1056,13 +1285,11 @@ class DailyTradingSystem:
             else:
                 logger.info(f"PRIORITY 3: Historical data completed - {successful_updates} tickers updated")
             
-            return result
+            return self._finish_phase('historical_data', result)
             
         except Exception as e:
             logger.error(f"Error in Priority 3 historical data: {e}")
-            self.error_handler.handle_error(
-                "Priority 3 historical data failed", e, ErrorSeverity.MEDIUM
-            )
+            self.error_handler.log_error("Priority 3 historical data failed", ErrorSeverity.ERROR, e)
             return {
                 'phase': 'priority_3_historical_data',
                 'error': str(e),
@@ -1081,18 +1308,18 @@ class DailyTradingSystem:
         try:
             start_time = time.time()
             
-            # Calculate remaining API calls
-            remaining_calls = self.max_api_calls_per_day - self.api_calls_used
-            logger.info(f"Remaining API calls for missing fundamentals: {remaining_calls}")
+            # API budget planned for this phase; higher-value phases keep theirs
+            budget = self._phase_budget('missing_fundamentals')
+            logger.info(f"API budget for missing fundamentals: {budget.planned_calls} calls {budget.allocation}")
             
-            if remaining_calls <= 0:
+            if not budget.can_spend(budget.item_cost()):
                 logger.warning("No API calls remaining for missing fundamentals")
-                return {
+                return self._finish_phase('missing_fundamentals', {
                     'phase': 'priority_4_missing_fundamentals',
                     'status': 'skipped',
                     'reason': 'no_api_calls_remaining',
                     'processing_time': time.time() - start_time
-                }
+                })
             
             # Get tickers with missing fundamental data
             tickers_missing_fundamentals = self._get_tickers_missing_fundamental_data()
@@ -1106,66 +1333,43 @@ class DailyTradingSystem:
                 logger.info(f"Limiting processing to {max_tickers_to_process} tickers to ensure Priority 6 runs")
                 logger.info(f"Remaining {len(tickers_missing_fundamentals) - max_tickers_to_process} tickers will be processed in future runs")
             
-            # Process missing fundamentals within API limit and time constraint
-            successful_updates = 0
-            failed_updates = 0
-            api_calls_used = 0
+            # Fetch concurrently within the API and time budget; results stream to a batched writer
             max_processing_time = self.priority_timeouts['priority_4_fundamentals']
+            fetcher = ConcurrentFundamentalsFetcher(db=self.db, time_budget=max_processing_time)
+            fetch_report = fetcher.run(tickers_to_process, budget=budget,
+                                       time_budget=max_processing_time - (time.time() - start_time))
             
-            logger.info(f"Processing {len(tickers_to_process)} tickers (max time: {max_processing_time}s)")
-            
-            for i, ticker in enumerate(tickers_to_process):
-                # Check time constraint
-                elapsed_time = time.time() - start_time
-                if elapsed_time > max_processing_time:
-                    logger.info(f"Time limit reached ({elapsed_time:.1f}s > {max_processing_time}s) - stopping Priority 4 to allow Priority 6 to run")
-                    logger.info(f"Progress: {successful_updates + failed_updates}/{len(tickers_to_process)} tickers processed")
-                    break
-                
-                if api_calls_used >= remaining_calls:
-                    logger.info(f"API call limit reached after {api_calls_used} calls")
-                    break
-                
-                logger.info(f"Processing ticker {i+1}/{len(tickers_to_process)}: {ticker} - Elapsed: {elapsed_time:.1f}s")
-                
-                try:
-                    # Fill missing fundamental data
-                    fundamental_success = self._update_single_ticker_fundamentals(ticker)
-                    
-                    if fundamental_success:
-                        # Calculate ratios for newly filled data
-                        self._calculate_fundamental_ratios(ticker)
-                        successful_updates += 1
-                        api_calls_used += 1
-                        logger.debug(f"Filled missing fundamentals for {ticker}")
-                    else:
-                        failed_updates += 1
-                        logger.warning(f"Failed to fill fundamentals for {ticker}")
-                        
-                except Exception as e:
-                    logger.error(f"Error filling fundamentals for {ticker}: {e}")
-                    failed_updates += 1
+            # Calculate ratios for newly filled data
+            for ticker in fetcher.stored_tickers:
+                self._calculate_fundamental_ratios(ticker)
             
+            successful_updates = fetch_report.stored
+            failed_updates = fetch_report.tickers_requested - fetch_report.stored - fetch_report.deferred
+            api_calls_used = fetch_report.api_calls_used
             self.api_calls_used += api_calls_used
             processing_time = time.time() - start_time
             
             result = {
                 'phase': 'priority_4_missing_fundamentals',
                 'tickers_missing_data': len(tickers_missing_fundamentals),
-                'tickers_processed': len(tickers_to_process),
+                'tickers_processed': len(tickers_to_process) - fetch_report.deferred,
                 'successful_updates': successful_updates,
                 'failed_updates': failed_updates,
+                'deferred_tickers': fetch_report.deferred,
                 'api_calls_used': api_calls_used,
+                'throughput_per_minute': round(fetch_report.throughput_per_minute, 1),
+                'max_queue_depth': fetch_report.max_queue_depth,
+                'fetch_report': fetch_report.to_dict(),
                 'processing_time': processing_time,
-                'time_limit_reached': processing_time >= max_processing_time
+                'time_limit_reached': fetch_report.time_limit_reached or processing_time >= max_processing_time
             }
             
-            if processing_time >= max_processing_time:
+            if result['time_limit_reached']:
                 logger.info(f"PRIORITY 4: Time limit reached - {successful_updates} tickers updated, continuing to Priority 6")
             else:
                 logger.info(f"PRIORITY 4: Missing fundamentals completed - {successful_updates} tickers updated")
             
-            return result
+            return self._finish_phase('missing_fundamentals', result)
             
         except Exception as e:
             logger.error(f"Error in Priority 4 missing fundamentals: {e}")
@@ -1194,21 +1398,23 @@ class DailyTradingSystem:
             for ticker in tickers:
                 try:
                     # Get price data for technical calculations
-                    price_data = self.db.get_price_data_for_technicals(ticker)
+                    price_data = self.db.get_price_frame(ticker)
                     
                     # Check if we have enough data for technical indicators (minimum 100 days for reliable calculations)
                     if not price_data or len(price_data) < 100:
-                        # Check if we have enough API calls remaining for historical data
-                        remaining_calls = self.max_api_calls_per_day - self.api_calls_used
-                        if remaining_calls > 0:
-                            logger.info(f"Insufficient data for {ticker}: {len(price_data) if price_data else 0} days, fetching historical data (API calls remaining: {remaining_calls})")
+                        # Check if the historical data budget still allows a fetch
+                        budget = self._phase_budget('historical_data')
+                        if budget.can_spend():
+                            logger.info(f"Insufficient data for {ticker}: {len(price_data) if price_data else 0} days, fetching historical data (API budget remaining: {budget.remaining})")
                             
                             # Fetch historical data to ensure minimum 200 days for better reliability
                             historical_result = self._get_historical_data_to_minimum(ticker, min_days=200)
+                            budget.spend(historical_result.get('api_calls', 0))
+                            self.api_calls_used += historical_result.get('api_calls', 0)
                             if historical_result.get('success'):
                                 historical_fetches += 1
                                 # Get updated price data after fetching historical data
-                                price_data = self.db.get_price_data_for_technicals(ticker)
+                                price_data = self.db.get_price_frame(ticker)
                                 logger.info(f"Fetched historical data for {ticker}: now have {len(price_data) if price_data else 0} days")
                             else:
                                 logger.warning(f"Failed to fetch historical data for {ticker}")
@@ -1334,28 +1540,11 @@ class DailyTradingSystem:
                 'TES', 'TEV', 'TIF', 'TII', 'TOT', 'TXR', 'ZA', 'ZE', 'BRK.B', 'SNE'
             ]
             
-            removed_count = 0
-            for ticker in delisted_candidates:
-                try:
-                    # Check if ticker exists in stocks table
-                    query = "SELECT COUNT(*) FROM stocks WHERE ticker = %s"
-                    result = self.db.fetch_one(query, (ticker,))
-                    
-                    if result and result[0] > 0:
-                        # Remove from stocks table
-                        delete_query = "DELETE FROM stocks WHERE ticker = %s"
-                        self.db.execute_update(delete_query, (ticker,))
-                        
-                        # Remove from daily_charts table
-                        delete_charts_query = "DELETE FROM daily_charts WHERE ticker = %s"
-                        self.db.execute_update(delete_charts_query, (ticker,))
-                        
-                        logger.info(f"Removed delisted stock: {ticker}")
-                        removed_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error removing delisted stock {ticker}: {e}")
-                    continue
+            # One set-based purge; tickers no longer in stocks are simply not matched
+            report = self.remove_delisted_stocks(delisted_candidates)
+            if report['error']:
+                raise RuntimeError(report['error'])
+            removed_count = len(report['removed_tickers'])
             
             result = {
                 'phase': 'cleanup_delisted_stocks',
@@ -1371,8 +1560,8 @@ class DailyTradingSystem:
             
         except Exception as e:
             logger.error(f"Error in basic delisted stocks cleanup: {e}")
-            self.error_handler.handle_error(
-                "Basic delisted stocks cleanup failed", e, ErrorSeverity.MEDIUM
+            self.error_handler.log_error(
+                "Basic delisted stocks cleanup failed", ErrorSeverity.ERROR, e
             )
             return {
                 'phase': 'cleanup_delisted_stocks',
@@ -1785,10 +1974,13 @@ class DailyTradingSystem:
             logger.error(f"Failed to store zero indicators for {ticker}: {e}")
             # Don't raise - this is a fallback operation
 
-    def _calculate_single_ticker_technicals(self, ticker: str, price_data: List[Dict]) -> Optional[Dict]:
+    def _calculate_single_ticker_technicals(self, ticker: str, price_data: PriceFrame) -> Optional[Dict]:
         """
         Calculate ALL technical indicators for a single ticker using comprehensive calculator.
         Returns comprehensive dictionary with all calculated indicators.
+        
+        price_data is the PriceFrame the caller already loaded; it is handed to
+        the calculator so the window is not read from daily_charts a second time.
         """
         start_time = time.time()
         
@@ -1800,7 +1992,8 @@ class DailyTradingSystem:
             calculator = UniversalTechnicalScoreCalculator()
             
             # Calculate indicators using universal system
-            results = calculator.calculate_enhanced_technical_scores(ticker)
+            results = calculator.calculate_enhanced_technical_scores(
+                ticker, prices=price_data if isinstance(price_data, PriceFrame) else None)
             
             calculation_time = time.time() - start_time
             
@@ -1941,11 +2134,22 @@ class DailyTradingSystem:
 
     def get_technical_data_quality_summary(self) -> Dict[str, Any]:
         """
-        Get a summary of technical data quality across all tickers based on ALL indicators.
+        Get a summary of technical data quality across all tickers.
+        
+        Read from the pre-aggregated quality stats (last week's indicator
+        completeness per ticker); scans daily_charts only if they are unavailable.
         
         Returns:
             Dictionary with quality statistics
         """
+        try:
+            return self.quality_stats.technical_quality()
+        except Exception as e:
+            logger.warning(f"Quality stats unavailable, scanning daily_charts: {e}")
+            return self._scan_technical_data_quality_summary()
+
+    def _scan_technical_data_quality_summary(self) -> Dict[str, Any]:
+        """Technical data quality summary computed by scanning the last week of daily_charts"""
         try:
             # Import the comprehensive calculator to get all indicator names
             import sys
@@ -1964,11 +2168,12 @@ class DailyTradingSystem:
             query = f"""
             SELECT ticker, {indicator_list}, COUNT(*) as total_records
             FROM daily_charts 
-            WHERE date >= CURRENT_DATE - INTERVAL '7 days'
+            WHERE date >= %s
             GROUP BY ticker
             """
             
-            results = self.db.execute_query(query)
+            week_start = (date.today() - timedelta(days=7)).isoformat()
+            results = self.db.execute_query(query, (week_start,))
             if not results:
                 return {'total_tickers': 0, 'average_quality': 0.0}
             
@@ -2016,11 +2221,12 @@ class DailyTradingSystem:
                        COUNT(CASE WHEN macd_line != 0 THEN 1 END) as macd_valid,
                        COUNT(*) as total_records
                 FROM daily_charts 
-                WHERE date >= CURRENT_DATE - INTERVAL '7 days'
+                WHERE date >= %s
                 GROUP BY ticker
                 """
                 
-                results = self.db.execute_query(fallback_query)
+                week_start = (date.today() - timedelta(days=7)).isoformat()
+                results = self.db.execute_query(fallback_query, (week_start,))
                 if not results:
                     return {'total_tickers': 0, 'average_quality': 0.0}
                 
@@ -2056,11 +2262,10 @@ class DailyTradingSystem:
         try:
             start_time = time.time()
             
-            # Calculate remaining API calls
-            remaining_calls = self.max_api_calls_per_day - self.api_calls_used
-            logger.info(f"Remaining API calls: {remaining_calls}")
+            budget = self._phase_budget('historical_data')
+            logger.info(f"API budget for historical data: {budget.remaining} calls")
             
-            if remaining_calls <= 0:
+            if not budget.can_spend():
                 logger.warning("No API calls remaining for historical data")
                 return {
                     'phase': 'historical_data_population',
@@ -2077,7 +2282,10 @@ class DailyTradingSystem:
             successful_updates = 0
             api_calls_used = 0
             
-            for ticker in tickers_needing_history[:remaining_calls]:
+            for ticker in tickers_needing_history:
+                if not budget.try_spend(1, 'yahoo'):
+                    logger.info(f"API budget exhausted after {api_calls_used} calls")
+                    break
                 try:
                     # Get historical data (100+ days)
                     historical_result = self._get_historical_data(ticker)
@@ -2153,28 +2361,15 @@ class DailyTradingSystem:
     def _store_historical_data(self, ticker: str, historical_data: List):
         """
         Store historical data in daily_charts table.
+        
+        Provider records carry dollar prices; they are scaled to cents and
+        loaded with one COPY + INSERT ... ON CONFLICT DO NOTHING.
         """
         try:
-            for data_point in historical_data:
-                query = """
-                INSERT INTO daily_charts (
-                    ticker, date, open, high, low, 
-                    close, volume
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ticker, date) DO NOTHING
-                """
-                
-                values = (
-                    ticker,
-                    data_point['date'],
-                    data_point['open'],
-                    data_point['high'],
-                    data_point['low'],
-                    data_point['close'],
-                    data_point['volume']
-                )
-                
-                self.db.execute_update(query, values)
+            rows = price_frame_to_cents(pd.DataFrame(historical_data), ticker)
+            with self.db.get_cursor() as cursor:
+                counts = upsert_price_history(cursor, 'daily_charts', rows, overwrite=False)
+            logger.debug(f"Stored historical data for {ticker}: {counts['inserted']} new rows")
                 
         except Exception as e:
             logger.error(f"Error storing historical data for {ticker}: {e}")
@@ -2188,11 +2383,10 @@ class DailyTradingSystem:
         try:
             start_time = time.time()
             
-            # Calculate remaining API calls
-            remaining_calls = self.max_api_calls_per_day - self.api_calls_used
-            logger.info(f"Remaining API calls for fundamentals: {remaining_calls}")
+            budget = self._phase_budget('missing_fundamentals')
+            logger.info(f"API budget for fundamentals: {budget.remaining} calls")
             
-            if remaining_calls <= 0:
+            if not budget.can_spend(budget.item_cost()):
                 logger.warning("No API calls remaining for fundamental updates")
                 return {
                     'phase': 'fundamentals_update_non_trading',
@@ -2209,9 +2403,9 @@ class DailyTradingSystem:
             successful_updates = 0
             api_calls_used = 0
             
-            for ticker in tickers_needing_fundamentals[:remaining_calls]:
-                if api_calls_used >= remaining_calls:
-                    logger.info(f"API call limit reached after {api_calls_used} calls")
+            for ticker in tickers_needing_fundamentals:
+                if not budget.try_spend(budget.item_cost()):
+                    logger.info(f"API budget exhausted after {api_calls_used} calls")
                     break
                 
                 try:
@@ -2342,18 +2536,19 @@ class DailyTradingSystem:
             logger.info(f"Selecting {limit} priority tickers from {len(all_tickers)} total for technical analysis")
             
             # Get tickers with market cap data and recent prices, ordered by importance
+            today_str = date.today().isoformat()
             query = """
             SELECT DISTINCT s.ticker, s.market_cap, s.sector
             FROM stocks s
             INNER JOIN daily_charts dc ON s.ticker = dc.ticker
-            WHERE dc.date = CURRENT_DATE::text
+            WHERE dc.date = %s
             AND s.market_cap IS NOT NULL 
             AND s.market_cap > 1000000000  -- Focus on stocks > $1B market cap
             ORDER BY s.market_cap DESC, s.ticker
             LIMIT %s
             """
             
-            results = self.db.execute_query(query, (limit,))
+            results = self.db.execute_query(query, (today_str, limit))
             priority_tickers = [row[0] for row in results]
             
             if len(priority_tickers) < limit:
@@ -2366,13 +2561,13 @@ class DailyTradingSystem:
                 SELECT DISTINCT s.ticker
                 FROM stocks s
                 INNER JOIN daily_charts dc ON s.ticker = dc.ticker
-                WHERE dc.date = CURRENT_DATE::text
+                WHERE dc.date = %s
                 AND s.ticker NOT IN ({excluded_tickers})
                 ORDER BY s.ticker
                 LIMIT %s
                 """
                 
-                fallback_results = self.db.execute_query(fallback_query, (remaining_needed,))
+                fallback_results = self.db.execute_query(fallback_query, (today_str, remaining_needed))
                 priority_tickers.extend([row[0] for row in fallback_results])
             
             logger.info(f"Selected {len(priority_tickers)} priority tickers for technical analysis")
@@ -2390,52 +2585,56 @@ class DailyTradingSystem:
             query = """
             SELECT DISTINCT ticker 
             FROM daily_charts 
-            WHERE date >= (CURRENT_DATE - INTERVAL '7 days')::date::text
+            WHERE date >= %s
             ORDER BY ticker
             """
-            results = self.db.execute_query(query)
+            results = self.db.execute_query(query, ((date.today() - timedelta(days=7)).isoformat(),))
             return [row[0] for row in results]
         except Exception as e:
             logger.error(f"Error getting tickers with recent prices: {e}")
             return []
 
+    def _earnings_calendar_range_calls(self) -> int:
+        """Range requests the nightly earnings calendar refresh will make"""
+        service = self.earnings_processor.earnings_calendar
+        return service.range_calls_needed() if service else 0
+
+    def _refresh_earnings_calendar(self) -> Dict:
+        """
+        Refresh earnings_calendar for every stock with a few date-range calls and one upsert.
+        Per-ticker calendar lookups are left to the standalone service for unresolved tickers.
+        """
+        service = self.earnings_processor.earnings_calendar
+        if service is None:
+            logger.warning("Earnings calendar service not available - using stored calendar")
+            return {'phase': 'earnings_calendar', 'status': 'skipped', 'reason': 'service_unavailable'}
+        
+        try:
+            result = service.bulk_update_earnings_calendar(budget=self._phase_budget('earnings_calendar'))
+            self.api_calls_used += result['range_calls']
+            result = {
+                'phase': 'earnings_calendar',
+                'range_calls': result['range_calls'],
+                'events_fetched': result['events_fetched'],
+                'rows_stored': result['rows_stored'],
+                'tickers_resolved': len(result['resolved_tickers']),
+                'api_calls_used': result['range_calls'],
+                'processing_time': result['processing_time']
+            }
+            logger.info(f"🗓️ Earnings calendar refreshed: {result['rows_stored']} rows for "
+                        f"{result['tickers_resolved']} tickers from {result['range_calls']} range calls")
+            return self._finish_phase('earnings_calendar', result)
+        except Exception as e:
+            logger.error(f"Error refreshing earnings calendar: {e}")
+            return {'phase': 'earnings_calendar', 'status': 'failed', 'error': str(e)}
+
     def _get_earnings_announcement_tickers(self) -> List[str]:
         """
-        Get tickers that have earnings announcements today.
-        This should check earnings calendar data.
+        Get tickers with earnings reported in the last few days whose
+        fundamentals have not been refreshed since, from the earnings_calendar table.
         """
         try:
-            # First, try to get earnings announcements from earnings calendar
-            if hasattr(self, 'earnings_calendar') and self.earnings_calendar:
-                try:
-                    today = date.today().strftime('%Y-%m-%d')
-                    earnings_today = self.earnings_calendar.get_earnings_for_date(today)
-                    if earnings_today:
-                        return [ticker for ticker in earnings_today if ticker]
-                except Exception as e:
-                    logger.warning(f"Error getting earnings from calendar service: {e}")
-            
-            # Fallback: Check earnings_calendar table if it exists
-            try:
-                query = """
-                SELECT DISTINCT ticker 
-                FROM earnings_calendar 
-                WHERE earnings_date = CURRENT_DATE 
-                AND ticker IS NOT NULL
-                ORDER BY ticker
-                """
-                results = self.db.execute_query(query)
-                tickers = [row[0] for row in results]
-                if tickers:
-                    logger.info(f"Found {len(tickers)} earnings announcements in database")
-                    return tickers
-            except Exception as e:
-                logger.debug(f"No earnings_calendar table or error: {e}")
-            
-            # Final fallback: Return empty list (no earnings announcements)
-            logger.info("No earnings announcements found for today")
-            return []
-            
+            return self.earnings_processor.get_earnings_update_candidates()
         except Exception as e:
             logger.error(f"Error getting earnings announcement tickers: {e}")
             return []
@@ -2604,7 +2803,11 @@ class DailyTradingSystem:
 
     def _batch_fetch_historical_data(self, tickers: List[str], min_days: int = 200) -> Dict:
         """
-        Fetch historical data for multiple tickers in batches for better performance.
+        Fetch historical data for multiple tickers using bulk yfinance downloads.
+        
+        Tickers are downloaded a few hundred per request and written with COPY;
+        the per-ticker provider fallback only runs for tickers missing from the
+        bulk result.
         
         Args:
             tickers: List of ticker symbols
@@ -2614,68 +2817,42 @@ class DailyTradingSystem:
             Dictionary with batch processing results
         """
         try:
-            batch_size = 10  # Process 10 tickers at a time
-            total_successful = 0
-            total_failed = 0
-            total_api_calls = 0
+            logger.info(f"Starting bulk historical data fetch for {len(tickers)} tickers")
             
-            logger.info(f"Starting batch historical data fetch for {len(tickers)} tickers (batch size: {batch_size})")
+            fallback_api_calls = 0
+            budget = self._phase_budget('historical_data')
             
-            for i in range(0, len(tickers), batch_size):
-                batch = tickers[i:i + batch_size]
-                logger.info(f"Processing batch {i//batch_size + 1}: {batch}")
-                
-                batch_successful = 0
-                batch_failed = 0
-                batch_api_calls = 0
-                
-                for ticker in batch:
-                    try:
-                        # Check if we have enough API calls remaining
-                        remaining_calls = self.max_api_calls_per_day - self.api_calls_used
-                        if remaining_calls <= 0:
-                            logger.warning(f"No API calls remaining, stopping batch processing")
-                            break
-                        
-                        # Get historical data for this ticker
-                        result = self._get_historical_data_to_minimum(ticker, min_days)
-                        
-                        if result.get('success'):
-                            batch_successful += 1
-                            total_successful += 1
-                        else:
-                            batch_failed += 1
-                            total_failed += 1
-                        
-                        batch_api_calls += result.get('api_calls', 0)
-                        total_api_calls += result.get('api_calls', 0)
-                        
-                        # Small delay between tickers to respect rate limits
-                        time.sleep(0.1)
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing {ticker} in batch: {e}")
-                        batch_failed += 1
-                        total_failed += 1
-                
-                # Update API call counter
-                self.api_calls_used += batch_api_calls
-                
-                logger.info(f"Batch {i//batch_size + 1} completed: {batch_successful} successful, {batch_failed} failed, {batch_api_calls} API calls")
-                
-                # Delay between batches to respect rate limits
-                if i + batch_size < len(tickers):
-                    time.sleep(1.0)
+            def fetch_single(ticker: str) -> bool:
+                nonlocal fallback_api_calls
+                if not budget.can_spend():
+                    return False
+                single_result = self._get_historical_data_to_minimum(ticker, min_days)
+                fallback_api_calls += single_result.get('api_calls', 0)
+                budget.spend(single_result.get('api_calls', 0))
+                return bool(single_result.get('success'))
+            
+            backfill_result = self.history_backfill.backfill(
+                tickers, days=min_days, fallback=fetch_single,
+                should_continue=lambda batch: budget.try_spend(1, 'yahoo')
+            )
+            
+            total_api_calls = backfill_result['bulk_requests'] + fallback_api_calls
+            self.api_calls_used += total_api_calls
+            total_successful = backfill_result['bulk_tickers_loaded'] + backfill_result['fallback_successful']
             
             result = {
                 'total_tickers': len(tickers),
                 'successful_fetches': total_successful,
-                'failed_fetches': total_failed,
+                'failed_fetches': len(tickers) - total_successful,
                 'total_api_calls': total_api_calls,
+                'bulk_tickers_loaded': backfill_result['bulk_tickers_loaded'],
+                'bulk_rows_written': backfill_result['bulk_rows_written'],
+                'fallback_tickers': len(backfill_result['missing_tickers']),
                 'success_rate': total_successful / len(tickers) if tickers else 0.0
             }
             
-            logger.info(f"Batch historical data fetch completed: {total_successful}/{len(tickers)} successful ({result['success_rate']:.1%})")
+            logger.info(f"Bulk historical data fetch completed: {total_successful}/{len(tickers)} successful ({result['success_rate']:.1%}), "
+                        f"{result['fallback_tickers']} needed per-ticker fallback")
             
             return result
             
@@ -2789,6 +2966,7 @@ class DailyTradingSystem:
             
             values = (ticker, report_date, period_type, revenue, net_income, total_assets, total_debt, shares_outstanding, data_source)
             self.db.execute_update(query, values)
+            mark_quality_dirty('company_fundamentals', [ticker])
             logger.debug(f"Stored fundamental data for {ticker}")
             
         except Exception as e:
@@ -2890,9 +3068,10 @@ class DailyTradingSystem:
             
             # Initialize and run analyst scoring
             analyst_manager = AnalystScoringManager(db=self.db)
-            result = analyst_manager.calculate_all_analyst_scores(service_manager=self.service_manager)
+            result = analyst_manager.calculate_all_analyst_scores(service_manager=self.service_manager,
+                                                                  budget=self._phase_budget('analyst_scores'))
             
-            return result
+            return self._finish_phase('analyst_scores', result)
             
         except Exception as e:
             logger.error(f"❌ Analyst scores calculation failed: {e}")
@@ -2913,6 +3092,7 @@ class DailyTradingSystem:
             'start_time': self.start_time,
             'total_processing_time': total_time,
             'total_api_calls_used': self.api_calls_used,
+            'request_plan': self.request_plan.report() if self.request_plan else None,
             'phase_results': phase_results,
             'summary': self._generate_summary(phase_results)
         }
@@ -2935,23 +3115,21 @@ class DailyTradingSystem:
             'summary': {'status': 'failed'}
         }
 
-    def remove_delisted_stock(self, ticker: str) -> bool:
+    def remove_delisted_stocks(self, tickers: List[str]) -> Dict:
         """
-        Remove a delisted stock from the database, respecting foreign key constraints.
-        Deletes from company_fundamentals before stocks.
+        Remove delisted stocks from every per-ticker table in one transaction.
+        Dependent tables are cleared before stocks (see ticker_purge.PURGE_TABLES).
         """
-        try:
-            # Delete from company_fundamentals first
-            delete_fundamentals = "DELETE FROM company_fundamentals WHERE ticker = %s"
-            self.db.execute_query(delete_fundamentals, (ticker,))
-            # Then delete from stocks
-            delete_stock = "DELETE FROM stocks WHERE ticker = %s"
-            self.db.execute_query(delete_stock, (ticker,))
-            logger.info(f"Successfully removed delisted stock {ticker} from company_fundamentals and stocks.")
-            return True
-        except Exception as e:
-            logger.error(f"Error removing delisted stock {ticker}: {e}")
-            return False
+        report = TickerPurger(self.db).purge(tickers)
+        if report.success:
+            logger.info(f"Successfully removed {len(report.removed_tickers)} delisted stocks ({report.total_rows} rows).")
+        else:
+            logger.error(f"Error removing delisted stocks {tickers}: {report.error}")
+        return report.to_dict()
+
+    def remove_delisted_stock(self, ticker: str) -> bool:
+        """Remove a single delisted stock (see remove_delisted_stocks)."""
+        return self.remove_delisted_stocks([ticker])['error'] is None
 
 
 def main():
@@ -2959,17 +3137,43 @@ def main():
     parser = argparse.ArgumentParser(description='Daily Trading System')
     parser.add_argument('--force', action='store_true', help='Force run even if market was closed')
     parser.add_argument('--config', type=str, help='Configuration file path')
+    parser.add_argument('--trace-sample-rate', type=float, default=None,
+                        help='Fraction of tickers whose spans are exported (latency stats cover all tickers)')
+    parser.add_argument('--profile', choices=['cprofile', 'sample'], default=None,
+                        help='Write a per-phase profile (cProfile .pstats or sampled .folded flame-graph input)')
+    parser.add_argument('--measure-startup', action='store_true',
+                        help='Report per-module import time and init cost in a fresh interpreter, then exit')
+    parser.add_argument('--log-mode', choices=['verbose', 'summary'], default=os.getenv('LOG_MODE', 'verbose'),
+                        help="'summary' logs only failures, progress and phase summaries instead of every ticker")
+    parser.add_argument('--log-file', type=str, default=os.getenv('LOG_FILE', 'daily_run/logs/system.log'),
+                        help='Rotating log file written by the background log thread')
     
     args = parser.parse_args()
     
+    if args.measure_startup:
+        try:
+            from .startup_report import measure_startup
+        except ImportError:
+            from startup_report import measure_startup
+        report = measure_startup()
+        print(report.format())
+        return 1 if report.error else 0
+    
     # Setup logging
-    logging.basicConfig(
+    configure_logging(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        log_file=args.log_file,
+        mode=args.log_mode,
+        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
     # Initialize and run the system
-    system = DailyTradingSystem()
+    tracing = {}
+    if args.trace_sample_rate is not None:
+        tracing['sample_rate'] = args.trace_sample_rate
+    if args.profile:
+        tracing['profile'] = args.profile
+    system = DailyTradingSystem(config={'tracing': tracing} if tracing else None)
     results = system.run_daily_trading_process(force_run=args.force)
     
     # Print summary
@@ -2980,6 +3184,8 @@ def main():
     print(f"API Calls Used: {results.get('total_api_calls_used', 0)}")
     print(f"Phases Completed: {results.get('summary', {}).get('successful_phases', 0)}")
     print(f"Phases Failed: {results.get('summary', {}).get('failed_phases', 0)}")
+    if results.get('tracing', {}).get('trace_file'):
+        print(f"Trace: {results['tracing']['trace_file']}")
     
     if 'error' in results:
         print(f"System Error: {results['error']}")
@@ -0,0 +1,379 @@
+"""
+Data Quality Stats
+
+Pre-aggregated quality and freshness statistics, so health checks read one
+row per table instead of scanning full history.
+
+Two tables are maintained:
+- ticker_quality_stats: one row per (source_table, ticker) with row counts,
+  invalid rows, first/last price date, rows in the last week and technical
+  indicator completeness for that week
+- table_quality_summary: one row per source table, rolled up from
+  ticker_quality_stats (cost grows with the number of tickers, not history)
+
+Write paths call database.mark_quality_dirty(table, tickers); refresh_dirty()
+then re-aggregates just those tickers (an index range scan per ticker) and
+rolls the summary up again. Window figures (rows in the last week, indicator
+completeness) of tickers that were not written since the window moved are
+re-counted from the window alone before every roll-up, so they age out.
+refresh_all() rebuilds a table's stats from a full scan; it bootstraps a
+table and refresh_due() repeats it every FULL_REFRESH_DAYS to correct drift
+from writers that do not mark tickers dirty.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from .database import DatabaseManager, pop_quality_dirty
+except ImportError:
+    from database import DatabaseManager, pop_quality_dirty
+
+logger = logging.getLogger(__name__)
+
+# Indicators counted for technical completeness (numeric daily_charts columns)
+TECHNICAL_QUALITY_COLUMNS = [
+    'rsi_14', 'ema_20', 'ema_50', 'macd_line', 'macd_signal', 'macd_histogram',
+    'bb_upper', 'bb_middle', 'bb_lower', 'atr_14', 'cci_20', 'stoch_k', 'stoch_d'
+]
+
+# Per-table aggregation settings; the invalid predicates match SystemMonitor's checks
+QUALITY_TABLES = {
+    'daily_charts': {
+        'date_column': 'date',
+        'updated_column': None,
+        'invalid': 'close <= 0 OR high < low',
+        'indicators': TECHNICAL_QUALITY_COLUMNS,
+    },
+    'company_fundamentals': {
+        'date_column': None,
+        'updated_column': 'last_updated',
+        'invalid': 'revenue < 0 OR net_income < 0 OR total_assets < 0',
+        'indicators': None,
+    },
+    'stocks': {
+        'date_column': None,
+        'updated_column': 'last_updated',
+        'invalid': 'market_cap < 0 OR revenue_ttm < 0 OR net_income_ttm < 0',
+        'indicators': None,
+    },
+}
+
+FRESHNESS_WINDOW_DAYS = 7
+FULL_REFRESH_DAYS = 7
+
+
+class DataQualityStats:
+    """Maintains and reads the pre-aggregated quality/freshness tables"""
+
+    def __init__(self, db: DatabaseManager = None):
+        self.db = db or DatabaseManager()
+        self._tables_ready = False
+
+    def ensure_tables(self):
+        """Create the stats tables if missing"""
+        if self._tables_ready:
+            return
+        self.db.execute_update("""
+            CREATE TABLE IF NOT EXISTS ticker_quality_stats (
+                source_table VARCHAR(50) NOT NULL,
+                ticker VARCHAR(10) NOT NULL,
+                row_count BIGINT NOT NULL DEFAULT 0,
+                invalid_count BIGINT NOT NULL DEFAULT 0,
+                earliest_date DATE,
+                latest_date DATE,
+                window_start DATE,
+                window_records INTEGER NOT NULL DEFAULT 0,
+                indicator_valid INTEGER NOT NULL DEFAULT 0,
+                indicator_checks INTEGER NOT NULL DEFAULT 0,
+                last_updated TIMESTAMP,
+                refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (source_table, ticker)
+            )
+        """)
+        self.db.execute_update("""
+            CREATE TABLE IF NOT EXISTS table_quality_summary (
+                source_table VARCHAR(50) PRIMARY KEY,
+                total_records BIGINT NOT NULL DEFAULT 0,
+                unique_tickers INTEGER NOT NULL DEFAULT 0,
+                missing_data_count BIGINT NOT NULL DEFAULT 0,
+                duplicate_count INTEGER NOT NULL DEFAULT 0,
+                invalid_data_count BIGINT NOT NULL DEFAULT 0,
+                earliest_date DATE,
+                latest_date DATE,
+                today_records INTEGER NOT NULL DEFAULT 0,
+                week_records BIGINT NOT NULL DEFAULT 0,
+                last_updated TIMESTAMP,
+                technical_quality JSONB,
+                refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                full_refreshed_at TIMESTAMP
+            )
+        """)
+        self.db.execute_update(
+            "ALTER TABLE table_quality_summary ADD COLUMN IF NOT EXISTS full_refreshed_at TIMESTAMP")
+        self._tables_ready = True
+
+    # Maintenance -------------------------------------------------------------
+
+    @staticmethod
+    def _window_terms(table: str, in_window: str, prefix: str = '') -> tuple:
+        """SQL for (window_records, indicator_valid, indicator_checks) over rows matching in_window"""
+        indicators = QUALITY_TABLES[table]['indicators'] or []
+        records = f"COUNT(*) FILTER (WHERE {in_window})"
+        if not indicators:
+            return records, "0", "0"
+        valid_terms = ' + '.join(f"(COALESCE({prefix}{column}, 0) <> 0)::int" for column in indicators)
+        return (records,
+                f"COALESCE(SUM({valid_terms}) FILTER (WHERE {in_window}), 0)",
+                f"{records} * {len(indicators)}")
+
+    def _aggregate_sql(self, table: str, ticker_filter: bool) -> str:
+        """INSERT ... SELECT that aggregates table into ticker_quality_stats"""
+        settings = QUALITY_TABLES[table]
+        date_column = settings['date_column']
+        in_window = f"{date_column} >= %(window_start)s" if date_column else "FALSE"
+        window_records, indicator_valid, indicator_checks = self._window_terms(table, in_window)
+
+        return f"""
+            INSERT INTO ticker_quality_stats (
+                source_table, ticker, row_count, invalid_count, earliest_date, latest_date,
+                window_start, window_records, indicator_valid, indicator_checks, last_updated, refreshed_at
+            )
+            SELECT
+                %(table)s,
+                COALESCE(ticker, ''),
+                COUNT(*),
+                COUNT(*) FILTER (WHERE {settings['invalid']}),
+                {f"MIN({date_column})::date" if date_column else "NULL::date"},
+                {f"MAX({date_column})::date" if date_column else "NULL::date"},
+                %(window_start)s::date,
+                {window_records},
+                {indicator_valid},
+                {indicator_checks},
+                {f"MAX({settings['updated_column']})" if settings['updated_column'] else "NULL::timestamp"},
+                CURRENT_TIMESTAMP
+            FROM {table}
+            {"WHERE ticker = ANY(%(tickers)s)" if ticker_filter else ""}
+            GROUP BY COALESCE(ticker, '')
+        """
+
+    def _age_windows_sql(self, table: str) -> str:
+        """
+        UPDATE that re-counts the window figures of tickers whose window_start
+        is older than the current window, reading only the window's rows
+        """
+        date_column = QUALITY_TABLES[table]['date_column']
+        in_window = f"src.{date_column} >= %(window_start)s"
+        window_records, indicator_valid, indicator_checks = self._window_terms(table, in_window, 'src.')
+        return f"""
+            UPDATE ticker_quality_stats stats SET
+                window_start = %(window_start)s::date,
+                window_records = aged.window_records,
+                indicator_valid = aged.indicator_valid,
+                indicator_checks = aged.indicator_checks
+            FROM (
+                SELECT stale.ticker,
+                       {window_records} AS window_records,
+                       {indicator_valid} AS indicator_valid,
+                       {indicator_checks} AS indicator_checks
+                FROM ticker_quality_stats stale
+                LEFT JOIN {table} src
+                    ON src.ticker = stale.ticker AND {in_window}
+                WHERE stale.source_table = %(table)s
+                  AND stale.window_start < %(window_start)s::date
+                GROUP BY stale.ticker
+            ) aged
+            WHERE stats.source_table = %(table)s AND stats.ticker = aged.ticker
+        """
+
+    def _params(self, table: str, tickers: Optional[List[str]] = None) -> Dict[str, Any]:
+        window_start = (date.today() - timedelta(days=FRESHNESS_WINDOW_DAYS)).strftime('%Y-%m-%d')
+        return {'table': table, 'window_start': window_start, 'tickers': tickers}
+
+    def refresh_tickers(self, table: str, tickers: Iterable[str]) -> int:
+        """
+        Re-aggregate stats for the given tickers of one table and roll up its summary.
+
+        Tickers whose rows are gone (e.g. purged delisted stocks) lose their stats row.
+
+        Returns:
+            Number of tickers refreshed
+        """
+        tickers = sorted({t for t in tickers if t})
+        if not tickers or table not in QUALITY_TABLES:
+            return 0
+        self.ensure_tables()
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM ticker_quality_stats WHERE source_table = %s AND ticker = ANY(%s)",
+                (table, tickers))
+            cursor.execute(self._aggregate_sql(table, ticker_filter=True), self._params(table, tickers))
+        self.refresh_summary(table)
+        return len(tickers)
+
+    def refresh_all(self, table: str):
+        """Rebuild a table's stats from a full scan (bootstrap / drift correction)"""
+        self.ensure_tables()
+        logger.info(f"📏 Rebuilding quality stats for {table} from a full scan")
+        with self.db.get_cursor() as cursor:
+            cursor.execute("DELETE FROM ticker_quality_stats WHERE source_table = %s", (table,))
+            cursor.execute(self._aggregate_sql(table, ticker_filter=False), self._params(table))
+        self.refresh_summary(table)
+        self.db.execute_update(
+            "UPDATE table_quality_summary SET full_refreshed_at = CURRENT_TIMESTAMP WHERE source_table = %s",
+            (table,))
+
+    def refresh_due(self, max_age_days: int = FULL_REFRESH_DAYS) -> List[str]:
+        """
+        Run refresh_all() for tables whose last full rebuild is older than max_age_days.
+
+        Returns:
+            Tables rebuilt
+        """
+        self.ensure_tables()
+        rows = self.db.fetch_all_dict(
+            "SELECT source_table, full_refreshed_at FROM table_quality_summary") or []
+        last_full = {row['source_table']: row['full_refreshed_at'] for row in rows}
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        rebuilt = []
+        for table in QUALITY_TABLES:
+            if table in last_full and last_full[table] is not None and last_full[table] >= cutoff:
+                continue
+            try:
+                self.refresh_all(table)
+                rebuilt.append(table)
+            except Exception as e:
+                logger.warning(f"Quality stats rebuild failed for {table}: {e}")
+        return rebuilt
+
+    def refresh_summary(self, table: str):
+        """Roll ticker_quality_stats up into the table's summary row, ageing stale windows first"""
+        today = date.today().strftime('%Y-%m-%d')
+        if QUALITY_TABLES[table]['date_column']:
+            self.db.execute_update(self._age_windows_sql(table), self._params(table))
+        self.db.execute_update("""
+            INSERT INTO table_quality_summary (
+                source_table, total_records, unique_tickers, missing_data_count, duplicate_count,
+                invalid_data_count, earliest_date, latest_date, today_records, week_records,
+                last_updated, technical_quality, refreshed_at
+            )
+            SELECT
+                %(table)s,
+                COALESCE(SUM(row_count), 0),
+                COUNT(*) FILTER (WHERE ticker <> ''),
+                COALESCE(SUM(row_count) FILTER (WHERE ticker = ''), 0),
+                COUNT(*) FILTER (WHERE ticker <> '' AND row_count > 1),
+                COALESCE(SUM(invalid_count), 0),
+                MIN(earliest_date),
+                MAX(latest_date),
+                COUNT(*) FILTER (WHERE latest_date >= %(today)s::date),
+                COALESCE(SUM(window_records), 0),
+                MAX(last_updated),
+                jsonb_build_object(
+                    'total_tickers', COUNT(*) FILTER (WHERE indicator_checks > 0),
+                    'average_quality', COALESCE(AVG(indicator_valid::float / indicator_checks)
+                                                FILTER (WHERE indicator_checks > 0), 0),
+                    'high_quality_count', COUNT(*) FILTER (WHERE indicator_checks > 0
+                                                           AND indicator_valid >= 0.8 * indicator_checks),
+                    'excellent', COUNT(*) FILTER (WHERE indicator_checks > 0
+                                                  AND indicator_valid >= 0.9 * indicator_checks),
+                    'good', COUNT(*) FILTER (WHERE indicator_checks > 0
+                                             AND indicator_valid >= 0.7 * indicator_checks
+                                             AND indicator_valid < 0.9 * indicator_checks),
+                    'fair', COUNT(*) FILTER (WHERE indicator_checks > 0
+                                             AND indicator_valid >= 0.5 * indicator_checks
+                                             AND indicator_valid < 0.7 * indicator_checks),
+                    'poor', COUNT(*) FILTER (WHERE indicator_checks > 0
+                                             AND indicator_valid < 0.5 * indicator_checks)
+                ),
+                CURRENT_TIMESTAMP
+            FROM ticker_quality_stats
+            WHERE source_table = %(table)s
+            ON CONFLICT (source_table) DO UPDATE SET
+                total_records = EXCLUDED.total_records,
+                unique_tickers = EXCLUDED.unique_tickers,
+                missing_data_count = EXCLUDED.missing_data_count,
+                duplicate_count = EXCLUDED.duplicate_count,
+                invalid_data_count = EXCLUDED.invalid_data_count,
+                earliest_date = EXCLUDED.earliest_date,
+                latest_date = EXCLUDED.latest_date,
+                today_records = EXCLUDED.today_records,
+                week_records = EXCLUDED.week_records,
+                last_updated = EXCLUDED.last_updated,
+                technical_quality = EXCLUDED.technical_quality,
+                refreshed_at = EXCLUDED.refreshed_at
+        """, {'table': table, 'today': today})
+
+    def refresh_dirty(self) -> Dict[str, int]:
+        """Refresh every ticker marked dirty by the write paths since the last call"""
+        dirty = pop_quality_dirty()
+        refreshed = {}
+        for table, tickers in dirty.items():
+            if table not in QUALITY_TABLES:
+                continue
+            try:
+                refreshed[table] = self.refresh_tickers(table, tickers)
+            except Exception as e:
+                logger.warning(f"Quality stats refresh failed for {table}: {e}")
+        if refreshed:
+            logger.info(f"📏 Quality stats refreshed for {refreshed}")
+        return refreshed
+
+    # Reads -------------------------------------------------------------------
+
+    def summary(self, table: str) -> Optional[Dict[str, Any]]:
+        """
+        Summary row for a table, built with a full scan on first use.
+
+        Returns:
+            Dictionary of the summary columns, or None for untracked tables
+        """
+        if table not in QUALITY_TABLES:
+            return None
+        self.ensure_tables()
+        rows = self.db.fetch_all_dict(
+            "SELECT * FROM table_quality_summary WHERE source_table = %s", (table,))
+        if not rows:
+            self.refresh_all(table)
+            rows = self.db.fetch_all_dict(
+                "SELECT * FROM table_quality_summary WHERE source_table = %s", (table,))
+        return rows[0] if rows else None
+
+    def freshness(self, table: str = 'daily_charts') -> Dict[str, Any]:
+        """Freshness figures in DatabaseManager.check_data_freshness's shape"""
+        summary = self.summary(table)
+        if not summary:
+            return {}
+        return {
+            'total_records': summary['total_records'],
+            'unique_tickers': summary['unique_tickers'],
+            'latest_date': _date_text(summary['latest_date']),
+            'earliest_date': _date_text(summary['earliest_date']),
+            'today_records': summary['today_records'],
+            'week_records': summary['week_records'],
+            'stats_refreshed_at': summary['refreshed_at'],
+        }
+
+    def technical_quality(self) -> Dict[str, Any]:
+        """Technical indicator completeness over the last week, across tickers"""
+        summary = self.summary('daily_charts') or {}
+        quality = summary.get('technical_quality') or {}
+        if not quality.get('total_tickers'):
+            return {'total_tickers': 0, 'average_quality': 0.0}
+        distribution = {key: quality[key] for key in ('excellent', 'good', 'fair', 'poor')}
+        return {
+            'total_tickers': quality['total_tickers'],
+            'average_quality': quality['average_quality'],
+            'high_quality_count': quality['high_quality_count'],
+            'low_quality_count': distribution['poor'],
+            'quality_distribution': distribution,
+            'stats_refreshed_at': summary.get('refreshed_at'),
+        }
+
+
+def _date_text(value) -> Optional[str]:
+    """daily_charts dates are reported as 'YYYY-MM-DD' text, as before"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return value
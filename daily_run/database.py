@@ -6,7 +6,11 @@ Database connection manager for daily_run module
 import psycopg2
 import psycopg2.extras
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Mapping, Sequence, Set, Tuple
 from contextlib import contextmanager
 try:
     from .config import Config
@@ -14,7 +18,32 @@ try:
 except ImportError:
     from config import Config
     from exceptions import DatabaseError
-from datetime import date
+from datetime import date, timedelta
+
+# Tickers written since the last data-quality stats refresh, per table
+_quality_dirty: Dict[str, Set[str]] = defaultdict(set)
+_quality_dirty_lock = threading.Lock()
+
+
+def mark_quality_dirty(table: str, tickers: Iterable[str]):
+    """Record tickers whose rows in table changed, for DataQualityStats.refresh_dirty()"""
+    with _quality_dirty_lock:
+        _quality_dirty[table].update(ticker for ticker in tickers if ticker)
+
+
+def quality_dirty_tickers(table: str) -> Set[str]:
+    """Tickers recorded for table since the last pop, without clearing them"""
+    with _quality_dirty_lock:
+        return set(_quality_dirty.get(table, ()))
+
+
+def pop_quality_dirty() -> Dict[str, Set[str]]:
+    """Take (and clear) the dirty tickers recorded so far"""
+    global _quality_dirty
+    with _quality_dirty_lock:
+        dirty, _quality_dirty = _quality_dirty, defaultdict(set)
+    return {table: tickers for table, tickers in dirty.items() if tickers}
+
 
 class DatabaseManager:
     """Centralized database connection manager"""
@@ -24,6 +53,7 @@ class DatabaseManager:
         self.config = Config.get_db_config()
         self.connection = None
         self.logger = logging.getLogger(__name__)
+        self._latest_snapshot = None
     
     def connect(self) -> bool:
         """Establish database connection"""
@@ -161,6 +191,30 @@ class DatabaseManager:
         
         return self.fetch_all_dict(query, tuple(tickers))
     
+    @property
+    def latest_snapshot(self):
+        """Shared LatestSnapshot reader/maintainer for ticker_latest_snapshot"""
+        if self._latest_snapshot is None:
+            try:
+                from .latest_snapshot import LatestSnapshot
+            except ImportError:
+                from latest_snapshot import LatestSnapshot
+            self._latest_snapshot = LatestSnapshot(self)
+        return self._latest_snapshot
+    
+    def get_latest_snapshots(self, tickers: List[str] = None, columns: List[str] = None) -> Dict[str, Dict]:
+        """
+        Latest close, VWAP, indicators and S/R levels per ticker in one scan (None = all tickers).
+
+        The snapshot is refreshed by the daily run before scoring, so this is
+        for the scorers' bulk reads; get_latest_price(s) read daily_charts.
+        """
+        return self.latest_snapshot.load(tickers, columns)
+    
+    def get_latest_snapshot(self, ticker: str) -> Optional[Dict]:
+        """Latest snapshot row for one ticker, or None if there is none (yet)"""
+        return self.latest_snapshot.get(ticker)
+    
     def get_latest_price(self, ticker: str, table: str = 'daily_charts') -> Optional[float]:
         """Get latest price for a ticker"""
         query = f"""
@@ -254,38 +308,52 @@ class DatabaseManager:
             price_data.get('volume')
         )
         self.execute_update(query, params)
+        mark_quality_dirty('daily_charts', [ticker])
     
     def update_price_data_batch(self, price_data_list: List[Dict[str, Any]]) -> int:
-        """Update price data for multiple tickers efficiently"""
+        """Update today's price data for multiple tickers efficiently (see upsert_daily_quotes)"""
         if not price_data_list:
             return 0
-            
-        query = """
-            INSERT INTO daily_charts (ticker, date, open, high, low, close, volume)
-            VALUES %s
-            ON CONFLICT (ticker, date) DO UPDATE SET
-                open = EXCLUDED.open,
-                high = EXCLUDED.high,
-                low = EXCLUDED.low,
-                close = EXCLUDED.close,
-                volume = EXCLUDED.volume
+        counts = self.upsert_daily_quotes(price_data_list)
+        return counts['inserted'] + counts['updated']
+    
+    def upsert_daily_quotes(self, quotes: Any, quote_date: Optional[date] = None,
+                            source: Optional[str] = None) -> Dict[str, Any]:
         """
+        Store a batch of end-of-day quotes in daily_charts.
         
-        current_date = date.today()
-        values = []
+        Takes the parsed provider batch as is ({ticker: quote} or a list of
+        quotes with 'ticker', see bulk_ingest.quotes_to_rows), streams it with
+        a binary COPY into a temp table and merges it with one
+        ON CONFLICT (ticker, date) DO UPDATE, in one transaction.
         
-        for data in price_data_list:
-            values.append((
-                data.get('ticker'),
-                current_date,
-                data.get('open'),
-                data.get('high'),
-                data.get('low'),
-                data.get('close'),
-                data.get('volume')
-            ))
+        Args:
+            quotes: Parsed provider batch; prices are stored as given
+            quote_date: Date of quotes without their own 'date' (default today)
+            source: Also record data_source/last_updated on the rows
         
-        return self.execute_values(query, values)
+        Returns:
+            Counts ('received', 'staged', 'inserted', 'updated', 'skipped') and 'seconds'
+        """
+        try:
+            from .bulk_ingest import copy_quotes, quotes_to_rows
+        except ImportError:
+            from bulk_ingest import copy_quotes, quotes_to_rows
+        started = time.perf_counter()
+        received = len(quotes)
+        rows = quotes_to_rows(quotes, quote_date)
+        if rows.empty:
+            counts = {'staged': 0, 'inserted': 0, 'updated': 0}
+        else:
+            with self.get_cursor() as cursor:
+                counts = copy_quotes(cursor, rows, source=source)
+            mark_quality_dirty('daily_charts', rows['ticker'].unique())
+        counts.update(received=received, skipped=received - counts['staged'],
+                      seconds=round(time.perf_counter() - started, 4))
+        self.logger.info(f"💾 daily_charts: {counts['staged']}/{received} quotes via binary COPY "
+                         f"({counts['inserted']} inserted, {counts['updated']} updated, "
+                         f"{counts['skipped']} skipped) in {counts['seconds']:.3f}s")
+        return counts
     
     def get_price_history(self, ticker: str, days: int = 100) -> List[Dict]:
         """Get price history for a ticker"""
@@ -300,19 +368,36 @@ class DatabaseManager:
         return self.fetch_all_dict(query, (ticker, days))
     
     def check_data_freshness(self, table: str = 'daily_charts') -> Dict[str, Any]:
-        """Check data freshness statistics"""
+        """
+        Check data freshness statistics.
+        
+        Tracked tables are answered from the pre-aggregated quality summary
+        (one row, independent of history size); others are scanned.
+        """
+        try:
+            from .data_quality_stats import DataQualityStats, QUALITY_TABLES
+        except ImportError:
+            from data_quality_stats import DataQualityStats, QUALITY_TABLES
+        if table in QUALITY_TABLES:
+            try:
+                return DataQualityStats(self).freshness(table)
+            except Exception as e:
+                self.logger.warning(f"Quality stats unavailable for {table}, scanning instead: {e}")
+        
+        # ISO date strings compare correctly against both TEXT and DATE columns
+        today = date.today()
         query = f"""
         SELECT 
             COUNT(*) as total_records,
             COUNT(DISTINCT ticker) as unique_tickers,
             MAX(date) as latest_date,
             MIN(date) as earliest_date,
-            COUNT(CASE WHEN date = CURRENT_DATE::text THEN 1 END) as today_records,
-            COUNT(CASE WHEN date >= (CURRENT_DATE - INTERVAL '7 days')::date::text THEN 1 END) as week_records
+            COUNT(*) FILTER (WHERE date = %s) as today_records,
+            COUNT(*) FILTER (WHERE date >= %s) as week_records
         FROM {table}
         """
         
-        result = self.fetch_one(query)
+        result = self.fetch_one(query, (today.isoformat(), (today - timedelta(days=7)).isoformat()))
         if result:
             return {
                 'total_records': result[0],
@@ -335,6 +420,142 @@ class DatabaseManager:
         """
         return self.fetch_all_dict(query, (ticker, days))
     
+    def get_price_frame(self, ticker: str, days: int = 100, scale: Optional[float] = None) -> 'PriceFrame':
+        """
+        Latest `days` bars of a ticker as a columnar PriceFrame (oldest first).
+
+        Rows come from a plain cursor as tuples and go straight into NumPy
+        arrays, without the per-row dicts of get_price_data_for_technicals.
+        """
+        try:
+            from .price_frame import PriceFrame
+        except ImportError:
+            from price_frame import PriceFrame
+        query = """
+        SELECT date, open, high, low, close, volume
+        FROM daily_charts 
+        WHERE ticker = %s 
+        ORDER BY date DESC 
+        LIMIT %s
+        """
+        return PriceFrame.from_rows(self.execute_query(query, (ticker, days)), scale)
+
+    def _stream_batches(self, query: str, params: tuple, itersize: int,
+                        transform: Optional[Callable[[List[tuple], List[str]], Any]] = None) -> Iterator[Any]:
+        """
+        Run query on a named (server-side) cursor and yield its rows itersize at a time.
+
+        The cursor lives on its own read-only connection: a commit on
+        self.connection would close a named cursor opened there, and the
+        prefetch thread must not share a connection with the caller.
+        """
+        try:
+            from .row_stream import iter_batches
+        except ImportError:
+            from row_stream import iter_batches
+        connection = None
+        cursor = None
+        try:
+            connection = psycopg2.connect(**self.config)
+            connection.set_session(readonly=True)
+            cursor = connection.cursor(name=f"stream_{uuid.uuid4().hex[:12]}")
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            rows = 0
+            for batch in iter_batches(cursor, itersize):
+                rows += len(batch)
+                if transform is None:
+                    yield batch
+                else:
+                    yield transform(batch, [column[0] for column in cursor.description])
+            self.logger.debug(f"Streamed {rows} rows in batches of {itersize}")
+        except Exception as e:
+            self.logger.error(f"Streaming query failed: {e}")
+            raise DatabaseError("stream", str(e))
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if connection is not None:
+                connection.close()
+
+    def stream_query(self, query: str, params: tuple = None, itersize: int = None,
+                     prefetch: int = None) -> Iterator[List[tuple]]:
+        """
+        Yield a query's rows in batches of up to itersize tuples.
+
+        Unlike execute_query, rows are pulled from a server-side cursor one
+        batch per round trip, and the next batch is fetched on a background
+        thread (prefetch batches ahead) while the caller handles the current one.
+        Stopping early closes the cursor.
+        """
+        try:
+            from .row_stream import DEFAULT_ITERSIZE, DEFAULT_PREFETCH, prefetch as prefetched
+        except ImportError:
+            from row_stream import DEFAULT_ITERSIZE, DEFAULT_PREFETCH, prefetch as prefetched
+        batches = self._stream_batches(query, params, itersize or DEFAULT_ITERSIZE)
+        return prefetched(batches, DEFAULT_PREFETCH if prefetch is None else prefetch)
+
+    def stream_arrays(self, query: str, params: tuple = None, columns: Sequence[str] = None,
+                      dtypes: Mapping[str, str] = None, itersize: int = None,
+                      prefetch: int = None) -> Iterator[Dict[str, 'np.ndarray']]:
+        """
+        Yield a query's rows as {column: NumPy array} chunks of up to itersize rows.
+
+        Columns default to the cursor's column names; see row_stream.rows_to_arrays
+        for the dtypes conversion. Arrays are built on the prefetch thread.
+        """
+        try:
+            from .row_stream import DEFAULT_ITERSIZE, DEFAULT_PREFETCH, prefetch as prefetched, rows_to_arrays
+        except ImportError:
+            from row_stream import DEFAULT_ITERSIZE, DEFAULT_PREFETCH, prefetch as prefetched, rows_to_arrays
+
+        def to_arrays(rows: List[tuple], names: List[str]) -> Dict[str, Any]:
+            return rows_to_arrays(rows, columns or names, dtypes)
+
+        batches = self._stream_batches(query, params, itersize or DEFAULT_ITERSIZE, to_arrays)
+        return prefetched(batches, DEFAULT_PREFETCH if prefetch is None else prefetch)
+
+    def stream_price_frames(self, tickers: Optional[List[str]] = None, since: Optional[str] = None,
+                            until: Optional[str] = None, table: str = 'daily_charts',
+                            scale: Optional[float] = None, itersize: int = None,
+                            prefetch: int = None) -> Iterator[Tuple[str, 'PriceFrame']]:
+        """
+        Yield (ticker, PriceFrame) for every ticker's full OHLCV history, one ticker at a time.
+
+        For universe-wide history reads: memory is bounded by itersize rows
+        plus the ticker being assembled, not by the size of the table.
+
+        Args:
+            tickers: Only these tickers (default: every ticker in the table)
+            since / until: Inclusive ISO date bounds
+            scale: Divide prices by this (100 for cents as stored in daily_charts)
+        """
+        try:
+            from .price_frame import iter_ticker_frames
+        except ImportError:
+            from price_frame import iter_ticker_frames
+        conditions = ["ticker IS NOT NULL"]
+        params = []
+        if tickers is not None:
+            conditions.append("ticker = ANY(%s)")
+            params.append(list(tickers))
+        if since:
+            conditions.append("date >= %s")
+            params.append(since)
+        if until:
+            conditions.append("date <= %s")
+            params.append(until)
+        query = f"""
+        SELECT ticker, date, open, high, low, close, volume
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY ticker, date
+        """
+        return iter_ticker_frames(self.stream_query(query, tuple(params), itersize, prefetch), scale)
+    
     def update_technical_indicators(self, ticker: str, indicators: Dict[str, float], target_date: str = None):
         """Update technical indicators for a ticker - COMPREHENSIVE VERSION"""
         if not target_date:
@@ -501,6 +722,8 @@ class DatabaseManager:
             # Use batch update for better performance (PostgreSQL optimized)
             try:
                 stored_count = self._batch_update_indicators(ticker, target_date, update_fields, values)
+                if stored_count:
+                    mark_quality_dirty('daily_charts', [ticker])
                 self.logger.info(f"Updated {stored_count} technical indicators for {ticker}")
                 return stored_count
             except Exception as e:
@@ -601,9 +824,21 @@ class DatabaseManager:
 
     def create_indexes_if_missing(self):
         """Create database indexes for better performance"""
+        try:
+            from .daily_charts_migration import covering_index_statements
+        except ImportError:
+            from daily_charts_migration import covering_index_statements
+        try:
+            chart_columns = [row[0] for row in self.execute_query(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = 'daily_charts'")]
+        except Exception as e:
+            self.logger.warning(f"Could not read daily_charts columns: {e}")
+            chart_columns = None
+        
         # Use separate connections for non-transactional index creation
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_daily_charts_ticker_date ON daily_charts(ticker, date DESC)",
+        # (ticker, date DESC) covering indexes serve the technicals window and the
+        # latest-indicator snapshot as index-only scans
+        indexes = covering_index_statements('daily_charts', chart_columns or None) + [
             "CREATE INDEX IF NOT EXISTS idx_daily_charts_date ON daily_charts(date DESC)",
             "CREATE INDEX IF NOT EXISTS idx_company_fundamentals_ticker ON company_fundamentals(ticker)",
             "CREATE INDEX IF NOT EXISTS idx_stocks_ticker ON stocks(ticker)"
@@ -617,7 +852,7 @@ class DatabaseManager:
                 with temp_conn.cursor() as cursor:
                     cursor.execute(index_sql)
                 temp_conn.close()
-                self.logger.info(f"Index created/verified: {index_sql.split()[-3]}")
+                self.logger.info(f"Index created/verified: {index_sql.split()[5]}")
             except Exception as e:
                 self.logger.warning(f"Index creation failed (may already exist): {e}")
     
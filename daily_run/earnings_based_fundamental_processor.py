@@ -15,17 +15,44 @@ from common_imports import *
 from database import DatabaseManager
 from error_handler import ErrorHandler, ErrorSeverity
 from monitoring import SystemMonitor
-from earnings_calendar_service import EarningsCalendarService
+from service_registry import LazyService, ServiceRegistry
 
 logger = logging.getLogger(__name__)
 
 
+def __getattr__(name: str):
+    # Provider classes are imported on first use (see common_imports)
+    if name in ('YahooFinanceService', 'AlphaVantageService'):
+        return get_service_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _provider(class_name: str):
+    """Factory building a provider class looked up on this module at build time"""
+    return lambda: getattr(sys.modules[__name__], class_name)()
+
+
+def _fmp_service():
+    from fmp_service import FMPService
+    return FMPService()
+
+
+def _earnings_calendar_service():
+    from earnings_calendar_service import EarningsCalendarService
+    return EarningsCalendarService()
+
+
 class EarningsBasedFundamentalProcessor:
     """
     Processes fundamental updates based on earnings calendar events.
     Only updates fundamentals when earnings reports are released.
     """
     
+    earnings_calendar = LazyService()
+    yahoo_service = LazyService()
+    fmp_service = LazyService()
+    alpha_vantage_service = LazyService()
+    
     def __init__(self, db: DatabaseManager, max_workers: int = 5, 
                  earnings_window_days: int = 7):
         self.db = db
@@ -34,58 +61,62 @@ class EarningsBasedFundamentalProcessor:
         self.error_handler = ErrorHandler("earnings_based_fundamental_processor")
         self.monitoring = SystemMonitor()
         
-        # Initialize earnings calendar service
-        try:
-            self.earnings_calendar = EarningsCalendarService()
-        except:
-            self.earnings_calendar = None
-            logger.warning("Earnings calendar service not available")
-        
-        # Initialize fundamental services
-        try:
-            self.yahoo_service = YahooFinanceService()
-        except:
-            self.yahoo_service = None
-            logger.warning("Yahoo Finance service not available")
-            
-        try:
-            from fmp_service import FMPService
-            self.fmp_service = FMPService()
-        except:
-            self.fmp_service = None
-            logger.warning("FMP service not available")
-            
-        try:
-            self.alpha_vantage_service = AlphaVantageService()
-        except:
-            self.alpha_vantage_service = None
-            logger.warning("Alpha Vantage service not available")
+        # The calendar service opens its own DB connection and the providers
+        # their sessions, so all of them are built on first use
+        self.services = ServiceRegistry('earnings_processor')
+        self.services.register('earnings_calendar', _earnings_calendar_service)
+        self.services.register('yahoo_service', _provider('YahooFinanceService'))
+        self.services.register('fmp_service', _fmp_service)
+        self.services.register('alpha_vantage_service', _provider('AlphaVantageService'))
     
-    def get_earnings_update_candidates(self, tickers: List[str]) -> List[str]:
+    def get_earnings_update_candidates(self, tickers: Optional[List[str]] = None,
+                                       limit: Optional[int] = None) -> List[str]:
         """
         Get tickers that need fundamental updates based on earnings calendar.
         
+        A ticker is a candidate when the earnings_calendar table shows a report
+        within the last `earnings_window_days` days (including today) and its
+        fundamentals were not refreshed since that report.
+        
         Args:
-            tickers: List of ticker symbols to check
+            tickers: Ticker symbols to check (None checks the whole universe)
+            limit: Maximum number of candidates, most recent reports first
             
         Returns:
             List of tickers that need fundamental updates
         """
-        logger.info(f"Checking earnings calendar for {len(tickers)} tickers")
+        logger.info(f"Checking earnings calendar for {len(tickers) if tickers is not None else 'all'} tickers")
+        
+        if tickers is not None and not tickers:
+            return []
         
-        candidates = []
-        today = date.today()
+        query = """
+        SELECT ec.ticker
+        FROM earnings_calendar ec
+        JOIN stocks s ON s.ticker = ec.ticker
+        WHERE ec.earnings_date BETWEEN CURRENT_DATE - %s AND CURRENT_DATE
+          AND (s.fundamentals_last_update IS NULL OR s.fundamentals_last_update::date <= ec.earnings_date)
+        """
+        params = [self.earnings_window_days]
+        if tickers is not None:
+            query += " AND ec.ticker = ANY(%s)"
+            params.append(list(tickers))
+        query += """
+        GROUP BY ec.ticker, s.market_cap
+        ORDER BY MAX(ec.earnings_date) DESC, s.market_cap DESC NULLS LAST
+        """
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
         
         try:
-            # For now, return all tickers as candidates since earnings calendar is complex
-            # In production, this would check actual earnings dates
-            return tickers[:10]  # Limit to 10 for testing
+            candidates = [row[0] for row in self.db.execute_query(query, tuple(params))]
+            logger.info(f"Found {len(candidates)} tickers with recent earnings needing fundamentals")
+            return candidates
             
         except Exception as e:
             logger.error(f"Error checking earnings candidates: {e}")
-            self.error_handler.handle_error(
-                "Failed to check earnings candidates", e, ErrorSeverity.HIGH
-            )
+            self.error_handler.handle_error(e, {'operation': 'get_earnings_update_candidates'})
             return []
     
     def process_earnings_based_updates(self, tickers: List[str]) -> Dict[str, int]:
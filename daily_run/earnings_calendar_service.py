@@ -7,17 +7,72 @@ from common_imports import (
     os, time, logging, requests, pd, datetime, timedelta, 
     psycopg2, DB_CONFIG, setup_logging, get_api_rate_limiter, safe_get_numeric
 )
-import yfinance as yf
-from typing import Dict, Optional, List, Any, Tuple
+import psycopg2.extras
+from typing import Dict, Optional, List, Any, Tuple, Iterable
 import argparse
+import csv
+import io
 from datetime import date
 
-# Setup logging for this service
-setup_logging('earnings_calendar')
+from database import mark_quality_dirty
 
 FINNHUB_API_KEY = os.getenv('FINNHUB_API_KEY')
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
 
+# Bulk mode: days of upcoming earnings pulled per night, split into Finnhub range windows
+BULK_WINDOW_DAYS = 90
+FINNHUB_RANGE_DAYS = 30
+
+# Preference when two sources report the same (ticker, earnings_date)
+SOURCE_RANK = {'finnhub': 3, 'yahoo': 2, 'alphavantage': 1}
+
+
+def calendar_ticker_variants(symbol: str) -> Tuple[str, ...]:
+    """Ticker as the calendar reports it plus the class-share spelling used elsewhere (BRK.B / BRK-B)"""
+    symbol = (symbol or '').strip().upper()
+    if not symbol:
+        return ()
+    variants = [symbol]
+    for a, b in (('.', '-'), ('-', '.')):
+        if a in symbol:
+            variants.append(symbol.replace(a, b))
+    return tuple(variants)
+
+
+def merge_calendar_events(events: Iterable[Dict], known_tickers: Dict[str, Optional[str]]) -> Tuple[Dict[Tuple[str, Any], Dict], int]:
+    """
+    Join range-call events against the stocks universe.
+
+    Args:
+        events: Normalized events from the range calendars
+        known_tickers: Ticker -> company name for every row in stocks
+
+    Returns:
+        ({(ticker, earnings_date): row}, number of events for tickers not in stocks)
+    """
+    rows = {}
+    unmatched = 0
+    for event in events:
+        ticker = next((v for v in calendar_ticker_variants(event.get('ticker')) if v in known_tickers), None)
+        earnings_date = event.get('earnings_date')
+        if ticker is None or not earnings_date:
+            unmatched += 1
+            continue
+        row = dict(event, ticker=ticker)
+        row.setdefault('company_name', None)
+        row['company_name'] = row['company_name'] or known_tickers[ticker]
+        key = (ticker, earnings_date)
+        current = rows.get(key)
+        if current is None or SOURCE_RANK.get(row.get('data_source'), 0) > SOURCE_RANK.get(current.get('data_source'), 0):
+            # Keep estimates the preferred source lacks
+            if current is not None:
+                for field in ('estimate_eps', 'actual_eps', 'estimate_revenue', 'actual_revenue'):
+                    if row.get(field) is None:
+                        row[field] = current.get(field)
+            rows[key] = row
+    return rows, unmatched
+
+
 class EarningsCalendarService:
     """
     Earnings Calendar Integration Service - BACK-010 Implementation
@@ -134,17 +189,18 @@ class EarningsCalendarService:
         """
         Fetch earnings calendar data with fallback: Yahoo → Finnhub → Alpha Vantage
         """
+        import yfinance as yf  # deferred: ~200ms at import, only needed on this path
+
         # 1. Try Yahoo
         for attempt in range(self.max_retries):
             try:
                 provider = 'yahoo'
                 endpoint = 'earnings_calendar'
-                if not self.api_limiter.check_limit(provider, endpoint):
+                if not self.api_limiter.try_acquire(provider, endpoint):
                     logging.warning(f"Yahoo Finance API limit reached for {ticker}")
                     break
                 stock = yf.Ticker(ticker)
                 calendar = stock.calendar
-                self.api_limiter.record_call(provider, endpoint)
                 if calendar is not None and len(calendar) > 0:
                     earnings_data = self.parse_earnings_calendar(ticker, calendar)
                     if earnings_data:
@@ -166,13 +222,12 @@ class EarningsCalendarService:
         try:
             provider = 'finnhub'
             endpoint = 'earnings_calendar'
-            if not self.api_limiter.check_limit(provider, endpoint):
+            if not self.api_limiter.try_acquire(provider, endpoint):
                 logging.warning(f"Finnhub API limit reached for {ticker}")
             else:
                 url = f"https://finnhub.io/api/v1/calendar/earnings"
                 params = {'symbol': ticker, 'from': datetime.now().strftime('%Y-%m-%d'), 'to': (datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d'), 'token': FINNHUB_API_KEY}
                 response = requests.get(url, params=params, timeout=30)
-                self.api_limiter.record_call(provider, endpoint)
                 if response.status_code == 200:
                     data = response.json()
                     if data and 'earningsCalendar' in data and data['earningsCalendar']:
@@ -199,13 +254,12 @@ class EarningsCalendarService:
         try:
             provider = 'alphavantage'
             endpoint = 'EARNINGS'
-            if not self.api_limiter.check_limit(provider, endpoint):
+            if not self.api_limiter.try_acquire(provider, endpoint):
                 logging.warning(f"Alpha Vantage API limit reached for {ticker}")
             else:
                 url = f"https://www.alphavantage.co/query"
                 params = {'function': 'EARNINGS', 'symbol': ticker, 'apikey': ALPHA_VANTAGE_API_KEY}
                 response = requests.get(url, params=params, timeout=30)
-                self.api_limiter.record_call(provider, endpoint)
                 if response.status_code == 200:
                     data = response.json()
                     if 'quarterlyEarnings' in data and data['quarterlyEarnings']:
@@ -327,7 +381,7 @@ class EarningsCalendarService:
                     actual_revenue = EXCLUDED.actual_revenue,
                     data_source = EXCLUDED.data_source,
                     confirmed = EXCLUDED.confirmed,
-                    created_at = CURRENT_TIMESTAMP
+                    updated_at = CURRENT_TIMESTAMP
             """, (
                 ticker,
                 earnings_data.get('company_name'),
@@ -351,6 +405,237 @@ class EarningsCalendarService:
             self.conn.rollback()
             return False
     
+    def fetch_finnhub_calendar_range(self, start: date, end: date) -> Optional[List[Dict]]:
+        """
+        Fetch every company's earnings between two dates from Finnhub in one call.
+        
+        Returns:
+            List of normalized events, or None if the call was not made or failed
+        """
+        if not FINNHUB_API_KEY or not self.api_limiter.try_acquire('finnhub', 'earnings_calendar'):
+            logging.warning(f"Finnhub earnings range {start} → {end} skipped (no key or API limit reached)")
+            return None
+        try:
+            response = requests.get("https://finnhub.io/api/v1/calendar/earnings",
+                                    params={'from': start.isoformat(), 'to': end.isoformat(),
+                                            'token': FINNHUB_API_KEY},
+                                    timeout=30)
+            if response.status_code != 200:
+                logging.warning(f"Finnhub earnings range {start} → {end} returned {response.status_code}")
+                return None
+            events = []
+            for event in (response.json() or {}).get('earningsCalendar') or []:
+                events.append({
+                    'ticker': event.get('symbol'),
+                    'earnings_date': event.get('date'),
+                    'earnings_time': self.parse_earnings_time(event.get('hour')),
+                    'estimate_eps': self.safe_get_numeric_dict(event, 'epsEstimate'),
+                    'actual_eps': self.safe_get_numeric_dict(event, 'epsActual'),
+                    'estimate_revenue': self.safe_get_numeric_dict(event, 'revenueEstimate'),
+                    'actual_revenue': self.safe_get_numeric_dict(event, 'revenueActual'),
+                    'data_source': 'finnhub',
+                    'confirmed': event.get('epsActual') is not None
+                })
+            logging.info(f"Finnhub earnings range {start} → {end}: {len(events)} events")
+            return events
+        except Exception as e:
+            logging.error(f"Finnhub earnings range error ({start} → {end}): {e}")
+            return None
+    
+    def fetch_alpha_vantage_calendar(self, days_ahead: int = BULK_WINDOW_DAYS) -> Optional[List[Dict]]:
+        """
+        Fetch Alpha Vantage's market-wide EARNINGS_CALENDAR (CSV) in one call.
+        
+        Returns:
+            List of normalized events, or None if the call was not made or failed
+        """
+        if not ALPHA_VANTAGE_API_KEY or not self.api_limiter.try_acquire('alphavantage', 'EARNINGS_CALENDAR'):
+            logging.warning("Alpha Vantage earnings calendar skipped (no key or API limit reached)")
+            return None
+        horizon = '3month' if days_ahead <= 90 else '6month' if days_ahead <= 180 else '12month'
+        try:
+            response = requests.get("https://www.alphavantage.co/query",
+                                    params={'function': 'EARNINGS_CALENDAR', 'horizon': horizon,
+                                            'apikey': ALPHA_VANTAGE_API_KEY},
+                                    timeout=60)
+            if response.status_code != 200 or not response.text.startswith('symbol'):
+                logging.warning(f"Alpha Vantage earnings calendar unavailable: {response.text[:100]}")
+                return None
+            events = [{
+                'ticker': row.get('symbol'),
+                'company_name': row.get('name') or None,
+                'earnings_date': row.get('reportDate'),
+                'earnings_time': 'TBD',
+                'estimate_eps': self.safe_get_numeric_dict(row, 'estimate'),
+                'actual_eps': None,
+                'estimate_revenue': None,
+                'actual_revenue': None,
+                'data_source': 'alphavantage',
+                'confirmed': False
+            } for row in csv.DictReader(io.StringIO(response.text))]
+            logging.info(f"Alpha Vantage earnings calendar ({horizon}): {len(events)} events")
+            return events
+        except Exception as e:
+            logging.error(f"Alpha Vantage earnings calendar error: {e}")
+            return None
+    
+    def get_known_tickers(self) -> Dict[str, Optional[str]]:
+        """Ticker -> company name for every stock, used to join range-call results"""
+        try:
+            self.cur.execute("SELECT ticker, company_name FROM stocks WHERE ticker IS NOT NULL")
+            return {row[0].strip().upper(): row[1] for row in self.cur.fetchall()}
+        except Exception as e:
+            logging.error(f"Error loading stocks for earnings calendar join: {e}")
+            self.conn.rollback()
+            return {}
+    
+    def store_earnings_batch(self, rows: List[Dict]) -> int:
+        """
+        Upsert many earnings rows in one statement, setting priority levels as they are written.
+        
+        Returns:
+            Number of rows written
+        """
+        unique = {}
+        for row in rows:
+            earnings_date = row.get('earnings_date')
+            if isinstance(earnings_date, (list, tuple)):
+                # yfinance reports a range of candidate dates; the first is the expected one
+                earnings_date = earnings_date[0] if earnings_date else None
+            if isinstance(earnings_date, (pd.Timestamp, datetime)):
+                earnings_date = earnings_date.date()
+            if earnings_date is None or not row.get('ticker'):
+                continue
+            earnings_date = str(earnings_date)
+            # One row per key: ON CONFLICT cannot touch the same row twice in a statement
+            unique[(row['ticker'], earnings_date)] = (
+                row['ticker'], row.get('company_name'), earnings_date,
+                row.get('earnings_time') or 'TBD', row.get('estimate_eps'), row.get('actual_eps'),
+                row.get('estimate_revenue'), row.get('actual_revenue'),
+                row.get('data_source', 'finnhub'), bool(row.get('confirmed')))
+        values = list(unique.values())
+        if not values:
+            return 0
+        try:
+            psycopg2.extras.execute_values(self.cur, """
+                INSERT INTO earnings_calendar
+                (ticker, company_name, earnings_date, earnings_time, estimate_eps,
+                 actual_eps, estimate_revenue, actual_revenue, data_source, confirmed,
+                 priority_level, updated_at)
+                SELECT v.ticker, v.company_name, v.earnings_date::date, v.earnings_time,
+                       v.estimate_eps::numeric, v.actual_eps::numeric,
+                       v.estimate_revenue::numeric, v.actual_revenue::numeric,
+                       v.data_source, v.confirmed,
+                       CASE
+                           WHEN v.earnings_date::date <= CURRENT_DATE + 7 THEN 5
+                           WHEN v.earnings_date::date <= CURRENT_DATE + 30 THEN 4
+                           WHEN v.earnings_date::date <= CURRENT_DATE + 90 THEN 3
+                           WHEN v.earnings_date::date <= CURRENT_DATE + 180 THEN 2
+                           ELSE 1
+                       END,
+                       CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(ticker, company_name, earnings_date, earnings_time, estimate_eps,
+                                      actual_eps, estimate_revenue, actual_revenue, data_source, confirmed)
+                ON CONFLICT (ticker, earnings_date)
+                DO UPDATE SET
+                    company_name = COALESCE(EXCLUDED.company_name, earnings_calendar.company_name),
+                    earnings_time = EXCLUDED.earnings_time,
+                    estimate_eps = COALESCE(EXCLUDED.estimate_eps, earnings_calendar.estimate_eps),
+                    actual_eps = COALESCE(EXCLUDED.actual_eps, earnings_calendar.actual_eps),
+                    estimate_revenue = COALESCE(EXCLUDED.estimate_revenue, earnings_calendar.estimate_revenue),
+                    actual_revenue = COALESCE(EXCLUDED.actual_revenue, earnings_calendar.actual_revenue),
+                    priority_level = EXCLUDED.priority_level,
+                    data_source = EXCLUDED.data_source,
+                    confirmed = EXCLUDED.confirmed OR earnings_calendar.confirmed,
+                    updated_at = CURRENT_TIMESTAMP
+            """, values, page_size=len(values))
+            self.conn.commit()
+            logging.info(f"Upserted {len(values)} earnings calendar rows in one statement")
+            return len(values)
+        except Exception as e:
+            logging.error(f"Error upserting earnings calendar batch: {e}")
+            self.conn.rollback()
+            return 0
+    
+    @staticmethod
+    def range_calls_needed(days_back: int = 7, days_ahead: int = BULK_WINDOW_DAYS) -> int:
+        """Range requests one bulk refresh makes: the Finnhub windows plus one Alpha Vantage call"""
+        return -(-(days_back + days_ahead + 1) // FINNHUB_RANGE_DAYS) + 1
+    
+    def bulk_update_earnings_calendar(self, days_back: int = 7, days_ahead: int = BULK_WINDOW_DAYS,
+                                      budget=None) -> Dict[str, Any]:
+        """
+        Refresh the earnings calendar for the whole universe from date-range calls.
+        
+        Finnhub is queried in FINNHUB_RANGE_DAYS windows (recent reports included so
+        actual EPS lands too); Alpha Vantage's market-wide calendar fills in tickers
+        Finnhub missed. Results are joined against stocks in memory and written in a
+        single upsert.
+        
+        Args:
+            days_back: Days of already-reported earnings to include
+            days_ahead: Days of upcoming earnings to include
+            budget: Optional PhaseBudget charged one call per range request
+            
+        Returns:
+            Dictionary with range calls made, events fetched, rows stored and resolved tickers
+        """
+        start_time = time.time()
+        today = date.today()
+        window_start = today - timedelta(days=days_back)
+        window_end = today + timedelta(days=days_ahead)
+        
+        events = []
+        range_calls = 0
+        finnhub_ok = True
+        cursor = window_start
+        while cursor <= window_end:
+            chunk_end = min(window_end, cursor + timedelta(days=FINNHUB_RANGE_DAYS - 1))
+            if budget is not None and not budget.try_spend(1, 'finnhub'):
+                logging.warning("Earnings calendar API budget exhausted for Finnhub range calls")
+                finnhub_ok = False
+                break
+            range_calls += 1
+            chunk = self.fetch_finnhub_calendar_range(cursor, chunk_end)
+            if chunk is None:
+                finnhub_ok = False
+            else:
+                events.extend(chunk)
+            cursor = chunk_end + timedelta(days=1)
+        
+        known_tickers = self.get_known_tickers()
+        rows, unmatched = merge_calendar_events(events, known_tickers)
+        
+        # Alpha Vantage's single calendar call covers whatever Finnhub could not
+        covered = {ticker for ticker, _ in rows}
+        if not finnhub_ok or len(covered) < len(known_tickers):
+            if budget is None or budget.try_spend(1, 'alpha_vantage'):
+                range_calls += 1
+                av_events = self.fetch_alpha_vantage_calendar(days_ahead) or []
+                av_rows, av_unmatched = merge_calendar_events(av_events, known_tickers)
+                unmatched += av_unmatched
+                for key, row in av_rows.items():
+                    if key not in rows:
+                        rows[key] = row
+        
+        stored = self.store_earnings_batch(list(rows.values()))
+        resolved = sorted({ticker for ticker, _ in rows}) if stored else []
+        if stored:
+            self.update_stocks_earnings_dates()
+        
+        result = {
+            'range_calls': range_calls,
+            'events_fetched': len(events),
+            'rows_stored': stored,
+            'unmatched_events': unmatched,
+            'resolved_tickers': resolved,
+            'processing_time': time.time() - start_time
+        }
+        logging.info(f"Bulk earnings calendar: {range_calls} range calls, {stored} rows for "
+                     f"{len(resolved)} tickers ({unmatched} events not in stocks) "
+                     f"in {result['processing_time']:.1f}s")
+        return result
+    
     def update_earnings_priorities(self):
         """
         Update priority levels based on earnings dates
@@ -373,8 +658,7 @@ class EarningsCalendarService:
                         WHEN earnings_date BETWEEN CURRENT_DATE + INTERVAL '31 days' AND CURRENT_DATE + INTERVAL '90 days' THEN 3
                         WHEN earnings_date BETWEEN CURRENT_DATE + INTERVAL '91 days' AND CURRENT_DATE + INTERVAL '180 days' THEN 2
                         ELSE 1
-                    END,
-                    created_at = CURRENT_TIMESTAMP
+                    END
                 WHERE earnings_date >= CURRENT_DATE
             """)
             
@@ -443,10 +727,13 @@ class EarningsCalendarService:
                     WHERE ec2.ticker = s.ticker
                     AND ec2.earnings_date >= CURRENT_DATE
                 )
+                RETURNING s.ticker
             """)
             
-            updated_count = self.cur.rowcount
+            updated_tickers = [row[0] for row in self.cur.fetchall()]
+            updated_count = len(updated_tickers)
             self.conn.commit()
+            mark_quality_dirty('stocks', updated_tickers)
             logging.info(f"Updated next_earnings_date for {updated_count} stocks")
             
             return updated_count
@@ -506,53 +793,74 @@ class EarningsCalendarService:
             logging.error(f"Error getting companies needing earnings update: {e}")
             return []
     
-    def process_earnings_calendar_updates(self, tickers: List[str] = None, limit: int = 20):
+    def process_earnings_calendar_updates(self, tickers: List[str] = None, limit: int = 20,
+                                          bulk: bool = True, budget=None) -> Dict[str, Any]:
         """
         Process earnings calendar updates for specified tickers or companies needing updates
         
+        In bulk mode the whole calendar window is refreshed from range calls first;
+        only tickers the range calls did not resolve are fetched one by one.
+        
         Args:
             tickers: List of specific tickers to update (if None, auto-select)
-            limit: Maximum number of companies to process
+            limit: Maximum number of companies to fetch per ticker
+            bulk: Refresh from date-range calendars before per-ticker fetches
+            budget: Optional PhaseBudget for the range and per-ticker calls
         """
+        bulk_result = {}
+        resolved = set()
+        if bulk:
+            bulk_result = self.bulk_update_earnings_calendar(budget=budget)
+            resolved = set(bulk_result.get('resolved_tickers', []))
+        
         if tickers is None:
-            # Get companies that need updates
+            # Get companies that still need updates
             companies = self.get_companies_needing_earnings_update(limit)
             tickers = [company['ticker'] for company in companies]
         
-        if not tickers:
-            logging.info("No companies need earnings calendar updates")
-            return
+        pending = [ticker for ticker in tickers if ticker.upper() not in resolved][:limit]
         
-        logging.info(f"Processing earnings calendar updates for {len(tickers)} companies")
+        if not pending:
+            logging.info("No companies need per-ticker earnings calendar updates")
+        else:
+            logging.info(f"Fetching earnings calendar per ticker for {len(pending)} unresolved companies")
         
-        success_count = 0
-        for ticker in tickers:
+        fetched = []
+        for ticker in pending:
+            if budget is not None and not budget.try_spend(1):
+                logging.warning("Earnings calendar API budget exhausted, deferring remaining tickers")
+                break
             try:
-                # Fetch earnings calendar data
+                # Wait for the Yahoo minute window instead of a fixed delay
+                ledger = getattr(self.api_limiter, 'ledger', None)
+                wait = ledger.seconds_until_available('yahoo') if ledger else 0
+                if wait > 0:
+                    time.sleep(min(wait, 5))
+                
                 earnings_data = self.fetch_earnings_calendar(ticker)
                 
-                if earnings_data:
-                    # Store in database
-                    if self.store_earnings_data(earnings_data):
-                        success_count += 1
-                        logging.info(f"Successfully updated earnings calendar for {ticker}")
-                    else:
-                        logging.warning(f"Failed to store earnings data for {ticker}")
+                if earnings_data and earnings_data.get('earnings_date'):
+                    fetched.append(earnings_data)
                 else:
                     logging.warning(f"No earnings data available for {ticker}")
                 
-                # Rate limiting delay
-                time.sleep(1)
-                
             except Exception as e:
                 logging.error(f"Error processing earnings calendar for {ticker}: {e}")
                 continue
         
+        stored = self.store_earnings_batch(fetched)
+        
         # Update priorities and stocks table
         self.update_earnings_priorities()
         self.update_stocks_earnings_dates()
         
-        logging.info(f"Completed earnings calendar updates: {success_count}/{len(tickers)} successful")
+        logging.info(f"Completed earnings calendar updates: {len(resolved)} tickers from range calls, "
+                     f"{stored}/{len(pending)} per ticker")
+        return {
+            'bulk': bulk_result,
+            'per_ticker_requested': len(pending),
+            'per_ticker_stored': stored
+        }
     
     def get_earnings_summary(self) -> Dict:
         """Get summary of earnings calendar data"""
@@ -597,8 +905,10 @@ def main():
     parser.add_argument('--limit', type=int, default=20, help='Maximum companies to process')
     parser.add_argument('--summary', action='store_true', help='Show earnings summary')
     parser.add_argument('--update-priorities', action='store_true', help='Update priority levels')
+    parser.add_argument('--no-bulk', action='store_true', help='Skip the date-range calendar refresh')
     
     args = parser.parse_args()
+    setup_logging('earnings_calendar')
     
     service = EarningsCalendarService()
     
@@ -614,7 +924,7 @@ def main():
             print(f"Updated priority levels for {updated} earnings records")
         
         else:
-            service.process_earnings_calendar_updates(args.tickers, args.limit)
+            service.process_earnings_calendar_updates(args.tickers, args.limit, bulk=not args.no_bulk)
     
     finally:
         service.close()
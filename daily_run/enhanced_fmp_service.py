@@ -11,10 +11,13 @@ import pandas as pd
 from datetime import datetime, timedelta
 import psycopg2
 from typing import Dict, Optional, List, Any
+from concurrent.futures import ThreadPoolExecutor
 try:
-    from .database import DatabaseManager
+    from .database import DatabaseManager, mark_quality_dirty
+    from .quota_ledger import get_quota_ledger
 except ImportError:
-    from database import DatabaseManager
+    from database import DatabaseManager, mark_quality_dirty
+    from quota_ledger import get_quota_ledger
 
 # API configuration
 FMP_API_KEY = os.getenv('FMP_API_KEY')
@@ -32,6 +35,9 @@ DB_CONFIG = {
 class EnhancedFMPService:
     """Enhanced Financial Modeling Prep API service for comprehensive fundamental data"""
     
+    # Shared by all instances: one ticker's five endpoint requests run side by side
+    _endpoint_pool = ThreadPoolExecutor(max_workers=20, thread_name_prefix="fmp-endpoint")
+    
     def __init__(self):
         """Initialize database connection"""
         self.conn = psycopg2.connect(**DB_CONFIG)
@@ -39,6 +45,8 @@ class EnhancedFMPService:
         self.db = DatabaseManager()
         self.max_retries = 3
         self.base_delay = 2  # seconds
+        self.quota = get_quota_ledger()
+        self.quota_wait = 30  # seconds to wait for the FMP minute window
         
         if not FMP_API_KEY:
             logging.error("FMP_API_KEY not found in environment variables")
@@ -49,12 +57,16 @@ class EnhancedFMPService:
         try:
             logging.info(f"Fetching comprehensive financial data for {ticker}")
             
-            # Fetch all required data
-            income_data = self._fetch_income_statement(ticker)
-            balance_data = self._fetch_balance_sheet(ticker)
-            cash_flow_data = self._fetch_cash_flow_statement(ticker)
-            key_metrics_data = self._fetch_key_metrics(ticker)
-            profile_data = self._fetch_company_profile(ticker)
+            # Fetch all required endpoints at once; they are independent requests
+            endpoints = [self._fetch_income_statement, self._fetch_balance_sheet,
+                         self._fetch_cash_flow_statement, self._fetch_key_metrics,
+                         self._fetch_company_profile]
+            if not self.quota.acquire('fmp', n=len(endpoints), timeout=self.quota_wait):
+                logging.warning(f"FMP quota exhausted, skipping comprehensive data for {ticker}")
+                return None
+            futures = [self._endpoint_pool.submit(fetch, ticker) for fetch in endpoints]
+            income_data, balance_data, cash_flow_data, key_metrics_data, profile_data = \
+                [future.result() for future in futures]
             
             # Parse and combine all data
             comprehensive_data = self._parse_comprehensive_data(
@@ -310,6 +322,7 @@ class EnhancedFMPService:
             
             self.cur.execute(insert_query, values)
             self.conn.commit()
+            mark_quality_dirty('company_fundamentals', [ticker])
             
             logging.info(f"Successfully stored comprehensive fundamental data for {ticker}")
             return True
@@ -172,18 +172,23 @@ class EnhancedFullSpectrumScoring:
                 logger.warning(f"No fundamental data found for {ticker}")
                 return None
                 
-            # Fetch technical data from daily_charts table (latest date)
-            technical_query = """
-                SELECT close, vwap, rsi_14, macd_line, ema_20, ema_50, ema_200,
-                       support_1, support_2, support_3, resistance_1, resistance_2, resistance_3,
-                       volume, date
-                FROM daily_charts 
-                WHERE ticker = %s 
-                ORDER BY date DESC 
-                LIMIT 1
-            """
-            cursor.execute(technical_query, (ticker,))
-            technical_row = cursor.fetchone()
+            # Latest technical data: ticker_latest_snapshot, else the newest daily_charts row
+            technical_columns = ['close', 'vwap', 'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200',
+                                 'support_1', 'support_2', 'support_3', 'resistance_1', 'resistance_2',
+                                 'resistance_3', 'volume', 'date']
+            snapshot = self.db.get_latest_snapshot(ticker)
+            if snapshot is not None:
+                technical_row = tuple(snapshot.get(column) for column in technical_columns)
+            else:
+                technical_query = f"""
+                    SELECT {', '.join(technical_columns)}
+                    FROM daily_charts 
+                    WHERE ticker = %s 
+                    ORDER BY date DESC 
+                    LIMIT 1
+                """
+                cursor.execute(technical_query, (ticker,))
+                technical_row = cursor.fetchone()
             
             if not technical_row:
                 logger.warning(f"No technical data found for {ticker}")
@@ -586,6 +591,7 @@ class EnhancedFullSpectrumScoring:
         """Calculate enhanced scores for multiple tickers"""
         try:
             logger.info(f"Calculating enhanced scores for {len(tickers)} tickers")
+            self.db.latest_snapshot.preload(tickers)
             
             successful_calculations = 0
             failed_calculations = 0
@@ -58,8 +58,15 @@ class FundamentalDataResult:
 class EnhancedMultiServiceFundamentalManager:
     """Enhanced fundamental data manager with intelligent fallback system"""
     
-    def __init__(self):
-        """Initialize all service connections"""
+    def __init__(self, store_inline: bool = True):
+        """
+        Initialize all service connections
+        
+        Args:
+            store_inline: Let FMP store its own fetch immediately; the concurrent
+                fetcher turns this off and writes merged results in batches
+        """
+        self.store_inline = store_inline
         self.services = {
             'fmp': EnhancedFMPService(),
             'alpha_vantage': AlphaVantageService(),
@@ -407,7 +414,11 @@ class EnhancedMultiServiceFundamentalManager:
         """Get data from Enhanced FMP service"""
         try:
             # Use the enhanced FMP service
-            result = self.services['fmp'].get_comprehensive_fundamental_data(ticker)
+            fmp = self.services['fmp']
+            if self.store_inline:
+                result = fmp.get_comprehensive_fundamental_data(ticker)
+            else:
+                result = fmp.fetch_comprehensive_financial_data(ticker)
             if not result:
                 return None
             
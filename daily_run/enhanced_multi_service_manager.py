@@ -16,6 +16,8 @@ from database import DatabaseManager
 from error_handler import ErrorHandler, ErrorSeverity
 from monitoring import SystemMonitor
 from circuit_breaker import CircuitBreaker, CircuitState
+from quota_ledger import get_quota_ledger
+from service_registry import ServiceRegistry
 
 
 class ServicePriority(Enum):
@@ -64,13 +66,12 @@ class EnhancedMultiServiceManager:
         
         # Service configurations
         self.service_configs = self._initialize_service_configs()
-        self.service_instances = {}
+        self.service_instances = ServiceRegistry('multi_service_manager')
         self.api_metrics = {}
         self.circuit_breakers = {}
         
-        # Rate limiting
-        self.rate_limits = {}
-        self.daily_counters = {}
+        # Rate limiting (shared with every other service through the quota ledger)
+        self.quota = get_quota_ledger()
         
         # Initialize services
         self._initialize_services()
@@ -93,7 +94,7 @@ class EnhancedMultiServiceManager:
             'fmp': ServiceConfig(
                 name='Financial Modeling Prep',
                 priority=ServicePriority.SECONDARY,
-                rate_limit_per_minute=10,
+                rate_limit_per_minute=30,
                 rate_limit_per_day=1000,
                 cost_per_call=0.001,
                 reliability_score=0.95,
@@ -104,7 +105,7 @@ class EnhancedMultiServiceManager:
                 name='Alpha Vantage',
                 priority=ServicePriority.FALLBACK,
                 rate_limit_per_minute=5,
-                rate_limit_per_day=100,
+                rate_limit_per_day=500,
                 cost_per_call=0.0,
                 reliability_score=0.85,
                 capabilities=['fundamentals', 'pricing'],
@@ -133,25 +134,18 @@ class EnhancedMultiServiceManager:
         }
     
     def _initialize_services(self):
-        """Initialize all available services"""
+        """Register enabled services; each client is constructed on its first call"""
         self.logger.info("Initializing enhanced multi-service manager")
         
         for service_id, config in self.service_configs.items():
             if not config.enabled:
                 self.logger.warning(f"⚠️  {config.name} disabled (missing API key)")
                 continue
-                
-            try:
-                service = self._create_service_instance(service_id)
-                if service:
-                    self.service_instances[service_id] = service
-                    self.api_metrics[service_id] = APICallMetrics()
-                    self.logger.info(f"{config.name} initialized")
-                else:
-                    self.logger.warning(f"⚠️  {config.name} failed to initialize")
-                    
-            except Exception as e:
-                self.logger.error(f"❌ Failed to initialize {config.name}: {e}")
+            
+            self.service_instances.register(
+                service_id, lambda sid=service_id: self._create_service_instance(sid))
+            self.api_metrics[service_id] = APICallMetrics()
+            self.logger.info(f"{config.name} registered")
     
     def _create_service_instance(self, service_id: str):
         """Create service instance based on existing implementations"""
@@ -452,23 +446,32 @@ class EnhancedMultiServiceManager:
         return PolygonServiceWrapper()
     
     def _initialize_rate_limiting(self):
-        """Initialize rate limiting for all services"""
+        """Register service limits with the quota ledger"""
         for service_id, config in self.service_configs.items():
             if service_id in self.service_instances:
-                self.rate_limits[service_id] = {
-                    'minute_calls': [],
-                    'daily_calls': 0,
-                    'daily_reset': datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-                }
+                self.quota.set_limits(service_id, config.rate_limit_per_minute, config.rate_limit_per_day)
     
     def _initialize_circuit_breakers(self):
-        """Initialize circuit breakers for all services"""
+        """Initialize pricing circuit breakers; other data types get theirs on first use"""
         for service_id in self.service_instances:
-            self.circuit_breakers[service_id] = CircuitBreaker(
+            self._circuit_breaker(service_id, 'pricing')
+    
+    def _circuit_breaker(self, service_id: str, data_type: str) -> CircuitBreaker:
+        """Breaker for one (service, data type) pair, so a slow endpoint trips on its own"""
+        key = (service_id, data_type)
+        if key not in self.circuit_breakers:
+            self.circuit_breakers[key] = CircuitBreaker(
                 service_name=service_id,
+                endpoint=data_type,
                 failure_threshold=5,
-                recovery_timeout=300  # 5 minutes
+                recovery_timeout=30,       # first probe after ~15-30s, doubling per trip
+                max_recovery_timeout=900,
+                slow_call_duration=10.0
             )
+        return self.circuit_breakers[key]
+    
+    def _service_breakers(self, service_id: str) -> Dict[str, CircuitBreaker]:
+        return {data_type: cb for (sid, data_type), cb in self.circuit_breakers.items() if sid == service_id}
     
     def get_optimal_service_order(self, data_type: str = 'pricing', tickers_count: int = 1) -> List[str]:
         """Get optimal service order based on data type, availability, and current status"""
@@ -478,7 +481,7 @@ class EnhancedMultiServiceManager:
             if (service_id in self.service_instances and 
                 config.enabled and 
                 data_type in config.capabilities and
-                self._is_service_available(service_id)):
+                self._is_service_available(service_id, data_type)):
                 
                 # Calculate service score
                 score = self._calculate_service_score(service_id, tickers_count)
@@ -492,30 +495,20 @@ class EnhancedMultiServiceManager:
         
         return service_order
     
-    def _is_service_available(self, service_id: str) -> bool:
+    def _is_service_available(self, service_id: str, data_type: Optional[str] = None) -> bool:
         """Check if service is available (not rate limited or circuit broken)"""
-        # Check circuit breaker
-        if service_id in self.circuit_breakers:
-            cb = self.circuit_breakers[service_id]
-            if cb.state != CircuitState.CLOSED:
+        # Check the breaker for this data type; without one, any endpoint still accepting calls will do
+        breakers = self._service_breakers(service_id)
+        if data_type is not None:
+            cb = breakers.get(data_type)
+            if cb is not None and not cb.is_available():
                 return False
+        elif breakers and not any(cb.is_available() for cb in breakers.values()):
+            return False
         
-        # Check rate limits
-        if service_id in self.rate_limits:
-            config = self.service_configs[service_id]
-            rate_data = self.rate_limits[service_id]
-            
-            # Check daily limit
-            if config.rate_limit_per_day is not None and rate_data['daily_calls'] >= config.rate_limit_per_day:
-                return False
-            
-            # Check minute limit
-            now = datetime.now()
-            minute_ago = now - timedelta(minutes=1)
-            rate_data['minute_calls'] = [call_time for call_time in rate_data['minute_calls'] if call_time > minute_ago]
-            
-            if len(rate_data['minute_calls']) >= config.rate_limit_per_minute:
-                return False
+        # Check minute window and daily quota
+        if service_id in self.service_instances:
+            return self.quota.available(service_id)
         
         return True
     
@@ -591,32 +584,42 @@ class EnhancedMultiServiceManager:
         last_error = None
         
         for service_id in service_order:
+            cb = None
+            start_time = time.time()
             try:
                 self.logger.info(f"🔄 Trying {service_id} for {ticker} ({data_type})")
                 
-                # Check circuit breaker state
-                cb = self.circuit_breakers[service_id]
-                if cb.state != CircuitState.CLOSED:
-                    self.logger.warning(f"⚡ Circuit breaker open for {service_id}")
+                # Resolve the service before spending quota or a breaker probe on it;
+                # a lazy service whose factory failed is skipped, not counted as an API failure
+                service = self.service_instances.get(service_id)
+                if service is None:
+                    self.logger.warning(f"⚠️  {service_id} not available, skipping")
+                    continue
+                if data_type == 'fundamentals' and not hasattr(service, 'get_fundamental_data'):
+                    self.logger.warning(f"⚠️  {service_id} doesn't support fundamental data")
                     continue
                 
-                # Record rate limit
-                self._record_api_call(service_id)
+                # Check circuit breaker state (takes a probe slot when half-open)
+                cb = self._circuit_breaker(service_id, data_type)
+                if not cb.allow_request():
+                    self.logger.warning(f"⚡ Circuit breaker open for {service_id} ({data_type})")
+                    continue
+                
+                # Reserve the call against the minute window and daily quota
+                if not self._record_api_call(service_id):
+                    cb.release()
+                    self._record_rate_limit(service_id)
+                    self.logger.warning(f"⏳ {service_id} quota exhausted, skipping")
+                    continue
                 
                 # Make the API call
                 start_time = time.time()
                 
                 result = None
-                service = self.service_instances[service_id]
-                
                 if data_type == 'pricing':
                     result = service.get_data(ticker)
                 elif data_type == 'fundamentals':
-                    if hasattr(service, 'get_fundamental_data'):
-                        result = service.get_fundamental_data(ticker)
-                    else:
-                        self.logger.warning(f"⚠️  {service_id} doesn't support fundamental data")
-                        continue
+                    result = service.get_fundamental_data(ticker)
                 
                 response_time = time.time() - start_time
                 
@@ -624,21 +627,24 @@ class EnhancedMultiServiceManager:
                 if result and self._validate_result(result, data_type):
                     # Success
                     self._record_successful_call(service_id, response_time)
-                    cb._on_success(response_time)
+                    cb.record_success(response_time)
                     self.logger.info(f"✅ Successfully fetched {data_type} for {ticker} from {service_id}")
                     return result, service_id
                 else:
-                    # No data or invalid data
+                    # No data or invalid data: the endpoint answered, so only its latency counts
+                    cb.record_success(response_time)
                     self._record_failed_call(service_id, "no_valid_data")
                     self.logger.warning(f"⚠️  No valid {data_type} data for {ticker} from {service_id}")
                     
             except Exception as e:
                 last_error = e
-                response_time = time.time() - start_time if 'start_time' in locals() else 0
+                response_time = time.time() - start_time
                 
                 # Record failure
                 self._record_failed_call(service_id, str(e))
-                cb._on_failure(e)
+                if cb is not None:
+                    # Includes time spent waiting, so a request that hangs until timeout counts as slow
+                    cb.record_failure(e, response_time)
                 
                 # Check if it's a rate limit error
                 if 'rate limit' in str(e).lower() or '429' in str(e):
@@ -687,9 +693,8 @@ class EnhancedMultiServiceManager:
         service_id = service_name_mapping.get(service_name.lower(), service_name.lower())
         
         # Check if service exists and is available
-        if service_id in self.service_instances:
-            service = self.service_instances[service_id]
-            
+        service = self.service_instances.get(service_id)
+        if service is not None:
             # Create a wrapper that provides the expected interface
             class ServiceWrapper:
                 def __init__(self, service_instance, service_id, manager):
@@ -777,20 +782,12 @@ class EnhancedMultiServiceManager:
         
         return True
     
-    def _record_api_call(self, service_id: str):
-        """Record an API call for rate limiting"""
+    def _record_api_call(self, service_id: str) -> bool:
+        """Reserve an API call in the quota ledger; False if the service is out of quota"""
         now = datetime.now()
         
-        # Update rate limits
-        if service_id in self.rate_limits:
-            rate_data = self.rate_limits[service_id]
-            rate_data['minute_calls'].append(now)
-            rate_data['daily_calls'] += 1
-            
-            # Reset daily counter if needed
-            if now >= rate_data['daily_reset']:
-                rate_data['daily_calls'] = 1
-                rate_data['daily_reset'] = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        if not self.quota.try_acquire(service_id):
+            return False
         
         # Update metrics
         if service_id in self.api_metrics:
@@ -809,6 +806,8 @@ class EnhancedMultiServiceManager:
             # Add cost
             config = self.service_configs[service_id]
             metrics.cost_today += config.cost_per_call
+        
+        return True
     
     def _record_successful_call(self, service_id: str, response_time: float):
         """Record a successful API call"""
@@ -853,6 +852,7 @@ class EnhancedMultiServiceManager:
         for service_id, metrics in self.api_metrics.items():
             config = self.service_configs[service_id]
             is_available = self._is_service_available(service_id)
+            daily_calls = self.quota.calls_today(service_id)
             
             success_rate = 0
             if metrics.total_calls > 0:
@@ -862,22 +862,28 @@ class EnhancedMultiServiceManager:
             if metrics.response_times:
                 avg_response_time = sum(metrics.response_times[-10:]) / len(metrics.response_times[-10:])
             
+            # Worst state across the service's endpoints, plus the per-endpoint detail
+            endpoint_states = {data_type: cb.state.name
+                               for data_type, cb in self._service_breakers(service_id).items()}
             circuit_status = "CLOSED"
-            if service_id in self.circuit_breakers:
-                cb = self.circuit_breakers[service_id]
-                circuit_status = cb.state.name
+            for state in (CircuitState.OPEN, CircuitState.HALF_OPEN):
+                if state.name in endpoint_states.values():
+                    circuit_status = state.name
+                    break
             
             report['services'][service_id] = {
                 'name': config.name,
                 'available': is_available,
                 'circuit_breaker_status': circuit_status,
+                'endpoint_circuit_status': endpoint_states,
                 'total_calls': metrics.total_calls,
                 'successful_calls': metrics.successful_calls,
                 'failed_calls': metrics.failed_calls,
                 'rate_limited_calls': metrics.rate_limited_calls,
                 'success_rate_percent': success_rate,
-                'daily_calls': metrics.daily_calls_count,
+                'daily_calls': daily_calls,
                 'daily_limit': config.rate_limit_per_day,
+                'remaining_today': self.quota.remaining_today(service_id),
                 'cost_today': metrics.cost_today,
                 'avg_response_time': avg_response_time,
                 'last_call': metrics.last_call_time.isoformat() if metrics.last_call_time else None
@@ -886,7 +892,7 @@ class EnhancedMultiServiceManager:
             if is_available:
                 report['summary']['available_services'] += 1
             
-            report['summary']['total_calls_today'] += metrics.daily_calls_count
+            report['summary']['total_calls_today'] += daily_calls
             report['summary']['total_cost_today'] += metrics.cost_today
             
             if metrics.total_calls > 0:
@@ -904,7 +910,8 @@ class EnhancedMultiServiceManager:
         
         try:
             # Close individual service instances
-            for service_id, service in self.service_instances.items():
+            # Only services that were actually built; closing must not construct new ones
+            for service_id, service in self.service_instances.built().items():
                 try:
                     if hasattr(service, 'close'):
                         service.close()
@@ -918,8 +925,6 @@ class EnhancedMultiServiceManager:
             self.service_instances.clear()
             self.api_metrics.clear()
             self.circuit_breakers.clear()
-            self.rate_limits.clear()
-            self.daily_counters.clear()
             
             self.logger.info("✅ All services closed and resources cleaned up")
             
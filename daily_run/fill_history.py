@@ -9,6 +9,11 @@ from datetime import date, timedelta, datetime
 from dotenv import load_dotenv
 from ratelimit import limits, sleep_and_retry
 
+try:
+    from .bulk_ingest import price_frame_to_cents, upsert_price_history
+except ImportError:
+    from bulk_ingest import price_frame_to_cents, upsert_price_history
+
 # Load environment variables
 load_dotenv()
 
@@ -40,9 +45,9 @@ def get_ticker_gaps(cur):
     cur.execute('''
         SELECT ticker, COUNT(*) as days_available, MIN(date), MAX(date)
         FROM daily_charts
-        WHERE date::date >= (CURRENT_DATE - INTERVAL '120 days')
+        WHERE date >= %s
         GROUP BY ticker
-    ''')
+    ''', ((date.today() - timedelta(days=120)).isoformat(),))
     ticker_info = cur.fetchall()
     cur.execute('SELECT DISTINCT ticker FROM stocks')
     all_tickers = set(row[0] for row in cur.fetchall())
@@ -293,29 +298,14 @@ def fetch_stock_history_with_fallback(ticker, start_date, end_date):
     return None
 
 def insert_history(conn, cur, ticker, hist_df):
-    for idx, row in hist_df.iterrows():
-        try:
-            cur.execute('''
-                INSERT INTO daily_charts (ticker, date, open, high, low, close, volume)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ticker, date) DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume
-            ''', (
-                ticker,
-                idx.strftime('%Y-%m-%d'),
-                int(round(row['Open'] * 100)) if not pd.isna(row['Open']) else None,
-                int(round(row['High'] * 100)) if not pd.isna(row['High']) else None,
-                int(round(row['Low'] * 100)) if not pd.isna(row['Low']) else None,
-                int(round(row['Close'] * 100)) if not pd.isna(row['Close']) else None,
-                int(row['Volume']) if not pd.isna(row['Volume']) else None
-            ))
-        except Exception as e:
-            logging.error(f"Insert error for {ticker} on {idx}: {e}")
-    conn.commit()
+    try:
+        rows = price_frame_to_cents(hist_df, ticker)
+        counts = upsert_price_history(cur, 'daily_charts', rows)
+        conn.commit()
+        logging.info(f"{ticker}: {counts['inserted']} rows inserted, {counts['updated']} updated")
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Insert error for {ticker}: {e}")
 
 def fill_history():
     conn = psycopg2.connect(**DB_CONFIG)
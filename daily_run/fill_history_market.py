@@ -10,6 +10,11 @@ from dotenv import load_dotenv
 from typing import List, Dict, Tuple
 from ratelimit import limits, sleep_and_retry
 
+try:
+    from .bulk_ingest import price_frame_to_cents, upsert_price_history
+except ImportError:
+    from bulk_ingest import price_frame_to_cents, upsert_price_history
+
 # Load environment variables
 load_dotenv()
 
@@ -571,37 +576,14 @@ def insert_market_history(conn, cur, ticker, hist_df):
     if not market_info:
         logging.error(f"No market info found for {ticker}, skipping insert.")
         return
-    for idx, row in hist_df.iterrows():
-        try:
-            cur.execute('''
-                INSERT INTO market_data (
-                    ticker, date, open, high, low, close, volume,
-                    category, indicator, etf_name,
-                    created_at, updated_at
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                ON CONFLICT (ticker, date) DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume,
-                    created_at = CURRENT_TIMESTAMP
-            ''', (
-                ticker,
-                idx.strftime('%Y-%m-%d'),
-                int(round(row['Open'] * 100)) if not pd.isna(row['Open']) else None,
-                int(round(row['High'] * 100)) if not pd.isna(row['High']) else None,
-                int(round(row['Low'] * 100)) if not pd.isna(row['Low']) else None,
-                int(round(row['Close'] * 100)) if not pd.isna(row['Close']) else None,
-                int(row['Volume']) if not pd.isna(row['Volume']) else None,
-                market_info['category'],
-                market_info['indicator'],
-                market_info['etf_name']
-            ))
-        except Exception as e:
-            logging.error(f"Insert error for {ticker} on {idx}: {e}")
-    conn.commit()
+    try:
+        rows = price_frame_to_cents(hist_df, ticker)
+        counts = upsert_price_history(cur, 'market_data', rows, metadata=market_info, timestamps=True)
+        conn.commit()
+        logging.info(f"{ticker}: {counts['inserted']} rows inserted, {counts['updated']} updated")
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Insert error for {ticker}: {e}")
 
 def fill_history_market(test_mode=False):
     conn = psycopg2.connect(**DB_CONFIG)
@@ -9,6 +9,11 @@ from datetime import date, timedelta, datetime
 from dotenv import load_dotenv
 from ratelimit import limits, sleep_and_retry
 
+try:
+    from .bulk_ingest import price_frame_to_cents, upsert_price_history
+except ImportError:
+    from bulk_ingest import price_frame_to_cents, upsert_price_history
+
 # Load environment variables
 load_dotenv()
 
@@ -269,37 +274,14 @@ def insert_sector_history(conn, cur, ticker, hist_df):
     if not sector_info:
         logging.error(f"No sector info found for {ticker}, skipping insert.")
         return
-    for idx, row in hist_df.iterrows():
-        try:
-            cur.execute('''
-                INSERT INTO sectors (
-                    ticker, date, open, high, low, close, volume,
-                    sector_name, sector_category, etf_name,
-                    created_at, updated_at
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                ON CONFLICT (ticker, date) DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume,
-                    created_at = CURRENT_TIMESTAMP
-            ''', (
-                ticker,
-                idx.strftime('%Y-%m-%d'),
-                int(round(row['Open'] * 100)) if not pd.isna(row['Open']) else None,
-                int(round(row['High'] * 100)) if not pd.isna(row['High']) else None,
-                int(round(row['Low'] * 100)) if not pd.isna(row['Low']) else None,
-                int(round(row['Close'] * 100)) if not pd.isna(row['Close']) else None,
-                int(row['Volume']) if not pd.isna(row['Volume']) else None,
-                sector_info['sector_name'],
-                sector_info['sector_category'],
-                sector_info['etf_name']
-            ))
-        except Exception as e:
-            logging.error(f"Insert error for {ticker} on {idx}: {e}")
-    conn.commit()
+    try:
+        rows = price_frame_to_cents(hist_df, ticker)
+        counts = upsert_price_history(cur, 'sectors', rows, metadata=sector_info, timestamps=True)
+        conn.commit()
+        logging.info(f"{ticker}: {counts['inserted']} rows inserted, {counts['updated']} updated")
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Insert error for {ticker}: {e}")
 
 def fetch_stock_history_with_fallback(ticker, start_date, end_date):
     """
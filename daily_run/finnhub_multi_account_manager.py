@@ -15,6 +15,11 @@ from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dotenv import load_dotenv
 
+try:
+    from .quota_ledger import account_for_key, get_quota_ledger
+except ImportError:
+    from quota_ledger import account_for_key, get_quota_ledger
+
 # Load environment variables
 load_dotenv()
 
@@ -69,9 +74,13 @@ class FinnhubMultiAccountManager:
         if self.calls_per_day <= self.calls_per_minute:
             raise ValueError(f"Daily limit ({self.calls_per_day}) must be greater than minute limit ({self.calls_per_minute})")
         
-        # Account usage tracking (thread-safe)
-        self.account_usage = {i: {'daily_calls': 0, 'last_reset': datetime.now().date()} for i in range(self.accounts_count)}
-        self.account_rate_limits = {i: {'last_call': 0, 'calls_this_minute': 0} for i in range(self.accounts_count)}
+        # Per-account minute windows and daily counters live in the shared quota ledger,
+        # so parallel collectors and restarted runs see the same usage
+        self.quota = get_quota_ledger()
+        for account_id in range(self.accounts_count):
+            self.quota.set_limits('finnhub', self.calls_per_minute, self.calls_per_day,
+                                  account=self._account_name(account_id))
+        self.last_call = {i: 0.0 for i in range(self.accounts_count)}
         self._usage_lock = threading.Lock()
         
         # Performance monitoring
@@ -103,6 +112,13 @@ class FinnhubMultiAccountManager:
             logger.warning(f"⚠️ Invalid {env_var}, using default: {default}")
             return default
     
+    def _account_name(self, account_id: int) -> str:
+        """Ledger account for an API key slot (shared with FinnhubService when the key is the same)"""
+        return account_for_key(self.api_keys[account_id])
+    
+    def _remaining_daily(self, account_id: int) -> int:
+        return self.quota.remaining_today('finnhub', self._account_name(account_id)) or 0
+    
     def get_available_account(self, stock_ticker: str = None, retry_count: int = 0) -> int:
         """
         Get the best available account for API calls
@@ -114,54 +130,30 @@ class FinnhubMultiAccountManager:
         """
         MAX_RETRIES = 3
         
-        with self._usage_lock:
-            current_time = time.time()
-            today = datetime.now().date()
-            
-            # Reset daily counters if needed
-            for account_id in range(self.accounts_count):
-                if self.account_usage[account_id]['last_reset'] != today:
-                    self.account_usage[account_id]['daily_calls'] = 0
-                    self.account_usage[account_id]['last_reset'] = today
-            
-            # Find accounts under minute rate limit
-            available_accounts = []
-            for account_id in range(self.accounts_count):
-                rate_limit = self.account_rate_limits[account_id]
-                
-                # Reset minute counter if a minute has passed
-                if current_time - rate_limit['last_call'] >= self.minute_reset:
-                    rate_limit['calls_this_minute'] = 0
-                
-                # Check if under minute limit
-                if rate_limit['calls_this_minute'] < self.calls_per_minute:
-                    available_accounts.append(account_id)
-            
-            if not available_accounts:
-                # Check retry limit to prevent infinite recursion
-                if retry_count >= MAX_RETRIES:
-                    logger.error(f"❌ All accounts rate limited after {MAX_RETRIES} retries. Raising exception.")
-                    raise RuntimeError(f"All Finnhub accounts rate limited after {MAX_RETRIES} retries")
-                
-                # All accounts are rate limited, wait and retry
-                logger.warning(f"⚠️ All accounts rate limited, retry {retry_count + 1}/{MAX_RETRIES}, waiting for reset...")
-                time.sleep(self.rate_limit_sleep)
-                return self.get_available_account(stock_ticker, retry_count + 1)
-            
-            # Find accounts under daily limit
-            daily_available = [acc for acc in available_accounts 
-                             if self.account_usage[acc]['daily_calls'] < self.calls_per_day]
-            
-            if daily_available:
-                # Use account with most remaining daily calls
-                best_account = max(daily_available, 
-                                 key=lambda x: self.calls_per_day - self.account_usage[x]['daily_calls'])
-                return best_account
+        # Accounts with quota left today
+        daily_available = [acc for acc in range(self.accounts_count) if self._remaining_daily(acc) > 0]
+        if not daily_available:
+            raise RuntimeError("All Finnhub accounts exhausted their daily quota")
+        
+        # Accounts with room in the current minute window
+        available_accounts = [acc for acc in daily_available
+                              if self.quota.available('finnhub', self._account_name(acc))]
+        
+        if not available_accounts:
+            # Check retry limit to prevent infinite recursion
+            if retry_count >= MAX_RETRIES:
+                logger.error(f"❌ All accounts rate limited after {MAX_RETRIES} retries. Raising exception.")
+                raise RuntimeError(f"All Finnhub accounts rate limited after {MAX_RETRIES} retries")
             
-            # Otherwise, find the account with the most remaining calls
-            best_account = max(available_accounts, 
-                             key=lambda x: self.calls_per_day - self.account_usage[x]['daily_calls'])
-            return best_account
+            # All accounts are rate limited, wait for the first minute window to refill
+            wait = min(self.quota.seconds_until_available('finnhub', self._account_name(acc))
+                       for acc in daily_available)
+            logger.warning(f"⚠️ All accounts rate limited, retry {retry_count + 1}/{MAX_RETRIES}, waiting for reset...")
+            time.sleep(min(max(wait, 1.0), self.rate_limit_sleep))
+            return self.get_available_account(stock_ticker, retry_count + 1)
+        
+        # Use account with most remaining daily calls
+        return max(available_accounts, key=self._remaining_daily)
     
     def make_api_call(self, endpoint: str, params: Optional[Dict] = None, ticker: str = None) -> Optional[Dict]:
         """
@@ -180,16 +172,9 @@ class FinnhubMultiAccountManager:
             account_id = attempt
             api_key = self.api_keys[account_id]
             
-            # Check rate limiting for this account
+            # Reserve the call against this account's minute window and daily quota
             current_time = time.time()
-            rate_limit = self.account_rate_limits[account_id]
-            
-            # Reset minute counter if a minute has passed
-            if current_time - rate_limit['last_call'] >= self.minute_reset:
-                rate_limit['calls_this_minute'] = 0
-            
-            # Check if we can make a call this minute
-            if rate_limit['calls_this_minute'] >= self.calls_per_minute:
+            if not self.quota.try_acquire('finnhub', account=self._account_name(account_id)):
                 logger.debug(f"⏳ Account {account_id + 1} rate limited, trying next account...")
                 continue  # Try next account instead of waiting
             
@@ -206,9 +191,7 @@ class FinnhubMultiAccountManager:
                 
                 # Update usage tracking
                 with self._usage_lock:
-                    self.account_usage[account_id]['daily_calls'] += 1
-                    rate_limit['calls_this_minute'] += 1
-                    rate_limit['last_call'] = current_time
+                    self.last_call[account_id] = current_time
                     self.performance_metrics['calls_per_account'][account_id] += 1
                     
                     # Add call time with rolling window limit
@@ -240,7 +223,7 @@ class FinnhubMultiAccountManager:
                 elif response.status_code == 429:  # Rate limited
                     logger.warning(f"⚠️ Rate limited on account {account_id + 1}, trying next account...")
                     # Mark this account as rate limited and try next
-                    rate_limit['calls_this_minute'] = self.calls_per_minute
+                    self.quota.throttle('finnhub', self._account_name(account_id))
                     continue
                 else:
                     logger.warning(f"⚠️ HTTP {response.status_code} from account {account_id + 1}: {response.text}")
@@ -286,45 +269,40 @@ class FinnhubMultiAccountManager:
                 'calls_per_account': self.performance_metrics['calls_per_account'].copy(),
                 'average_call_time': avg_call_time,
                 'uptime': (datetime.now() - self.performance_metrics['start_time']).total_seconds(),
-                'account_usage': self.account_usage.copy(),
-                'rate_limits': self.account_rate_limits.copy()
+                'account_usage': {i: {'daily_calls': self.quota.calls_today('finnhub', self._account_name(i))}
+                                  for i in range(self.accounts_count)},
+                'rate_limits': {i: {'last_call': self.last_call[i],
+                                    'minute_tokens': self.quota.minute_tokens('finnhub', self._account_name(i))}
+                                for i in range(self.accounts_count)}
             }
     
     def reset_daily_counters(self):
         """Reset daily call counters for all accounts"""
         with self._usage_lock:
-            today = datetime.now().date()
             for account_id in range(self.accounts_count):
-                self.account_usage[account_id]['daily_calls'] = 0
-                self.account_usage[account_id]['last_reset'] = today
+                self.quota.reset_today('finnhub', self._account_name(account_id))
             logger.info("✅ Daily call counters reset for all accounts")
     
     def get_account_status(self) -> Dict:
         """Get detailed status of all accounts"""
         with self._usage_lock:
-            current_time = time.time()
             status = {}
             
             for account_id in range(self.accounts_count):
-                rate_limit = self.account_rate_limits[account_id]
-                usage = self.account_usage[account_id]
+                account = self._account_name(account_id)
                 
                 # Calculate remaining calls
-                remaining_minute = max(0, self.calls_per_minute - rate_limit['calls_this_minute'])
-                remaining_daily = max(0, self.calls_per_day - usage['daily_calls'])
-                
-                # Calculate time until reset
-                time_since_last = current_time - rate_limit['last_call']
-                time_until_reset = max(0, self.minute_reset - time_since_last) if rate_limit['calls_this_minute'] >= self.calls_per_minute else 0
+                remaining_minute = self.quota.minute_tokens('finnhub', account)
+                remaining_daily = self._remaining_daily(account_id)
                 
                 status[account_id] = {
                     'api_key': f"{self.api_keys[account_id][:8]}...",
-                    'calls_this_minute': rate_limit['calls_this_minute'],
-                    'calls_today': usage['daily_calls'],
+                    'calls_this_minute': self.calls_per_minute - remaining_minute,
+                    'calls_today': self.quota.calls_today('finnhub', account),
                     'remaining_minute': remaining_minute,
                     'remaining_daily': remaining_daily,
-                    'time_until_reset': time_until_reset,
-                    'last_call': datetime.fromtimestamp(rate_limit['last_call']).strftime('%H:%M:%S'),
+                    'time_until_reset': self.quota.seconds_until_available('finnhub', account),
+                    'last_call': datetime.fromtimestamp(self.last_call[account_id]).strftime('%H:%M:%S'),
                     'status': 'available' if remaining_minute > 0 and remaining_daily > 0 else 'limited'
                 }
             
@@ -340,12 +318,11 @@ class FinnhubMultiAccountManager:
             }
             
             for account_id in range(self.accounts_count):
-                rate_limit = self.account_rate_limits[account_id]
-                usage = self.account_usage[account_id]
+                account = self._account_name(account_id)
                 
                 # Calculate health score (0-100)
-                minute_health = max(0, 100 - (rate_limit['calls_this_minute'] / self.calls_per_minute * 100))
-                daily_health = max(0, 100 - (usage['daily_calls'] / self.calls_per_day * 100))
+                minute_health = self.quota.minute_tokens('finnhub', account) / self.calls_per_minute * 100
+                daily_health = self._remaining_daily(account_id) / self.calls_per_day * 100
                 overall_health = (minute_health + daily_health) / 2
                 
                 summary['account_health'][account_id] = {
@@ -22,6 +22,10 @@ try:
     from .error_handler import ErrorHandler
 except ImportError:
     from error_handler import ErrorHandler
+try:
+    from .quota_ledger import account_for_key
+except ImportError:
+    from quota_ledger import account_for_key
 from utility_functions.api_rate_limiter import APIRateLimiter
 
 # Load environment variables
@@ -52,9 +56,11 @@ class FinnhubService:
         self.api_key = os.getenv('FINNHUB_API_KEY')
         self.base_url = "https://finnhub.io/api/v1"
         
-        # Use robust DB-backed rate limiter
+        # Shared quota ledger (minute buckets + persistent daily counters)
         self.rate_limiter = APIRateLimiter()
         self.endpoint = 'quote'  # Default endpoint, can be overridden per call
+        # Same ledger account FinnhubMultiAccountManager uses for this key
+        self.quota_account = account_for_key(self.api_key)
         
         if not self.api_key:
             self.logger.warning("⚠️ Finnhub API key not found - service will be limited")
@@ -70,19 +76,19 @@ class FinnhubService:
         if not self.api_key:
             self.logger.error("No API key available")
             return None
-        # Check rate limit before making the call
-        if not self.rate_limiter.check_limit('finnhub', endpoint):
+        # Reserve the call in the shared quota ledger before making it
+        if not self.rate_limiter.try_acquire('finnhub', endpoint, self.quota_account):
             self.logger.warning(f"Finnhub API rate limit reached for endpoint {endpoint}. Waiting...")
-            # Optionally, you can sleep until next available time or just return None
             time.sleep(1)  # Sleep 1 second and try again (simple backoff)
-            if not self.rate_limiter.check_limit('finnhub', endpoint):
+            if not self.rate_limiter.try_acquire('finnhub', endpoint, self.quota_account):
                 self.logger.error(f"Still over Finnhub rate limit for endpoint {endpoint}. Skipping call.")
                 return None
         url = f"{self.base_url}/{endpoint}"
         params['token'] = self.api_key
         try:
             response = requests.get(url, params=params, timeout=30)
-            self.rate_limiter.record_call('finnhub', endpoint)
+            if response.status_code == 429:
+                self.rate_limiter.ledger.throttle('finnhub', self.quota_account)
             if response.status_code == 200:
                 data = response.json()
                 if isinstance(data, dict) and 'error' in data:
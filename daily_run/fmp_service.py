@@ -8,16 +8,17 @@ from common_imports import (
     psycopg2, DB_CONFIG, setup_logging, get_api_rate_limiter, safe_get_numeric
 )
 from typing import Dict, Optional, List, Any
+from concurrent.futures import ThreadPoolExecutor
 from simple_ratio_calculator import calculate_ratios, validate_ratios
-from database import DatabaseManager
-
-# Setup logging for this service
-setup_logging('fmp')
+from database import DatabaseManager, mark_quality_dirty
 
 # API configuration
 FMP_API_KEY = os.getenv('FMP_API_KEY')
 FMP_BASE_URL = "https://financialmodelingprep.com/api/v3"
 
+# Statement requests for one ticker run side by side
+_statement_pool = ThreadPoolExecutor(max_workers=12, thread_name_prefix="fmp-statements")
+
 class FMPService:
     """Financial Modeling Prep API service for fundamental data"""
     
@@ -47,34 +48,29 @@ class FMPService:
                 #     logging.warning(f"FMP API limit reached for {ticker}")
                 #     return None
 
-                # Fetch income statement
-                income_url = f"{FMP_BASE_URL}/income-statement/{ticker}"
+                # Income, balance sheet and cash flow are independent requests: issue them together
                 params = {'apikey': FMP_API_KEY, 'limit': 4}  # Get last 4 quarters for TTM
-                
-                response = requests.get(income_url, params=params, timeout=30)
+                urls = {
+                    endpoint: f"{FMP_BASE_URL}/income-statement/{ticker}",
+                    'balance_sheet': f"{FMP_BASE_URL}/balance-sheet-statement/{ticker}",
+                    'cash_flow': f"{FMP_BASE_URL}/cash-flow-statement/{ticker}",
+                }
+                futures = {name: _statement_pool.submit(requests.get, url, params=params, timeout=30)
+                           for name, url in urls.items()}
+                responses = {name: future.result() for name, future in futures.items()}
                 
                 if self.api_limiter:
-                    self.api_limiter.record_call(provider, endpoint)
+                    for name in responses:
+                        self.api_limiter.record_call(provider, name)
                 
+                response = responses[endpoint]
                 if response.status_code == 200:
                     income_data = response.json()
                     if income_data:
-                        # Fetch balance sheet
-                        balance_url = f"{FMP_BASE_URL}/balance-sheet-statement/{ticker}"
-                        balance_response = requests.get(balance_url, params=params, timeout=30)
-                        
-                        if self.api_limiter:
-                            self.api_limiter.record_call(provider, 'balance_sheet')
-                        
+                        balance_response = responses['balance_sheet']
                         balance_data = balance_response.json() if balance_response.status_code == 200 else []
                         
-                        # Fetch cash flow
-                        cash_url = f"{FMP_BASE_URL}/cash-flow-statement/{ticker}"
-                        cash_response = requests.get(cash_url, params=params, timeout=30)
-                        
-                        if self.api_limiter:
-                            self.api_limiter.record_call(provider, 'cash_flow')
-                        
+                        cash_response = responses['cash_flow']
                         cash_data = cash_response.json() if cash_response.status_code == 200 else []
                         
                         # Parse and standardize data
@@ -495,6 +491,9 @@ class FMPService:
             # This service focuses on populating raw fundamental data
             
             self.conn.commit()
+            mark_quality_dirty('stocks', [ticker])
+            if income or balance or cash_flow:
+                mark_quality_dirty('company_fundamentals', [ticker])
             logging.info(f"Successfully stored FMP fundamental data for {ticker}")
             return True
             
@@ -538,6 +537,7 @@ class FMPService:
             self.api_limiter.close()
 
 if __name__ == "__main__":
+    setup_logging('fmp')
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--ticker', type=str, default='AAPL', help='Ticker symbol to fetch')
@@ -0,0 +1,425 @@
+"""
+Indicator Backfill
+
+Computes technical indicators for every historical daily_charts bar, not
+just the latest one the nightly run writes. Each ticker's full price series
+is loaded once and every indicator is computed as a whole Series with the
+indicators/* functions. Results are written one partition (year or month,
+matching daily_charts) at a time: the rows for that date range are COPYed into
+a temp table and merged with one UPDATE ... FROM, so each transaction locks a
+single partition's rows for a short time.
+
+Progress is recorded per ticker in indicator_backfill_progress, so an
+interrupted run resumes with the tickers it had not finished. A duty-cycle
+throttle sleeps between partition writes so the backfill can run next to the
+nightly job.
+
+Values are stored like DatabaseManager.update_technical_indicators: computed
+on dollar prices and written as value * 100. Only indicators that are
+causal and vectorized are backfilled; the nearest-level, strength and
+volume-profile columns depend on the latest bar's context and stay
+nightly-only. VWAP, OBV and VPT are cumulative, so they are computed over the
+same trailing window the nightly reads (NIGHTLY_WINDOW bars) rather than
+from the first bar in the table.
+
+Usage:
+    python indicator_backfill.py [--tickers AAPL MSFT] [--duty-cycle 0.5] [--restart]
+"""
+
+import argparse
+import io
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .database import DatabaseManager, mark_quality_dirty
+    from .daily_charts_migration import DailyChartsMigration, partition_bounds
+    from .indicators.adx import calculate_adx
+    from .indicators.atr import calculate_atr
+    from .indicators.bollinger_bands import calculate_bollinger_bands
+    from .indicators.cci import calculate_cci
+    from .indicators.ema import calculate_ema
+    from .indicators.macd import calculate_macd
+    from .indicators.rsi import calculate_rsi
+    from .indicators.stochastic import calculate_stochastic
+    from .indicators.support_resistance import (
+        calculate_fibonacci_levels, calculate_pivot_points_enhanced, calculate_rolling_levels
+    )
+except ImportError:
+    from database import DatabaseManager, mark_quality_dirty
+    from daily_charts_migration import DailyChartsMigration, partition_bounds
+    from indicators.adx import calculate_adx
+    from indicators.atr import calculate_atr
+    from indicators.bollinger_bands import calculate_bollinger_bands
+    from indicators.cci import calculate_cci
+    from indicators.ema import calculate_ema
+    from indicators.macd import calculate_macd
+    from indicators.rsi import calculate_rsi
+    from indicators.stochastic import calculate_stochastic
+    from indicators.support_resistance import (
+        calculate_fibonacci_levels, calculate_pivot_points_enhanced, calculate_rolling_levels
+    )
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_TABLE = 'indicator_backfill_progress'
+STAGING_TABLE = 'indicator_backfill_staging'
+
+# Bump when a formula changes so finished tickers are recomputed on the next run
+INDICATOR_VERSION = 1
+
+# Bars the nightly run reads per ticker (get_price_data_for_technicals)
+NIGHTLY_WINDOW = 100
+
+# Bars of history an indicator needs before its value means anything
+WARMUP_BARS = {
+    'ema_20': 20, 'ema_50': 50, 'ema_100': 100, 'ema_200': 200,
+    'macd_line': 26, 'macd_signal': 26, 'macd_histogram': 26,
+    'adx_14': 28,
+}
+
+VOLUME_COLUMNS = {'obv', 'vpt'}
+
+INDICATOR_COLUMNS = [
+    'rsi_14', 'ema_20', 'ema_50', 'ema_100', 'ema_200',
+    'macd_line', 'macd_signal', 'macd_histogram',
+    'bb_upper', 'bb_middle', 'bb_lower',
+    'stoch_k', 'stoch_d', 'atr_14', 'cci_20', 'adx_14',
+    'vwap', 'obv', 'vpt',
+    'pivot_point', 'pivot_fibonacci', 'pivot_camarilla', 'pivot_woodie', 'pivot_demark',
+    'resistance_1', 'resistance_2', 'resistance_3', 'support_1', 'support_2', 'support_3',
+    'swing_high_5d', 'swing_low_5d', 'swing_high_10d', 'swing_low_10d',
+    'swing_high_20d', 'swing_low_20d',
+    'week_high', 'week_low', 'month_high', 'month_low',
+    'fib_236', 'fib_382', 'fib_500', 'fib_618', 'fib_786', 'fib_1272', 'fib_1618', 'fib_2618',
+]
+
+
+def _to_storage(values: pd.Series, column: str) -> pd.Series:
+    """Cap and scale like update_technical_indicators (int(value * 100), NULL for NaN)"""
+    cap = 1e12 if column in VOLUME_COLUMNS else 1e7
+    scaled = np.trunc(np.clip(values.to_numpy(dtype='float64'), -cap, cap) * 100)
+    scaled[~np.isfinite(scaled)] = np.nan
+    return pd.Series(pd.array(scaled, dtype='Int64'), index=values.index)
+
+
+def compute_indicator_frame(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Indicators for every bar of one ticker's price history.
+
+    Args:
+        prices: Rows with 'date', 'open', 'high', 'low', 'close', 'volume'
+                (prices in cents, as stored in daily_charts), any order
+
+    Returns:
+        DataFrame with 'date' (ISO text) and INDICATOR_COLUMNS as storage-scaled
+        nullable integers, one row per bar with a valid close
+    """
+    df = prices.copy()
+    df['date'] = pd.to_datetime(df['date'].astype(str).str[:10], errors='coerce')
+    df = df.dropna(subset=['date', 'close']).sort_values('date').drop_duplicates('date', keep='last')
+    df = df.reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame(columns=['date'] + INDICATOR_COLUMNS)
+
+    high = pd.to_numeric(df['high'], errors='coerce').astype(float) / 100.0
+    low = pd.to_numeric(df['low'], errors='coerce').astype(float) / 100.0
+    close = pd.to_numeric(df['close'], errors='coerce').astype(float) / 100.0
+    volume = pd.to_numeric(df['volume'], errors='coerce').astype(float).fillna(0.0)
+
+    values: Dict[str, pd.Series] = {'rsi_14': calculate_rsi(close, 14)}
+    for window in (20, 50, 100, 200):
+        values[f'ema_{window}'] = calculate_ema(close, window)
+    values['macd_line'], values['macd_signal'], values['macd_histogram'] = calculate_macd(close)
+    values['bb_upper'], values['bb_middle'], values['bb_lower'] = calculate_bollinger_bands(close, window=20)
+    values['stoch_k'], values['stoch_d'] = calculate_stochastic(high, low, close)
+    values['atr_14'] = calculate_atr(high, low, close, 14)
+    values['cci_20'] = calculate_cci(high, low, close, 20)
+    adx = calculate_adx(high, low, close, 14)
+    values['adx_14'] = adx if len(adx) == len(close) else pd.Series(np.nan, index=close.index)
+
+    # Cumulative indicators over the nightly's trailing window
+    typical_price = (high + low + close) / 3
+    volume_sum = volume.rolling(NIGHTLY_WINDOW, min_periods=1).sum()
+    values['vwap'] = (typical_price * volume).rolling(NIGHTLY_WINDOW, min_periods=1).sum() / volume_sum.replace(0, np.nan)
+    values['obv'] = (np.sign(close.diff()).fillna(0) * volume).rolling(NIGHTLY_WINDOW, min_periods=1).sum()
+    values['vpt'] = (close.pct_change().fillna(0) * volume).rolling(NIGHTLY_WINDOW, min_periods=1).sum()
+
+    values.update(calculate_pivot_points_enhanced(high, low, close))
+    values.update(calculate_rolling_levels(high, low, 20))
+    # Fibonacci levels are filled with 0 during warm-up; store those as NULL
+    values.update({name: series.replace(0, np.nan)
+                   for name, series in calculate_fibonacci_levels(high, low, close, 20).items()})
+
+    frame = pd.DataFrame({'date': df['date'].dt.strftime('%Y-%m-%d')})
+    for column in INDICATOR_COLUMNS:
+        series = pd.Series(values[column], index=close.index, dtype='float64')
+        warmup = WARMUP_BARS.get(column)
+        if warmup:
+            series.iloc[:warmup - 1] = np.nan
+        frame[column] = _to_storage(series, column)
+    return frame
+
+
+@dataclass
+class BackfillReport:
+    """Outcome of one backfill run"""
+    tickers_total: int = 0
+    tickers_done: int = 0
+    tickers_resumed: int = 0
+    tickers_failed: List[str] = field(default_factory=list)
+    rows_computed: int = 0
+    rows_updated: int = 0
+    partition_writes: int = 0
+    throttle_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class IndicatorBackfill:
+    """Full-history indicator backfill into daily_charts, partition by partition"""
+
+    def __init__(self, db: DatabaseManager = None, table: str = 'daily_charts',
+                 batch_size: int = 25, duty_cycle: float = 0.5,
+                 max_rows_per_second: Optional[float] = None,
+                 include_latest: bool = False):
+        """
+        Args:
+            db: Database manager
+            table: Price table to backfill
+            batch_size: Tickers loaded and computed together
+            duty_cycle: Fraction of wall time spent writing; after a write that
+                        took t seconds the backfill sleeps t * (1 - d) / d
+            max_rows_per_second: Optional cap on updated rows per second
+            include_latest: Also overwrite each ticker's latest bar, which the
+                            nightly run owns by default
+        """
+        if not 0 < duty_cycle <= 1:
+            raise ValueError(f"duty_cycle must be in (0, 1], got {duty_cycle}")
+        self.db = db or DatabaseManager()
+        self.table = table
+        self.batch_size = batch_size
+        self.duty_cycle = duty_cycle
+        self.max_rows_per_second = max_rows_per_second
+        self.include_latest = include_latest
+        self.partitions = DailyChartsMigration(db=self.db, table=table)
+        self._columns: Optional[List[str]] = None
+
+    # Progress ----------------------------------------------------------------
+
+    def ensure_progress_table(self):
+        self.db.execute_update(f"""
+            CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+                ticker VARCHAR(10) PRIMARY KEY,
+                version INTEGER NOT NULL,
+                rows_updated INTEGER NOT NULL DEFAULT 0,
+                last_date DATE,
+                completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def reset(self):
+        """Forget all progress so the next run recomputes every ticker"""
+        self.ensure_progress_table()
+        self.db.execute_update(f"DELETE FROM {PROGRESS_TABLE}")
+
+    def universe(self) -> List[str]:
+        return [row[0] for row in self.db.execute_query(
+            "SELECT ticker FROM stocks WHERE ticker IS NOT NULL ORDER BY ticker")]
+
+    def pending_tickers(self, tickers: Optional[Iterable[str]] = None) -> List[str]:
+        """Tickers (default: every ticker in stocks) not yet backfilled at INDICATOR_VERSION"""
+        tickers = sorted(set(self.universe() if tickers is None else tickers))
+        if not tickers:
+            return []
+        done = {row[0] for row in self.db.execute_query(
+            f"SELECT ticker FROM {PROGRESS_TABLE} WHERE version = %s AND ticker = ANY(%s)",
+            (INDICATOR_VERSION, tickers))}
+        return [ticker for ticker in tickers if ticker not in done]
+
+    def _record_progress(self, cursor, tickers: List[str], rows: pd.DataFrame, updated: Dict[str, int]):
+        last_dates = rows.groupby('ticker')['date'].max().to_dict() if not rows.empty else {}
+        for ticker in tickers:
+            cursor.execute(f"""
+                INSERT INTO {PROGRESS_TABLE} (ticker, version, rows_updated, last_date, completed_at)
+                VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (ticker) DO UPDATE SET
+                    version = EXCLUDED.version, rows_updated = EXCLUDED.rows_updated,
+                    last_date = EXCLUDED.last_date, completed_at = EXCLUDED.completed_at
+            """, (ticker, INDICATOR_VERSION, updated.get(ticker, 0), last_dates.get(ticker)))
+
+    # Compute -----------------------------------------------------------------
+
+    def columns(self) -> List[str]:
+        """INDICATOR_COLUMNS that exist in the price table"""
+        if self._columns is None:
+            existing = {row[0] for row in self.db.execute_query(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+                (self.table,))}
+            self._columns = [column for column in INDICATOR_COLUMNS if column in existing]
+        return self._columns
+
+    def load_history(self, tickers: List[str]) -> pd.DataFrame:
+        rows = self.db.execute_query(f"""
+            SELECT ticker, date, open, high, low, close, volume
+            FROM {self.table}
+            WHERE ticker = ANY(%s)
+            ORDER BY ticker, date
+        """, (tickers,))
+        return pd.DataFrame(rows, columns=['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'])
+
+    def compute(self, history: pd.DataFrame) -> pd.DataFrame:
+        """Indicator rows for every ticker in a history frame ('ticker', 'date', columns())"""
+        frames = []
+        for ticker, prices in history.groupby('ticker', sort=False):
+            frame = compute_indicator_frame(prices)
+            if frame.empty:
+                continue
+            if not self.include_latest:
+                frame = frame.iloc[:-1]
+            frames.append(frame.assign(ticker=ticker))
+        if not frames:
+            return pd.DataFrame(columns=['ticker', 'date'] + self.columns())
+        return pd.concat(frames, ignore_index=True)[['ticker', 'date'] + self.columns()]
+
+    # Write -------------------------------------------------------------------
+
+    def _update_sql(self) -> str:
+        columns = self.columns()
+        assignments = ', '.join(f"{column} = s.{column}" for column in columns)
+        return f"""
+            UPDATE {self.table} dc SET {assignments}
+            FROM {STAGING_TABLE} s
+            WHERE dc.ticker = s.ticker AND dc.date = s.date
+              AND dc.date >= %s AND dc.date < %s
+              AND ({', '.join(f'dc.{c}' for c in columns)}) IS DISTINCT FROM ({', '.join(f's.{c}' for c in columns)})
+        """
+
+    def write_partition(self, rows: pd.DataFrame, start: date, end: date) -> Dict[str, int]:
+        """
+        Merge one partition's indicator rows in a single transaction.
+
+        The staging table is built from the price table's own column types, so
+        dates compare the same way whether daily_charts.date is TEXT or DATE.
+
+        Returns:
+            Rows updated per ticker (rows already holding these values are skipped)
+        """
+        columns = ['ticker', 'date'] + self.columns()
+        buffer = io.StringIO()
+        rows[columns].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        with self.db.get_cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ON COMMIT DROP AS
+                SELECT {', '.join(columns)} FROM {self.table} WITH NO DATA
+            """)
+            cursor.copy_expert(f"COPY {STAGING_TABLE} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(self._update_sql() + " RETURNING dc.ticker", (start.isoformat(), end.isoformat()))
+            updated_tickers = [row[0] for row in cursor.fetchall()]
+        return pd.Series(updated_tickers, dtype=object).value_counts().to_dict()
+
+    def _throttle(self, write_seconds: float, rows: int) -> float:
+        """Sleep so writes use at most duty_cycle of wall time (and max_rows_per_second)"""
+        pause = write_seconds * (1 - self.duty_cycle) / self.duty_cycle
+        if self.max_rows_per_second:
+            pause = max(pause, rows / self.max_rows_per_second - write_seconds)
+        if pause > 0:
+            time.sleep(pause)
+        return max(pause, 0.0)
+
+    def backfill_batch(self, tickers: List[str], report: BackfillReport):
+        rows = self.compute(self.load_history(tickers))
+        report.rows_computed += len(rows)
+        updated: Dict[str, int] = {}
+        if not rows.empty:
+            first, last = date.fromisoformat(rows['date'].min()), date.fromisoformat(rows['date'].max())
+            for suffix, start, end in partition_bounds(first, last, self.partitions.granularity(), ahead=0):
+                part = rows[(rows['date'] >= start.isoformat()) & (rows['date'] < end.isoformat())]
+                if part.empty:
+                    continue
+                write_start = time.time()
+                counts = self.write_partition(part, start, end)
+                for ticker, count in counts.items():
+                    updated[ticker] = updated.get(ticker, 0) + count
+                report.partition_writes += 1
+                report.throttle_seconds += self._throttle(time.time() - write_start, len(part))
+
+        report.rows_updated += sum(updated.values())
+        with self.db.get_cursor() as cursor:
+            self._record_progress(cursor, tickers, rows, updated)
+        if updated:
+            mark_quality_dirty(self.table, list(updated))
+
+    def run(self, tickers: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> BackfillReport:
+        """
+        Backfill every pending ticker; tickers finished by an earlier run are skipped.
+
+        Args:
+            tickers: Restrict to these tickers (default: all in stocks)
+            limit: Stop after this many tickers (for a time-boxed run)
+        """
+        start_time = time.time()
+        self.ensure_progress_table()
+        candidates = sorted(set(self.universe() if tickers is None else tickers))
+        pending = self.pending_tickers(candidates)
+        report = BackfillReport(tickers_total=len(candidates),
+                                tickers_resumed=len(candidates) - len(pending))
+        if limit is not None:
+            pending = pending[:limit]
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        logger.info(f"📈 Indicator backfill: {len(pending)} tickers in {len(batches)} batches "
+                    f"({len(self.columns())} indicators, duty cycle {self.duty_cycle:.0%})")
+
+        for batch_num, batch in enumerate(batches, 1):
+            try:
+                self.backfill_batch(batch, report)
+                report.tickers_done += len(batch)
+            except Exception as e:
+                logger.error(f"❌ Indicator backfill batch {batch_num} failed ({', '.join(batch)}): {e}")
+                report.tickers_failed.extend(batch)
+            logger.info(f"📈 Indicator backfill batch {batch_num}/{len(batches)}: "
+                        f"{report.rows_updated} rows updated so far")
+
+        report.elapsed = time.time() - start_time
+        logger.info(f"✅ Indicator backfill: {report.tickers_done} tickers, {report.rows_updated}/"
+                    f"{report.rows_computed} rows updated in {report.elapsed:.1f}s "
+                    f"({report.throttle_seconds:.1f}s throttled, {len(report.tickers_failed)} failed)")
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Backfill technical indicators for every historical bar')
+    parser.add_argument('--tickers', nargs='+', help='Only these tickers (default: all in stocks)')
+    parser.add_argument('--batch-size', type=int, default=25, help='Tickers computed together')
+    parser.add_argument('--duty-cycle', type=float, default=0.5,
+                        help='Fraction of wall time spent writing (lower = gentler on the database)')
+    parser.add_argument('--max-rows-per-second', type=float, default=None, help='Cap on updated rows per second')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many tickers')
+    parser.add_argument('--include-latest', action='store_true',
+                        help="Also overwrite each ticker's latest bar (normally left to the nightly run)")
+    parser.add_argument('--restart', action='store_true', help='Discard progress and recompute every ticker')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    backfill = IndicatorBackfill(batch_size=args.batch_size, duty_cycle=args.duty_cycle,
+                                 max_rows_per_second=args.max_rows_per_second,
+                                 include_latest=args.include_latest)
+    if args.restart:
+        backfill.reset()
+    report = backfill.run(args.tickers, limit=args.limit)
+    return 1 if report.tickers_failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
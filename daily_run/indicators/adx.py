@@ -12,14 +12,22 @@ def wilder_smoothing(series: pd.Series, period: int) -> pd.Series:
     Returns:
         Smoothed series using Wilder's method
     """
-    smoothed = pd.Series(index=series.index, dtype=float)
+    smoothed = pd.Series(np.nan, index=series.index, dtype=float)
+    if len(series) < period:
+        return smoothed
     
-    # Initialize first smoothed value as sum of first 'period' values
-    smoothed.iloc[period-1] = series.iloc[:period].sum()
+    # Seed with the sum of the first 'period' values, then apply
+    # S[i] = S[i-1] - S[i-1]/period + x[i]. That recursion is period times an
+    # exponential average with alpha = 1/period, so it runs as one ewm pass
+    # instead of a Python loop over the full history.
+    seeded = series.astype(float).copy()
+    seeded.iloc[:period-1] = np.nan
+    seeded.iloc[period-1] = series.iloc[:period].sum() / period
+    smoothed = seeded.ewm(alpha=1.0 / period, adjust=False).mean() * period
     
-    # Apply Wilder's smoothing formula
-    for i in range(period, len(series)):
-        smoothed.iloc[i] = smoothed.iloc[i-1] - (smoothed.iloc[i-1]/period) + series.iloc[i]
+    # As in the recursive form, a missing value after the seed poisons every later one
+    gaps = seeded.isna().to_numpy() & (np.arange(len(series)) >= period)
+    smoothed[np.cumsum(gaps) > 0] = np.nan
     
     return smoothed
 
@@ -16,7 +16,7 @@ def calculate_cci(high: pd.Series, low: pd.Series, close: pd.Series, window: int
     """
     tp = (high + low + close) / 3
     tp_sma = tp.rolling(window=window).mean()
-    tp_md = tp.rolling(window=window).apply(lambda x: np.abs(x - x.mean()).mean())
+    tp_md = tp.rolling(window=window).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
     
     # Prevent division by zero when mean deviation is zero
     # Standard CCI uses a constant of 0.015 (Lambert's constant for ~70-80% values within ±100)
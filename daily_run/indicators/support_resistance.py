@@ -557,6 +557,44 @@ def calculate_pivot_points_enhanced(high: pd.Series, low: pd.Series, close: pd.S
         'pivot_demark': pivot_demark
     }
 
+def calculate_rolling_levels(high: pd.Series, low: pd.Series, window: int = 20) -> dict:
+    """
+    Rolling-window support/resistance levels (only past bars, so every value
+    is what the level was on that day)
+    
+    Args:
+        high: Series of high prices
+        low: Series of low prices
+        window: Lookback window for the first support/resistance level (default: 20)
+        
+    Returns:
+        Dictionary of support_1-3, resistance_1-3, swing high/low (5/10/20 days)
+        and week/month high/low series
+    """
+    return {
+        # Basic levels
+        'resistance_1': high.rolling(window=window).max(),
+        'resistance_2': high.rolling(window=window*2).max(),
+        'resistance_3': high.rolling(window=window*3).max(),
+        'support_1': low.rolling(window=window).min(),
+        'support_2': low.rolling(window=window*2).min(),
+        'support_3': low.rolling(window=window*3).min(),
+        
+        # Swing highs and lows for different periods
+        'swing_high_5d': high.rolling(window=5).max(),
+        'swing_low_5d': low.rolling(window=5).min(),
+        'swing_high_10d': high.rolling(window=10).max(),
+        'swing_low_10d': low.rolling(window=10).min(),
+        'swing_high_20d': high.rolling(window=20).max(),
+        'swing_low_20d': low.rolling(window=20).min(),
+        
+        # Weekly and monthly highs/lows
+        'week_high': high.rolling(window=7).max(),
+        'week_low': low.rolling(window=7).min(),
+        'month_high': high.rolling(window=21).max(),
+        'month_low': low.rolling(window=21).min(),
+    }
+
 def calculate_support_resistance(high: pd.Series, low: pd.Series, close: pd.Series, 
                                volume: pd.Series = None, window: int = 20, swing_window: int = 5) -> dict:
     """
@@ -580,14 +618,10 @@ def calculate_support_resistance(high: pd.Series, low: pd.Series, close: pd.Seri
     if len(high) != len(low) or len(low) != len(close):
         raise ValueError("All price series must have the same length")
     
-    # Basic support and resistance levels
-    support_1 = low.rolling(window=window).min()
-    support_2 = low.rolling(window=window*2).min()
-    support_3 = low.rolling(window=window*3).min()
-    
-    resistance_1 = high.rolling(window=window).max()
-    resistance_2 = high.rolling(window=window*2).max()
-    resistance_3 = high.rolling(window=window*3).max()
+    # Basic support/resistance, swing-period and weekly/monthly levels
+    rolling_levels = calculate_rolling_levels(high, low, window)
+    support_1 = rolling_levels['support_1']
+    resistance_1 = rolling_levels['resistance_1']
     
     # Enhanced pivot points
     pivot_points = calculate_pivot_points_enhanced(high, low, close)
@@ -595,20 +629,6 @@ def calculate_support_resistance(high: pd.Series, low: pd.Series, close: pd.Seri
     # Advanced swing point detection
     swing_highs, swing_lows, swing_strengths = detect_swing_points_advanced(high, low, close, swing_window)
     
-    # Swing highs and lows for different periods
-    swing_high_5d = high.rolling(window=5).max()
-    swing_low_5d = low.rolling(window=5).min()
-    swing_high_10d = high.rolling(window=10).max()
-    swing_low_10d = low.rolling(window=10).min()
-    swing_high_20d = high.rolling(window=20).max()
-    swing_low_20d = low.rolling(window=20).min()
-    
-    # Weekly and monthly highs/lows
-    week_high = high.rolling(window=7).max()
-    week_low = low.rolling(window=7).min()
-    month_high = high.rolling(window=21).max()
-    month_low = low.rolling(window=21).min()
-    
     # Fibonacci levels
     fibonacci_levels = calculate_fibonacci_levels(high, low, close, window)
     
@@ -641,27 +661,8 @@ def calculate_support_resistance(high: pd.Series, low: pd.Series, close: pd.Seri
     
     # Compile comprehensive results
     result = {
-        # Basic levels
-        'resistance_1': resistance_1,
-        'resistance_2': resistance_2,
-        'resistance_3': resistance_3,
-        'support_1': support_1,
-        'support_2': support_2,
-        'support_3': support_3,
-        
-        # Swing points
-        'swing_high_5d': swing_high_5d,
-        'swing_low_5d': swing_low_5d,
-        'swing_high_10d': swing_high_10d,
-        'swing_low_10d': swing_low_10d,
-        'swing_high_20d': swing_high_20d,
-        'swing_low_20d': swing_low_20d,
-        
-        # Time-based levels
-        'week_high': week_high,
-        'week_low': week_low,
-        'month_high': month_high,
-        'month_low': month_low,
+        # Basic, swing-period and time-based levels
+        **rolling_levels,
         
         # Enhanced features
         'nearest_support': nearest_support,
@@ -14,6 +14,7 @@ sys.path.append(os.path.dirname(__file__))
 
 from fundamental_ratio_calculator import FundamentalRatioCalculator
 from database import Database
+from change_tracker import ChangeTracker
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,7 @@ class FundamentalRatioIntegrator:
     def __init__(self, db_connection):
         self.db = db_connection
         self.calculator = FundamentalRatioCalculator(db_connection)
+        self.change_tracker = ChangeTracker(db_connection)
         
     def process_ticker_ratios(self, ticker: str, current_price: float) -> Dict:
         """
@@ -81,26 +83,38 @@ class FundamentalRatioIntegrator:
                 'error': str(e)
             }
     
-    def process_batch_ratios(self, tickers: List[str], current_prices: Dict[str, float]) -> Dict:
+    def process_batch_ratios(self, tickers: List[str], current_prices: Dict[str, float],
+                             force: bool = False) -> Dict:
         """
         Process fundamental ratios for multiple tickers
         
+        Only tickers whose fundamentals changed or whose price moved past the
+        change tracker's threshold are recomputed unless force is set.
+        
         Args:
             tickers: List of stock symbols
             current_prices: Dictionary of current prices by ticker
+            force: Recompute every ticker regardless of changes
             
         Returns:
             Dictionary with batch results
         """
-        logger.info(f"Processing fundamental ratios for {len(tickers)} tickers")
+        requested = len(tickers)
+        if force:
+            dirty_report = None
+        else:
+            tickers, dirty_report = self.change_tracker.dirty_set('financial_ratios', tickers)
+        logger.info(f"Processing fundamental ratios for {len(tickers)}/{requested} tickers")
         
         results = {
             'total_tickers': len(tickers),
             'successful': 0,
             'failed': 0,
             'total_ratios': 0,
-            'ticker_results': {}
+            'ticker_results': {},
+            'dirty_set': dirty_report.to_dict() if dirty_report else None
         }
+        successful_tickers = []
         
         for ticker in tickers:
             current_price = current_prices.get(ticker, 0)
@@ -120,9 +134,13 @@ class FundamentalRatioIntegrator:
             if ticker_result['status'] == 'success':
                 results['successful'] += 1
                 results['total_ratios'] += ticker_result['ratios_calculated']
+                successful_tickers.append(ticker)
             else:
                 results['failed'] += 1
         
+        if dirty_report:
+            self.change_tracker.mark_computed('financial_ratios', successful_tickers)
+        
         logger.info(f"Batch processing complete: {results['successful']} successful, {results['failed']} failed")
         return results
     
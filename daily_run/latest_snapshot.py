@@ -0,0 +1,184 @@
+"""
+Latest Snapshot
+
+ticker_latest_snapshot holds the newest daily_charts row per ticker: close,
+volume, VWAP, every technical indicator and the support/resistance levels.
+It is refreshed for the tickers a run wrote (end of Priority 1, and again
+for tickers the history backfill added), so scorers read the current state
+of the whole universe in one scan instead of one ORDER BY date DESC LIMIT 1
+query per ticker.
+
+The table mirrors the daily_charts column list (LIKE daily_charts); refreshes
+copy the columns both tables share, so columns added to daily_charts later
+only need an ALTER TABLE here to be carried over.
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .database import DatabaseManager
+except ImportError:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLE = 'ticker_latest_snapshot'
+
+
+class LatestSnapshot:
+    """Maintains ticker_latest_snapshot and serves bulk/per-ticker reads from it"""
+
+    def __init__(self, db: DatabaseManager = None, source_table: str = 'daily_charts'):
+        self.db = db or DatabaseManager()
+        self.source_table = source_table
+        self._available: Optional[bool] = None
+        self._columns: Optional[List[str]] = None
+        self._cache: Dict[str, Dict] = {}
+        self._cache_complete = False
+        self._lock = threading.Lock()
+
+    # Maintenance -------------------------------------------------------------
+
+    def ensure_table(self) -> bool:
+        """
+        Create the snapshot table from the daily_charts layout if missing.
+
+        Returns:
+            True if the table was created by this call
+        """
+        if self.available():
+            return False
+        self._columns = None
+        self.db.execute_update(f"CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} (LIKE {self.source_table})")
+        self.db.execute_update(f"""
+            ALTER TABLE {SNAPSHOT_TABLE}
+            ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        """)
+        self.db.execute_update(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_{SNAPSHOT_TABLE}_ticker ON {SNAPSHOT_TABLE} (ticker)
+        """)
+        self._available = True
+        return True
+
+    def columns(self) -> List[str]:
+        """daily_charts columns the snapshot table also has, in table order"""
+        if self._columns is None:
+            rows = self.db.execute_query("""
+                SELECT s.column_name
+                FROM information_schema.columns s
+                JOIN information_schema.columns t
+                  ON t.table_name = %s AND t.column_name = s.column_name
+                WHERE s.table_name = %s
+                ORDER BY s.ordinal_position
+            """, (SNAPSHOT_TABLE, self.source_table))
+            self._columns = [row[0] for row in rows]
+        return self._columns
+
+    def _refresh_sql(self) -> str:
+        columns = self.columns()
+        return f"""
+            INSERT INTO {SNAPSHOT_TABLE} ({', '.join(columns)}, refreshed_at)
+            SELECT {', '.join(f'dc.{column}' for column in columns)}, CURRENT_TIMESTAMP
+            FROM unnest(%(tickers)s::text[]) AS t(ticker)
+            CROSS JOIN LATERAL (
+                SELECT * FROM {self.source_table}
+                WHERE ticker = t.ticker
+                ORDER BY date DESC
+                LIMIT 1
+            ) dc
+        """
+
+    def refresh(self, tickers: Optional[Iterable[str]] = None) -> int:
+        """
+        Re-read the newest daily_charts row for tickers (every ticker in stocks
+        when None). Each ticker is one descent of the (ticker, date DESC) index.
+        The first refresh after the table is created covers every ticker.
+
+        Returns:
+            Number of tickers refreshed
+        """
+        if self.ensure_table():
+            tickers = None
+        if tickers is None:
+            tickers = [row[0] for row in self.db.execute_query(
+                "SELECT ticker FROM stocks WHERE ticker IS NOT NULL")]
+            delete_sql, params = f"DELETE FROM {SNAPSHOT_TABLE}", None
+        else:
+            tickers = sorted(set(tickers))
+            if not tickers:
+                return 0
+            delete_sql, params = f"DELETE FROM {SNAPSHOT_TABLE} WHERE ticker = ANY(%s)", (tickers,)
+
+        insert_sql = self._refresh_sql()
+        with self.db.get_cursor() as cursor:
+            cursor.execute(delete_sql, params)
+            cursor.execute(insert_sql, {'tickers': tickers})
+        self.invalidate()
+        logger.info(f"📸 Refreshed latest snapshot for {len(tickers)} tickers")
+        return len(tickers)
+
+    def invalidate(self):
+        with self._lock:
+            self._cache = {}
+            self._cache_complete = False
+
+    # Reads -------------------------------------------------------------------
+
+    def available(self) -> bool:
+        """Whether the snapshot table exists (checked once)"""
+        if self._available is None:
+            try:
+                row = self.db.fetch_one("SELECT to_regclass(%s) IS NOT NULL", (SNAPSHOT_TABLE,))
+                self._available = bool(row and row[0])
+            except Exception as e:
+                logger.warning(f"Could not check for {SNAPSHOT_TABLE}: {e}")
+                self._available = False
+        return self._available
+
+    def load(self, tickers: Optional[Iterable[str]] = None,
+             columns: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Snapshot rows keyed by ticker, for the whole universe or the given tickers.
+
+        Args:
+            tickers: Tickers to read; None reads every ticker in one scan
+            columns: Columns to return (ticker is always included); None for all
+
+        Returns:
+            {ticker: {column: value}}; empty when the table does not exist yet
+        """
+        if not self.available():
+            return {}
+        select_list = ', '.join(['ticker'] + [c for c in columns if c != 'ticker']) if columns else '*'
+        query = f"SELECT {select_list} FROM {SNAPSHOT_TABLE}"
+        params = None
+        if tickers is not None:
+            tickers = list(tickers)
+            if not tickers:
+                return {}
+            query += " WHERE ticker = ANY(%s)"
+            params = (tickers,)
+        return {row['ticker']: row for row in self.db.fetch_all_dict(query, params)}
+
+    def preload(self, tickers: Optional[Iterable[str]] = None) -> int:
+        """Cache full snapshot rows so get() does not go back to the database"""
+        rows = self.load(tickers)
+        with self._lock:
+            self._cache.update(rows)
+            self._cache_complete = tickers is None
+        return len(rows)
+
+    def get(self, ticker: str) -> Optional[Dict]:
+        """One ticker's snapshot row, from the preload cache or a primary-key lookup"""
+        with self._lock:
+            if ticker in self._cache:
+                return self._cache[ticker]
+            if self._cache_complete:
+                return None
+        row = self.load([ticker]).get(ticker)
+        if row is not None:
+            with self._lock:
+                self._cache[ticker] = row
+        return row
@@ -0,0 +1,326 @@
+"""
+Log Pipeline
+
+Process-wide logging for the daily run.
+
+configure_logging() installs a single QueueHandler on the root logger and
+moves every real destination (console, rotating log files, an optional
+JSON-lines event file) behind a QueueListener thread. Logging calls in the
+hot loops only append the record to an in-process queue; message
+formatting and file/terminal I/O happen on the listener thread. Records
+are queued unformatted, so '%s'-style arguments are only rendered if a
+handler actually writes them.
+
+Per-ticker work is reported through PhaseLog instead of several f-string
+INFO lines per ticker: one structured event per ticker per phase (status,
+seconds, extra fields), progress lines rate-limited to one every
+progress_interval seconds, and one summary line when the phase ends. In
+'summary' mode (production) successful per-ticker events are switched off
+at the logger level, so they cost a level check; failures, progress and
+phase summaries are still written.
+
+Modules no longer attach their own handlers at import time; entry points
+call configure_logging() once (common_imports.setup_logging and
+config.setup_logging_from_config delegate to it).
+
+Usage:
+    from log_pipeline import configure_logging, PhaseLog
+
+    configure_logging(log_file='daily_run/logs/system.log', mode='summary')
+    with PhaseLog('technicals', total=len(tickers)) as phase:
+        for ticker in tickers:
+            ...
+            phase.event(ticker, seconds=elapsed, stored=stored_count)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+EVENT_LOGGER = 'daily_run.events'
+PROGRESS_LOGGER = 'daily_run.progress'
+MODES = ('verbose', 'summary')
+DEFAULT_PROGRESS_INTERVAL = 30.0
+
+_lock = threading.Lock()
+_pipeline: Optional['LogPipeline'] = None
+_progress_interval = DEFAULT_PROGRESS_INTERVAL
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records as they are.
+
+    The stock QueueHandler formats every record in the calling thread so it
+    can be pickled across processes; this queue never leaves the process,
+    so formatting is left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonEventFormatter(logging.Formatter):
+    """One JSON object per line; structured events carry their fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        event = getattr(record, 'event', None)
+        if event is not None:
+            payload.update(event.to_dict())
+        else:
+            payload['message'] = record.getMessage()
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class LogPipeline:
+    """The root QueueHandler and the listener thread writing to the real handlers"""
+
+    def __init__(self, handlers: List[logging.Handler]):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.handler = _DeferredQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.files: Dict[str, logging.Handler] = {}
+        self.running = False
+
+    @property
+    def handlers(self) -> List[logging.Handler]:
+        return list(self.listener.handlers)
+
+    def add_handler(self, handler: logging.Handler):
+        # The listener reads its handler tuple per record, so swapping it is safe while running
+        self.listener.handlers = self.listener.handlers + (handler,)
+
+    def start(self):
+        if not self.running:
+            self.listener.start()
+            self.running = True
+
+    def stop(self):
+        """Drain the queue and flush every handler"""
+        if self.running:
+            self.listener.stop()
+            self.running = False
+        for handler in self.listener.handlers:
+            handler.flush()
+
+
+def _file_handler(path: str, fmt: logging.Formatter, max_bytes: int, backup_count: int) -> logging.Handler:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                   encoding='utf-8')
+    handler.setFormatter(fmt)
+    return handler
+
+
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = None, mode: str = 'verbose',
+                      console: bool = True, fmt: str = DEFAULT_FORMAT, json_file: Optional[str] = None,
+                      progress_interval: Optional[float] = None, max_bytes: int = 10 * 1024 * 1024,
+                      backup_count: int = 5) -> LogPipeline:
+    """
+    Route all logging through one queue and a background writer thread.
+
+    Safe to call more than once: later calls add their log files to the
+    running pipeline and update level, mode and progress interval. Handlers
+    already on the root logger (e.g. from an earlier basicConfig) are moved
+    behind the queue.
+
+    Args:
+        level: Root logger level
+        log_file: Rotating text log file
+        mode: 'verbose' (every per-ticker event) or 'summary' (failures, progress, phase summaries)
+        console: Also write to stderr (first call only)
+        fmt: Text format for console and log files
+        json_file: JSON-lines file receiving every record, with event fields
+        progress_interval: Seconds between PhaseLog progress lines
+        max_bytes: Rotation size of the log files
+        backup_count: Rotated files kept
+
+    Returns:
+        The process-wide LogPipeline
+    """
+    global _pipeline
+    formatter = logging.Formatter(fmt)
+    root = logging.getLogger()
+    with _lock:
+        if _pipeline is None:
+            adopted = [handler for handler in root.handlers if not isinstance(handler, logging.handlers.QueueHandler)]
+            for handler in adopted:
+                root.removeHandler(handler)
+            if console and not any(type(handler) is logging.StreamHandler for handler in adopted):
+                stream = logging.StreamHandler()
+                stream.setFormatter(formatter)
+                adopted.append(stream)
+            _pipeline = LogPipeline(adopted)
+            root.addHandler(_pipeline.handler)
+            _pipeline.start()
+            atexit.register(shutdown_logging)
+        for path, handler_fmt in ((log_file, formatter), (json_file, JsonEventFormatter())):
+            if path and os.path.abspath(path) not in _pipeline.files:
+                handler = _file_handler(path, handler_fmt, max_bytes, backup_count)
+                _pipeline.files[os.path.abspath(path)] = handler
+                _pipeline.add_handler(handler)
+    root.setLevel(level)
+    set_log_mode(mode)
+    if progress_interval is not None:
+        set_progress_interval(progress_interval)
+    return _pipeline
+
+
+def shutdown_logging():
+    """Flush queued records (registered with atexit by configure_logging)"""
+    with _lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+
+
+def set_log_mode(mode: str):
+    """'summary' switches successful per-ticker events off; 'verbose' switches them back on"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown log mode {mode!r}, expected one of {MODES}")
+    logging.getLogger(EVENT_LOGGER).setLevel(logging.WARNING if mode == 'summary' else logging.NOTSET)
+
+
+def set_progress_interval(seconds: float):
+    global _progress_interval
+    _progress_interval = seconds
+
+
+class TickerEvent:
+    """One ticker's outcome in one phase; rendered only when a handler writes it"""
+
+    __slots__ = ('phase', 'ticker', 'status', 'seconds', 'fields', 'index', 'total')
+
+    def __init__(self, phase: str, ticker: str, status: str, seconds: Optional[float],
+                 fields: Dict, index: int, total: Optional[int]):
+        self.phase = phase
+        self.ticker = ticker
+        self.status = status
+        self.seconds = seconds
+        self.fields = fields
+        self.index = index
+        self.total = total
+
+    def to_dict(self) -> Dict:
+        event = {'phase': self.phase, 'ticker': self.ticker, 'status': self.status, 'index': self.index}
+        if self.total is not None:
+            event['total'] = self.total
+        if self.seconds is not None:
+            event['seconds'] = round(self.seconds, 4)
+        event.update(self.fields)
+        return event
+
+    def __str__(self) -> str:
+        icon = '✅' if self.status == 'ok' else '❌'
+        position = f"[{self.index}/{self.total}] " if self.total else ''
+        timing = f" in {self.seconds:.2f}s" if self.seconds is not None else ''
+        details = ' '.join(f"{key}={value}" for key, value in self.fields.items())
+        return f"{icon} {position}{self.phase} {self.ticker}: {self.status}{timing}{' ' + details if details else ''}"
+
+
+class PhaseLog:
+    """Structured per-ticker events, rate-limited progress and a summary for one phase"""
+
+    def __init__(self, phase: str, total: Optional[int] = None, progress_interval: Optional[float] = None):
+        """
+        Args:
+            phase: Phase name written into every event
+            total: Number of tickers expected (for progress and ETA)
+            progress_interval: Seconds between progress lines (default: configure_logging's)
+        """
+        self.phase = phase
+        self.total = total
+        self.progress_interval = progress_interval
+        self.events = logging.getLogger(EVENT_LOGGER)
+        self.progress_logger = logging.getLogger(PROGRESS_LOGGER)
+        self.counts: Counter = Counter()
+        self.durations: List[float] = []
+        self.slowest: Optional[tuple] = None
+        self.done = 0
+        self.started = time.monotonic()
+        self._last_progress = self.started
+
+    def __enter__(self) -> 'PhaseLog':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def event(self, ticker: str, status: str = 'ok', seconds: Optional[float] = None, **fields):
+        """
+        Record one ticker's outcome.
+
+        status 'ok' is logged at INFO (off in summary mode), 'error' at ERROR
+        and anything else (e.g. 'failed', 'insufficient_data') at WARNING.
+        """
+        self.done += 1
+        self.counts[status] += 1
+        if seconds is not None:
+            self.durations.append(seconds)
+            if self.slowest is None or seconds > self.slowest[1]:
+                self.slowest = (ticker, seconds)
+
+        level = logging.INFO if status == 'ok' else logging.ERROR if status == 'error' else logging.WARNING
+        if self.events.isEnabledFor(level):
+            event = TickerEvent(self.phase, ticker, status, seconds, fields, self.done, self.total)
+            self.events.log(level, '%s', event, extra={'event': event})
+        self._maybe_progress()
+
+    def _maybe_progress(self):
+        now = time.monotonic()
+        interval = self.progress_interval if self.progress_interval is not None else _progress_interval
+        if now - self._last_progress < interval or not self.progress_logger.isEnabledFor(logging.INFO):
+            return
+        self._last_progress = now
+        elapsed = now - self.started
+        if self.total:
+            eta = (self.total - self.done) * elapsed / self.done
+            self.progress_logger.info("📊 %s: %d/%d (%.1f%%) %.1f/s, ETA %.1f min", self.phase, self.done,
+                                      self.total, self.done / self.total * 100, self.done / elapsed, eta / 60)
+        else:
+            self.progress_logger.info("📊 %s: %d done, %.1f/s", self.phase, self.done, self.done / elapsed)
+
+    def summary(self) -> Dict:
+        seconds = time.monotonic() - self.started
+        summary = {
+            'phase': self.phase,
+            'total': self.total,
+            'done': self.done,
+            'counts': dict(self.counts),
+            'seconds': round(seconds, 2),
+        }
+        if self.durations:
+            ordered = sorted(self.durations)
+            summary['p50_seconds'] = round(ordered[len(ordered) // 2], 4)
+            summary['p95_seconds'] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4)
+            summary['slowest'] = {'ticker': self.slowest[0], 'seconds': round(self.slowest[1], 4)}
+        return summary
+
+    def close(self):
+        """Write the phase summary line"""
+        summary = self.summary()
+        counts = ', '.join(f"{count} {status}" for status, count in sorted(self.counts.items())) or 'no tickers'
+        timing = ''
+        if self.durations:
+            timing = (f" (p50 {summary['p50_seconds']:.2f}s, p95 {summary['p95_seconds']:.2f}s, "
+                      f"slowest {self.slowest[0]} {self.slowest[1]:.2f}s)")
+        of_total = f" of {self.total}" if self.total is not None else ''
+        self.progress_logger.info("🎯 %s: %s%s in %.1f min%s", self.phase, counts, of_total,
+                                  summary['seconds'] / 60, timing)
@@ -11,8 +11,11 @@ from typing import Dict, List, Any, Optional
 import logging
 from dataclasses import dataclass, asdict
 import json
+from collections import deque
 from common_imports import psycopg2, DB_CONFIG, setup_logging
 from error_handler import ErrorHandler
+from tracing import Tracer, get_tracer
+from data_quality_stats import DataQualityStats, QUALITY_TABLES
 
 @dataclass
 class SystemMetrics:
@@ -49,9 +52,10 @@ class SystemMonitor:
     def __init__(self):
         self.error_handler = ErrorHandler("system_monitor")
         self.logger = logging.getLogger("system_monitor")
-        self.metrics_history: List[SystemMetrics] = []
-        self.service_health: Dict[str, ServiceHealth] = {}
         self.max_history_size = 1000
+        self.metrics_history: deque = deque(maxlen=self.max_history_size)
+        self.service_health: Dict[str, ServiceHealth] = {}
+        self._quality_stats: Optional[DataQualityStats] = None
         
     def get_system_metrics(self) -> SystemMetrics:
         """Get current system metrics"""
@@ -74,10 +78,8 @@ class SystemMonitor:
                 timestamp=datetime.now()
             )
             
-            # Store in history
+            # Store in history (bounded deque drops the oldest)
             self.metrics_history.append(metrics)
-            if len(self.metrics_history) > self.max_history_size:
-                self.metrics_history.pop(0)
             
             return metrics
             
@@ -214,7 +216,18 @@ class SystemMonitor:
         return health
     
     def check_data_quality(self, table_name: str) -> DataQualityMetrics:
-        """Check data quality for a specific table"""
+        """
+        Check data quality for a specific table.
+        
+        Tracked tables read their pre-aggregated summary row (constant time);
+        any other table is scanned.
+        """
+        if table_name in QUALITY_TABLES:
+            try:
+                return self._data_quality_from_stats(table_name)
+            except Exception as e:
+                self.logger.warning(f"Quality stats unavailable for {table_name}, scanning instead: {e}")
+        
         try:
             conn = psycopg2.connect(**DB_CONFIG)
             cur = conn.cursor()
@@ -289,6 +302,22 @@ class SystemMonitor:
             self.error_handler.handle_error(e, {'operation': 'check_data_quality', 'table': table_name})
             raise
     
+    def _data_quality_from_stats(self, table_name: str) -> DataQualityMetrics:
+        """DataQualityMetrics built from table_quality_summary"""
+        if self._quality_stats is None:
+            self._quality_stats = DataQualityStats()
+        summary = self._quality_stats.summary(table_name)
+        last_updated = summary.get('last_updated') or summary.get('refreshed_at') or datetime.now()
+        
+        return DataQualityMetrics(
+            total_records=summary['total_records'],
+            missing_data_count=summary['missing_data_count'],
+            duplicate_count=summary['duplicate_count'],
+            invalid_data_count=summary['invalid_data_count'],
+            last_updated=last_updated,
+            data_freshness_hours=(datetime.now() - last_updated).total_seconds() / 3600
+        )
+    
     def get_system_health_summary(self) -> Dict[str, Any]:
         """Get comprehensive system health summary"""
         try:
@@ -415,46 +444,38 @@ class SystemMonitor:
             raise
 
 class PerformanceMonitor:
-    """Performance monitoring for specific operations"""
+    """Performance monitoring for specific operations (backed by the tracer's histograms)"""
     
-    def __init__(self):
-        self.operation_times: Dict[str, List[float]] = {}
+    def __init__(self, tracer: Tracer = None):
+        self.tracer = tracer or get_tracer()
         self.error_handler = ErrorHandler("performance_monitor")
         self.logger = logging.getLogger("performance_monitor")
     
     def record_operation_time(self, operation: str, duration: float):
         """Record operation duration"""
-        if operation not in self.operation_times:
-            self.operation_times[operation] = []
-        
-        self.operation_times[operation].append(duration)
-        
-        # Keep only last 100 measurements
-        if len(self.operation_times[operation]) > 100:
-            self.operation_times[operation].pop(0)
+        self.tracer.record(operation, duration)
     
     def get_operation_stats(self, operation: str) -> Dict[str, float]:
         """Get statistics for an operation"""
-        if operation not in self.operation_times:
-            return {}
-        
-        times = self.operation_times[operation]
-        if not times:
+        histogram = self.tracer.histograms.get(operation)
+        if histogram is None or not histogram.count:
             return {}
         
         return {
-            'count': len(times),
-            'avg_time': sum(times) / len(times),
-            'min_time': min(times),
-            'max_time': max(times),
-            'total_time': sum(times)
+            'count': histogram.count,
+            'avg_time': histogram.mean,
+            'min_time': histogram.min,
+            'max_time': histogram.max,
+            'total_time': histogram.total,
+            'p50_time': histogram.quantile(0.5),
+            'p95_time': histogram.quantile(0.95)
         }
     
     def get_all_stats(self) -> Dict[str, Dict[str, float]]:
         """Get statistics for all operations"""
         return {
             operation: self.get_operation_stats(operation)
-            for operation in self.operation_times.keys()
+            for operation in list(self.tracer.histograms.keys())
         }
 
 # Global instances
@@ -24,7 +24,6 @@ Date: 2025-01-26
 
 import sys
 import os
-from datetime import date, datetime
 from typing import List, Dict, Optional, Set, Tuple, Any
 import logging
 import time
@@ -34,6 +33,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 # Add the parent directory to the path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from daily_run.bulk_ingest import QUOTE_CLOSE_FIELDS
 from daily_run.database import DatabaseManager
 from daily_run.simple_data_validator import SimpleDataValidator
 
@@ -56,6 +56,9 @@ class MultiServiceDataWorkflow:
         self.delay_between_requests = 2  # seconds
         self.max_concurrent_requests = 2  # Limited to avoid rate limits
         
+        # Price quotes fetched during a step, per source, written in one batch by flush_price_quotes
+        self._pending_quotes: Dict[str, Dict[str, Dict]] = {}
+        
         # Initialize all available services
         self._initialize_services()
     
@@ -202,6 +205,15 @@ class MultiServiceDataWorkflow:
                 print(f"    ⏳ Waiting {self.delay_between_requests}s before next ticker...")
                 time.sleep(self.delay_between_requests)
         
+        # Write the step's price quotes before anything re-validates them; a
+        # quote counts as fetched only once it is in daily_charts
+        failed_quotes = self.flush_price_quotes()
+        for ticker, error in failed_quotes.items():
+            if ticker in results:
+                results[ticker]['success'] = False
+                results[ticker]['error'] = error
+                print(f"    ❌ {ticker}: price not stored ({error})")
+        
         # Print fetch summary
         successful_fetches = sum(1 for result in results.values() if result.get('success', False))
         print(f"\n  📊 Multi-Service Fetch Summary: {successful_fetches}/{len(tickers)} successful")
@@ -470,45 +482,33 @@ class MultiServiceDataWorkflow:
             return False
     
     def _store_price_data_direct(self, ticker: str, data: Dict, source: str) -> bool:
-        """Store price data directly in database"""
-        try:
-            # Store in daily_charts table
-            query = """
-            INSERT INTO daily_charts 
-            (ticker, date, open, high, low, close, volume, data_source, last_updated)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (ticker, date)
-            DO UPDATE SET
-                open = EXCLUDED.open,
-                high = EXCLUDED.high,
-                low = EXCLUDED.low,
-                close = EXCLUDED.close,
-                volume = EXCLUDED.volume,
-                data_source = EXCLUDED.data_source,
-                last_updated = CURRENT_TIMESTAMP
-            """
-            
-            # Use current price for OHLC if not provided
-            current_price = data.get('price', 0)
-            
-            values = (
-                ticker,
-                date.today(),
-                data.get('open', current_price),
-                data.get('high', current_price),
-                data.get('low', current_price),
-                data.get('close', current_price),
-                data.get('volume'),
-                source,
-                datetime.now()
-            )
-            
-            self.db.execute_query(query, values)
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error storing price data for {ticker}: {e}")
+        """
+        Queue a price quote for the step's batch write (see flush_price_quotes).
+        
+        Returns False when the quote has no usable price, so the next service is tried.
+        """
+        if not any(data.get(field) for field in QUOTE_CLOSE_FIELDS):
+            logger.warning(f"No usable price from {source} for {ticker}")
             return False
+        self._pending_quotes.setdefault(source, {})[ticker] = data
+        return True
+    
+    def flush_price_quotes(self) -> Dict[str, str]:
+        """
+        Store the queued price quotes, one binary COPY upsert per source.
+        
+        Returns:
+            {ticker: error} for quotes whose source batch failed to store
+        """
+        pending, self._pending_quotes = self._pending_quotes, {}
+        failed = {}
+        for source, quotes in pending.items():
+            try:
+                self.db.upsert_daily_quotes(quotes, source=source)
+            except Exception as e:
+                logger.error(f"Error storing {len(quotes)} {source} price quotes: {e}")
+                failed.update({ticker: f"{source} price store failed: {e}" for ticker in quotes})
+        return failed
     
     def step4_revalidate_data(self, tickers: List[str]) -> Dict[str, Dict]:
         """
@@ -986,6 +986,7 @@ class MultiServiceDataWorkflow:
     
     def cleanup(self):
         """Clean up resources"""
+        self.flush_price_quotes()
         try:
             for service in self.services.values():
                 if hasattr(service, 'close'):
@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+
+Repeatable timing harness for the daily pipeline's hot paths. Runs against a
+deterministic synthetic universe (700 or 5,000 tickers by default) with
+mocked providers and an in-memory SQLite stand-in for Postgres, timing
+each stage on its own:
+
+- price_ingest: provider fetch (mocked), cents conversion, upsert
+- price_windows / price_windows_dicts: each ticker's 100-bar window read back
+  as a columnar PriceFrame, and the List[Dict] -> DataFrame path it replaces
+- history_stream / history_fetchall: the whole universe's history read in one
+  query, streamed in batches into per-ticker PriceFrames (prefetched on a
+  background thread), and the fetchall -> DataFrame -> groupby path
+- indicators: indicators/* (EMA, RSI, MACD, Bollinger, ATR, ADX, CCI, Stochastic, VWAP)
+- universal_technical: UniversalTechnicalScoreCalculator.calculate_enhanced_technical_scores
+- support_resistance: indicators.support_resistance.calculate_support_resistance
+- ratios_vectorized / ratios_scalar: universe ratio engine and the per-ticker calculator
+- analyst_scorer / fundamental_scorer: scorers with their data sources mocked
+- db_writes: technical indicator and score rows written back
+
+Results are written as JSON and compared with a stored baseline; a stage
+regresses when it is slower than baseline by more than its threshold (and by
+more than a small absolute floor that absorbs timer noise). The exit status
+is non-zero on regressions, and on stages that have no baseline entry, so
+the benchmark can gate a merge. Baselines for
+700 and 5,000 tickers are checked in (benchmark_baseline.json); re-record
+them with --update-baseline whenever a benchmarked path changes.
+
+With --memory every stage is run once more under tracemalloc (after the
+timed runs, so tracing does not skew the timings) to record its peak traced
+memory and the number of allocated blocks it leaves behind.
+
+Usage:
+    python daily_run/pipeline_benchmark.py --tickers 700
+    python daily_run/pipeline_benchmark.py --tickers 5000 --threshold 0.3 --stage-threshold indicators=0.5
+    python daily_run/pipeline_benchmark.py --tickers 700 5000 --update-baseline
+    python daily_run/pipeline_benchmark.py --tickers 700 --memory --stages price_windows price_windows_dicts
+    python daily_run/pipeline_benchmark.py --tickers 5000 --memory --stages history_stream history_fetchall
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_ingest import price_frame_to_cents, OHLCV_COLUMNS
+from price_frame import PriceFrame, iter_ticker_frames
+from row_stream import iter_batches, prefetch
+from vectorized_ratio_engine import FUNDAMENTAL_COLUMNS, compute_ratios
+from simple_ratio_calculator import calculate_ratios
+from indicators.ema import calculate_ema
+from indicators.rsi import calculate_rsi
+from indicators.macd import calculate_macd
+from indicators.bollinger_bands import calculate_bollinger_bands
+from indicators.atr import calculate_atr
+from indicators.adx import calculate_adx
+from indicators.cci import calculate_cci
+from indicators.stochastic import calculate_stochastic
+from indicators.vwap import calculate_vwap
+from indicators.support_resistance import calculate_support_resistance
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.25        # 25% slower than baseline is a regression
+MIN_REGRESSION_SECONDS = 0.05   # ignore deltas below timer/scheduler noise
+DEFAULT_SEED = 20240601
+SCORER_IMPORT_STUBS = ('calc_technical_scores', 'enhanced_sentiment_analyzer')
+WINDOW_DAYS = 100               # bars per ticker the nightly technicals read
+
+WINDOW_QUERY = """
+    SELECT date, open, high, low, close, volume
+    FROM daily_charts
+    WHERE ticker = ?
+    ORDER BY date DESC
+    LIMIT ?
+"""
+
+HISTORY_ITERSIZE = 5000          # rows per fetch for the streamed history read
+HISTORY_QUERY = """
+    SELECT ticker, date, open, high, low, close, volume
+    FROM daily_charts
+    ORDER BY ticker, date
+"""
+
+
+@dataclass
+class StageResult:
+    """Timing for one benchmark stage"""
+    name: str
+    seconds: float = 0.0
+    items: int = 0
+    status: str = 'ok'
+    detail: Optional[str] = None
+    peak_kib: Optional[float] = None
+    net_blocks: Optional[int] = None
+
+    @property
+    def per_item_ms(self) -> Optional[float]:
+        return 1000 * self.seconds / self.items if self.items else None
+
+    def to_dict(self) -> Dict:
+        result = asdict(self)
+        result['per_item_ms'] = round(self.per_item_ms, 4) if self.per_item_ms is not None else None
+        result['seconds'] = round(self.seconds, 4)
+        if self.peak_kib is not None:
+            result['peak_kib'] = round(self.peak_kib, 1)
+        return result
+
+
+@dataclass
+class Regression:
+    stage: str
+    baseline_seconds: float
+    seconds: float
+    threshold: float
+
+    @property
+    def slowdown(self) -> float:
+        return self.seconds / self.baseline_seconds - 1 if self.baseline_seconds else float('inf')
+
+    def __str__(self) -> str:
+        return (f"{self.stage}: {self.seconds:.3f}s vs baseline {self.baseline_seconds:.3f}s "
+                f"(+{self.slowdown:.0%}, limit +{self.threshold:.0%})")
+
+
+class SyntheticUniverse:
+    """
+    Deterministic synthetic market: OHLCV history, fundamentals and analyst data.
+
+    The same (n_tickers, n_days, seed) always yields identical data, so timings
+    compare like with like across runs and machines.
+    """
+
+    def __init__(self, n_tickers: int, n_days: int = 260, seed: int = DEFAULT_SEED,
+                 end_date: date = date(2024, 6, 28)):
+        self.n_tickers = n_tickers
+        self.n_days = n_days
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.tickers = [f"S{i:04d}" for i in range(n_tickers)]
+        self.dates = pd.bdate_range(end=end_date, periods=n_days)
+
+        start = rng.uniform(5, 500, n_tickers)
+        returns = rng.normal(0.0004, 0.02, (n_days, n_tickers))
+        close = start * np.exp(np.cumsum(returns, axis=0))
+        spread = np.abs(rng.normal(0, 0.01, (n_days, n_tickers)))
+        open_ = close * (1 + rng.normal(0, 0.005, (n_days, n_tickers)))
+        self.close = np.round(close, 2)
+        self.open = np.round(open_, 2)
+        self.high = np.round(np.maximum(open_, close) * (1 + spread), 2)
+        self.low = np.round(np.minimum(open_, close) * (1 - spread), 2)
+        self.volume = rng.integers(10_000, 50_000_000, (n_days, n_tickers))
+
+        revenue = rng.uniform(1e8, 5e11, n_tickers)
+        margin = rng.uniform(-0.1, 0.35, n_tickers)
+        assets = revenue * rng.uniform(0.5, 3, n_tickers)
+        equity = assets * rng.uniform(0.1, 0.7, n_tickers)
+        shares = rng.uniform(1e7, 1e10, n_tickers)
+        self.fundamentals = pd.DataFrame({
+            'revenue': revenue,
+            'gross_profit': revenue * rng.uniform(0.2, 0.7, n_tickers),
+            'operating_income': revenue * margin * 1.3,
+            'net_income': revenue * margin,
+            'ebitda': revenue * (margin + 0.1),
+            'eps_diluted': revenue * margin / shares,
+            'book_value_per_share': equity / shares,
+            'total_assets': assets,
+            'total_debt': assets * rng.uniform(0, 0.5, n_tickers),
+            'total_equity': equity,
+            'cash_and_equivalents': assets * rng.uniform(0.02, 0.3, n_tickers),
+            'operating_cash_flow': revenue * (margin + 0.05),
+            'free_cash_flow': revenue * margin * 0.8,
+            'capex': revenue * rng.uniform(0.01, 0.1, n_tickers),
+            'shares_outstanding': shares,
+            'shares_float': shares * 0.9,
+            'current_assets': assets * 0.4,
+            'current_liabilities': assets * rng.uniform(0.1, 0.4, n_tickers),
+            'inventory': assets * rng.uniform(0, 0.15, n_tickers),
+            'accounts_receivable': revenue * 0.1,
+            'accounts_payable': revenue * 0.08,
+            'cost_of_goods_sold': revenue * 0.5,
+            'interest_expense': revenue * 0.01,
+            'retained_earnings': equity * 0.5,
+            'total_liabilities': assets - equity,
+            'earnings_growth_yoy': rng.normal(5, 15, n_tickers),
+        }, index=pd.Index(self.tickers, name='ticker'))
+        for column in ('revenue', 'net_income', 'free_cash_flow'):
+            self.fundamentals[f"{column}_previous"] = self.fundamentals[column] * rng.uniform(0.8, 1.1, n_tickers)
+
+        counts = rng.integers(0, 12, (n_tickers, 5))
+        self.recommendations = {
+            ticker: {
+                'strong_buy_count': int(c[0]), 'buy_count': int(c[1]), 'hold_count': int(c[2]),
+                'sell_count': int(c[3]), 'strong_sell_count': int(c[4]),
+                'price_target': float(self.close[-1, i] * rng.uniform(0.8, 1.4)),
+            } for i, (ticker, c) in enumerate(zip(self.tickers, counts))
+        }
+        self.earnings = {
+            ticker: {'earnings_calendar': {'date': (end_date + timedelta(days=int(d))).isoformat(),
+                                           'eps_estimate': 1.0, 'eps_actual': 1.05},
+                     'next_earnings': {'days_until_earnings': int(d)}}
+            for ticker, d in zip(self.tickers, rng.integers(1, 90, n_tickers))
+        }
+
+    def price_frame(self, i: int) -> pd.DataFrame:
+        """yfinance-shaped frame for one ticker (what a price provider returns)"""
+        return pd.DataFrame({
+            'Open': self.open[:, i], 'High': self.high[:, i], 'Low': self.low[:, i],
+            'Close': self.close[:, i], 'Volume': self.volume[:, i],
+        }, index=self.dates)
+
+    def ohlcv(self, i: int, days: Optional[int] = None) -> pd.DataFrame:
+        """Lower-case OHLCV frame as scorers load it from daily_charts"""
+        frame = pd.DataFrame({
+            'date': self.dates, 'open': self.open[:, i], 'high': self.high[:, i],
+            'low': self.low[:, i], 'close': self.close[:, i], 'volume': self.volume[:, i].astype(float),
+        })
+        return frame.iloc[-days:].reset_index(drop=True) if days else frame
+
+
+class MockPriceProvider:
+    """Stands in for the Yahoo/FMP batch price services"""
+
+    def __init__(self, universe: SyntheticUniverse):
+        self.universe = universe
+        self._index = {ticker: i for i, ticker in enumerate(universe.tickers)}
+        self.calls = 0
+
+    def get_batch_history(self, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+        self.calls += 1
+        return {ticker: self.universe.price_frame(self._index[ticker]) for ticker in tickers}
+
+
+def create_sqlite_standin() -> sqlite3.Connection:
+    """In-memory database with the tables the benchmarked stages touch"""
+    # history_stream fetches on its prefetch thread
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.executescript("""
+        CREATE TABLE daily_charts (
+            ticker TEXT NOT NULL, date TEXT NOT NULL,
+            open INTEGER, high INTEGER, low INTEGER, close INTEGER, volume INTEGER,
+            PRIMARY KEY (ticker, date)
+        );
+        CREATE TABLE technical_indicators (
+            ticker TEXT NOT NULL, date TEXT NOT NULL,
+            ema_20 REAL, ema_50 REAL, rsi_14 REAL, macd_line REAL, macd_signal REAL,
+            bb_upper REAL, bb_lower REAL, atr_14 REAL, adx_14 REAL, cci_20 REAL,
+            stoch_k REAL, stoch_d REAL, vwap REAL, support_1 REAL, resistance_1 REAL,
+            PRIMARY KEY (ticker, date)
+        );
+        CREATE TABLE daily_scores (
+            ticker TEXT NOT NULL, date TEXT NOT NULL,
+            technical_score REAL, analyst_score REAL, fundamental_score REAL,
+            PRIMARY KEY (ticker, date)
+        );
+    """)
+    return conn
+
+
+@contextmanager
+def quiet_logging():
+    """Per-ticker info/warning logging would dominate the timings; keep errors only"""
+    previous = logging.root.manager.disable
+    logging.disable(logging.WARNING)
+    try:
+        yield
+    finally:
+        logging.disable(previous)
+
+
+class PipelineBenchmark:
+    """Runs each pipeline stage against a SyntheticUniverse and times it"""
+
+    def __init__(self, n_tickers: int = 700, n_days: int = 260, seed: int = DEFAULT_SEED,
+                 repeat: int = 1, stages: Optional[List[str]] = None, memory: bool = False):
+        self.universe = SyntheticUniverse(n_tickers, n_days, seed)
+        self.repeat = max(1, repeat)
+        self.conn = create_sqlite_standin()
+        self.provider = MockPriceProvider(self.universe)
+        self.only = set(stages) if stages else None
+        self.memory = memory
+        self._windows: List[Any] = []
+        self._history_closes: Dict[str, float] = {}
+        self._indicator_rows: List[tuple] = []
+        self._scores: Dict[str, Dict[str, float]] = {}
+        self._prices = pd.Series(self.universe.close[-1], index=self.universe.tickers)
+
+    # Stages -----------------------------------------------------------------
+
+    def stage_price_ingest(self) -> int:
+        rows = 0
+        batch_size = 100
+        for start in range(0, self.universe.n_tickers, batch_size):
+            frames = self.provider.get_batch_history(self.universe.tickers[start:start + batch_size])
+            batch = pd.concat([price_frame_to_cents(frame, ticker) for ticker, frame in frames.items()])
+            self.conn.executemany(
+                "INSERT INTO daily_charts (ticker, date, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (ticker, date) DO UPDATE SET open = excluded.open, high = excluded.high, "
+                "low = excluded.low, close = excluded.close, volume = excluded.volume",
+                batch[OHLCV_COLUMNS].astype(object).where(batch[OHLCV_COLUMNS].notna(), None).itertuples(index=False, name=None))
+            rows += len(batch)
+        self.conn.commit()
+        return rows
+
+    def stage_price_windows(self) -> int:
+        self._windows = []
+        cursor = self.conn.cursor()
+        for ticker in self.universe.tickers:
+            cursor.execute(WINDOW_QUERY, (ticker, WINDOW_DAYS))
+            self._windows.append(PriceFrame.from_cursor(cursor, scale=100))
+        return len(self._windows)
+
+    def stage_price_windows_dicts(self) -> int:
+        """The path PriceFrame replaces: fetch_all_dict rows, DataFrame, to_numeric, copy"""
+        self._windows = []
+        cursor = self.conn.cursor()
+        for ticker in self.universe.tickers:
+            cursor.execute(WINDOW_QUERY, (ticker, WINDOW_DAYS))
+            columns = [description[0] for description in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            df = pd.DataFrame(rows, columns=columns).sort_values('date').reset_index(drop=True)
+            for column in ('open', 'high', 'low', 'close', 'volume'):
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+            for column in ('open', 'high', 'low', 'close'):
+                df[column] = df[column] / 100
+            self._windows.append(df.copy())
+        return len(self._windows)
+
+    def stage_history_stream(self) -> int:
+        """Universe history in HISTORY_ITERSIZE-row batches, one PriceFrame per ticker at a time"""
+        self._history_closes = {}
+        cursor = self.conn.cursor()
+        cursor.execute(HISTORY_QUERY)
+        for ticker, prices in iter_ticker_frames(prefetch(iter_batches(cursor, HISTORY_ITERSIZE)), scale=100):
+            self._history_closes[ticker] = float(prices.close[-20:].mean())
+        return len(self._history_closes)
+
+    def stage_history_fetchall(self) -> int:
+        """The path history_stream replaces: every row fetched, one DataFrame, groupby"""
+        self._history_closes = {}
+        cursor = self.conn.cursor()
+        cursor.execute(HISTORY_QUERY)
+        frame = pd.DataFrame(cursor.fetchall(), columns=['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'])
+        for column in ('open', 'high', 'low', 'close'):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype(float) / 100
+        for ticker, prices in frame.groupby('ticker', sort=False):
+            self._history_closes[ticker] = float(prices['close'].iloc[-20:].mean())
+        return len(self._history_closes)
+
+    def stage_indicators(self) -> int:
+        self._indicator_rows = []
+        last_date = self.universe.dates[-1].strftime('%Y-%m-%d')
+        for i, ticker in enumerate(self.universe.tickers):
+            df = self.universe.ohlcv(i, 200)
+            high, low, close, volume = df['high'], df['low'], df['close'], df['volume']
+            ema_20 = calculate_ema(close, 20)
+            ema_50 = calculate_ema(close, 50)
+            rsi = calculate_rsi(close, 14)
+            macd_line, macd_signal, _ = calculate_macd(close)
+            bb_upper, _, bb_lower = calculate_bollinger_bands(close)
+            atr = calculate_atr(high, low, close)
+            adx = calculate_adx(high, low, close)
+            cci = calculate_cci(high, low, close)
+            stoch_k, stoch_d = calculate_stochastic(high, low, close)
+            vwap = calculate_vwap(high, low, close, volume)
+            self._indicator_rows.append([
+                ticker, last_date,
+                *(float(series.iloc[-1]) for series in (ema_20, ema_50, rsi, macd_line, macd_signal,
+                                                       bb_upper, bb_lower, atr, adx, cci,
+                                                       stoch_k, stoch_d, vwap)),
+                None, None])
+        return len(self._indicator_rows)
+
+    def stage_support_resistance(self) -> int:
+        levels = {}
+        for i, ticker in enumerate(self.universe.tickers):
+            df = self.universe.ohlcv(i, 200)
+            result = calculate_support_resistance(df['high'], df['low'], df['close'], df['volume'])
+            levels[ticker] = (float(result['support_1'].iloc[-1]), float(result['resistance_1'].iloc[-1]))
+        for row in self._indicator_rows:
+            row[-2], row[-1] = levels.get(row[0], (None, None))
+        return len(levels)
+
+    def stage_universal_technical(self) -> int:
+        from calc_technical_scores_universal import UniversalTechnicalScoreCalculator
+        calculator = UniversalTechnicalScoreCalculator()
+        index = {ticker: i for i, ticker in enumerate(self.universe.tickers)}
+        with patch.object(calculator, 'get_clean_ticker_data',
+                          side_effect=lambda ticker, days=60: self.universe.ohlcv(index[ticker], days)):
+            for ticker in self.universe.tickers:
+                result = calculator.calculate_enhanced_technical_scores(ticker)
+                if result:
+                    self._scores.setdefault(ticker, {})['technical_score'] = result['technical_score']
+        return self.universe.n_tickers
+
+    def stage_ratios_vectorized(self) -> int:
+        ratios = compute_ratios(self.universe.fundamentals, self._prices)
+        return len(ratios)
+
+    def stage_ratios_scalar(self) -> int:
+        records = self.universe.fundamentals[[c for c in FUNDAMENTAL_COLUMNS
+                                              if c in self.universe.fundamentals.columns]].to_dict('index')
+        for ticker, record in records.items():
+            record['current_price'] = float(self._prices[ticker])
+            record['market_cap'] = record['current_price'] * record['shares_outstanding']
+            calculate_ratios(record)
+        return len(records)
+
+    def stage_analyst_scorer(self) -> int:
+        from analyst_scorer import AnalystScorer
+        scorer = AnalystScorer(db=MagicMock())
+        u = self.universe
+        with patch.object(scorer, 'get_earnings_calendar_data', side_effect=lambda t: u.earnings[t]), \
+                patch.object(scorer, 'get_analyst_recommendations', side_effect=lambda t: dict(u.recommendations[t])), \
+                patch.object(scorer, 'get_current_price', side_effect=lambda t: float(self._prices[t])), \
+                patch.object(scorer, '_get_industry_adjustment', return_value=0):
+            for ticker in u.tickers:
+                result = scorer.calculate_analyst_score(ticker, u.dates[-1].date())
+                self._scores.setdefault(ticker, {})['analyst_score'] = result.get('composite_analyst_score')
+        return u.n_tickers
+
+    def stage_fundamental_scorer(self) -> int:
+        # calc_technical_scores and enhanced_sentiment_analyzer are not in the tree; the scorer
+        # only imports them for collaborators that are mocked below, like the providers
+        # (patch.dict restores sys.modules on exit, so the module is held by reference)
+        stubs = {name: sys.modules.get(name) or MagicMock() for name in SCORER_IMPORT_STUBS}
+        with patch.dict(sys.modules, stubs):
+            import calc_fundamental_scores as scores
+        with patch.object(scores, 'TechnicalScoreCalculator'), \
+                patch.object(scores, 'EnhancedSentimentAnalyzer'), \
+                patch.object(scores, 'ChangeTracker'):
+            calculator = scores.FundamentalScoreCalculator()
+        calculator.sentiment_analyzer.get_stored_sentiment.return_value = {'sentiment_score': 0}
+        records = self.universe.fundamentals.to_dict('index')
+        for ticker, record in records.items():
+            data = dict(record, ticker=ticker, sector='Technology')
+            with patch.object(calculator, 'get_fundamental_data', return_value=data), \
+                    patch.object(calculator, 'get_current_price', return_value=float(self._prices[ticker])):
+                result = calculator.calculate_fundamental_scores(ticker)
+            if result:
+                self._scores.setdefault(ticker, {})['fundamental_score'] = result.get('fundamental_health_score')
+        return len(records)
+
+    def stage_db_writes(self) -> int:
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO technical_indicators VALUES ({', '.join('?' * 17)})",
+            [tuple(row) for row in self._indicator_rows])
+        score_date = self.universe.dates[-1].strftime('%Y-%m-%d')
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO daily_scores VALUES (?, ?, ?, ?, ?)",
+            [(ticker, score_date, s.get('technical_score'), s.get('analyst_score'), s.get('fundamental_score'))
+             for ticker, s in self._scores.items()])
+        self.conn.commit()
+        return len(self._indicator_rows) + len(self._scores)
+
+    STAGES = ['price_ingest', 'price_windows', 'price_windows_dicts', 'history_stream', 'history_fetchall',
+              'indicators', 'support_resistance', 'universal_technical', 'ratios_vectorized', 'ratios_scalar', 'analyst_scorer', 'fundamental_scorer', 'db_writes']
+    READ_STAGES = {'price_windows', 'price_windows_dicts', 'history_stream', 'history_fetchall'}
+
+    # Runner -----------------------------------------------------------------
+
+    def _time_stage(self, name: str, func: Callable[[], int]) -> StageResult:
+        best = None
+        items = 0
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            items = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return StageResult(name=name, seconds=best, items=items)
+
+    def _measure_memory(self, result: StageResult, func: Callable[[], int]):
+        """Peak traced memory and allocated blocks left behind by one more run of a stage"""
+        self._windows = []
+        tracemalloc.start()
+        try:
+            blocks = sys.getallocatedblocks()
+            func()
+            result.net_blocks = sys.getallocatedblocks() - blocks
+            result.peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+    def run(self) -> Dict[str, Any]:
+        """Run every stage and return the JSON-serialisable result"""
+        stages = {}
+        with quiet_logging():
+            if self.only and 'price_ingest' not in self.only and self.only & self.READ_STAGES:
+                # The window and history stages read back what price_ingest writes
+                self.stage_price_ingest()
+            for name in self.STAGES:
+                if self.only and name not in self.only:
+                    continue
+                func = getattr(self, f"stage_{name}")
+                try:
+                    stages[name] = self._time_stage(name, func)
+                    if self.memory:
+                        self._measure_memory(stages[name], func)
+                except ImportError as e:
+                    stages[name] = StageResult(name=name, status='skipped', detail=f"import failed: {e}")
+                except Exception as e:
+                    stages[name] = StageResult(name=name, status='error', detail=str(e))
+                result = stages[name]
+                print(f"  {name:<22} {result.status:<8} {result.seconds:8.3f}s"
+                      + (f"  ({result.items} items)" if result.items else f"  {result.detail or ''}")
+                      + (f"  peak {result.peak_kib / 1024:.1f} MiB, {result.net_blocks:+d} blocks"
+                         if result.peak_kib is not None else ''))
+
+        return {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'dataset': {'tickers': self.universe.n_tickers, 'days': self.universe.n_days,
+                        'seed': self.universe.seed},
+            'environment': {'python': platform.python_version(), 'machine': platform.machine(),
+                            'numpy': np.__version__, 'pandas': pd.__version__},
+            'repeat': self.repeat,
+            'stages': {name: result.to_dict() for name, result in stages.items()},
+            'total_seconds': round(sum(r.seconds for r in stages.values() if r.status == 'ok'), 4),
+        }
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any],
+                        threshold: float = DEFAULT_THRESHOLD,
+                        stage_thresholds: Optional[Dict[str, float]] = None,
+                        min_seconds: float = MIN_REGRESSION_SECONDS) -> List[Regression]:
+    """
+    Stages slower than their baseline by more than the allowed ratio.
+
+    Stages without an ok baseline cannot regress here; uncovered_stages()
+    reports them.
+
+    Args:
+        results: Output of PipelineBenchmark.run()
+        baseline: Baseline for the same dataset size (a previous run() output)
+        threshold: Allowed relative slowdown for every stage
+        stage_thresholds: Per-stage overrides of threshold
+        min_seconds: Absolute slowdown below which a stage never counts as regressed
+
+    Returns:
+        Regressions found (empty when the run passes the gate)
+    """
+    stage_thresholds = stage_thresholds or {}
+    regressions = []
+    for name, stage in results.get('stages', {}).items():
+        base = baseline.get('stages', {}).get(name)
+        if stage.get('status') != 'ok' or not base or base.get('status') != 'ok':
+            continue
+        limit = stage_thresholds.get(name, threshold)
+        if stage['seconds'] > base['seconds'] * (1 + limit) and stage['seconds'] - base['seconds'] > min_seconds:
+            regressions.append(Regression(name, base['seconds'], stage['seconds'], limit))
+    return regressions
+
+
+def uncovered_stages(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Stages that ran ok but have no ok baseline to compare against.
+
+    compare_to_baseline() cannot gate these, so main() fails the run until
+    the baseline is re-recorded with --update-baseline.
+    """
+    base_stages = baseline.get('stages', {})
+    return [name for name, stage in results.get('stages', {}).items()
+            if stage.get('status') == 'ok' and base_stages.get(name, {}).get('status') != 'ok']
+
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, Any]):
+    """Store results as the baseline for their dataset size, keeping other sizes"""
+    baselines = load_baselines(path)
+    baselines[str(results['dataset']['tickers'])] = results
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def parse_stage_thresholds(values: List[str]) -> Dict[str, float]:
+    thresholds = {}
+    for value in values or []:
+        name, _, limit = value.partition('=')
+        thresholds[name.strip()] = float(limit)
+    return thresholds
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the daily pipeline hot paths')
+    parser.add_argument('--tickers', type=int, nargs='+', default=[700], help='Universe sizes to run (e.g. 700 5000)')
+    parser.add_argument('--days', type=int, default=260, help='Trading days of history per ticker')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Dataset seed')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage (best time is kept)')
+    parser.add_argument('--stages', nargs='+', choices=PipelineBenchmark.STAGES, help='Only run these stages')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed relative slowdown')
+    parser.add_argument('--stage-threshold', action='append', metavar='STAGE=RATIO',
+                        help='Per-stage allowed slowdown, e.g. indicators=0.5')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--memory', action='store_true',
+                        help='Also record peak traced memory and retained allocations per stage')
+    args = parser.parse_args(argv)
+
+    stage_thresholds = parse_stage_thresholds(args.stage_threshold)
+    baselines = load_baselines(args.baseline)
+    all_results = {}
+    failed = False
+
+    for n_tickers in args.tickers:
+        print(f"\n📏 Benchmark: {n_tickers} tickers x {args.days} days (seed {args.seed})")
+        results = PipelineBenchmark(n_tickers, args.days, args.seed, args.repeat, args.stages, args.memory).run()
+        all_results[str(n_tickers)] = results
+        print(f"  {'total':<22} {'':<8} {results['total_seconds']:8.3f}s")
+
+        if args.update_baseline:
+            save_baseline(args.baseline, results)
+            print(f"  Baseline updated in {args.baseline}")
+            continue
+
+        baseline = baselines.get(str(n_tickers))
+        if not baseline:
+            print(f"  No baseline for {n_tickers} tickers - run with --update-baseline to record one")
+            continue
+        uncovered = uncovered_stages(results, baseline)
+        if uncovered:
+            failed = True
+            print(f"  ❌ No baseline for stages: {', '.join(uncovered)} - re-record with --update-baseline")
+        regressions = compare_to_baseline(results, baseline, args.threshold, stage_thresholds)
+        if regressions:
+            failed = True
+            print("  ❌ Regressions:")
+            for regression in regressions:
+                print(f"     {regression}")
+        elif not uncovered:
+            print("  ✅ No regressions against baseline")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(all_results, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
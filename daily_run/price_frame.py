@@ -0,0 +1,193 @@
+"""
+Price Frame
+
+Columnar container for one ticker's OHLCV window.
+
+Price windows used to travel as List[Dict] (a DictCursor row turned into a
+dict per bar), then became a DataFrame with pd.to_numeric(...).astype(float)
+per column, sort_values/reset_index, and another df.copy() in the scaling
+fix. PriceFrame holds six contiguous NumPy arrays instead: dates as
+datetime64[D], open/high/low/close as float64 and volume as int64. It is
+built straight from the cursor's row tuples (no per-row dicts); NULLs become
+NaN, rows without a date or close are dropped, rows are sorted ascending and
+duplicate dates keep the last row.
+
+Column access mirrors the subset of the DataFrame API the indicator code
+uses: frame['close'] is a pd.Series over the array without a copy,
+len(frame), frame.tail(n) (views, no copy) and frame.empty, so the
+indicators/* functions and the scorers' indicator methods accept a
+PriceFrame directly. to_frame() builds a DataFrame over the same arrays.
+
+iter_ticker_frames() turns a stream of row batches ordered by ticker (see
+DatabaseManager.stream_price_frames) into one PriceFrame per ticker.
+
+Usage:
+    frame = db.get_price_frame('AAPL', days=100)
+    rsi = calculate_rsi(frame['close'], 14)
+    frame.nbytes   # 48 bytes per bar
+"""
+
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
+
+def _dates(values: Sequence) -> np.ndarray:
+    try:
+        return np.array(values, dtype='datetime64[D]')
+    except (ValueError, TypeError):
+        # Unparseable text: NaT for that row instead of failing the window
+        return pd.to_datetime(pd.Series(values, dtype=object).astype(str).str[:10],
+                              errors='coerce').to_numpy(dtype='datetime64[D]')
+
+
+def _floats(values: Sequence) -> np.ndarray:
+    try:
+        return np.array(values, dtype='float64')
+    except (ValueError, TypeError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype='float64')
+
+
+class PriceFrame:
+    """One ticker's OHLCV bars as contiguous NumPy arrays, oldest first"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, date: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray):
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    # Construction --------------------------------------------------------------
+
+    @classmethod
+    def empty_frame(cls) -> 'PriceFrame':
+        prices = [np.empty(0, dtype='float64') for _ in PRICE_COLUMNS]
+        return cls(np.empty(0, dtype='datetime64[D]'), *prices, np.empty(0, dtype='int64'))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, scale: Optional[float] = None) -> 'PriceFrame':
+        """
+        Build from (date, open, high, low, close, volume) rows in any order.
+
+        Args:
+            rows: Tuples as returned by cursor.fetchall(), or mappings with those keys
+            scale: Divide prices by this (100 for cents as stored in daily_charts)
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return cls.empty_frame()
+        if isinstance(rows[0], Mapping):
+            return cls._from_columns([[row.get(name) for row in rows] for name in COLUMNS], scale)
+        return cls._from_columns(list(zip(*rows)), scale)
+
+    @classmethod
+    def from_cursor(cls, cursor, scale: Optional[float] = None) -> 'PriceFrame':
+        """Build from an executed cursor selecting date, open, high, low, close, volume"""
+        return cls.from_rows(cursor.fetchall(), scale)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, scale: Optional[float] = None) -> 'PriceFrame':
+        """Build from a DataFrame with lower-case OHLCV columns"""
+        if df is None or df.empty:
+            return cls.empty_frame()
+        return cls._from_columns([df[name].to_numpy() for name in COLUMNS], scale)
+
+    @classmethod
+    def _from_columns(cls, columns: Sequence[Sequence], scale: Optional[float]) -> 'PriceFrame':
+        prices = [_floats(values) for values in columns[1:5]]
+        if scale:
+            for values in prices:
+                values /= scale
+        volume = _floats(columns[5])
+        volume[~np.isfinite(volume)] = 0
+        return cls(_dates(columns[0]), *prices, volume.astype('int64'))._normalized()
+
+    def _normalized(self) -> 'PriceFrame':
+        """Drop bars without date or close, sort by date and keep the last of duplicate dates"""
+        frame = self
+        keep = ~np.isnat(frame.date) & ~np.isnan(frame.close)
+        if not keep.all():
+            frame = frame.take(np.flatnonzero(keep))
+        if len(frame) > 1 and not (frame.date[1:] > frame.date[:-1]).all():
+            order = np.argsort(frame.date, kind='stable')
+            dates = frame.date[order]
+            last = np.append(dates[1:] != dates[:-1], True)
+            frame = frame.take(order[last])
+        return frame
+
+    # DataFrame-like access -------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def __getitem__(self, name: str) -> pd.Series:
+        """Column as a pd.Series over the underlying array (no copy)"""
+        if name not in COLUMNS:
+            raise KeyError(name)
+        return pd.Series(getattr(self, name), name=name, copy=False)
+
+    def __repr__(self) -> str:
+        span = f", {self.date[0]}..{self.date[-1]}" if len(self) else ''
+        return f"PriceFrame({len(self)} bars{span})"
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    def tail(self, n: int) -> 'PriceFrame':
+        """Last n bars; the arrays are views into this frame"""
+        start = max(len(self) - n, 0)
+        return PriceFrame(*(getattr(self, name)[start:] for name in COLUMNS))
+
+    def take(self, indices: np.ndarray) -> 'PriceFrame':
+        return PriceFrame(*(getattr(self, name)[indices] for name in COLUMNS))
+
+    def replace(self, **columns: np.ndarray) -> 'PriceFrame':
+        """New frame with some columns swapped; the others are shared, not copied"""
+        arrays: Dict[str, Any] = {name: getattr(self, name) for name in COLUMNS}
+        arrays.update(columns)
+        return PriceFrame(**arrays)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame over the same arrays (date as datetime64)"""
+        return pd.DataFrame({name: getattr(self, name) for name in COLUMNS}, copy=False)
+
+
+def iter_ticker_frames(batches: Iterable[Sequence[tuple]],
+                       scale: Optional[float] = None) -> Iterator[Tuple[str, PriceFrame]]:
+    """
+    (ticker, PriceFrame) per ticker from batches of rows ordered by ticker.
+
+    Rows are (ticker, date, open, high, low, close, volume). A ticker whose
+    rows span a batch boundary is held back until its last row has arrived,
+    so at most one ticker's rows are carried from one batch to the next.
+    """
+    carry: list = []
+    for batch in batches:
+        rows = carry + list(batch) if carry else batch
+        if not rows:
+            continue
+        last = rows[-1][0]
+        tail = len(rows)
+        while tail and rows[tail - 1][0] == last:
+            tail -= 1
+        for ticker, run in groupby(rows[:tail], key=itemgetter(0)):
+            yield ticker, PriceFrame._from_columns(list(zip(*run))[1:], scale)
+        carry = rows[tail:]
+    if carry:
+        yield carry[0][0], PriceFrame._from_columns(list(zip(*carry))[1:], scale)
@@ -0,0 +1,508 @@
+"""
+Quota Ledger
+
+Single source of truth for API quotas across the daily pipeline.
+
+Minute windows are enforced in-process with token buckets (one per
+provider/account). Daily quotas live in a persistent counter table that is
+incremented atomically with a conditional upsert, so concurrent threads,
+parallel processes and restarted runs all draw from the same daily budget:
+
+    INSERT ... ON CONFLICT (...) DO UPDATE
+        SET calls_made = calls_made + n
+        WHERE calls_made + n <= limit
+    RETURNING calls_made
+
+No returned row means the daily quota is exhausted. The ledger lives in
+PostgreSQL by default; setting QUOTA_LEDGER_PATH switches to a local SQLite
+file in WAL mode (useful for local runs and tests). If the persistent store
+is unreachable the ledger falls back to an in-memory counter and logs it.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class QuotaLimits:
+    """Per-account limits for a provider (None means unlimited)"""
+    per_minute: Optional[int] = None
+    per_day: Optional[int] = None
+
+
+# Free-tier limits per API key; the same limits APIRateLimiter enforced before
+# the ledger, so services that only go through the ledger keep their throughput
+DEFAULT_QUOTAS: Dict[str, QuotaLimits] = {
+    'yahoo': QuotaLimits(per_minute=60, per_day=None),
+    'fmp': QuotaLimits(per_minute=30, per_day=1000),
+    'alpha_vantage': QuotaLimits(per_minute=5, per_day=500),
+    'finnhub': QuotaLimits(per_minute=60, per_day=None),
+    'polygon': QuotaLimits(per_minute=300, per_day=None),
+}
+
+# Names used for the same provider in different services
+PROVIDER_ALIASES = {
+    'alphavantage': 'alpha_vantage',
+    'yahoo_finance': 'yahoo',
+    'yfinance': 'yahoo',
+    'financial_modeling_prep': 'fmp',
+    'polygon.io': 'polygon',
+}
+
+
+def normalize_provider(provider: str) -> str:
+    """Map service names ('Alpha Vantage', 'yahoo_finance', ...) to ledger provider keys"""
+    key = provider.strip().lower().replace(' ', '_').replace('-', '_')
+    return PROVIDER_ALIASES.get(key, key)
+
+
+def account_for_key(api_key: Optional[str]) -> str:
+    """
+    Ledger account for an API key.
+
+    Derived from the key itself (never stored in clear), so every service
+    holding the same key draws from one bucket and one daily counter.
+    """
+    if not api_key:
+        return ''
+    return 'key-' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+def quota_day() -> str:
+    """Quota day key; providers reset their daily quotas at midnight UTC"""
+    return datetime.utcnow().date().isoformat()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously over a one-minute window.
+
+    Unlike a list of call timestamps, acquiring and checking are O(1) and the
+    bucket never grows with call volume.
+    """
+
+    def __init__(self, per_minute: int, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, n: int = 1) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= n:
+                self._tokens -= n
+                return True
+            return False
+
+    def refund(self, n: int = 1):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + n)
+
+    def consume(self, n: int = 1):
+        """Take tokens unconditionally (for calls that were already made)"""
+        with self._lock:
+            self._refill()
+            self._tokens -= n
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider answered HTTP 429"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+
+    def wait_time(self, n: int = 1) -> float:
+        """Seconds until n tokens are available"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= n:
+                return 0.0
+            return (n - self._tokens) / self.rate
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return max(0.0, self._tokens)
+
+
+class MemoryQuotaBackend:
+    """Per-process daily counters; used as the fallback when no persistent store is reachable"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._counts: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, provider: str, account: str, day: str, n: int, limit: Optional[int]) -> Optional[int]:
+        with self._lock:
+            key = (provider, account, day)
+            total = self._counts.get(key, 0) + n
+            if limit is not None and total > limit:
+                return None
+            self._counts[key] = total
+            return total
+
+    def usage(self, day: str) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            return {(p, a): c for (p, a, d), c in self._counts.items() if d == day}
+
+    def reset(self, provider: str, account: Optional[str], day: str):
+        with self._lock:
+            for key in [k for k in self._counts if k[0] == provider and k[2] == day
+                        and (account is None or k[1] == account)]:
+                del self._counts[key]
+
+
+class SQLiteQuotaBackend:
+    """Daily counters in a local SQLite file (WAL mode, safe across processes)"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS api_quota_ledger (
+                    provider TEXT NOT NULL,
+                    account TEXT NOT NULL DEFAULT '',
+                    quota_date TEXT NOT NULL,
+                    calls_made INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT,
+                    PRIMARY KEY (provider, account, quota_date)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite serializes writers across processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, provider: str, account: str, day: str, n: int, limit: Optional[int]) -> Optional[int]:
+        if limit is not None and n > limit:
+            return None
+        row = self._connect().execute("""
+            INSERT INTO api_quota_ledger (provider, account, quota_date, calls_made, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (provider, account, quota_date) DO UPDATE SET
+                calls_made = api_quota_ledger.calls_made + excluded.calls_made,
+                updated_at = excluded.updated_at
+            WHERE ? IS NULL OR api_quota_ledger.calls_made + excluded.calls_made <= ?
+            RETURNING calls_made
+        """, (provider, account, day, n, datetime.utcnow().isoformat(), limit, limit)).fetchone()
+        return row[0] if row else None
+
+    def usage(self, day: str) -> Dict[Tuple[str, str], int]:
+        rows = self._connect().execute(
+            "SELECT provider, account, calls_made FROM api_quota_ledger WHERE quota_date = ?", (day,)
+        ).fetchall()
+        return {(row[0], row[1]): row[2] for row in rows}
+
+    def reset(self, provider: str, account: Optional[str], day: str):
+        if account is None:
+            self._connect().execute(
+                "DELETE FROM api_quota_ledger WHERE provider = ? AND quota_date = ?", (provider, day))
+        else:
+            self._connect().execute(
+                "DELETE FROM api_quota_ledger WHERE provider = ? AND account = ? AND quota_date = ?",
+                (provider, account, day))
+
+
+class PostgresQuotaBackend:
+    """Daily counters in the api_quota_ledger table of the main database"""
+
+    name = 'postgres'
+
+    def __init__(self, db=None):
+        if db is None:
+            try:
+                from .database import DatabaseManager
+            except ImportError:
+                from database import DatabaseManager
+            db = DatabaseManager()
+        self.db = db
+        # DatabaseManager shares one connection; keep transactions from interleaving
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def _ensure_table(self):
+        if self._table_ready:
+            return
+        self.db.execute_update("""
+            CREATE TABLE IF NOT EXISTS api_quota_ledger (
+                provider VARCHAR(30) NOT NULL,
+                account VARCHAR(30) NOT NULL DEFAULT '',
+                quota_date DATE NOT NULL,
+                calls_made INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (provider, account, quota_date)
+            )
+        """)
+        self._table_ready = True
+
+    def reserve(self, provider: str, account: str, day: str, n: int, limit: Optional[int]) -> Optional[int]:
+        if limit is not None and n > limit:
+            return None
+        with self._lock:
+            self._ensure_table()
+            row = self.db.fetch_one("""
+                INSERT INTO api_quota_ledger (provider, account, quota_date, calls_made)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (provider, account, quota_date) DO UPDATE SET
+                    calls_made = api_quota_ledger.calls_made + EXCLUDED.calls_made,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE %s::integer IS NULL OR api_quota_ledger.calls_made + EXCLUDED.calls_made <= %s::integer
+                RETURNING calls_made
+            """, (provider, account, day, n, limit, limit))
+        return row[0] if row else None
+
+    def usage(self, day: str) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            self._ensure_table()
+            rows = self.db.execute_query(
+                "SELECT provider, account, calls_made FROM api_quota_ledger WHERE quota_date = %s", (day,))
+        return {(row[0], row[1]): row[2] for row in rows or []}
+
+    def reset(self, provider: str, account: Optional[str], day: str):
+        with self._lock:
+            self._ensure_table()
+            if account is None:
+                self.db.execute_update(
+                    "DELETE FROM api_quota_ledger WHERE provider = %s AND quota_date = %s", (provider, day))
+            else:
+                self.db.execute_update(
+                    "DELETE FROM api_quota_ledger WHERE provider = %s AND account = %s AND quota_date = %s",
+                    (provider, account, day))
+
+
+class QuotaLedger:
+    """
+    Minute buckets plus persistent daily counters for every provider/account.
+
+    Usage:
+        if ledger.try_acquire('fmp'):
+            ... make the call ...
+        ledger.acquire('alpha_vantage', timeout=15)   # waits for the minute window
+        ledger.record('yahoo')                          # call already made, just count it
+    """
+
+    def __init__(self, backend=None, limits: Optional[Dict[str, QuotaLimits]] = None,
+                 clock=time.monotonic):
+        self.backend = backend if backend is not None else MemoryQuotaBackend()
+        self._limits: Dict[Tuple[str, Optional[str]], QuotaLimits] = {
+            (provider, None): quota for provider, quota in (limits or DEFAULT_QUOTAS).items()
+        }
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._fallback = None
+        # Last daily count seen per provider/account, so availability checks skip the store
+        self._seen: Dict[Tuple[str, str], Tuple[str, int]] = {}
+
+    # Configuration
+
+    def set_limits(self, provider: str, per_minute: Optional[int] = None,
+                   per_day: Optional[int] = None, account: Optional[str] = None):
+        """Set limits for a provider, or for one account of it"""
+        provider = normalize_provider(provider)
+        with self._lock:
+            self._limits[(provider, account)] = QuotaLimits(per_minute=per_minute, per_day=per_day)
+            for key in [k for k in self._buckets if k[0] == provider and (account is None or k[1] == account)]:
+                del self._buckets[key]
+
+    def limits(self, provider: str, account: str = '') -> QuotaLimits:
+        provider = normalize_provider(provider)
+        return (self._limits.get((provider, account))
+                or self._limits.get((provider, None))
+                or QuotaLimits())
+
+    def _bucket(self, provider: str, account: str) -> Optional[TokenBucket]:
+        per_minute = self.limits(provider, account).per_minute
+        if not per_minute:
+            return None
+        with self._lock:
+            bucket = self._buckets.get((provider, account))
+            if bucket is None:
+                bucket = self._buckets[(provider, account)] = TokenBucket(per_minute, self._clock)
+            return bucket
+
+    def _store(self):
+        return self._fallback or self.backend
+
+    def _reserve(self, provider: str, account: str, n: int, limit: Optional[int]) -> Optional[int]:
+        day = quota_day()
+        try:
+            total = self._store().reserve(provider, account, day, n, limit)
+        except Exception as e:
+            if self._fallback is not None:
+                raise
+            logger.warning(f"⚠️ Quota ledger {self.backend.name} backend unavailable, "
+                           f"falling back to in-process daily counters: {e}")
+            self._fallback = MemoryQuotaBackend()
+            total = self._fallback.reserve(provider, account, day, n, limit)
+        # A refused reservation means the stored count is at (or near) the limit
+        self._seen[(provider, account)] = (day, total if total is not None else limit)
+        return total
+
+    # Acquisition
+
+    def try_acquire(self, provider: str, n: int = 1, account: str = '') -> bool:
+        """Reserve n calls now; False if the minute window or daily quota is exhausted"""
+        provider = normalize_provider(provider)
+        bucket = self._bucket(provider, account)
+        if bucket is not None and not bucket.try_acquire(n):
+            return False
+        if self._reserve(provider, account, n, self.limits(provider, account).per_day) is None:
+            if bucket is not None:
+                bucket.refund(n)
+            return False
+        return True
+
+    def acquire(self, provider: str, n: int = 1, account: str = '',
+                timeout: Optional[float] = None) -> bool:
+        """
+        Reserve n calls, waiting for the minute window to refill.
+
+        Never waits on the daily quota: returns False as soon as it is exhausted
+        or when the minute window would not refill within the timeout.
+        """
+        provider = normalize_provider(provider)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        limits = self.limits(provider, account)
+        if limits.per_minute and n > limits.per_minute:
+            return False
+        while True:
+            if self.try_acquire(provider, n, account):
+                return True
+            remaining = self.remaining_today(provider, account)
+            if remaining is not None and remaining < n:
+                return False
+            bucket = self._bucket(provider, account)
+            wait = bucket.wait_time(n) if bucket is not None else 0.0
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(max(wait, 0.01))
+
+    def record(self, provider: str, n: int = 1, account: str = '') -> int:
+        """Count calls that were made without a prior reservation"""
+        provider = normalize_provider(provider)
+        bucket = self._bucket(provider, account)
+        if bucket is not None:
+            bucket.consume(n)
+        return self._reserve(provider, account, n, None) or 0
+
+    def throttle(self, provider: str, account: str = ''):
+        """Treat the minute window as exhausted (provider answered with a rate-limit error)"""
+        bucket = self._bucket(normalize_provider(provider), account)
+        if bucket is not None:
+            bucket.drain()
+
+    def reset_today(self, provider: str, account: Optional[str] = None):
+        """Forget today's daily usage for a provider (all accounts unless one is given)"""
+        provider = normalize_provider(provider)
+        self._store().reset(provider, account, quota_day())
+        for key in [k for k in self._seen if k[0] == provider and (account is None or k[1] == account)]:
+            del self._seen[key]
+
+    # Introspection
+
+    def calls_today(self, provider: str, account: str = '', refresh: bool = False) -> int:
+        """
+        Calls counted today. Uses the count returned by this process's last
+        reservation unless refresh is set or nothing was reserved yet.
+        """
+        key = (normalize_provider(provider), account)
+        seen = self._seen.get(key)
+        if not refresh and seen is not None and seen[0] == quota_day():
+            return seen[1]
+        calls = self._usage().get(key, 0)
+        self._seen[key] = (quota_day(), calls)
+        return calls
+
+    def remaining_today(self, provider: str, account: str = '') -> Optional[int]:
+        per_day = self.limits(provider, account).per_day
+        if per_day is None:
+            return None
+        return max(0, per_day - self.calls_today(provider, account))
+
+    def minute_tokens(self, provider: str, account: str = '') -> Optional[int]:
+        bucket = self._bucket(normalize_provider(provider), account)
+        return None if bucket is None else int(bucket.available)
+
+    def seconds_until_available(self, provider: str, account: str = '') -> float:
+        bucket = self._bucket(normalize_provider(provider), account)
+        return 0.0 if bucket is None else bucket.wait_time()
+
+    def available(self, provider: str, account: str = '') -> bool:
+        """Whether a call could be made right now (does not reserve it)"""
+        remaining = self.remaining_today(provider, account)
+        if remaining is not None and remaining <= 0:
+            return False
+        tokens = self.minute_tokens(provider, account)
+        return tokens is None or tokens >= 1
+
+    def _usage(self) -> Dict[Tuple[str, str], int]:
+        try:
+            usage = self._store().usage(quota_day())
+            day = quota_day()
+            self._seen.update({key: (day, calls) for key, calls in usage.items()})
+            return usage
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read quota usage: {e}")
+            return {}
+
+    def usage_report(self) -> Dict[str, Dict]:
+        """Today's usage per provider/account with limits and remaining calls"""
+        report = {}
+        for (provider, account), calls in sorted(self._usage().items()):
+            limits = self.limits(provider, account)
+            key = f"{provider}:{account}" if account else provider
+            report[key] = {
+                'calls_today': calls,
+                'daily_limit': limits.per_day,
+                'remaining_today': None if limits.per_day is None else max(0, limits.per_day - calls),
+                'per_minute': limits.per_minute,
+            }
+        return report
+
+
+_ledger: Optional[QuotaLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_quota_ledger() -> QuotaLedger:
+    """Process-wide ledger shared by every service"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            path = os.getenv('QUOTA_LEDGER_PATH')
+            try:
+                backend = SQLiteQuotaBackend(path) if path else PostgresQuotaBackend()
+            except Exception as e:
+                logger.warning(f"⚠️ Quota ledger store unavailable, using in-process counters: {e}")
+                backend = MemoryQuotaBackend()
+            _ledger = QuotaLedger(backend)
+        return _ledger
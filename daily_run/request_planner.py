@@ -0,0 +1,294 @@
+"""
+Request Planner
+
+Quota-aware allocation of API calls across the phases of the nightly run.
+
+At run start each phase reports its demand (tickers needing prices, history,
+fundamentals, analyst refreshes, ...). The planner converts demand into calls
+per provider using each phase's cost profile and allocates the remaining
+quotas from the quota ledger in order of phase value, not run order. A
+low-value phase that runs early (missing fundamentals) can therefore no
+longer spend the quota a high-value phase that runs late (analyst scores)
+depends on.
+
+Two kinds of capacity are planned:
+- Providers with a daily quota share one pool for the whole run.
+- Providers limited only per minute get capacity from each phase's time
+  budget (phases run one after another, so these do not compete).
+
+Each phase receives a PhaseBudget with its allocation and provider mix, spends
+from it while it runs, may borrow unallocated capacity, and returns what it
+did not use when it finishes. Phase reports show planned versus actual calls.
+"""
+
+import logging
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+try:
+    from .quota_ledger import get_quota_ledger, normalize_provider
+except ImportError:
+    from quota_ledger import get_quota_ledger, normalize_provider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PhaseProfile:
+    """How valuable a phase is and what one unit of its work costs per provider"""
+    value: int
+    calls_per_item: Dict[str, float]
+
+
+# Calls per ticker for each provider a phase can use (batch endpoints cost a fraction)
+PHASE_PROFILES: Dict[str, PhaseProfile] = {
+    'daily_prices': PhaseProfile(100, {'yahoo': 0.01, 'fmp': 0.01, 'finnhub': 1, 'alpha_vantage': 1}),
+    'earnings_fundamentals': PhaseProfile(90, {'yahoo': 1, 'finnhub': 1, 'fmp': 3, 'alpha_vantage': 3}),
+    'earnings_calendar': PhaseProfile(80, {'finnhub': 1, 'alpha_vantage': 1}),
+    'analyst_scores': PhaseProfile(70, {'finnhub': 1}),
+    'historical_data': PhaseProfile(50, {'yahoo': 0.005, 'finnhub': 1, 'fmp': 1, 'alpha_vantage': 1}),
+    'missing_fundamentals': PhaseProfile(40, {'yahoo': 1, 'finnhub': 1, 'fmp': 3, 'alpha_vantage': 3}),
+}
+
+
+@dataclass
+class PhaseBudget:
+    """API call budget handed to one phase"""
+    phase: str
+    value: int
+    demand_items: int
+    planned_items: int
+    calls_per_item: Dict[str, float]
+    allocation: Dict[str, int] = field(default_factory=dict)
+    spent: Dict[str, int] = field(default_factory=dict)
+    borrowed: Dict[str, int] = field(default_factory=dict)
+    released: bool = False
+    plan: Optional['RequestPlan'] = field(default=None, repr=False, compare=False)
+
+    @property
+    def providers(self) -> List[str]:
+        """Provider mix in order of preference"""
+        return list(self.allocation)
+
+    @property
+    def planned_calls(self) -> int:
+        return sum(self.allocation.values())
+
+    @property
+    def spent_calls(self) -> int:
+        return sum(self.spent.values())
+
+    @property
+    def remaining(self) -> int:
+        """Calls left in this phase's own allocation (excludes what could be borrowed)"""
+        return max(0, self.planned_calls + sum(self.borrowed.values()) - self.spent_calls)
+
+    def _left(self, provider: str) -> int:
+        return (self.allocation.get(provider, 0) + self.borrowed.get(provider, 0)
+                - self.spent.get(provider, 0))
+
+    def item_cost(self, provider: Optional[str] = None) -> int:
+        """Whole calls needed for one more item from a provider (default: the preferred one)"""
+        provider = normalize_provider(provider) if provider else (self.providers or list(self.calls_per_item) or [''])[0]
+        return max(1, math.ceil(self.calls_per_item.get(provider, 1)))
+
+    def can_spend(self, calls: int = 1, provider: Optional[str] = None) -> bool:
+        """Whether the phase may make `calls` more calls (own allocation or borrowable capacity)"""
+        if self.plan is None:
+            return True
+        with self.plan._lock:
+            return self._resolve(calls, provider, commit=False) is not None
+
+    def try_spend(self, calls: int = 1, provider: Optional[str] = None) -> bool:
+        """Charge calls to the budget if they fit; False leaves the budget untouched"""
+        if self.plan is None:
+            self._charge(normalize_provider(provider) if provider else '', calls)
+            return True
+        with self.plan._lock:
+            resolved = self._resolve(calls, provider, commit=True)
+            if resolved is None:
+                return False
+            self._charge(resolved, calls)
+            return True
+
+    def spend(self, calls: int, provider: Optional[str] = None):
+        """Record calls that were already made, borrowing or overdrawing as needed"""
+        if calls <= 0:
+            return
+        if self.plan is None:
+            self._charge(normalize_provider(provider) if provider else '', calls)
+            return
+        with self.plan._lock:
+            resolved = self._resolve(calls, provider, commit=True)
+            if resolved is None:
+                resolved = normalize_provider(provider) if provider else (self.providers or [''])[0]
+            self._charge(resolved, calls)
+
+    def _charge(self, provider: str, calls: int):
+        self.spent[provider] = self.spent.get(provider, 0) + calls
+
+    def _resolve(self, calls: int, provider: Optional[str], commit: bool) -> Optional[str]:
+        """Pick the provider to charge: own allocation first, then the plan's unallocated pool"""
+        candidates = [normalize_provider(provider)] if provider else (self.providers or list(self.calls_per_item))
+        for candidate in candidates:
+            if self._left(candidate) >= calls:
+                return candidate
+        for candidate in candidates:
+            if self.plan.lend(candidate, calls, commit):
+                if commit:
+                    self.borrowed[candidate] = self.borrowed.get(candidate, 0) + calls
+                return candidate
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            'phase': self.phase,
+            'value': self.value,
+            'demand_items': self.demand_items,
+            'planned_items': self.planned_items,
+            'planned_calls': self.planned_calls,
+            'planned_by_provider': dict(self.allocation),
+            'actual_calls': self.spent_calls,
+            'actual_by_provider': dict(self.spent),
+            'borrowed_calls': sum(self.borrowed.values()),
+        }
+
+
+class RequestPlan:
+    """Phase budgets plus the capacity nobody was allocated"""
+
+    def __init__(self, budgets: Dict[str, PhaseBudget], pool: Dict[str, Optional[int]],
+                 profiles: Dict[str, PhaseProfile] = None):
+        self.budgets = budgets
+        self.profiles = profiles or PHASE_PROFILES
+        # Unallocated daily capacity per provider; None for providers limited only per minute
+        self.pool = pool
+        self._lock = threading.RLock()
+        for budget in budgets.values():
+            budget.plan = self
+
+    def budget(self, phase: str) -> PhaseBudget:
+        """Budget for a phase; phases without a plan entry only draw from the pool"""
+        with self._lock:
+            if phase not in self.budgets:
+                profile = self.profiles.get(phase)
+                calls_per_item = dict(profile.calls_per_item) if profile else {p: 1 for p in self.pool}
+                self.budgets[phase] = PhaseBudget(phase=phase, value=profile.value if profile else 0,
+                                                  demand_items=0, planned_items=0,
+                                                  calls_per_item=calls_per_item, plan=self)
+            return self.budgets[phase]
+
+    def lend(self, provider: str, calls: int, commit: bool = True) -> bool:
+        """Take calls from the unallocated pool"""
+        if provider not in self.pool:
+            return False
+        available = self.pool[provider]
+        if available is None:
+            return True
+        if available < calls:
+            return False
+        if commit:
+            self.pool[provider] = available - calls
+        return True
+
+    def release(self, phase: str) -> Dict[str, int]:
+        """Return a finished phase's unspent daily-quota calls to the pool"""
+        with self._lock:
+            budget = self.budgets.get(phase)
+            if budget is None or budget.released:
+                return {}
+            returned = {}
+            for provider in set(budget.allocation) | set(budget.borrowed):
+                if self.pool.get(provider) is None:
+                    continue
+                unused = budget._left(provider)
+                if unused > 0:
+                    self.pool[provider] += unused
+                    returned[provider] = unused
+            budget.released = True
+            if returned:
+                logger.info(f"🔁 {phase} released unused calls: {returned}")
+            return returned
+
+    def report(self) -> Dict:
+        with self._lock:
+            phases = sorted(self.budgets.values(), key=lambda b: -b.value)
+            return {
+                'phases': {budget.phase: budget.to_dict() for budget in phases},
+                'planned_calls': sum(b.planned_calls for b in phases),
+                'actual_calls': sum(b.spent_calls for b in phases),
+                'unallocated': dict(self.pool),
+            }
+
+
+class RequestPlanner:
+    """Builds a RequestPlan from phase demand and the quota ledger's remaining capacity"""
+
+    def __init__(self, ledger=None, profiles: Dict[str, PhaseProfile] = None):
+        self.ledger = ledger or get_quota_ledger()
+        self.profiles = profiles or PHASE_PROFILES
+
+    def capacities(self) -> Dict[str, Optional[int]]:
+        """Remaining daily calls per provider; None where only a minute limit applies"""
+        providers = {p for profile in self.profiles.values() for p in profile.calls_per_item}
+        return {provider: self.ledger.remaining_today(provider) for provider in sorted(providers)}
+
+    def _minute_capacity(self, provider: str, seconds: Optional[float]) -> Optional[int]:
+        per_minute = self.ledger.limits(provider).per_minute
+        if not per_minute or seconds is None:
+            return None
+        return int(per_minute * seconds / 60)
+
+    def plan(self, demand: Dict[str, int], time_budgets: Optional[Dict[str, float]] = None) -> RequestPlan:
+        """
+        Allocate calls to phases.
+
+        Args:
+            demand: Items (tickers, range requests) each phase needs served
+            time_budgets: Seconds each phase may run, bounding minute-limited providers
+
+        Returns:
+            RequestPlan with one budget per phase
+        """
+        time_budgets = time_budgets or {}
+        pool = self.capacities()
+        budgets = {}
+
+        phases = sorted(demand, key=lambda phase: -self.profiles[phase].value if phase in self.profiles else 0)
+        for phase in phases:
+            profile = self.profiles.get(phase, PhaseProfile(0, {p: 1 for p in pool}))
+            items_left = max(0, int(demand[phase]))
+            allocation = {}
+
+            # Cheapest provider first; on ties prefer providers that do not draw on a daily quota
+            mix = sorted(profile.calls_per_item.items(),
+                         key=lambda item: (item[1], pool.get(item[0]) is not None))
+            for provider, cost in mix:
+                if items_left <= 0:
+                    break
+                daily = pool.get(provider)
+                capacity = daily if daily is not None else self._minute_capacity(provider, time_budgets.get(phase))
+                items = items_left if capacity is None else min(items_left, int(capacity / cost))
+                if items <= 0:
+                    continue
+                calls = math.ceil(items * cost)
+                if daily is not None:
+                    pool[provider] = daily - calls
+                allocation[provider] = calls
+                items_left -= items
+
+            budgets[phase] = PhaseBudget(phase=phase, value=profile.value,
+                                         demand_items=int(demand[phase]),
+                                         planned_items=int(demand[phase]) - items_left,
+                                         calls_per_item=dict(profile.calls_per_item),
+                                         allocation=allocation)
+
+        plan = RequestPlan(budgets, pool, self.profiles)
+        for budget in sorted(budgets.values(), key=lambda b: -b.value):
+            deferred = budget.demand_items - budget.planned_items
+            logger.info(f"🗓️ Plan {budget.phase}: {budget.planned_items}/{budget.demand_items} items, "
+                        f"{budget.planned_calls} calls {budget.allocation}"
+                        + (f", {deferred} deferred" if deferred else ""))
+        return plan
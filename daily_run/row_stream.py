@@ -0,0 +1,157 @@
+"""
+Row Stream
+
+Batch iteration helpers behind DatabaseManager's streaming reads.
+
+execute_query() returns cursor.fetchall(): every row of a universe-wide read
+is a Python tuple in memory before the caller sees the first one. The
+streaming reads run the query on a named (server-side) cursor and pull
+itersize rows per round trip instead, so memory is bounded by the batch size
+rather than by the result size. With prefetch the next batch is fetched on a
+background thread while the caller works on the current one.
+
+- iter_batches: fetchmany() loop over any DB-API cursor
+- prefetch: run a batch iterator ahead on a background thread (bounded queue)
+- rows_to_arrays: one batch of row tuples as NumPy column arrays
+
+Usage:
+    for chunk in db.stream_arrays(query, params, columns=['ticker', 'close'],
+                                  dtypes={'close': 'float64'}):
+        chunk['close'].mean()
+    for ticker, prices in db.stream_price_frames(since='2020-01-01', scale=100):
+        calculate_rsi(prices['close'])
+"""
+
+import queue
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, TypeVar
+
+import numpy as np
+
+DEFAULT_ITERSIZE = 5000          # rows per server-side FETCH
+DEFAULT_PREFETCH = 1             # batches fetched ahead of the consumer
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries a producer-side exception to the consumer"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iter_batches(cursor, itersize: int = DEFAULT_ITERSIZE) -> Iterator[List[tuple]]:
+    """Yield lists of up to itersize rows from an executed cursor until it is exhausted"""
+    while True:
+        batch = cursor.fetchmany(itersize)
+        if not batch:
+            return
+        yield batch
+
+
+def prefetch(batches: Iterator[T], depth: int = DEFAULT_PREFETCH) -> Iterator[T]:
+    """
+    Iterate batches on a background thread, at most depth batches ahead.
+
+    The source iterator is advanced (and closed) only on the background
+    thread. Its exceptions are re-raised in the consumer; when the consumer
+    stops early the source is closed and the thread joined before returning.
+    depth 0 iterates in the caller's thread.
+    """
+    if depth <= 0:
+        yield from batches
+        return
+
+    slots: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def offer(item) -> bool:
+        while not stop.is_set():
+            try:
+                slots.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in batches:
+                if not offer(batch):
+                    return
+            offer(_DONE)
+        except BaseException as e:
+            offer(_Failure(e))
+        finally:
+            close = getattr(batches, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name='row-stream-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = slots.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_date(value) -> np.datetime64:
+    if isinstance(value, (date, datetime)):
+        return np.datetime64(value, 'D')
+    try:
+        return np.datetime64(str(value)[:10], 'D')
+    except ValueError:
+        return np.datetime64('NaT', 'D')
+
+
+def _column(values: Sequence, dtype) -> np.ndarray:
+    if dtype is None:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        # A stray text value: NaN/NaT for that row instead of failing the batch
+        kind = np.dtype(dtype).kind
+        if kind == 'f':
+            return np.array([_to_float(value) for value in values], dtype=dtype)
+        if kind == 'M':
+            return np.array([_to_date(value) for value in values], dtype=dtype)
+        raise
+
+
+def rows_to_arrays(rows: Sequence[tuple], columns: Sequence[str],
+                   dtypes: Optional[Mapping[str, str]] = None) -> Dict[str, np.ndarray]:
+    """
+    One batch of row tuples as {column: array}.
+
+    Columns listed in dtypes are converted to that dtype (NULLs become NaN
+    for float and NaT for datetime64 columns; integer columns must not hold
+    NULLs); the others are object arrays holding the driver's values.
+    """
+    dtypes = dtypes or {}
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    if len(values) != len(columns):
+        raise ValueError(f"Expected {len(columns)} columns, rows have {len(values)}")
+    return {name: _column(column, dtypes.get(name)) for name, column in zip(columns, values)}
@@ -0,0 +1,1210 @@
+"""
+Scoring Backtest
+
+Replays daily_charts and company_fundamentals history through the scoring
+systems and measures what their ratings were worth: forward-return hit rates,
+per-rating bucket returns, the bullish-minus-bearish spread and the rank
+correlation (IC) between composite score and forward return.
+
+The scorers are not called once per ticker. History is loaded into
+date x ticker arrays (one per column the scorers read) and each scorer's
+if/elif threshold chains are evaluated as np.select over the whole panel,
+so every ticker on every date is scored in a handful of array operations.
+Each vectorized scorer reproduces its per-ticker counterpart exactly on the
+inputs that counterpart reads (test_scoring_backtest checks this against
+the original classes):
+
+    final_optimized_decisive_scoring, market_aligned_decisive_scoring,
+    final_decisive_scoring, balanced_decisive_scoring, decisive_scoring_system
+        -> DecisiveScorer (same structure, different constants)
+    aggressive_buy_hold_scoring, balanced_realistic_scoring
+        -> BaseScoreScorer
+    enhanced_full_spectrum_scoring (EnhancedFullSpectrumScoring),
+    full_spectrum_scoring_system
+        -> FullSpectrumScorer
+
+Inputs are point-in-time: technical columns come from that date's
+daily_charts row (stored units, as the live scorers read them), momentum
+from the ticker's previous bar, and fundamentals from the latest
+company_fundamentals report available on that date (report_date plus a
+filing lag). Market cap is shares_outstanding x close when shares are known.
+Dates before a ticker's first report are scored with NULL fundamentals, as
+the live scorers score a stocks row with NULL columns.
+
+Usage:
+    python scoring_backtest.py --start 2021-01-01 [--end 2025-06-30]
+        [--scorers final_optimized_decisive_scoring balanced_decisive_scoring]
+        [--horizons 5 20 60] [--tickers AAPL MSFT] [--json report.json]
+"""
+
+import argparse
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .database import DatabaseManager
+    from .enhanced_full_spectrum_scoring import EnhancedFullSpectrumScoring
+except ImportError:
+    from database import DatabaseManager
+    from enhanced_full_spectrum_scoring import EnhancedFullSpectrumScoring
+
+logger = logging.getLogger(__name__)
+
+# daily_charts columns the scorers read besides close and volume
+TECHNICAL_COLUMNS = [
+    'vwap', 'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200', 'sma_200',
+    'support_1', 'support_2', 'support_3', 'resistance_1', 'resistance_2', 'resistance_3',
+]
+
+# Scorer input (stocks column name) -> company_fundamentals column
+FUNDAMENTAL_COLUMNS = {
+    'market_cap': 'market_cap',
+    'revenue_ttm': 'revenue',
+    'net_income_ttm': 'net_income',
+    'ebitda_ttm': 'ebitda',
+    'total_debt': 'total_debt',
+    'shareholders_equity': 'total_equity',
+    'current_assets': 'current_assets',
+    'current_liabilities': 'current_liabilities',
+    'free_cash_flow': 'free_cash_flow',
+    'shares_outstanding': 'shares_outstanding',
+}
+
+# When one report date has several period types, the later entry wins
+PERIOD_PRIORITY = {'quarterly': 0, 'annual': 1, 'ttm': 2}
+
+# Days between a report's period end and the date the backtest may use it
+FUNDAMENTALS_LAG_DAYS = 45
+
+# Forward-return horizons in trading bars
+DEFAULT_HORIZONS = (5, 20, 60)
+
+SEVEN_LEVELS = ('Strong Buy', 'Buy', 'Hold', 'Weak Hold', 'Weak Sell', 'Sell', 'Strong Sell')
+FIVE_LEVELS = ('Strong Buy', 'Buy', 'Hold', 'Sell', 'Strong Sell')
+BULLISH = {'Strong Buy', 'Buy'}
+BEARISH = {'Weak Sell', 'Sell', 'Strong Sell'}
+
+# Minimum names on a date for its rank correlation to count towards the IC
+MIN_IC_NAMES = 5
+
+
+# Panel -----------------------------------------------------------------------
+
+@dataclass
+class BacktestPanel:
+    """Date x ticker arrays of every input the scorers read, plus forward returns"""
+    dates: np.ndarray
+    tickers: List[str]
+    fields: Dict[str, np.ndarray] = field(default_factory=dict)
+    forward_returns: Dict[int, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.dates), len(self.tickers)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Field array; a column the database does not have reads as all-NULL"""
+        values = self.fields.get(name)
+        return np.full(self.shape, np.nan) if values is None else values
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.fields
+
+
+def _numeric(frame: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+    for column in columns:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+    return frame
+
+
+def build_panel(prices: pd.DataFrame, fundamentals: Optional[pd.DataFrame] = None,
+                horizons: Sequence[int] = DEFAULT_HORIZONS,
+                start=None, end=None) -> BacktestPanel:
+    """
+    Pivot long price rows into a BacktestPanel.
+
+    Args:
+        prices: One row per (ticker, date) with close, optional volume and any
+                TECHNICAL_COLUMNS, in stored units
+        fundamentals: Reports with 'ticker', 'available' (first date the report
+                      may be used) and FUNDAMENTAL_COLUMNS keys
+        horizons: Forward-return horizons in bars
+        start, end: Dates to score; rows outside are only used for the
+                    previous bar and forward returns
+    """
+    frame = prices.drop_duplicates(['ticker', 'date'], keep='last').copy()
+    frame['date'] = pd.to_datetime(frame['date'])
+    frame = frame.sort_values(['ticker', 'date'], ignore_index=True)
+    value_columns = [column for column in frame.columns if column not in ('ticker', 'date')]
+    frame = _numeric(frame, value_columns)
+
+    close = frame['close'].where(frame['close'] > 0)
+    by_ticker = close.groupby(frame['ticker'], sort=False)
+    frame['prev_close'] = frame.groupby('ticker', sort=False)['close'].shift(1)
+    forward_columns = {}
+    for horizon in horizons:
+        forward_columns[horizon] = f'forward_{horizon}'
+        frame[f'forward_{horizon}'] = by_ticker.shift(-horizon) / close - 1
+
+    if start is not None:
+        frame = frame[frame['date'] >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame['date'] <= pd.Timestamp(end)]
+
+    tickers = sorted(frame['ticker'].unique())
+    wide = frame.set_index(['date', 'ticker']).sort_index().unstack('ticker')
+    dates = wide.index.to_numpy(dtype='datetime64[ns]')
+
+    def grid(column):
+        return wide[column].reindex(columns=tickers).to_numpy(dtype='float64')
+
+    panel = BacktestPanel(dates=dates, tickers=tickers)
+    for column in value_columns + ['prev_close']:
+        if column not in forward_columns.values():
+            panel.fields[column] = grid(column)
+    for horizon, column in forward_columns.items():
+        panel.forward_returns[horizon] = grid(column)
+
+    attach_fundamentals(panel, fundamentals)
+    return panel
+
+
+def attach_fundamentals(panel: BacktestPanel, reports: Optional[pd.DataFrame]):
+    """As-of join: each (date, ticker) gets the latest report available on that date"""
+    if reports is not None and not reports.empty and panel.tickers:
+        reports = reports[reports['ticker'].isin(panel.tickers)].dropna(subset=['available'])
+        reports = reports.assign(available=pd.to_datetime(reports['available']).astype('datetime64[ns]'))
+        reports = reports.sort_values('available', kind='stable')
+        rows, columns = panel.shape
+        grid = pd.DataFrame({
+            'date': np.repeat(panel.dates, columns),
+            'ticker': np.tile(np.array(panel.tickers, dtype=object), rows),
+        })
+        merged = pd.merge_asof(grid, reports, left_on='date', right_on='available', by='ticker')
+        for name in FUNDAMENTAL_COLUMNS:
+            if name in merged:
+                values = pd.to_numeric(merged[name], errors='coerce').to_numpy(dtype='float64')
+                panel.fields[name] = values.reshape(rows, columns)
+
+    if 'shares_outstanding' in panel and 'close' in panel:
+        # Point-in-time market cap; the reported figure is the value on its report date
+        with np.errstate(invalid='ignore'):
+            derived = panel['shares_outstanding'] * panel['close'] / 100.0
+        panel.fields['market_cap'] = np.where(np.isnan(derived), panel['market_cap'], derived)
+
+
+# Threshold tables ------------------------------------------------------------
+
+_COMPARE = {'>=': np.greater_equal, '>': np.greater, '<=': np.less_equal, '<': np.less}
+
+
+@dataclass(frozen=True)
+class Tiers:
+    """An if/elif chain of ``value <op> bound -> points``; the first match wins"""
+    bounds: Tuple[float, ...]
+    points: Tuple[float, ...]
+    otherwise: float
+    op: str = '>='
+
+    def apply(self, values: np.ndarray) -> np.ndarray:
+        compare = _COMPARE[self.op]
+        with np.errstate(invalid='ignore'):
+            conditions = [compare(values, bound) for bound in self.bounds]
+        return np.select(conditions, self.points, self.otherwise).astype('float64')
+
+
+@dataclass(frozen=True)
+class Bands:
+    """Nested inclusive ranges ``low <= value <= high -> points``; the first match wins"""
+    ranges: Tuple[Tuple[float, float, float], ...]
+    otherwise: float
+
+    def apply(self, values: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid='ignore'):
+            conditions = [(low <= values) & (values <= high) for low, high, _ in self.ranges]
+        return np.select(conditions, [points for _, _, points in self.ranges], self.otherwise).astype('float64')
+
+
+@dataclass(frozen=True)
+class RatingScale:
+    """Score thresholds (descending) and the labels between them"""
+    thresholds: Tuple[float, ...]
+    labels: Tuple[str, ...]
+
+    def codes(self, scores: np.ndarray, thresholds: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Index into labels for every score, -1 where the stock was not scored.
+
+        thresholds may be (tickers, levels) for per-ticker (sector) cut-offs.
+        """
+        bounds = np.asarray(self.thresholds if thresholds is None else thresholds, dtype='float64')
+        with np.errstate(invalid='ignore'):
+            missed = (scores[..., None] < bounds).sum(axis=-1)
+        return np.where(np.isnan(scores), -1, missed).astype(np.int8)
+
+
+def _present(values: np.ndarray) -> np.ndarray:
+    """Python truthiness of a nullable column: not NULL and not zero"""
+    return ~np.isnan(values) & (values != 0)
+
+
+def _known(values: np.ndarray) -> np.ndarray:
+    return ~np.isnan(values)
+
+
+@dataclass
+class ScoreResult:
+    """Composite scores and rating codes of one scorer over a panel"""
+    scorer: str
+    composite: np.ndarray
+    ratings: np.ndarray
+    labels: Tuple[str, ...]
+    seconds: float = 0.0
+
+
+# Decisive family -------------------------------------------------------------
+
+@dataclass(frozen=True)
+class DecisiveProfile:
+    """Constants of one FinalOptimizedDecisiveScorer-style scorer"""
+    name: str
+    market_cap: Tiers            # on market cap in billions
+    profitable: float
+    unprofitable: float
+    debt_to_equity: Tiers
+    current_ratio: Tiers
+    roe: Tiers
+    revenue: float
+    free_cash_flow: float
+    fundamental_map: Tiers       # average points -> fundamental health
+    momentum: Tiers
+    rsi: Bands
+    trend: Tuple[float, float, float, float]   # 20>50>200, 20>50, sideways, downtrend
+    sideways_band: float
+    macd: Tuple[float, float]
+    technical_map: Tiers
+    vwap: Tiers                  # on close / vwap
+    support: Tiers               # on distance to the closest support
+    resistance: Tiers
+    weights: Tuple[float, float, float]
+    rating: RatingScale
+    level_neutral: float = 70.0  # S/R score when a level fails validation
+    resistance_3_fallback: str = 'resistance_1'
+    price_range: Optional[Tuple[float, float]] = None   # None: no price validation
+    known_ranges: Mapping[str, Tuple[float, float]] = field(default_factory=dict)
+    invalid_price: Optional[float] = None   # VWAP/SR score for a bad close; None skips the stock
+
+
+_MARKET_CAP_B = (100, 10, 1)
+_DEBT_TO_EQUITY = (0.3, 0.5, 1.0, 2.0)
+_CURRENT_RATIO = (2.0, 1.5, 1.0, 0.8)
+_ROE = (0.20, 0.15, 0.10, 0.05, 0.02)
+_MOMENTUM = (0.08, 0.05, 0.02, -0.02, -0.05, -0.08)
+_HEALTH_7 = (85, 75, 65, 55, 45, 35)
+_VWAP_RATIO = (1.15, 1.10, 1.05, 1.0, 0.95, 0.90)
+_LEVEL_DISTANCE = (0.02, 0.05, 0.10, 0.15)
+_RSI_BANDS = ((35, 65), (25, 75), (15, 85), (5, 95))
+
+# is_price_data_valid in the final/market-aligned decisive scorers
+_DECISIVE_RANGES = {
+    'AAPL': (150, 250), 'MSFT': (400, 600), 'GOOGL': (150, 250),
+    'AMZN': (150, 250), 'NVDA': (150, 200), 'META': (400, 900),
+    'TSLA': (200, 400), 'NFLX': (400, 700), 'AMD': (100, 200),
+    'INTC': (20, 50), 'HD': (250, 400), 'MCD': (250, 400),
+    'JNJ': (150, 200), 'PFE': (25, 50), 'UNH': (300, 600),
+    'JPM': (150, 200), 'BAC': (30, 50), 'WFC': (40, 60),
+    'XOM': (80, 150), 'CVX': (120, 200),
+}
+
+# validate_price_data in BalancedDecisiveScorer
+_BALANCED_RANGES = {
+    'AAPL': (100, 300), 'MSFT': (200, 600), 'GOOGL': (100, 300),
+    'AMZN': (100, 300), 'NVDA': (100, 200), 'META': (200, 1000),
+    'TSLA': (100, 500), 'NFLX': (200, 800), 'AMD': (50, 200),
+    'INTC': (20, 100), 'HD': (200, 400), 'MCD': (200, 400),
+    'JNJ': (100, 200), 'PFE': (20, 100), 'UNH': (200, 600),
+    'JPM': (100, 200), 'BAC': (20, 100), 'WFC': (30, 100),
+    'XOM': (50, 150), 'CVX': (80, 200),
+}
+
+
+def _rsi(points: Tuple[float, ...], otherwise: float, bands=_RSI_BANDS) -> Bands:
+    return Bands(tuple((low, high, p) for (low, high), p in zip(bands, points)), otherwise)
+
+
+FINAL_OPTIMIZED = DecisiveProfile(
+    name='final_optimized_decisive_scoring',
+    market_cap=Tiers(_MARKET_CAP_B, (28, 25, 22), 20),
+    profitable=32, unprofitable=18,
+    debt_to_equity=Tiers(_DEBT_TO_EQUITY, (28, 25, 22, 19), 15, '<='),
+    current_ratio=Tiers(_CURRENT_RATIO, (28, 25, 22, 19), 15),
+    roe=Tiers(_ROE, (32, 29, 26, 22, 19), 15),
+    revenue=20, free_cash_flow=22,
+    fundamental_map=Tiers(_HEALTH_7, (95, 88, 80, 72, 64, 56), 48),
+    momentum=Tiers(_MOMENTUM, (38, 33, 28, 25, 20, 17), 14, '>'),
+    rsi=_rsi((35, 30, 25, 20), 15),
+    trend=(38, 33, 28, 20), sideways_band=0.05, macd=(35, 20),
+    technical_map=Tiers(_HEALTH_7, (92, 84, 76, 68, 60, 52), 44),
+    vwap=Tiers(_VWAP_RATIO, (100, 90, 80, 70, 60, 45), 25),
+    support=Tiers(_LEVEL_DISTANCE, (95, 85, 75, 65), 50, '<='),
+    resistance=Tiers(_LEVEL_DISTANCE, (20, 30, 45, 60), 85, '<='),
+    weights=(0.30, 0.25, 0.45),
+    rating=RatingScale(_HEALTH_7, SEVEN_LEVELS),
+    price_range=(10, 5000), known_ranges=_DECISIVE_RANGES,
+)
+
+MARKET_ALIGNED = DecisiveProfile(
+    name='market_aligned_decisive_scoring',
+    market_cap=Tiers(_MARKET_CAP_B, (25, 23, 20), 18),
+    profitable=30, unprofitable=15,
+    debt_to_equity=Tiers(_DEBT_TO_EQUITY, (25, 23, 20, 17), 12, '<='),
+    current_ratio=Tiers(_CURRENT_RATIO, (25, 23, 20, 17), 12),
+    roe=Tiers(_ROE, (30, 27, 24, 20, 17), 12),
+    revenue=18, free_cash_flow=20,
+    fundamental_map=Tiers(_HEALTH_7, (92, 85, 78, 70, 62, 54), 46),
+    momentum=Tiers(_MOMENTUM, (35, 30, 25, 22, 18, 15), 12, '>'),
+    rsi=_rsi((32, 28, 24, 20), 16),
+    trend=(35, 30, 26, 18), sideways_band=0.05, macd=(32, 18),
+    technical_map=Tiers(_HEALTH_7, (90, 82, 74, 66, 58, 50), 42),
+    vwap=Tiers(_VWAP_RATIO, (100, 90, 80, 70, 60, 45), 25),
+    support=Tiers(_LEVEL_DISTANCE, (95, 85, 75, 65), 50, '<='),
+    resistance=Tiers(_LEVEL_DISTANCE, (20, 30, 45, 60), 85, '<='),
+    weights=(0.35, 0.25, 0.40),
+    rating=RatingScale(_HEALTH_7, SEVEN_LEVELS),
+    price_range=(10, 5000), known_ranges=_DECISIVE_RANGES,
+)
+
+FINAL_DECISIVE = DecisiveProfile(
+    name='final_decisive_scoring',
+    market_cap=Tiers(_MARKET_CAP_B, (22, 20, 18), 15),
+    profitable=28, unprofitable=10,
+    debt_to_equity=Tiers(_DEBT_TO_EQUITY, (22, 20, 18, 15), 10, '<='),
+    current_ratio=Tiers(_CURRENT_RATIO, (22, 20, 18, 15), 10),
+    roe=Tiers(_ROE, (28, 25, 22, 18, 15), 10),
+    revenue=15, free_cash_flow=18,
+    fundamental_map=Tiers(_HEALTH_7, (95, 88, 78, 68, 58, 48), 38),
+    momentum=Tiers(_MOMENTUM, (35, 30, 25, 20, 15, 12), 8, '>'),
+    rsi=_rsi((30, 25, 20, 15), 10),
+    trend=(35, 30, 25, 15), sideways_band=0.05, macd=(30, 15),
+    technical_map=Tiers(_HEALTH_7, (92, 85, 75, 65, 55, 45), 35),
+    vwap=Tiers(_VWAP_RATIO, (100, 90, 80, 70, 60, 40), 20),
+    support=Tiers(_LEVEL_DISTANCE, (95, 85, 75, 65), 45, '<='),
+    resistance=Tiers(_LEVEL_DISTANCE, (15, 25, 40, 55), 90, '<='),
+    weights=(0.30, 0.30, 0.40),
+    rating=RatingScale(_HEALTH_7, SEVEN_LEVELS),
+    price_range=(10, 5000), known_ranges=_DECISIVE_RANGES,
+)
+
+BALANCED_DECISIVE = DecisiveProfile(
+    name='balanced_decisive_scoring',
+    market_cap=Tiers(_MARKET_CAP_B, (20, 18, 15), 12),
+    profitable=25, unprofitable=8,
+    debt_to_equity=Tiers(_DEBT_TO_EQUITY, (20, 18, 15, 12), 8, '<='),
+    current_ratio=Tiers(_CURRENT_RATIO, (20, 18, 15, 12), 8),
+    roe=Tiers(_ROE, (25, 22, 18, 15, 12), 8),
+    revenue=12, free_cash_flow=15,
+    fundamental_map=Tiers((80, 70, 60, 50, 40), (88, 78, 68, 58, 48), 38),
+    momentum=Tiers((0.06, 0.03, 0.01, -0.01, -0.03, -0.06), (30, 25, 20, 18, 15, 12), 8, '>'),
+    rsi=_rsi((25, 22, 18, 15), 12),
+    trend=(30, 25, 20, 15), sideways_band=0.05, macd=(25, 15),
+    technical_map=Tiers((80, 70, 60, 50, 40), (85, 75, 65, 55, 45), 35),
+    vwap=Tiers((1.12, 1.08, 1.04, 1.0, 0.96, 0.92), (95, 85, 75, 65, 55, 45), 25),
+    support=Tiers(_LEVEL_DISTANCE, (90, 80, 70, 60), 40, '<='),
+    resistance=Tiers(_LEVEL_DISTANCE, (20, 30, 45, 60), 85, '<='),
+    weights=(0.35, 0.30, 0.35),
+    rating=RatingScale((80, 70, 60, 50, 40, 30), SEVEN_LEVELS),
+    level_neutral=60.0,
+    price_range=(1, 10000), known_ranges=_BALANCED_RANGES, invalid_price=60.0,
+)
+
+DECISIVE = DecisiveProfile(
+    name='decisive_scoring_system',
+    market_cap=Tiers(_MARKET_CAP_B, (25, 20, 15), 10),
+    profitable=30, unprofitable=5,
+    debt_to_equity=Tiers(_DEBT_TO_EQUITY, (25, 20, 15, 10), 5, '<='),
+    current_ratio=Tiers(_CURRENT_RATIO, (25, 20, 15, 10), 5),
+    roe=Tiers(_ROE, (30, 25, 20, 15, 10), 5),
+    revenue=15, free_cash_flow=20,
+    fundamental_map=Tiers((80, 70, 60, 50), (95, 85, 75, 65), 35),
+    momentum=Tiers(_MOMENTUM, (35, 30, 25, 20, 15, 10), 5, '>'),
+    rsi=_rsi((30, 25, 20, 15), 10, bands=((40, 60), (30, 70), (20, 80), (10, 90))),
+    trend=(35, 30, 25, 15), sideways_band=0.03, macd=(30, 15),
+    technical_map=Tiers((80, 70, 60, 50), (90, 80, 70, 60), 40),
+    vwap=Tiers(_VWAP_RATIO, (100, 90, 80, 70, 60, 40), 20),
+    support=Tiers((0.01, 0.03, 0.05, 0.10, 0.15), (100, 90, 80, 70, 50), 30, '<='),
+    resistance=Tiers((0.01, 0.03, 0.05, 0.10, 0.15), (10, 20, 30, 50, 70), 100, '<='),
+    weights=(0.30, 0.30, 0.40),
+    rating=RatingScale(_HEALTH_7, SEVEN_LEVELS),
+    resistance_3_fallback='resistance_2',
+)
+
+DECISIVE_PROFILES = [FINAL_OPTIMIZED, MARKET_ALIGNED, FINAL_DECISIVE, BALANCED_DECISIVE, DECISIVE]
+
+
+class DecisiveScorer:
+    """Vectorized FinalOptimizedDecisiveScorer and its constant-only variants"""
+
+    def __init__(self, profile: DecisiveProfile):
+        self.profile = profile
+        self.name = profile.name
+        self.labels = profile.rating.labels
+
+    def _validator(self, panel: BacktestPanel) -> Callable[[np.ndarray], np.ndarray]:
+        """is_price_data_valid over the panel (per-ticker realistic ranges)"""
+        profile = self.profile
+        if profile.price_range is None:
+            return lambda values: np.ones(panel.shape, dtype=bool)
+        ranges = [profile.known_ranges.get(ticker, profile.price_range) for ticker in panel.tickers]
+        low = np.array([r[0] for r in ranges], dtype='float64')
+        high = np.array([r[1] for r in ranges], dtype='float64')
+
+        def valid(values):
+            with np.errstate(invalid='ignore'):
+                return (low <= values) & (values <= high)
+        return valid
+
+    def fundamental_health(self, panel: BacktestPanel) -> np.ndarray:
+        p = self.profile
+        net_income, equity = panel['net_income_ttm'], panel['shareholders_equity']
+        debt = panel['total_debt']
+        assets, liabilities = panel['current_assets'], panel['current_liabilities']
+        score = np.zeros(panel.shape)
+        factors = np.zeros(panel.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            market_cap = panel['market_cap']
+            has = market_cap > 0
+            score += np.where(has, p.market_cap.apply(market_cap / 1e9), 0)
+            factors += has
+
+            known = _known(net_income)
+            score += np.where(net_income > 0, p.profitable, np.where(known, p.unprofitable, 0))
+            factors += known
+
+            has = _present(debt) & (equity > 0)
+            score += np.where(has, p.debt_to_equity.apply(debt / equity), 0)
+            factors += has
+
+            has = _present(assets) & (liabilities > 0)
+            score += np.where(has, p.current_ratio.apply(assets / liabilities), 0)
+            factors += has
+
+            has = _present(net_income) & (equity > 0)
+            score += np.where(has, p.roe.apply(net_income / equity), 0)
+            factors += has
+
+            for column, points in (('revenue_ttm', p.revenue), ('free_cash_flow', p.free_cash_flow)):
+                has = panel[column] > 0
+                score += np.where(has, points, 0)
+                factors += has
+
+            average = np.where(factors > 0, score / factors, 50.0)
+        return p.fundamental_map.apply(average)
+
+    def technical_health(self, panel: BacktestPanel) -> np.ndarray:
+        p = self.profile
+        score = np.zeros(panel.shape)
+        factors = np.zeros(panel.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            current = panel['close'] / 100.0
+            previous = panel['prev_close'] / 100.0
+            has = previous > 0
+            score += np.where(has, p.momentum.apply((current - previous) / previous), 0)
+            factors += has
+
+            rsi = panel['rsi_14']
+            known = _known(rsi)
+            score += np.where(known, p.rsi.apply(rsi), 0)
+            factors += known
+
+            ema_20, ema_50, ema_200 = panel['ema_20'], panel['ema_50'], panel['ema_200']
+            has = _present(ema_20) & _present(ema_50) & _present(ema_200)
+            sma_20, sma_50, sma_200 = ema_20 / 100.0, ema_50 / 100.0, ema_200 / 100.0
+            golden, bullish, sideways, downtrend = p.trend
+            trend = np.select(
+                [(sma_20 > sma_50) & (sma_50 > sma_200), sma_20 > sma_50,
+                 np.abs(sma_20 - sma_50) / sma_50 < p.sideways_band],
+                [golden, bullish, sideways], downtrend)
+            score += np.where(has, trend, 0)
+            factors += has
+
+            macd = panel['macd_line']
+            known = _known(macd)
+            score += np.where(known, np.where(macd > 0, p.macd[0], p.macd[1]), 0)
+            factors += known
+
+            average = np.where(factors > 0, score / factors, 50.0)
+        return p.technical_map.apply(average)
+
+    def _level_score(self, current, levels, third_fallback: int, tiers: Tiers, valid) -> np.ndarray:
+        first, second, third = levels
+        level_1 = first / 100.0
+        level_2 = np.where(_present(second), second / 100.0, level_1)
+        level_3 = np.where(_present(third), third / 100.0, (level_1, level_2)[third_fallback])
+        stacked = np.stack([level_1, level_2, level_3])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            closest_index = np.argmin(np.abs(current - np.nan_to_num(stacked, nan=np.inf)), axis=0)
+            closest = np.take_along_axis(stacked, closest_index[None], axis=0)[0]
+            distance = np.abs(current - closest) / closest
+        usable = valid(level_1) & valid(level_2) & valid(level_3)
+        scored = np.where(usable, tiers.apply(distance), self.profile.level_neutral)
+        return np.where(_present(first), scored, 0.0)
+
+    def vwap_sr_score(self, panel: BacktestPanel) -> np.ndarray:
+        """VWAP & support/resistance score; NaN (or the profile's neutral score) for a bad close"""
+        p = self.profile
+        valid = self._validator(panel)
+        current = panel['close'] / 100.0
+
+        raw_vwap = panel['vwap']
+        has_vwap = _present(raw_vwap)
+        vwap = np.where(has_vwap, raw_vwap / 100.0, current)
+        vwap = np.where(has_vwap & ~valid(vwap), current, vwap)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap_score = np.where(vwap > 0, p.vwap.apply(current / vwap), 0)
+
+        supports = [panel[f'support_{n}'] for n in (1, 2, 3)]
+        resistances = [panel[f'resistance_{n}'] for n in (1, 2, 3)]
+        support_score = self._level_score(current, supports, 1, p.support, valid)
+        resistance_fallback = 0 if p.resistance_3_fallback == 'resistance_1' else 1
+        resistance_score = self._level_score(current, resistances, resistance_fallback, p.resistance, valid)
+
+        score = (vwap_score * 0.4) + (support_score * 0.3) + (resistance_score * 0.3)
+        bad_close = np.nan if p.invalid_price is None else p.invalid_price
+        return np.where(valid(current), score, bad_close)
+
+    def score(self, panel: BacktestPanel) -> ScoreResult:
+        started = time.perf_counter()
+        w_fundamental, w_technical, w_vwap = self.profile.weights
+        composite = ((self.fundamental_health(panel) * w_fundamental)
+                     + (self.technical_health(panel) * w_technical)
+                     + (self.vwap_sr_score(panel) * w_vwap))
+        composite = np.where(_known(panel['close']), composite, np.nan)
+        return ScoreResult(self.name, composite, self.profile.rating.codes(composite),
+                           self.labels, time.perf_counter() - started)
+
+
+# Base-score family -----------------------------------------------------------
+
+@dataclass(frozen=True)
+class BaseScoreProfile:
+    """Constants of one AggressiveBuyHoldScoring-style scorer"""
+    name: str
+    base_fundamental: float
+    base_technical: float
+    weights: Tuple[float, float, float, float]   # fundamental, technical, vwap/sr, sentiment
+    rating: RatingScale
+
+
+AGGRESSIVE_BUY_HOLD = BaseScoreProfile(
+    name='aggressive_buy_hold_scoring', base_fundamental=70, base_technical=65,
+    weights=(0.25, 0.20, 0.35, 0.20),
+    rating=RatingScale((75, 65, 55, 45, 35, 25), SEVEN_LEVELS),
+)
+
+BALANCED_REALISTIC = BaseScoreProfile(
+    name='balanced_realistic_scoring', base_fundamental=45, base_technical=40,
+    weights=(0.30, 0.25, 0.30, 0.15),
+    rating=RatingScale((80, 70, 60, 50, 40, 30), SEVEN_LEVELS),
+)
+
+
+class BaseScoreScorer:
+    """
+    Vectorized AggressiveBuyHoldScoring / BalancedRealisticScoring.
+
+    Those scorers read ema_200 as 'sma_200', use macd_line as its own signal
+    and a constant volume; the same substitutions are made here.
+    """
+
+    LARGE = (1e12, 1e11, 1e10)
+    REVENUE = (1e11, 1e10, 1e9)
+    EARNINGS = (1e10, 1e9, 0)
+    LEVELS = (0.02, 0.05, 0.10, 0.15)
+
+    def __init__(self, profile: BaseScoreProfile):
+        self.profile = profile
+        self.name = profile.name
+        self.labels = profile.rating.labels
+
+    def fundamental_health(self, panel: BacktestPanel) -> np.ndarray:
+        net_income, equity, debt = panel['net_income_ttm'], panel['shareholders_equity'], panel['total_debt']
+        score = np.zeros(panel.shape)
+        factors = np.zeros(panel.shape)
+
+        def add(has, points):
+            nonlocal score, factors
+            score = score + np.where(has, points, 0)
+            factors = factors + has
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            market_cap, revenue = panel['market_cap'], panel['revenue_ttm']
+            add(market_cap > 0, Tiers(self.LARGE, (15, 12, 10), 5, '>').apply(market_cap))
+            add(revenue > 0, Tiers(self.REVENUE, (15, 12, 10), 5, '>').apply(revenue))
+            add(_known(net_income), Tiers(self.EARNINGS, (15, 12, 10), 5, '>').apply(net_income))
+            has_equity = equity > 0
+            add(_known(debt) & has_equity, Tiers((0.5, 1.0, 2.0), (15, 12, 10), 5, '<').apply(debt / equity))
+            add(_known(net_income) & has_equity,
+                Tiers((20, 15, 10), (15, 12, 10), 5, '>').apply((net_income / equity) * 100))
+            fcf, ebitda = panel['free_cash_flow'], panel['ebitda_ttm']
+            add(_known(fcf), Tiers(self.EARNINGS, (15, 12, 10), 5, '>').apply(fcf))
+            add(_known(ebitda), Tiers(self.EARNINGS, (10, 8, 5), 0, '>').apply(ebitda))
+
+            base = self.profile.base_fundamental
+            return np.where(factors > 0, np.minimum(base + (score / factors), 100), base)
+
+    def technical_health(self, panel: BacktestPanel) -> np.ndarray:
+        score = np.zeros(panel.shape)
+        factors = np.zeros(panel.shape)
+        current = panel['close'] / 100.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = panel['rsi_14']
+            known = _known(rsi)
+            score += np.where(known, Bands(((30, 70, 20), (25, 75, 15), (20, 80, 10)), 5).apply(rsi), 0)
+            factors += known
+
+            # macd_signal is macd_line, so the crossover never fires
+            known = _known(panel['macd_line'])
+            score += np.where(known, 10, 0)
+            factors += known
+
+            ema_20, ema_50 = panel['ema_20'] / 100.0, panel['ema_50'] / 100.0
+            has = _known(ema_20) & _known(ema_50)
+            trend = np.select([(current > ema_20) & (ema_20 > ema_50), current > ema_20, current > ema_50],
+                              [20, 15, 10], 5)
+            score += np.where(has, trend, 0)
+            factors += has
+
+            # Constant volume of 1,000,000
+            score += 15
+            factors += 1
+
+            long_average = panel['ema_200'] / 100.0
+            known = _known(long_average)
+            score += np.where(known, np.where(current > long_average, 20, 10), 0)
+            factors += known
+
+            return np.minimum(self.profile.base_technical + (score / factors), 100)
+
+    def vwap_sr_score(self, panel: BacktestPanel) -> np.ndarray:
+        current = panel['close'] / 100.0
+        raw_vwap, support, resistance = panel['vwap'], panel['support_1'], panel['resistance_1']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap_score = np.where(
+                _known(raw_vwap),
+                Tiers((1.05, 1.02, 0.98, 0.95), (100, 85, 70, 50), 30, '>').apply(current / (raw_vwap / 100.0)),
+                70)
+            support_score = np.where(
+                _known(support),
+                Tiers(self.LEVELS, (100, 85, 70, 50), 30, '<=').apply((current - support / 100.0) / current),
+                70)
+            resistance_score = np.where(
+                _known(resistance),
+                Tiers(self.LEVELS, (20, 40, 60, 80), 100, '<=').apply((resistance / 100.0 - current) / current),
+                70)
+        score = (vwap_score * 0.4) + (support_score * 0.3) + (resistance_score * 0.3)
+        # A zero VWAP raises in the scalar version, which falls back to 70
+        return np.where(raw_vwap == 0, 70.0, score)
+
+    def score(self, panel: BacktestPanel) -> ScoreResult:
+        started = time.perf_counter()
+        fundamental = self.fundamental_health(panel)
+        technical = self.technical_health(panel)
+        vwap_sr = self.vwap_sr_score(panel)
+        w_fundamental, w_technical, w_vwap, w_sentiment = self.profile.weights
+        sentiment = (fundamental + technical) / 2
+        composite = np.minimum((fundamental * w_fundamental) + (technical * w_technical)
+                               + (vwap_sr * w_vwap) + (sentiment * w_sentiment), 100)
+        current = panel['close'] / 100.0
+        with np.errstate(invalid='ignore'):
+            composite = np.where((current >= 1.0) & (current <= 10000.0), composite, np.nan)
+        return ScoreResult(self.name, composite, self.profile.rating.codes(composite),
+                           self.labels, time.perf_counter() - started)
+
+
+# Full-spectrum family --------------------------------------------------------
+
+def scaled_price(values: np.ndarray) -> np.ndarray:
+    """EnhancedFullSpectrumScoring.get_scaled_price over an array"""
+    with np.errstate(invalid='ignore'):
+        factor = np.select(
+            [(1.0 <= values) & (values <= 10000.0), (100.0 <= values) & (values <= 1000000.0),
+             values < 1.0, values > 1000000.0],
+            [1.0, 100.0, 0.01, 100.0], 1.0)
+    return values / factor
+
+
+class FullSpectrumScorer:
+    """
+    Vectorized EnhancedFullSpectrumScoring (enhanced=True) and the root
+    FullSpectrumScoring it grew from (enhanced=False).
+
+    Sector weights are per ticker, taken from the scorer's own
+    get_sector_weights so the sector CSV and mapping stay the source of truth.
+    """
+
+    FIVE_LEVEL = RatingScale((82, 75, 68, 62), FIVE_LEVELS)
+    WEIGHT_DEFAULTS = (('fundamental_weight', 0.35), ('technical_weight', 0.25),
+                       ('vwap_sr_weight', 0.25), ('market_sentiment_weight', 0.15))
+    THRESHOLD_DEFAULTS = (('threshold_strong_buy', 78), ('threshold_buy', 68),
+                          ('threshold_hold', 58), ('threshold_sell', 43))
+
+    def __init__(self, name: str, sector_weights: Callable[[str], Dict], enhanced: bool = True):
+        self.name = name
+        self.sector_weights = sector_weights
+        self.enhanced = enhanced
+        self.labels = FIVE_LEVELS
+        self.trend_column = 'ema_200' if enhanced else 'sma_200'
+
+    def parameters(self, tickers: List[str]) -> Dict[str, np.ndarray]:
+        rows = [self.sector_weights(ticker) or {} for ticker in tickers]
+        params = {
+            'base_fundamental': np.array([row.get('base_score_fundamental', 50) for row in rows], dtype='float64'),
+            'base_technical': np.array([row.get('base_score_technical', 40) for row in rows], dtype='float64'),
+            'sector': np.array([row.get('sector', 'Default') for row in rows], dtype=object),
+            'weights': np.array([[row.get(key, default) for key, default in self.WEIGHT_DEFAULTS]
+                                 for row in rows], dtype='float64').reshape(len(rows), 4),
+            'thresholds': np.array([[row.get(key, default) for key, default in self.THRESHOLD_DEFAULTS]
+                                    for row in rows], dtype='float64').reshape(len(rows), 4),
+        }
+        return params
+
+    def fundamental_health(self, panel: BacktestPanel, base: np.ndarray) -> np.ndarray:
+        score = np.broadcast_to(base, panel.shape).astype('float64')
+        factors = np.zeros(panel.shape)
+        market_cap, revenue = panel['market_cap'], panel['revenue_ttm']
+        net_income, debt, fcf = panel['net_income_ttm'], panel['total_debt'], panel['free_cash_flow']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            has = market_cap > 0
+            score += np.where(has, Tiers((500, 100, 10, 2), (15, 12, 8, 5), 2, '>').apply(market_cap / 1_000_000_000), 0)
+            factors += has
+
+            has = _known(revenue) & _known(net_income)
+            margin = Tiers((0.25, 0.15, 0.10, 0.05), (20, 15, 10, 5), 0, '>').apply(net_income / revenue)
+            profitability = np.where((revenue > 0) & (net_income > 0), margin, np.where(revenue > 0, 3, 0))
+            score += np.where(has, profitability, 0)
+            factors += has
+
+            has = _known(debt) & _known(revenue)
+            leverage = Tiers((0.5, 1.0, 2.0), (15, 10, 5), 0, '<').apply(debt / revenue)
+            score += np.where(has & (revenue > 0), leverage, 0)
+            factors += has
+
+            has = _known(fcf)
+            score += np.where(has, np.where(fcf > 0, 10, np.where(fcf > -1_000_000_000, 5, 0)), 0)
+            factors += has
+
+        score = np.where(factors > 0, np.minimum(score, base + 60), score)
+        return np.clip(score, 0, 100)
+
+    def technical_health(self, panel: BacktestPanel, base: np.ndarray) -> np.ndarray:
+        score = np.broadcast_to(base, panel.shape).astype('float64')
+        factors = np.zeros(panel.shape)
+        current = scaled_price(panel['close'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = panel['rsi_14']
+            known = _known(rsi)
+            rsi_points = np.select(
+                [(40 <= rsi) & (rsi <= 60), (30 <= rsi) & (rsi <= 70), (20 <= rsi) & (rsi <= 80), rsi < 20, rsi > 80],
+                [20, 15, 10, 12, 5], 0)
+            score += np.where(known, rsi_points, 0)
+            factors += known
+
+            macd = panel['macd_line']
+            known = _known(macd)
+            score += np.where(known, np.where(macd > 0, 15, np.where(macd > -0.5, 8, 3)), 0)
+            factors += known
+
+            ema_20, ema_50 = panel['ema_20'], panel['ema_50']
+            has = _known(ema_20) & _known(ema_50)
+            ema_20, ema_50 = scaled_price(ema_20), scaled_price(ema_50)
+            trend = np.select([(current > ema_20) & (ema_20 > ema_50), current > ema_50, current > ema_20],
+                              [20, 12, 8], 3)
+            score += np.where(has, trend, 0)
+            factors += has
+
+            raw_long = panel[self.trend_column]
+            known = _known(raw_long)
+            long_average = scaled_price(raw_long)
+            distance = (current - long_average) / long_average
+            score += np.where(known, Tiers((0.20, 0.10, 0, -0.10), (20, 15, 10, 5), 0, '>').apply(distance), 0)
+            factors += known
+
+        score = np.where(factors > 0, np.minimum(score, base + 75), score)
+        # A zero long average raises in the scalar version, which falls back to 40
+        return np.where(raw_long == 0, 40.0, np.clip(score, 0, 100))
+
+    def vwap_sr_score(self, panel: BacktestPanel) -> np.ndarray:
+        current = scaled_price(panel['close'])
+        raw_vwap, support, resistance = panel['vwap'], panel['support_1'], panel['resistance_1']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = scaled_price(raw_vwap)
+            vwap_score = np.where(
+                _known(raw_vwap),
+                Tiers((0.05, 0.02, -0.02, -0.05), (85, 75, 65, 45), 25, '>').apply((current - vwap) / vwap), 50)
+            support_score = np.where(
+                _known(support),
+                Tiers((0.02, 0.05, 0.10), (85, 70, 60), 40, '<=').apply((current - scaled_price(support)) / current),
+                50)
+            resistance_score = np.where(
+                _known(resistance),
+                Tiers((0.15, 0.10, 0.05, 0.02), (85, 75, 65, 45), 25, '>=').apply(
+                    (scaled_price(resistance) - current) / current),
+                50)
+        score = np.clip((vwap_score * 0.4) + (support_score * 0.3) + (resistance_score * 0.3), 0, 100)
+        return np.where(raw_vwap == 0, 50.0, score)
+
+    def score(self, panel: BacktestPanel) -> ScoreResult:
+        started = time.perf_counter()
+        params = self.parameters(panel.tickers)
+        fundamental = self.fundamental_health(panel, params['base_fundamental'])
+        technical = self.technical_health(panel, params['base_technical'])
+        vwap_sr = self.vwap_sr_score(panel)
+        w_fundamental, w_technical, w_vwap, w_sentiment = params['weights'].T
+
+        if self.enhanced:
+            sentiment = (fundamental + technical) / 2
+        else:
+            sentiment = (fundamental + technical + vwap_sr) / 3
+        composite = ((fundamental * w_fundamental) + (technical * w_technical)
+                     + (vwap_sr * w_vwap) + (sentiment * w_sentiment))
+
+        if self.enhanced:
+            sector = params['sector']
+            adjust = np.select(
+                [(sector == 'Technology') & (composite > 65), sector == 'Energy',
+                 sector == 'Communication Services', (sector == 'Industrial') & (composite > 66)],
+                [0.98, 0.95, 0.93, 0.98], 1.0)
+            composite = np.minimum(composite * adjust, 100)
+            thresholds = None
+            scale = self.FIVE_LEVEL
+        else:
+            composite = np.clip(composite, 0, 100)
+            thresholds = params['thresholds']
+            scale = RatingScale(tuple(default for _, default in self.THRESHOLD_DEFAULTS), FIVE_LEVELS)
+
+        current = scaled_price(panel['close'])
+        with np.errstate(invalid='ignore'):
+            composite = np.where((current >= 1.0) & (current <= 10000.0), composite, np.nan)
+        return ScoreResult(self.name, composite, scale.codes(composite, thresholds),
+                           self.labels, time.perf_counter() - started)
+
+
+def default_scorers(db: DatabaseManager = None) -> Dict[str, object]:
+    """Every vectorized scorer, keyed by the module it reproduces"""
+    scorers = {profile.name: DecisiveScorer(profile) for profile in DECISIVE_PROFILES}
+    for profile in (AGGRESSIVE_BUY_HOLD, BALANCED_REALISTIC):
+        scorers[profile.name] = BaseScoreScorer(profile)
+
+    enhanced = EnhancedFullSpectrumScoring(db=db)
+    enhanced.load_sector_weights()
+    scorers['enhanced_full_spectrum_scoring'] = FullSpectrumScorer(
+        'enhanced_full_spectrum_scoring', lambda ticker: enhanced.get_sector_weights(ticker)[1])
+    # FullSpectrumScoring's sector_weights_full_spectrum.csv is not in the tree, so it
+    # always runs on its built-in defaults
+    scorers['full_spectrum_scoring_system'] = FullSpectrumScorer(
+        'full_spectrum_scoring_system', lambda ticker: {}, enhanced=False)
+    return scorers
+
+
+# Evaluation ------------------------------------------------------------------
+
+@dataclass
+class BucketStats:
+    """Forward returns of every observation that got one rating"""
+    rating: str
+    observations: int
+    mean_return: float
+    median_return: float
+    excess_return: float          # vs. the same date's universe mean
+    hit_rate: Optional[float]     # share moving the rated way; None for hold ratings
+
+
+@dataclass
+class ScorerResult:
+    """One scorer at one forward-return horizon"""
+    scorer: str
+    horizon: int
+    observations: int
+    coverage: float               # scored share of ticker-days with a close
+    hit_rate: Optional[float]     # bullish calls that rose + bearish calls that fell
+    spread: Optional[float]       # mean bullish return - mean bearish return
+    information_coefficient: Optional[float]
+    buckets: List[BucketStats] = field(default_factory=list)
+    score_seconds: float = 0.0
+
+
+def _rank_ic(scores: np.ndarray, returns: np.ndarray) -> Optional[float]:
+    """Mean per-date Spearman correlation between score and forward return"""
+    both = _known(scores) & _known(returns)
+    enough = both.sum(axis=1) >= MIN_IC_NAMES
+    if not enough.any():
+        return None
+    score_ranks = pd.DataFrame(np.where(both, scores, np.nan)[enough]).rank(axis=1).to_numpy(copy=True)
+    return_ranks = pd.DataFrame(np.where(both, returns, np.nan)[enough]).rank(axis=1).to_numpy(copy=True)
+    score_ranks -= np.nanmean(score_ranks, axis=1, keepdims=True)
+    return_ranks -= np.nanmean(return_ranks, axis=1, keepdims=True)
+    numerator = np.nansum(score_ranks * return_ranks, axis=1)
+    denominator = np.sqrt(np.nansum(score_ranks ** 2, axis=1) * np.nansum(return_ranks ** 2, axis=1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlations = numerator / denominator
+    correlations = correlations[np.isfinite(correlations)]
+    return float(correlations.mean()) if len(correlations) else None
+
+
+def evaluate(panel: BacktestPanel, result: ScoreResult, horizon: int) -> ScorerResult:
+    """Hit rates, rating-bucket returns, spread and IC of one scorer's ratings"""
+    returns = panel.forward_returns[horizon]
+    known_returns = _known(returns)
+    counts = known_returns.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        day_mean = np.where(counts > 0, np.nansum(returns, axis=1, keepdims=True) / counts, np.nan)
+
+    mask = (result.ratings >= 0) & known_returns
+    frame = pd.DataFrame({
+        'rating': result.ratings[mask],
+        'return': returns[mask],
+        'excess': (returns - day_mean)[mask],
+    })
+    frame['up'] = frame['return'] > 0
+    frame['down'] = frame['return'] < 0
+    stats = frame.groupby('rating').agg(
+        observations=('return', 'size'), mean_return=('return', 'mean'),
+        median_return=('return', 'median'), excess_return=('excess', 'mean'),
+        up=('up', 'mean'), down=('down', 'mean'))
+
+    buckets = []
+    for code, row in stats.iterrows():
+        label = result.labels[int(code)]
+        hit_rate = row['up'] if label in BULLISH else row['down'] if label in BEARISH else None
+        buckets.append(BucketStats(
+            rating=label, observations=int(row['observations']),
+            mean_return=float(row['mean_return']), median_return=float(row['median_return']),
+            excess_return=float(row['excess_return']),
+            hit_rate=None if hit_rate is None else float(hit_rate)))
+
+    labels = np.array(result.labels, dtype=object)[frame['rating'].to_numpy()] if len(frame) else np.array([])
+    bullish = np.isin(labels, list(BULLISH))
+    bearish = np.isin(labels, list(BEARISH))
+    calls = bullish.sum() + bearish.sum()
+    hits = (bullish & frame['up'].to_numpy()).sum() + (bearish & frame['down'].to_numpy()).sum()
+    spread = None
+    if bullish.any() and bearish.any():
+        spread = float(frame['return'].to_numpy()[bullish].mean() - frame['return'].to_numpy()[bearish].mean())
+
+    priced = _known(panel['close']).sum()
+    return ScorerResult(
+        scorer=result.scorer, horizon=horizon, observations=int(mask.sum()),
+        coverage=float((result.ratings >= 0).sum() / priced) if priced else 0.0,
+        hit_rate=float(hits / calls) if calls else None, spread=spread,
+        information_coefficient=_rank_ic(result.composite, returns),
+        buckets=buckets, score_seconds=result.seconds)
+
+
+@dataclass
+class BacktestReport:
+    """Outcome of one backtest run"""
+    start: str = ''
+    end: str = ''
+    tickers: int = 0
+    dates: int = 0
+    horizons: List[int] = field(default_factory=list)
+    load_seconds: float = 0.0
+    score_seconds: float = 0.0
+    elapsed: float = 0.0
+    results: List[ScorerResult] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def format(self) -> str:
+        def pct(value):
+            return '    n/a' if value is None else f"{value * 100:+6.2f}%"
+
+        lines = [
+            "SCORING BACKTEST",
+            "=" * 72,
+            f"Period: {self.start} .. {self.end}  ({self.dates} dates, {self.tickers} tickers)",
+            f"Loaded in {self.load_seconds:.1f}s, scored and evaluated in {self.score_seconds:.1f}s",
+        ]
+        for result in self.results:
+            hit = 'n/a' if result.hit_rate is None else f"{result.hit_rate:.1%}"
+            ic = 'n/a' if result.information_coefficient is None else f"{result.information_coefficient:+.3f}"
+            lines += [
+                "",
+                f"{result.scorer} - {result.horizon}-bar forward return",
+                f"  hit rate {hit}  spread {pct(result.spread).strip()}  IC {ic}  "
+                f"coverage {result.coverage:.0%}  ({result.observations} observations)",
+                f"  {'Rating':<12} {'Obs':>9} {'Mean':>8} {'Median':>8} {'Excess':>8} {'Hit':>7}",
+            ]
+            for bucket in result.buckets:
+                bucket_hit = '    -' if bucket.hit_rate is None else f"{bucket.hit_rate:.1%}"
+                lines.append(f"  {bucket.rating:<12} {bucket.observations:>9} {pct(bucket.mean_return):>8} "
+                             f"{pct(bucket.median_return):>8} {pct(bucket.excess_return):>8} {bucket_hit:>7}")
+        return "\n".join(lines)
+
+
+# Engine ----------------------------------------------------------------------
+
+class ScoringBacktest:
+    """Loads history into a panel and runs the vectorized scorers over it"""
+
+    def __init__(self, db: DatabaseManager = None, table: str = 'daily_charts',
+                 batch_size: int = 100, fundamentals_lag_days: int = FUNDAMENTALS_LAG_DAYS):
+        """
+        Args:
+            db: Database manager
+            table: Price table to replay
+            batch_size: Tickers loaded per query
+            fundamentals_lag_days: Days after report_date before a report is used
+        """
+        self.db = db or DatabaseManager()
+        self.table = table
+        self.batch_size = batch_size
+        self.fundamentals_lag_days = fundamentals_lag_days
+        self._columns: Dict[str, List[str]] = {}
+
+    def _existing(self, table: str) -> List[str]:
+        if table not in self._columns:
+            self._columns[table] = [row[0] for row in self.db.execute_query(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table,))]
+        return self._columns[table]
+
+    def technical_columns(self) -> List[str]:
+        """TECHNICAL_COLUMNS that exist in the price table"""
+        existing = set(self._existing(self.table))
+        return [column for column in TECHNICAL_COLUMNS if column in existing]
+
+    def fundamental_columns(self) -> Dict[str, str]:
+        """FUNDAMENTAL_COLUMNS whose company_fundamentals column exists"""
+        existing = set(self._existing('company_fundamentals'))
+        return {name: column for name, column in FUNDAMENTAL_COLUMNS.items() if column in existing}
+
+    def universe(self) -> List[str]:
+        return [row[0] for row in self.db.execute_query(
+            "SELECT ticker FROM stocks WHERE ticker IS NOT NULL ORDER BY ticker")]
+
+    def load_prices(self, tickers: List[str], start: date, end: date) -> pd.DataFrame:
+        """Long price rows for the tickers between start and end (ISO-bound, TEXT or DATE column)"""
+        columns = ['close', 'volume'] + self.technical_columns()
+        frames = []
+        for i in range(0, len(tickers), self.batch_size):
+            batch = tickers[i:i + self.batch_size]
+            rows = self.db.execute_query(f"""
+                SELECT ticker, date, {', '.join(columns)}
+                FROM {self.table}
+                WHERE ticker = ANY(%s) AND date >= %s AND date <= %s
+                ORDER BY ticker, date
+            """, (batch, start.isoformat(), end.isoformat()))
+            if rows:
+                frames.append(_numeric(pd.DataFrame(rows, columns=['ticker', 'date'] + columns), columns))
+        if not frames:
+            return pd.DataFrame(columns=['ticker', 'date'] + columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def load_fundamentals(self, tickers: List[str]) -> pd.DataFrame:
+        """company_fundamentals reports with the date each may first be used"""
+        columns = self.fundamental_columns()
+        existing = set(self._existing('company_fundamentals'))
+        if not columns or 'report_date' not in existing or not tickers:
+            return pd.DataFrame(columns=['ticker', 'available'])
+        period = 'period_type' if 'period_type' in existing else 'NULL'
+        rows = self.db.execute_query(f"""
+            SELECT ticker, report_date, {period}, {', '.join(columns.values())}
+            FROM company_fundamentals
+            WHERE ticker = ANY(%s) AND report_date IS NOT NULL
+            ORDER BY ticker, report_date
+        """, (tickers,))
+        frame = pd.DataFrame(rows, columns=['ticker', 'report_date', 'period_type'] + list(columns))
+        frame = _numeric(frame, columns)
+        frame['available'] = pd.to_datetime(frame['report_date']) + pd.Timedelta(days=self.fundamentals_lag_days)
+        frame['priority'] = frame['period_type'].map(PERIOD_PRIORITY).fillna(-1)
+        frame = frame.sort_values(['ticker', 'available', 'priority'])
+        frame = frame.drop_duplicates(['ticker', 'available'], keep='last')
+        return frame[['ticker', 'available'] + list(columns)].reset_index(drop=True)
+
+    def load_panel(self, start, end=None, tickers: Optional[Iterable[str]] = None,
+                   horizons: Sequence[int] = DEFAULT_HORIZONS) -> BacktestPanel:
+        start = pd.Timestamp(start).date()
+        end = pd.Timestamp(end).date() if end is not None else date.today()
+        tickers = sorted(set(self.universe() if tickers is None else tickers))
+        # A few bars before start for momentum, enough after end for the longest horizon
+        load_end = end + timedelta(days=int(max(horizons, default=0) * 1.5) + 10)
+        prices = self.load_prices(tickers, start - timedelta(days=14), load_end)
+        fundamentals = self.load_fundamentals(tickers)
+        return build_panel(prices, fundamentals, horizons, start=start, end=end)
+
+    def run(self, start, end=None, tickers: Optional[Iterable[str]] = None,
+            scorers: Optional[Iterable[str]] = None,
+            horizons: Sequence[int] = DEFAULT_HORIZONS) -> BacktestReport:
+        """
+        Score every ticker on every date in [start, end] and evaluate the ratings.
+
+        Args:
+            start, end: Scoring period (end defaults to today)
+            tickers: Restrict to these tickers (default: all in stocks)
+            scorers: Names from default_scorers() (default: all)
+            horizons: Forward-return horizons in bars
+        """
+        started = time.time()
+        available = default_scorers(self.db)
+        names = list(available) if scorers is None else list(scorers)
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValueError(f"Unknown scorers: {', '.join(unknown)} (available: {', '.join(available)})")
+
+        panel = self.load_panel(start, end, tickers, horizons)
+        report = BacktestReport(horizons=list(horizons), tickers=len(panel.tickers), dates=len(panel.dates),
+                                load_seconds=time.time() - started)
+        if len(panel.dates):
+            report.start = str(pd.Timestamp(panel.dates[0]).date())
+            report.end = str(pd.Timestamp(panel.dates[-1]).date())
+        logger.info(f"📈 Scoring backtest: {report.tickers} tickers x {report.dates} dates loaded in "
+                    f"{report.load_seconds:.1f}s, running {len(names)} scorers")
+
+        scoring_started = time.time()
+        for name in names:
+            result = available[name].score(panel)
+            for horizon in horizons:
+                report.results.append(evaluate(panel, result, horizon))
+            logger.info(f"📊 {name}: scored in {result.seconds * 1000:.0f}ms")
+        report.score_seconds = time.time() - scoring_started
+        report.elapsed = time.time() - started
+        logger.info(f"✅ Scoring backtest finished in {report.elapsed:.1f}s")
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Backtest the scoring systems over daily_charts history')
+    parser.add_argument('--start', default=str(date.today() - timedelta(days=3 * 365)),
+                        help='First date to score (default: three years ago)')
+    parser.add_argument('--end', default=None, help='Last date to score (default: today)')
+    parser.add_argument('--tickers', nargs='+', help='Only these tickers (default: all in stocks)')
+    parser.add_argument('--scorers', nargs='+', help='Scorers to run (default: all)')
+    parser.add_argument('--horizons', nargs='+', type=int, default=list(DEFAULT_HORIZONS),
+                        help='Forward-return horizons in bars')
+    parser.add_argument('--batch-size', type=int, default=100, help='Tickers loaded per query')
+    parser.add_argument('--fundamentals-lag', type=int, default=FUNDAMENTALS_LAG_DAYS,
+                        help='Days after report_date before a report is used')
+    parser.add_argument('--json', help='Also write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    backtest = ScoringBacktest(batch_size=args.batch_size, fundamentals_lag_days=args.fundamentals_lag)
+    report = backtest.run(args.start, args.end, tickers=args.tickers, scorers=args.scorers,
+                          horizons=args.horizons)
+    print(report.format())
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report.to_dict(), f, indent=2, default=str)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,388 @@
+"""
+Scoring Plugins
+
+A common interface for the scoring variants: every plugin scores a whole
+UniverseSnapshot (loaded once, see universe_snapshot.py) and returns
+composite score and rating per ticker, so any number of variants can be
+compared side by side in one process over exactly the same data.
+
+Two kinds of plugin are provided:
+
+    LegacyScorerPlugin      wraps a root-level per-ticker scorer class
+                            (FinalOptimizedDecisiveScorer, ComprehensiveAIComparison,
+                            EnhancedSectorBasedScoring, BalancedDecisiveScorer, ...).
+                            Its get_stock_data is rebound to read from the snapshot
+                            in the layout that class expects, so its own scoring
+                            code runs unchanged without a connection of its own.
+    VectorizedScorerPlugin  wraps a scoring_backtest scorer and rates the whole
+                            universe in a few array operations.
+
+New variants implement ScorerPlugin.score_universe directly, reading
+snapshot.column() / snapshot.history_matrix() for columnar access.
+
+Usage:
+    python scoring_plugins.py --list
+    python scoring_plugins.py --plugins final_optimized_decisive_scoring balanced_decisive_scoring
+        [--tickers AAPL MSFT] [--csv comparison.csv]
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .database import DatabaseManager
+    from .universe_snapshot import UniverseSnapshot, UniverseSnapshotLoader
+    from . import scoring_backtest
+except ImportError:
+    from database import DatabaseManager
+    from universe_snapshot import UniverseSnapshot, UniverseSnapshotLoader
+    import scoring_backtest
+
+# The legacy scorers live in the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logger = logging.getLogger(__name__)
+
+# stocks columns the per-ticker scorers select
+STOCK_COLUMNS = [
+    'market_cap', 'revenue_ttm', 'net_income_ttm', 'total_assets', 'total_debt',
+    'shareholders_equity', 'current_assets', 'current_liabilities', 'operating_income',
+    'cash_and_equivalents', 'free_cash_flow', 'shares_outstanding', 'diluted_eps_ttm',
+    'book_value_per_share', 'ebitda_ttm', 'enterprise_value',
+]
+LEVEL_COLUMNS = ['support_1', 'support_2', 'support_3', 'resistance_1', 'resistance_2', 'resistance_3']
+
+
+# Snapshot views: the dicts each family's get_stock_data used to build -------
+
+def decisive_view(snapshot: UniverseSnapshot, ticker: str, scorer) -> Dict:
+    """{'fundamental', 'technical', 'price_history'} of the decisive scorers"""
+    fundamental, technical = snapshot.fundamental(ticker), snapshot.technical(ticker)
+    if not fundamental or not technical:
+        return {}
+    return {
+        'fundamental': {column: fundamental.get(column) for column in STOCK_COLUMNS},
+        'technical': {
+            'close': technical.get('close'),
+            'vwap': technical.get('vwap'),
+            **{column: technical.get(column) for column in LEVEL_COLUMNS},
+            'rsi': technical.get('rsi_14'),
+            'macd': technical.get('macd_line'),
+            'sma_20': technical.get('ema_20'),
+            'sma_50': technical.get('ema_50'),
+            'sma_200': technical.get('ema_200'),
+        },
+        'price_history': snapshot.price_history(ticker, ('close', 'volume', 'date')),
+    }
+
+
+def combined_view(snapshot: UniverseSnapshot, ticker: str, scorer) -> Optional[Dict]:
+    """Flat stocks + latest-row dict of the aggressive/balanced and sector-weighted scorers"""
+    fundamental, technical = snapshot.fundamental(ticker), snapshot.technical(ticker)
+    if not fundamental or not technical:
+        return None
+    sector = getattr(scorer, 'sector_mapping', {}).get(ticker, 'Technology')
+    data = {'ticker': ticker, 'company_name': ticker, 'sector': sector, 'industry': sector}
+    data.update({column: fundamental.get(column) for column in STOCK_COLUMNS})
+    data.update({column: technical.get(column) for column in ['vwap'] + LEVEL_COLUMNS})
+    data.update({
+        'rsi_14': technical.get('rsi_14'),
+        'macd_line': technical.get('macd_line'),
+        'macd_signal': technical.get('macd_line'),
+        'ema_20': technical.get('ema_20'),
+        'ema_50': technical.get('ema_50'),
+        'sma_200': technical.get('ema_200'),
+        'volume': 1000000,
+        'close': technical.get('close'),
+        'current_price': technical.get('close'),
+    })
+    return data
+
+
+def full_spectrum_view(snapshot: UniverseSnapshot, ticker: str, scorer) -> Optional[Dict]:
+    """Flat dict of the full-spectrum scorers (stocks sector/industry, real volume)"""
+    fundamental, technical = snapshot.fundamental(ticker), snapshot.technical(ticker)
+    if not fundamental or not technical:
+        return None
+    data = {'ticker': ticker}
+    data.update({column: fundamental.get(column) for column in (
+        'market_cap', 'revenue_ttm', 'net_income_ttm', 'total_debt', 'free_cash_flow',
+        'shares_outstanding', 'book_value_per_share')})
+    data.update({
+        'sector': fundamental.get('sector') or 'Technology',
+        'industry': fundamental.get('industry') or 'Software',
+        'close': technical.get('close'),
+        'current_price': technical.get('close'),
+    })
+    data.update({column: technical.get(column) for column in (
+        'vwap', 'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200', 'sma_200', 'date')})
+    data.update({column: technical.get(column) for column in LEVEL_COLUMNS})
+    data['volume'] = technical.get('volume') or 1000000
+    return data
+
+
+def raw_view(snapshot: UniverseSnapshot, ticker: str, scorer) -> Optional[Dict]:
+    """Whole stocks and latest rows plus OHLCV history dicts (SELECT * scorers)"""
+    fundamental, technical = snapshot.fundamental(ticker), snapshot.technical(ticker)
+    if not fundamental or not technical:
+        return None
+    columns = ('date', 'open', 'high', 'low', 'close', 'volume')
+    return {
+        'fundamental': dict(fundamental),
+        'technical': dict(technical),
+        'price_history': [dict(zip(columns, row)) for row in snapshot.price_history(ticker, columns)],
+    }
+
+
+# Plugin interface --------------------------------------------------------------
+
+@dataclass
+class PluginResult:
+    """One plugin's ratings over a snapshot"""
+    plugin: str
+    scores: Dict[str, Dict[str, Any]] = field(default_factory=dict)   # ticker -> composite_score, rating
+    skipped: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def rating_counts(self) -> Dict[str, int]:
+        return dict(Counter(score['rating'] for score in self.scores.values()))
+
+
+class ScorerPlugin:
+    """A scoring variant evaluated over a whole UniverseSnapshot"""
+
+    name = 'scorer'
+
+    def score_universe(self, snapshot: UniverseSnapshot) -> PluginResult:
+        raise NotImplementedError
+
+
+class LegacyScorerPlugin(ScorerPlugin):
+    """Runs a root-level per-ticker scorer class against a snapshot"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], view: Callable, method: str = 'score_stock'):
+        """
+        Args:
+            name: Plugin name
+            factory: Builds the scorer instance (no database connection is opened)
+            view: Snapshot view producing what the class's get_stock_data returned
+            method: Per-ticker entry point returning a result dict
+        """
+        self.name = name
+        self.factory = factory
+        self.view = view
+        self.method = method
+
+    def build(self, snapshot: UniverseSnapshot):
+        scorer = self.factory()
+        if hasattr(scorer, 'load_sector_weights'):
+            scorer.load_sector_weights()
+        scorer.get_stock_data = lambda ticker: self.view(snapshot, ticker, scorer)
+        return scorer
+
+    def score_universe(self, snapshot: UniverseSnapshot) -> PluginResult:
+        started = time.time()
+        result = PluginResult(self.name)
+        score = getattr(self.build(snapshot), self.method)
+        for ticker in snapshot.tickers:
+            try:
+                outcome = score(ticker)
+            except Exception as e:
+                result.errors[ticker] = str(e)
+                continue
+            if not outcome:
+                result.skipped.append(ticker)
+            elif 'error' in outcome:
+                result.errors[ticker] = outcome['error']
+            else:
+                result.scores[ticker] = {
+                    'composite_score': float(outcome['composite_score']),
+                    'rating': outcome.get('rating') or outcome.get('our_rating'),
+                }
+        result.seconds = time.time() - started
+        return result
+
+
+class VectorizedScorerPlugin(ScorerPlugin):
+    """Runs a scoring_backtest scorer over the snapshot as a one-date panel"""
+
+    def __init__(self, scorer, name: str = None):
+        self.scorer = scorer
+        self.name = name or f"vectorized:{scorer.name}"
+
+    @staticmethod
+    def panel(snapshot: UniverseSnapshot) -> scoring_backtest.BacktestPanel:
+        """Latest values of every scorer input, one row, one column per ticker"""
+        fields = {column: snapshot.column(column)[None, :]
+                  for column in ['close', 'volume'] + scoring_backtest.TECHNICAL_COLUMNS}
+        fields.update({column: snapshot.column(column)[None, :]
+                       for column in scoring_backtest.FUNDAMENTAL_COLUMNS})
+        # The bar before the latest one, as price_history[1] in the per-ticker scorers
+        fields['prev_close'] = snapshot.history_matrix('close', 2)[:, 1][None, :]
+        return scoring_backtest.BacktestPanel(
+            dates=np.array([np.datetime64('today', 'ns')]), tickers=list(snapshot.tickers), fields=fields)
+
+    def score_universe(self, snapshot: UniverseSnapshot) -> PluginResult:
+        started = time.time()
+        result = PluginResult(self.name)
+        scored = self.scorer.score(self.panel(snapshot))
+        for j, ticker in enumerate(snapshot.tickers):
+            code = scored.ratings[0, j]
+            if code < 0:
+                result.skipped.append(ticker)
+            else:
+                result.scores[ticker] = {'composite_score': float(scored.composite[0, j]),
+                                         'rating': scored.labels[code]}
+        result.seconds = time.time() - started
+        return result
+
+
+# Registry ----------------------------------------------------------------------
+
+# name -> (module, class, view[, entry point])
+LEGACY_SCORERS = {
+    'final_optimized_decisive_scoring': ('final_optimized_decisive_scoring', 'FinalOptimizedDecisiveScorer', decisive_view),
+    'market_aligned_decisive_scoring': ('market_aligned_decisive_scoring', 'MarketAlignedDecisiveScorer', decisive_view),
+    'final_decisive_scoring': ('final_decisive_scoring', 'FinalDecisiveScorer', decisive_view),
+    'balanced_decisive_scoring': ('balanced_decisive_scoring', 'BalancedDecisiveScorer', decisive_view),
+    'decisive_scoring_system': ('decisive_scoring_system', 'DecisiveStockScorer', decisive_view),
+    'final_enhanced_scoring_optimized': ('final_enhanced_scoring_optimized', 'FinalOptimizedScorer', decisive_view),
+    'enhanced_scoring_corrected_schema': ('enhanced_scoring_corrected_schema', 'CorrectedEnhancedScorer', decisive_view),
+    'aggressive_buy_hold_scoring': ('aggressive_buy_hold_scoring', 'AggressiveBuyHoldScoring', combined_view),
+    'balanced_realistic_scoring': ('balanced_realistic_scoring', 'BalancedRealisticScoring', combined_view),
+    'comprehensive_ai_comparison_table': ('comprehensive_ai_comparison_table', 'ComprehensiveAIComparison', combined_view),
+    'enhanced_sector_based_scoring': ('enhanced_sector_based_scoring', 'EnhancedSectorBasedScoring', combined_view),
+    'improved_alignment_scoring': ('improved_alignment_scoring', 'ImprovedAlignmentScoring', combined_view),
+    'optimal_alignment_scoring': ('optimal_alignment_scoring', 'OptimalAlignmentScoring', combined_view),
+    'full_spectrum_scoring_system': ('full_spectrum_scoring_system', 'FullSpectrumScoring', full_spectrum_view),
+    'enhanced_scoring_with_vwap_sr': ('enhanced_scoring_with_vwap_sr', 'EnhancedStockScorer', raw_view),
+}
+
+
+def _legacy_factory(module_name: str, class_name: str) -> Callable[[], Any]:
+    def build():
+        return getattr(importlib.import_module(module_name), class_name)()
+    return build
+
+
+def available_plugins(db: DatabaseManager = None) -> Dict[str, ScorerPlugin]:
+    """Every registered plugin by name; legacy classes are imported on first use"""
+    plugins: Dict[str, ScorerPlugin] = {}
+    for name, (module_name, class_name, view) in LEGACY_SCORERS.items():
+        plugins[name] = LegacyScorerPlugin(name, _legacy_factory(module_name, class_name), view)
+
+    def enhanced_full_spectrum():
+        try:
+            from .enhanced_full_spectrum_scoring import EnhancedFullSpectrumScoring
+        except ImportError:
+            from enhanced_full_spectrum_scoring import EnhancedFullSpectrumScoring
+        return EnhancedFullSpectrumScoring(db=db)
+
+    plugins['enhanced_full_spectrum_scoring'] = LegacyScorerPlugin(
+        'enhanced_full_spectrum_scoring', enhanced_full_spectrum, full_spectrum_view,
+        method='calculate_enhanced_scores')
+
+    for scorer in scoring_backtest.default_scorers(db).values():
+        plugin = VectorizedScorerPlugin(scorer)
+        plugins[plugin.name] = plugin
+    return plugins
+
+
+# Side-by-side comparison ---------------------------------------------------------
+
+@dataclass
+class ComparisonReport:
+    """Every plugin's ratings over one snapshot"""
+    tickers: int = 0
+    snapshot_queries: int = 0
+    snapshot_seconds: float = 0.0
+    results: List[PluginResult] = field(default_factory=list)
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per ticker: <plugin>_score and <plugin>_rating columns"""
+        columns = {}
+        for result in self.results:
+            columns[f"{result.plugin}_score"] = {t: s['composite_score'] for t, s in result.scores.items()}
+            columns[f"{result.plugin}_rating"] = {t: s['rating'] for t, s in result.scores.items()}
+        frame = pd.DataFrame(columns)
+        frame.index.name = 'ticker'
+        return frame.sort_index()
+
+    def format(self) -> str:
+        lines = [
+            "SCORING VARIANTS SIDE BY SIDE",
+            "=" * 72,
+            f"Snapshot: {self.tickers} tickers in {self.snapshot_queries} queries ({self.snapshot_seconds:.1f}s)",
+            "",
+            f"{'Plugin':<42} {'Scored':>7} {'Skipped':>8} {'Errors':>7} {'Time':>8}",
+        ]
+        for result in self.results:
+            lines.append(f"{result.plugin:<42} {len(result.scores):>7} {len(result.skipped):>8} "
+                         f"{len(result.errors):>7} {result.seconds:>7.2f}s")
+        for result in self.results:
+            counts = result.rating_counts()
+            if counts:
+                summary = ', '.join(f"{rating} {count}" for rating, count in
+                                    sorted(counts.items(), key=lambda item: -item[1]))
+                lines.append(f"  {result.plugin}: {summary}")
+        return "\n".join(lines)
+
+
+def compare(snapshot: UniverseSnapshot, plugins: Iterable[ScorerPlugin]) -> ComparisonReport:
+    """Score the same snapshot with every plugin"""
+    report = ComparisonReport(tickers=len(snapshot), snapshot_queries=snapshot.queries,
+                              snapshot_seconds=snapshot.load_seconds)
+    for plugin in plugins:
+        try:
+            result = plugin.score_universe(snapshot)
+        except Exception as e:
+            logger.error(f"❌ {plugin.name} failed: {e}")
+            result = PluginResult(plugin.name, errors={'*': str(e)})
+        logger.info(f"📊 {plugin.name}: {len(result.scores)} scored, {len(result.skipped)} skipped "
+                    f"in {result.seconds:.2f}s")
+        report.results.append(result)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Compare scoring variants over one universe snapshot')
+    parser.add_argument('--plugins', nargs='+', help='Plugins to run (default: all)')
+    parser.add_argument('--tickers', nargs='+', help='Only these tickers (default: all in stocks)')
+    parser.add_argument('--history-days', type=int, default=100, help='Bars of price history per ticker')
+    parser.add_argument('--csv', help='Write per-ticker scores and ratings to this CSV')
+    parser.add_argument('--list', action='store_true', help='List available plugins and exit')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    db = DatabaseManager()
+    plugins = available_plugins(db)
+    if args.list:
+        print("\n".join(plugins))
+        return 0
+
+    names = args.plugins or list(plugins)
+    unknown = [name for name in names if name not in plugins]
+    if unknown:
+        parser.error(f"unknown plugins: {', '.join(unknown)}")
+
+    snapshot = UniverseSnapshotLoader(db, history_days=args.history_days).load(args.tickers)
+    report = compare(snapshot, [plugins[name] for name in names])
+    print(report.format())
+    if args.csv:
+        report.to_frame().to_csv(args.csv)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
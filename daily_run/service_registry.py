@@ -0,0 +1,157 @@
+"""
+Service Registry
+
+Named services (API providers, processors) that are only constructed on
+first use. Provider clients open sessions, read API keys and sometimes
+connect to the database in __init__; a run that never reaches the code path
+needing one (e.g. a non-trading day that skips the price phase) never pays
+for it. Construction times are recorded for the --measure-startup report.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# (service, seconds) for every lazily built service in this process
+_init_times: List[tuple] = []
+_init_times_lock = threading.Lock()
+
+
+def record_init(name: str, seconds: float):
+    with _init_times_lock:
+        _init_times.append((name, seconds))
+
+
+def init_timings() -> List[tuple]:
+    """Construction time of every service built so far, in build order"""
+    with _init_times_lock:
+        return list(_init_times)
+
+
+class ServiceRegistry:
+    """
+    Dict-like registry of services built on first access.
+
+    Membership and iteration only look at registered names and never build a
+    service. A factory that raises or returns None marks the service
+    unavailable: it drops out of membership and get() returns the default,
+    matching the old "service = None when construction fails" behaviour.
+    """
+
+    def __init__(self, owner: str = 'services'):
+        self.owner = owner
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> 'ServiceRegistry':
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+            self._failed.pop(name, None)
+        return self
+
+    def _build(self, name: str) -> Any:
+        instance = self._instances.get(name, _MISSING)
+        if instance is not _MISSING:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name, _MISSING)
+            if instance is not _MISSING:
+                return instance
+            if name in self._failed or name not in self._factories:
+                return _MISSING
+            start = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                instance = None
+                self._failed[name] = str(e)
+                logger.warning(f"{name} not available: {e}")
+            elapsed = time.perf_counter() - start
+            record_init(f"{self.owner}.{name}", elapsed)
+            if instance is None:
+                self._failed.setdefault(name, 'factory returned None')
+                return _MISSING
+            self._instances[name] = instance
+            logger.debug(f"Built {self.owner}.{name} in {elapsed * 1000:.0f}ms")
+            return instance
+
+    def get(self, name: str, default: Any = None) -> Any:
+        instance = self._build(name)
+        return default if instance is _MISSING else instance
+
+    def __getitem__(self, name: str) -> Any:
+        instance = self._build(name)
+        if instance is _MISSING:
+            raise KeyError(name)
+        return instance
+
+    def __setitem__(self, name: str, instance: Any):
+        """Install a ready-made instance (tests, callers that already hold one)"""
+        with self._lock:
+            self._factories.setdefault(name, lambda: None)
+            self._failed.pop(name, None)
+            self._instances[name] = instance
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._factories and name not in self._failed
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([name for name in self._factories if name not in self._failed])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def keys(self) -> List[str]:
+        return list(self)
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def built(self) -> Dict[str, Any]:
+        """Services constructed so far (closing these never builds new ones)"""
+        with self._lock:
+            return dict(self._instances)
+
+    def pending(self) -> List[str]:
+        """Registered services not constructed yet"""
+        return [name for name in self if name not in self._instances]
+
+    def failed(self) -> Dict[str, str]:
+        return dict(self._failed)
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+            self._failed.clear()
+
+
+class LazyService:
+    """
+    Attribute backed by the owner's ServiceRegistry (``self.services``).
+
+    Reading builds the service on first access; assigning installs an instance,
+    so ``processor.yahoo_service = mock`` keeps working.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+
+    def __set_name__(self, owner, name):
+        if self.name is None:
+            self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.services.get(self.name)
+
+    def __set__(self, instance, value):
+        instance.services[self.name] = value
@@ -0,0 +1,166 @@
+"""
+Startup Report
+
+Measures what it costs to start the daily trading system before any work is
+done: per-module import time (from ``python -X importtime``) and the time to
+construct DailyTradingSystem, plus which services were built eagerly and
+which are still waiting for first use.
+
+The measurement runs in a fresh interpreter so modules already imported by
+the caller do not hide their cost.
+
+Usage:
+    python daily_trading_system.py --measure-startup
+    python startup_report.py [--top 25]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+@dataclass
+class ModuleImport:
+    """One line of -X importtime output (times in milliseconds)"""
+    name: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+
+
+@dataclass
+class StartupReport:
+    """Import and construction cost of DailyTradingSystem"""
+    total_import_ms: float = 0.0
+    init_ms: float = 0.0
+    modules: List[ModuleImport] = field(default_factory=list)
+    service_init_ms: Dict[str, float] = field(default_factory=dict)
+    pending_services: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def top_level(self) -> List[ModuleImport]:
+        """Modules imported directly by the entry point (depth 0)"""
+        return [module for module in self.modules if module.depth == 0]
+
+    def slowest(self, count: int = 20) -> List[ModuleImport]:
+        """Modules with the largest cumulative import time"""
+        return sorted(self.modules, key=lambda m: m.cumulative_ms, reverse=True)[:count]
+
+    def format(self, top: int = 20) -> str:
+        lines = [
+            "STARTUP REPORT",
+            "=" * 50,
+            f"Import time:  {self.total_import_ms:8.1f}ms",
+            f"Init time:    {self.init_ms:8.1f}ms",
+            f"Total:        {self.total_import_ms + self.init_ms:8.1f}ms",
+        ]
+        if self.error:
+            lines.append(f"Error: {self.error}")
+        lines += ["", f"Slowest imports (cumulative, top {top}):"]
+        for module in self.slowest(top):
+            lines.append(f"  {module.cumulative_ms:8.1f}ms  {module.self_ms:7.1f}ms self  {module.name}")
+        if self.service_init_ms:
+            lines += ["", "Services built during init:"]
+            for name, ms in sorted(self.service_init_ms.items(), key=lambda item: -item[1]):
+                lines.append(f"  {ms:8.1f}ms  {name}")
+        if self.pending_services:
+            lines += ["", "Deferred until first use: " + ", ".join(self.pending_services)]
+        return "\n".join(lines)
+
+
+def parse_importtime(stderr: str) -> List[ModuleImport]:
+    """
+    Parse ``-X importtime`` output.
+
+    Lines look like ``import time:       412 |      10517 |   pandas``; the
+    indentation of the name is two spaces per nesting level.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append(ModuleImport(
+            name=name,
+            self_ms=int(self_us) / 1000.0,
+            cumulative_ms=int(cumulative_us) / 1000.0,
+            depth=max(0, (len(indent) - 1) // 2)
+        ))
+    return modules
+
+
+def _child() -> int:
+    """Import and construct the system, then print timings as JSON on stdout"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    result = {}
+    try:
+        import daily_trading_system
+        start = time.perf_counter()
+        system = daily_trading_system.DailyTradingSystem()
+        result['init_ms'] = (time.perf_counter() - start) * 1000
+        result['pending'] = system.services.pending()
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    from service_registry import init_timings
+    result['services'] = [(name, seconds * 1000) for name, seconds in init_timings()]
+    print(json.dumps(result))
+    return 0
+
+
+def measure_startup(timeout: int = 120) -> StartupReport:
+    """Run the import/construct probe in a fresh interpreter and collect its timings"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--child'],
+        capture_output=True, text=True, timeout=timeout,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    report = StartupReport(modules=parse_importtime(completed.stderr))
+    report.total_import_ms = sum(module.cumulative_ms for module in report.top_level()
+                                 if module.name == 'daily_trading_system')
+
+    payload = completed.stdout.strip().splitlines()[-1:] if completed.stdout else []
+    try:
+        data = json.loads(payload[0]) if payload else {}
+    except ValueError:
+        data = {}
+    if not data:
+        report.error = f"probe exited with {completed.returncode}"
+        return report
+
+    report.init_ms = data.get('init_ms', 0.0)
+    report.pending_services = data.get('pending', [])
+    report.error = data.get('error')
+    for name, ms in data.get('services', []):
+        report.service_init_ms[name] = report.service_init_ms.get(name, 0.0) + ms
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure daily trading system startup cost')
+    parser.add_argument('--top', type=int, default=20, help='Number of slowest imports to list')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return _child()
+
+    report = measure_startup()
+    print(report.format(top=args.top))
+    return 1 if report.error else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -17,11 +17,13 @@ try:
     from .database import DatabaseManager
     from .error_handler import ErrorHandler, ErrorSeverity
     from .exceptions import DataNotFoundError, RateLimitError, ServiceError
+    from .ticker_purge import TickerPurger
 except ImportError:
     from enhanced_multi_service_manager import EnhancedMultiServiceManager
     from database import DatabaseManager
     from error_handler import ErrorHandler, ErrorSeverity
     from exceptions import DataNotFoundError, RateLimitError, ServiceError
+    from ticker_purge import TickerPurger
 
 logger = logging.getLogger(__name__)
 
@@ -42,9 +44,12 @@ class ExistenceCheckResult:
 class StockExistenceChecker:
     """Checks stock existence across multiple APIs and manages delisted stock removal"""
     
-    def __init__(self, db: DatabaseManager, service_manager: EnhancedMultiServiceManager = None):
+    def __init__(self, db: DatabaseManager, service_manager: EnhancedMultiServiceManager = None,
+                 archive_dir: Optional[str] = None):
         self.db = db
         self.service_manager = service_manager or EnhancedMultiServiceManager()
+        # Purged rows are archived here before deletion (None: no archive)
+        self.archive_dir = archive_dir
         self.error_handler = ErrorHandler("stock_existence_checker")
         
         # APIs to check in order of reliability - Finnhub first as it's the best API
@@ -295,63 +300,21 @@ class StockExistenceChecker:
             return {'removed': 0, 'errors': 0}
         
         logger.info(f"Removing {len(to_remove)} delisted stocks from database")
-        
-        removed_count = 0
-        error_count = 0
-        
-        for ticker in to_remove:
-            try:
-                if self._remove_stock_from_database(ticker):
-                    removed_count += 1
-                    logger.info(f"✅ Successfully removed {ticker}")
-                else:
-                    error_count += 1
-                    logger.error(f"❌ Failed to remove {ticker}")
-                    
-            except Exception as e:
-                error_count += 1
-                logger.error(f"❌ Error removing {ticker}: {e}")
-                self.error_handler.handle_error(
-                    f"Failed to remove delisted stock {ticker}", e, ErrorSeverity.MEDIUM
-                )
-        
+
+        # One transaction for the whole list: either every ticker is gone or none is
+        report = TickerPurger(self.db, archive_dir=self.archive_dir).purge(to_remove)
+        if report.success:
+            removed_count, error_count = len(to_remove), 0
+        else:
+            removed_count, error_count = 0, len(to_remove)
+            self.error_handler.log_error(
+                f"Failed to remove {len(to_remove)} delisted stocks", ErrorSeverity.ERROR,
+                Exception(report.error), {'tickers': to_remove}
+            )
+
         logger.info(f"Delisted stock removal completed: {removed_count} removed, {error_count} errors")
         return {'removed': removed_count, 'errors': error_count}
     
     def _remove_stock_from_database(self, ticker: str) -> bool:
         """Remove a stock from all database tables, respecting foreign key constraints"""
-        try:
-            # Order matters due to foreign key constraints
-            tables_to_clean = [
-                'daily_charts',
-                'technical_indicators', 
-                'company_fundamentals',
-                'stocks'
-            ]
-            
-            for table in tables_to_clean:
-                try:
-                    # Check if table exists
-                    check_query = """
-                        SELECT EXISTS (
-                            SELECT FROM information_schema.tables 
-                            WHERE table_name = %s
-                        )
-                    """
-                    table_exists = self.db.fetch_one(check_query, (table,))
-                    
-                    if table_exists and table_exists[0]:
-                        # Delete from table
-                        delete_query = f"DELETE FROM {table} WHERE ticker = %s"
-                        self.db.execute_update(delete_query, (ticker,))
-                        logger.debug(f"Removed {ticker} from {table}")
-                        
-                except Exception as e:
-                    logger.warning(f"Could not remove {ticker} from {table}: {e}")
-                    # Continue with other tables
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error removing {ticker} from database: {e}")
-            return False
+        return TickerPurger(self.db, archive_dir=self.archive_dir).purge([ticker]).success
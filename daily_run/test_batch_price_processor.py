@@ -0,0 +1,141 @@
+"""
+Tests for BatchPriceProcessor residual fallback
+Covers carrying only missing tickers forward, partial-result merging,
+capacity-based routing, per-provider coverage statistics and storing a
+parsed batch through the binary COPY ingest
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import batch_price_processor
+from batch_price_processor import BatchPriceProcessor
+
+
+def quote(ticker, source):
+    return {'close_price': 100.0, 'volume': 1000, 'data_source': source}
+
+
+class FakeProvider:
+    """Provider returning quotes for every requested ticker except `missing`"""
+
+    def __init__(self, source, missing=()):
+        self.source = source
+        self.missing = set(missing)
+        self.calls = []
+
+    def __call__(self, tickers):
+        self.calls.append(list(tickers))
+        return {t: quote(t, self.source) for t in tickers if t not in self.missing}
+
+
+class TestResidualFallback(unittest.TestCase):
+
+    def setUp(self):
+        services = {name: MagicMock() for name in ('YahooFinanceService', 'AlphaVantageService', 'FinnhubService')}
+        with patch.multiple(batch_price_processor, **services), \
+                patch.dict(sys.modules, {'fmp_service': MagicMock()}):
+            self.processor = BatchPriceProcessor(MagicMock(), max_batch_size=100, delay_between_batches=0)
+        self.tickers = [f"T{i:03d}" for i in range(100)]
+
+    def use_providers(self, **providers):
+        order = ['FMP', 'Alpha Vantage', 'Yahoo Finance', 'Finnhub']
+        self.processor.service_priority = [(name, providers[name]) for name in order]
+
+    def test_only_missing_tickers_carried_forward(self):
+        fmp = FakeProvider('fmp', missing=self.tickers[:3])
+        yahoo = FakeProvider('yahoo_finance')
+        alpha = FakeProvider('alpha_vantage')
+        finnhub = FakeProvider('finnhub')
+        self.use_providers(**{'FMP': fmp, 'Alpha Vantage': alpha, 'Yahoo Finance': yahoo, 'Finnhub': finnhub})
+
+        results = self.processor._process_single_batch(self.tickers, 1)
+
+        self.assertEqual(len(results), 100)
+        self.assertEqual(len(fmp.calls), 1)
+        # Residual goes to the other batch-capable provider, not the per-ticker ones
+        self.assertEqual(yahoo.calls, [self.tickers[:3]])
+        self.assertEqual(alpha.calls, [])
+        self.assertEqual(finnhub.calls, [])
+        self.assertEqual(results['T000']['data_source'], 'yahoo_finance')
+        self.assertEqual(results['T050']['data_source'], 'fmp')
+
+        stats = self.processor.get_coverage_stats()
+        self.assertEqual(stats['FMP']['returned'], 97)
+        self.assertEqual(stats['Yahoo Finance']['api_calls'], 1)
+        self.assertEqual(stats['Yahoo Finance']['coverage'], 1.0)
+
+    def test_routing_prefers_recorded_capacity(self):
+        failing_yahoo = FakeProvider('yahoo_finance', missing=self.tickers)
+        self.processor._record_coverage('Yahoo Finance', 100, 0)
+        fmp = FakeProvider('fmp', missing=self.tickers[:2])
+        alpha = FakeProvider('alpha_vantage')
+        self.use_providers(**{'FMP': fmp, 'Alpha Vantage': alpha, 'Yahoo Finance': failing_yahoo,
+                              'Finnhub': FakeProvider('finnhub')})
+
+        results = self.processor._process_single_batch(self.tickers, 1)
+
+        self.assertEqual(len(results), 100)
+        self.assertEqual(failing_yahoo.calls, [])
+        self.assertEqual(alpha.calls, [self.tickers[:2]])
+
+    def test_primary_keeps_its_rank_after_a_residual_fallback(self):
+        fmp = FakeProvider('fmp', missing=self.tickers[:3])
+        yahoo = FakeProvider('yahoo_finance')
+        self.use_providers(**{'FMP': fmp, 'Alpha Vantage': FakeProvider('alpha_vantage'),
+                              'Yahoo Finance': yahoo, 'Finnhub': FakeProvider('finnhub')})
+
+        self.processor._process_single_batch(self.tickers, 1)
+        first = self.processor._select_service_for_residual(set())
+
+        # FMP returned 97/100; Yahoo served the 3-ticker residual and is
+        # ranked on its batch limit and success ratio, not on 3 per call
+        self.assertEqual(yahoo.calls, [self.tickers[:3]])
+        self.assertEqual(first[0], 'Yahoo Finance')
+        self.assertEqual(self.processor._select_service_for_residual({'Yahoo Finance'})[0], 'FMP')
+
+        # A provider that has not been tried never outranks a working one
+        self.processor._coverage_stats.clear()
+        self.processor._record_coverage('FMP', 100, 97)
+        self.assertEqual(self.processor._select_service_for_residual(set())[0], 'FMP')
+
+    def test_unresolvable_tickers_returned_partial(self):
+        missing = self.tickers[:5]
+        self.use_providers(**{name: FakeProvider(name, missing=missing)
+                              for name in ('FMP', 'Alpha Vantage', 'Finnhub')},
+                           **{'Yahoo Finance': FakeProvider('yahoo_finance', missing=missing)})
+
+        with patch.object(batch_price_processor.time, 'sleep'):
+            results = self.processor._process_single_batch(self.tickers, 1)
+
+        self.assertEqual(len(results), 95)
+        stats = self.processor.get_coverage_stats()
+        self.assertEqual(set(stats), {'FMP', 'Alpha Vantage', 'Yahoo Finance', 'Finnhub'})
+        self.assertEqual(stats['Finnhub']['requested'], 5)
+
+    def test_parsed_batch_is_stored_in_one_ingest_call(self):
+        batch = FakeProvider('fmp')(self.tickers[:5])
+        self.processor.db.upsert_daily_quotes.return_value = {
+            'received': 5, 'staged': 5, 'inserted': 4, 'updated': 1, 'skipped': 0, 'seconds': 0.01}
+
+        with patch.object(self.processor.monitoring, 'record_metric') as record:
+            self.processor.store_daily_prices(batch)
+
+        self.processor.db.upsert_daily_quotes.assert_called_once_with(batch)
+        record.assert_any_call('daily_prices_stored', 5)
+
+    def test_store_failure_is_logged_not_raised(self):
+        self.processor.db.upsert_daily_quotes.side_effect = Exception('connection lost')
+
+        with patch.object(self.processor.error_handler, 'log_error') as log_error:
+            self.processor.store_daily_prices(FakeProvider('fmp')(self.tickers[:2]))
+
+        self.assertEqual(log_error.call_args[0][0], "Failed to store daily prices")
+
+
+if __name__ == '__main__':
+    unittest.main()
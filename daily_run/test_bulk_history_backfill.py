@@ -0,0 +1,150 @@
+"""
+Tests for the bulk yfinance history backfill
+Covers multi-index unpacking, cents scaling and per-ticker fallback routing
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bulk_history_backfill import BulkHistoryBackfill, history_frame_to_rows, HISTORY_COLUMNS
+
+
+def make_bulk_frame(tickers, days=3, missing=()):
+    """Build a frame shaped like yf.download(group_by='ticker')"""
+    dates = pd.date_range('2024-01-02', periods=days, freq='B', name='Date')
+    fields = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+    columns = pd.MultiIndex.from_product([tickers, fields], names=['Ticker', 'Price'])
+    data = np.tile(np.array([10.0, 11.0, 9.5, 10.555, 10.5, 1000.0]), (days, len(tickers)))
+    frame = pd.DataFrame(data, index=dates, columns=columns)
+    for ticker in missing:
+        frame[ticker] = np.nan
+    return frame
+
+
+def make_db():
+    db = MagicMock()
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (0, 0)
+    db.get_cursor.return_value.__enter__.return_value = cursor
+    return db, cursor
+
+
+class TestHistoryFrameToRows(unittest.TestCase):
+    """Test unpacking of yfinance frames into daily_charts rows"""
+
+    def test_multi_ticker_frame(self):
+        rows = history_frame_to_rows(make_bulk_frame(['AAPL', 'MSFT']), ['AAPL', 'MSFT'])
+        self.assertEqual(list(rows.columns), HISTORY_COLUMNS)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(set(rows['ticker']), {'AAPL', 'MSFT'})
+        self.assertEqual(rows['close'].iloc[0], 1056)
+        self.assertEqual(rows['open'].dtype, np.int64)
+        self.assertEqual(rows['date'].iloc[0], '2024-01-02')
+
+    def test_missing_ticker_rows_dropped(self):
+        rows = history_frame_to_rows(make_bulk_frame(['AAPL', 'BAD'], missing=['BAD']), ['AAPL', 'BAD'])
+        self.assertEqual(set(rows['ticker']), {'AAPL'})
+
+    def test_single_ticker_flat_frame(self):
+        frame = make_bulk_frame(['AAPL'])['AAPL']
+        rows = history_frame_to_rows(frame, ['AAPL'])
+        self.assertEqual(len(rows), 3)
+        self.assertTrue((rows['ticker'] == 'AAPL').all())
+
+    def test_empty_frame(self):
+        self.assertTrue(history_frame_to_rows(pd.DataFrame(), ['AAPL']).empty)
+        self.assertTrue(history_frame_to_rows(None, ['AAPL']).empty)
+
+
+class TestBulkHistoryBackfill(unittest.TestCase):
+    """Test the bulk backfill flow with a mocked downloader and database"""
+
+    def test_write_rows_uses_copy(self):
+        db, cursor = make_db()
+        cursor.fetchone.return_value = (3, 0)
+        backfill = BulkHistoryBackfill(db=db, downloader=MagicMock())
+        rows = history_frame_to_rows(make_bulk_frame(['AAPL']), ['AAPL'])
+
+        self.assertEqual(backfill.write_rows(rows), 3)
+        copy_sql, buffer = cursor.copy_expert.call_args[0]
+        self.assertIn('COPY daily_charts_copy_staging', copy_sql)
+        self.assertEqual(buffer.getvalue().splitlines()[0], 'AAPL,2024-01-02,1000,1100,950,1056,1000')
+
+    def test_fallback_only_for_missing_tickers(self):
+        db, _ = make_db()
+        downloader = MagicMock(return_value=make_bulk_frame(['AAPL', 'BAD'], missing=['BAD']))
+        fallback = MagicMock(return_value=True)
+        backfill = BulkHistoryBackfill(db=db, downloader=downloader, pause_between_batches=0)
+
+        result = backfill.backfill(['AAPL', 'BAD'], days=100, fallback=fallback)
+
+        downloader.assert_called_once()
+        fallback.assert_called_once_with('BAD')
+        self.assertEqual(result['bulk_tickers_loaded'], 1)
+        self.assertEqual(result['missing_tickers'], ['BAD'])
+        self.assertEqual(result['fallback_successful'], 1)
+
+    def test_batches_split_by_batch_size(self):
+        db, _ = make_db()
+        downloader = MagicMock(side_effect=lambda tickers, **kwargs: make_bulk_frame(tickers))
+        backfill = BulkHistoryBackfill(db=db, batch_size=2, downloader=downloader, pause_between_batches=0)
+
+        result = backfill.backfill(['A', 'B', 'C'], days=10)
+
+        self.assertEqual(downloader.call_count, 2)
+        self.assertEqual(result['bulk_requests'], 2)
+        self.assertEqual(result['missing_tickers'], [])
+
+    def test_should_continue_gates_each_request(self):
+        db, _ = make_db()
+        downloader = MagicMock(side_effect=lambda tickers, **kwargs: make_bulk_frame(tickers))
+        fallback = MagicMock(return_value=True)
+        gate = MagicMock(side_effect=[True, False])
+        backfill = BulkHistoryBackfill(db=db, batch_size=2, downloader=downloader, pause_between_batches=0)
+
+        result = backfill.backfill(['A', 'B', 'C', 'D', 'E'], days=10, fallback=fallback, should_continue=gate)
+
+        self.assertEqual([c.args[0] for c in gate.call_args_list], [['A', 'B'], ['C', 'D']])
+        self.assertEqual(downloader.call_count, 1)
+        self.assertEqual(result['bulk_requests'], 1)
+        self.assertEqual(result['skipped_tickers'], ['C', 'D', 'E'])
+        self.assertEqual(result['missing_tickers'], [])
+        fallback.assert_not_called()
+
+    def test_priority_3_charges_budget_before_each_bulk_request(self):
+        from daily_trading_system import DailyTradingSystem
+        db, _ = make_db()
+        downloader = MagicMock(side_effect=lambda tickers, **kwargs: make_bulk_frame(tickers))
+        budget = MagicMock(planned_calls=1, allocation={'yahoo': 1})
+        budget.try_spend.side_effect = [True, False]
+
+        system = DailyTradingSystem.__new__(DailyTradingSystem)
+        system.history_backfill = BulkHistoryBackfill(db=db, batch_size=2, downloader=downloader,
+                                                      pause_between_batches=0)
+        system.processing_limits = {'priority_3_max_tickers': 10}
+        system.priority_timeouts = {'priority_3_historical': 600}
+        system.api_calls_used = 0
+        system._phase_budget = MagicMock(return_value=budget)
+        system._finish_phase = lambda phase, result: result
+        system._get_tickers_needing_100_days_history = MagicMock(return_value=['A', 'B', 'C', 'D', 'E'])
+        system._get_historical_data_to_minimum = MagicMock()
+
+        result = system._ensure_minimum_historical_data()
+
+        self.assertEqual(downloader.call_count, 1)
+        self.assertEqual(budget.try_spend.call_count, 2)
+        budget.spend.assert_not_called()
+        system._get_historical_data_to_minimum.assert_not_called()
+        self.assertEqual(result['bulk_tickers_loaded'], 2)
+        self.assertEqual(result['api_calls_used'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+"""
+Tests for the shared COPY bulk loader
+Covers cents conversion, the staging/upsert SQL issued per load and the
+binary COPY path for end-of-day quotes
+"""
+
+import os
+import struct
+import sys
+import unittest
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bulk_ingest import (OHLCV_COLUMNS, QUOTE_COPY_TYPES, copy_quotes, copy_upsert, encode_copy_binary,
+                         price_frame_to_cents, quotes_to_rows, upsert_price_history)
+from database import DatabaseManager
+
+BINARY_FORMATS = {'date': '>i', 'float8': '>d', 'int8': '>q'}
+
+
+def decode_copy_binary(payload: bytes, types):
+    """Rows of a binary COPY stream, decoded field by field"""
+    assert payload[:11] == b'PGCOPY\n\xff\r\n\x00'
+    offset, rows = 19, []
+    while True:
+        (count,) = struct.unpack_from('>h', payload, offset)
+        offset += 2
+        if count == -1:
+            break
+        assert count == len(types)
+        row = []
+        for kind in types:
+            (length,) = struct.unpack_from('>i', payload, offset)
+            offset += 4
+            if length == -1:
+                row.append(None)
+                continue
+            raw = payload[offset:offset + length]
+            offset += length
+            if kind == 'text':
+                row.append(raw.decode('utf-8'))
+            elif kind == 'date':
+                row.append(date(2000, 1, 1) + timedelta(days=struct.unpack('>i', raw)[0]))
+            else:
+                row.append(struct.unpack(BINARY_FORMATS[kind], raw)[0])
+        rows.append(tuple(row))
+    assert offset == len(payload)
+    return rows
+
+
+class TestPriceFrameToCents(unittest.TestCase):
+    """Test vectorized conversion of price frames"""
+
+    def test_yfinance_frame(self):
+        index = pd.DatetimeIndex(['2024-01-02', '2024-01-03'], name='Date')
+        frame = pd.DataFrame({
+            'Open': [10.0, np.nan], 'High': [10.5, 11.0], 'Low': [9.99, 10.0],
+            'Close': [10.255, 10.5], 'Volume': [1500.0, 2000.0]
+        }, index=index)
+
+        rows = price_frame_to_cents(frame, 'SPY')
+
+        self.assertEqual(list(rows.columns), OHLCV_COLUMNS)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows.iloc[0]['date'], '2024-01-02')
+        self.assertEqual(rows.iloc[0]['low'], 999)
+        self.assertEqual(rows.iloc[0]['volume'], 1500)
+
+    def test_provider_records(self):
+        records = [{'date': '2024-01-02', 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': None}]
+
+        rows = price_frame_to_cents(pd.DataFrame(records), 'AAPL')
+
+        self.assertEqual(rows.iloc[0]['close'], 150)
+        self.assertTrue(pd.isna(rows.iloc[0]['volume']))
+
+    def test_empty_frame(self):
+        self.assertTrue(price_frame_to_cents(pd.DataFrame(), 'AAPL').empty)
+
+
+class TestCopyUpsert(unittest.TestCase):
+    """Test the SQL issued by the COPY loader"""
+
+    def setUp(self):
+        self.cursor = MagicMock()
+        self.cursor.fetchone.return_value = (2, 1)
+        self.rows = pd.DataFrame({
+            'ticker': ['SPY'] * 3, 'date': ['2024-01-02', '2024-01-03', '2024-01-04'],
+            'open': [1, 2, 3], 'high': [1, 2, 3], 'low': [1, 2, 3], 'close': [1, 2, 3], 'volume': [10, 20, 30]
+        })
+
+    def executed_sql(self):
+        return ' '.join(call[0][0] for call in self.cursor.execute.call_args_list)
+
+    def test_upsert_counts_and_sql(self):
+        counts = upsert_price_history(self.cursor, 'market_data', self.rows,
+                                      metadata={'etf_name': 'S&P 500'}, timestamps=True)
+
+        self.assertEqual(counts, {'staged': 3, 'inserted': 2, 'updated': 1, 'unchanged': 0})
+        sql = self.executed_sql()
+        self.assertIn('CREATE TEMP TABLE market_data_copy_staging ON COMMIT DROP AS', sql)
+        self.assertIn('SELECT ticker, date, open, high, low, close, volume, etf_name FROM market_data WITH NO DATA', sql)
+        self.assertNotIn('LIKE market_data', sql)
+        self.assertIn('DO UPDATE SET open = EXCLUDED.open', sql)
+        self.assertIn('updated_at = CURRENT_TIMESTAMP', sql)
+        copy_sql, buffer = self.cursor.copy_expert.call_args[0]
+        self.assertIn('etf_name', copy_sql)
+        self.assertEqual(len(buffer.getvalue().splitlines()), 3)
+
+    def test_keep_existing_rows(self):
+        self.cursor.fetchone.return_value = (1, 0)
+
+        counts = copy_upsert(self.cursor, 'daily_charts', self.rows)
+
+        self.assertIn('DO NOTHING', self.executed_sql())
+        self.assertEqual(counts['unchanged'], 2)
+
+    def test_keep_existing_on_null(self):
+        copy_upsert(self.cursor, 'stocks', self.rows, key_columns=('ticker',),
+                    update_columns=['open', 'close'], keep_existing_on_null=True)
+
+        self.assertIn('open = COALESCE(EXCLUDED.open, stocks.open)', self.executed_sql())
+
+    def test_empty_rows_skip_database(self):
+        counts = copy_upsert(self.cursor, 'daily_charts', pd.DataFrame(columns=OHLCV_COLUMNS))
+
+        self.assertEqual(counts['staged'], 0)
+        self.cursor.execute.assert_not_called()
+
+
+class TestQuoteCopy(unittest.TestCase):
+    """Test the binary COPY path for end-of-day quotes"""
+
+    QUOTES = {
+        'AAPL': {'close_price': 190.5, 'volume': 1000, 'data_source': 'fmp'},
+        'KO': {'price': 60, 'open': 59.5},
+        'ZERO': {'close': 0},
+        'BRK.B': {'close': '400.10', 'volume': None, 'date': '2024-05-01'},
+    }
+
+    def test_quotes_to_rows(self):
+        rows = quotes_to_rows(self.QUOTES, date(2024, 1, 2))
+
+        self.assertEqual(list(rows.columns), OHLCV_COLUMNS)
+        self.assertEqual(list(rows['ticker']), ['AAPL', 'KO', 'BRK.B'])
+        self.assertEqual(list(rows['date'].dt.strftime('%Y-%m-%d')), ['2024-01-02', '2024-01-02', '2024-05-01'])
+        self.assertEqual(rows.iloc[1][['open', 'high', 'close']].tolist(), [59.5, 60.0, 60.0])
+        self.assertTrue(pd.isna(rows.iloc[2]['volume']))
+        listed = quotes_to_rows([{'ticker': 'AAPL', 'close': 1.0}, {'ticker': 'AAPL', 'close': 2.0}, {'close': 3.0}])
+        self.assertEqual(listed['close'].tolist(), [2.0])
+
+    def test_binary_encoding_round_trips(self):
+        rows = quotes_to_rows(self.QUOTES, date(2024, 1, 2)).assign(data_source=['fmp', None, 'é'])
+        types = {column: QUOTE_COPY_TYPES[column] for column in OHLCV_COLUMNS + ['data_source']}
+
+        decoded = sorted(decode_copy_binary(encode_copy_binary(rows, types), list(types.values())))
+
+        self.assertEqual(decoded, [
+            ('AAPL', date(2024, 1, 2), 190.5, 190.5, 190.5, 190.5, 1000, 'fmp'),
+            ('BRK.B', date(2024, 5, 1), 400.1, 400.1, 400.1, 400.1, None, 'é'),
+            ('KO', date(2024, 1, 2), 59.5, 60.0, 60.0, 60.0, None, None),
+        ])
+        self.assertEqual(decode_copy_binary(encode_copy_binary(rows.iloc[:0], types), list(types.values())), [])
+
+    def test_copy_quotes_sql(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (2, 1)
+
+        counts = copy_quotes(cursor, quotes_to_rows(self.QUOTES), source='yahoo')
+
+        self.assertEqual(counts, {'staged': 3, 'inserted': 2, 'updated': 1})
+        sql = ' '.join(call[0][0] for call in cursor.execute.call_args_list)
+        self.assertIn('CREATE TEMP TABLE IF NOT EXISTS daily_charts_quotes_copy (ticker text, date date', sql)
+        self.assertIn('ON CONFLICT (ticker, date) DO UPDATE SET open = EXCLUDED.open', sql)
+        self.assertIn('last_updated = CURRENT_TIMESTAMP', sql)
+        copy_sql, buffer = cursor.copy_expert.call_args[0]
+        self.assertIn('FORMAT binary', copy_sql)
+        self.assertEqual({row[-1] for row in decode_copy_binary(buffer.getvalue(), ['text', 'date'] + ['float8'] * 4
+                                                                + ['int8', 'text'])}, {'yahoo'})
+
+    def test_database_batch_reports_counts_and_latency(self):
+        db = DatabaseManager()
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (3, 0)
+        with patch.object(db, 'get_cursor') as get_cursor, self.assertLogs('database', level='INFO') as logs:
+            get_cursor.return_value.__enter__.return_value = cursor
+            stored = db.update_price_data_batch([{'ticker': t, **q} for t, q in self.QUOTES.items()])
+            counts = db.upsert_daily_quotes({'ZERO': {'close': None}})
+
+        self.assertEqual(stored, 3)
+        self.assertEqual((counts['received'], counts['staged'], counts['skipped']), (1, 0, 1))
+        self.assertGreaterEqual(counts['seconds'], 0)
+        self.assertEqual(get_cursor.call_count, 1)
+        self.assertIn('3/4 quotes via binary COPY (3 inserted, 0 updated, 1 skipped)', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Tests for dirty-set change tracking
+Covers fingerprint/price comparisons, watermark writes and fail-open behaviour
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from change_tracker import FINGERPRINT_COLUMNS, ChangeTracker, select_dirty
+
+
+class TestSelectDirty(unittest.TestCase):
+    """Test the pure dirty-set comparison"""
+
+    def setUp(self):
+        self.current = {
+            'NEW': ('a', 1000),
+            'SAME': ('b', 1000),
+            'REPORTED': ('c2', 1000),
+            'MOVED': ('d', 1100),
+            'DRIFT': ('e', 1010),
+        }
+        self.stored = {
+            'SAME': ('b', 1000),
+            'REPORTED': ('c1', 1000),
+            'MOVED': ('d', 1000),
+            'DRIFT': ('e', 1000),
+        }
+
+    def test_price_dependent(self):
+        dirty, report = select_dirty(self.current, self.stored, 'financial_ratios', 0.05)
+
+        self.assertEqual(dirty, ['NEW', 'REPORTED', 'MOVED'])
+        self.assertEqual(report.never_computed, 1)
+        self.assertEqual(report.fundamentals_changed, 1)
+        self.assertEqual(report.price_moved, 1)
+        self.assertAlmostEqual(report.skip_ratio, 0.4)
+
+    def test_price_independent(self):
+        dirty, report = select_dirty(self.current, self.stored, 'fundamental_scores', None)
+
+        self.assertEqual(dirty, ['NEW', 'REPORTED'])
+        self.assertEqual(report.to_dict()['skipped_tickers'], 3)
+
+
+class TestChangeTracker(unittest.TestCase):
+    """Test the database-backed tracker with a mocked DatabaseManager"""
+
+    def make_db(self, inputs, watermarks):
+        db = MagicMock()
+        db.execute_query.side_effect = lambda query, params=None: (
+            watermarks if 'recompute_watermarks' in query else inputs
+        )
+        return db
+
+    def test_dirty_set_and_mark_computed(self):
+        db = self.make_db(
+            inputs=[('AAPL', 'f1', 19000), ('MSFT', 'f2', 40000)],
+            watermarks=[('AAPL', 'f1', 19000)]
+        )
+        tracker = ChangeTracker(db)
+
+        dirty, report = tracker.dirty_set('financial_ratios', ['AAPL', 'MSFT'])
+        tracker.mark_computed('financial_ratios', dirty)
+
+        self.assertEqual(dirty, ['MSFT'])
+        self.assertEqual(report.dirty_tickers, 1)
+        rows = db.execute_values.call_args[0][1]
+        self.assertEqual([row[:4] for row in rows], [('financial_ratios', 'MSFT', 'f2', 40000)])
+
+    def test_fingerprint_covers_raw_inputs_only(self):
+        db = self.make_db(inputs=[], watermarks=[])
+
+        ChangeTracker(db).load_current_inputs(['AAPL'])
+
+        query, params = db.execute_query.call_args[0]
+        self.assertNotIn('md5(cf::text)', query)
+        self.assertIn(FINGERPRINT_COLUMNS, params)
+        for column in ('revenue', 'net_income', 'total_assets', 'report_date', 'shares_outstanding'):
+            self.assertIn(column, FINGERPRINT_COLUMNS)
+        # Written back by store_ratios() or moving with the price
+        for column in ('last_updated', 'price_to_earnings', 'graham_number', 'market_cap', 'enterprise_value'):
+            self.assertNotIn(column, FINGERPRINT_COLUMNS)
+
+    def test_tracking_failure_marks_everything_dirty(self):
+        db = MagicMock()
+        db.execute_update.side_effect = Exception('permission denied')
+        tracker = ChangeTracker(db)
+
+        dirty, report = tracker.dirty_set('fundamental_scores', ['AAPL', 'MSFT'])
+
+        self.assertEqual(dirty, ['AAPL', 'MSFT'])
+        self.assertFalse(report.tracking_available)
+        self.assertEqual(report.skip_ratio, 0.0)
+
+    def test_mark_computed_without_dirty_set_is_noop(self):
+        db = MagicMock()
+        ChangeTracker(db).mark_computed('financial_ratios', ['AAPL'])
+        db.execute_values.assert_not_called()
+
+
+class TestFundamentalScoresDirtySet(unittest.TestCase):
+    """Test how the fundamental scorer uses the dirty set"""
+
+    def setUp(self):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        # calc_fundamental_scores imports modules that are not part of this tree
+        stubs = {name: sys.modules.get(name) or MagicMock()
+                 for name in ('calc_technical_scores', 'enhanced_sentiment_analyzer')}
+        with patch.dict(sys.modules, stubs):
+            import calc_fundamental_scores
+        with patch.object(calc_fundamental_scores, 'TechnicalScoreCalculator'), \
+                patch.object(calc_fundamental_scores, 'EnhancedSentimentAnalyzer'), \
+                patch.object(calc_fundamental_scores, 'ChangeTracker'):
+            self.calculator = calc_fundamental_scores.FundamentalScoreCalculator()
+        self.calculator.change_tracker.dirty_set.return_value = (['MSFT'], MagicMock(to_dict=dict))
+        self.calculator.calculate_fundamental_scores = MagicMock(return_value={'fundamental_health_score': 60})
+        self.calculator.store_fundamental_scores = MagicMock(return_value=True)
+        self.connection = MagicMock()
+        self.cursor = self.connection.cursor.return_value.__enter__.return_value
+        self.cursor.rowcount = 2
+        self.calculator.get_connection = MagicMock(return_value=self.connection)
+
+    def test_skipped_tickers_carried_forward_and_summary_counts_requested(self):
+        results = self.calculator.calculate_scores_for_tickers(['AAPL', 'MSFT', 'KO'])
+
+        self.assertEqual(results['skipped'], ['AAPL', 'KO'])
+        query, params = self.cursor.execute.call_args[0]
+        self.assertIn('INSERT INTO company_scores_historical', query)
+        self.assertIn('CURRENT_DATE', query)
+        self.assertEqual(params, (['AAPL', 'KO'],))
+        self.connection.commit.assert_called_once()
+        self.assertEqual(results['summary']['total_tickers'], 3)
+        self.assertEqual(results['summary']['computed_tickers'], 1)
+        self.assertEqual(results['summary']['skipped'], 2)
+        self.calculator.change_tracker.mark_computed.assert_called_once_with('fundamental_scores', ['MSFT'])
+
+
+if __name__ == '__main__':
+    unittest.main()
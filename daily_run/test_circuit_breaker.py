@@ -0,0 +1,146 @@
+"""
+Tests for the adaptive circuit breaker
+Covers error-rate and slow-call tripping, per-endpoint isolation, jittered
+exponential backoff, half-open recovery and the non-blocking event log
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import circuit_breaker
+from circuit_breaker import (
+    BreakerEventLog, CircuitBreaker, CircuitBreakerManager, CircuitBreakerOpenException, CircuitState
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **options):
+    settings = dict(failure_threshold=100, recovery_timeout=10, minimum_calls=10,
+                    failure_rate_threshold=0.5, slow_call_duration=5.0,
+                    slow_call_rate_threshold=0.5, half_open_max_calls=2, clock=clock)
+    settings.update(options)
+    return CircuitBreaker('alpha_vantage', endpoint='fundamentals', **settings)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_trips_on_rolling_error_rate(self):
+        cb = make_breaker(self.clock)
+        for i in range(9):
+            cb.record_success(0.1) if i % 2 else cb.record_failure(Exception('boom'), 0.1)
+        # Below minimum_calls nothing trips, even at 55% errors
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+
+        cb.record_failure(Exception('boom'), 0.1)
+        self.assertEqual(cb.state, CircuitState.OPEN)
+        self.assertFalse(cb.allow_request())
+
+    def test_hanging_calls_trip_on_slow_call_ratio(self):
+        cb = make_breaker(self.clock)
+        for _ in range(5):
+            cb.record_success(0.2)
+        for _ in range(4):
+            cb.record_success(30.0)
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+
+        # A 30s timeout is both a failure and a slow call
+        cb.record_failure(TimeoutError('read timed out'), 30.0)
+        self.assertEqual(cb.state, CircuitState.OPEN)
+        self.assertGreaterEqual(cb.get_state()['p95_latency'], 30.0)
+
+    def test_call_times_failures(self):
+        cb = make_breaker(self.clock, minimum_calls=1, slow_call_rate_threshold=1.0,
+                          failure_rate_threshold=1.01)
+        ticks = iter([0.0, 31.0])
+        with patch.object(circuit_breaker.time, 'monotonic', side_effect=lambda: next(ticks)):
+            with self.assertRaises(TimeoutError):
+                cb.call(lambda: (_ for _ in ()).throw(TimeoutError('hang')))
+        self.assertEqual(cb.state, CircuitState.OPEN)
+        self.assertEqual(cb.total_slow_calls, 1)
+
+    def test_backoff_grows_with_jitter_and_cap(self):
+        cb = make_breaker(self.clock, recovery_timeout=10, max_recovery_timeout=40)
+        delays = []
+        for _ in range(5):
+            cb._trip('test')
+            delays.append(cb.open_until - self.clock.now)
+        bounds = [10, 20, 40, 40, 40]
+        for delay, bound in zip(delays, bounds):
+            self.assertGreaterEqual(delay, bound / 2)
+            self.assertLessEqual(delay, bound)
+
+    def test_half_open_probes_then_closes(self):
+        cb = make_breaker(self.clock, minimum_calls=1)
+        cb.record_failure(Exception('down'), 0.1)
+        self.assertEqual(cb.state, CircuitState.OPEN)
+
+        self.clock.now = 11.0
+        self.assertEqual(cb.state, CircuitState.HALF_OPEN)
+        self.assertTrue(cb.allow_request())
+        self.assertTrue(cb.allow_request())
+        # Only half_open_max_calls probes in flight
+        self.assertFalse(cb.allow_request())
+
+        cb.record_success(0.1)
+        cb.record_success(0.1)
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+        self.assertEqual(cb.trip_count, 0)
+
+    def test_slow_probe_reopens_with_longer_backoff(self):
+        cb = make_breaker(self.clock, minimum_calls=1)
+        cb.record_failure(Exception('down'), 0.1)
+        self.clock.now = 11.0
+        self.assertTrue(cb.allow_request())
+
+        cb.record_success(20.0)
+        self.assertEqual(cb.state, CircuitState.OPEN)
+        self.assertEqual(cb.trip_count, 2)
+        self.assertGreaterEqual(cb.open_until - self.clock.now, 10)
+
+
+class TestCircuitBreakerManager(unittest.TestCase):
+
+    def test_slow_endpoint_does_not_block_other_endpoints(self):
+        manager = CircuitBreakerManager()
+        fundamentals = manager.get_circuit_breaker('alpha_vantage', endpoint='fundamentals',
+                                                   minimum_calls=1)
+        fundamentals.record_failure(TimeoutError('hang'), 30.0)
+
+        self.assertFalse(manager.is_available('alpha_vantage', 'fundamentals'))
+        self.assertTrue(manager.is_available('alpha_vantage', 'pricing'))
+        self.assertEqual(manager.call_endpoint('alpha_vantage', 'pricing', lambda: 42), 42)
+        with self.assertRaises(CircuitBreakerOpenException):
+            manager.call_endpoint('alpha_vantage', 'fundamentals', lambda: 42)
+
+
+class TestBreakerEventLog(unittest.TestCase):
+
+    def test_emit_never_blocks_when_queue_is_full(self):
+        log = BreakerEventLog(maxsize=1)
+        release = threading.Event()
+        with patch.object(circuit_breaker.logger, 'log', side_effect=lambda *a, **k: release.wait(5)):
+            for _ in range(50):
+                log.emit(20, 'event')
+            self.assertGreater(log.dropped, 0)
+            release.set()
+        log.flush()
+        self.assertGreaterEqual(len(log.recent), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for the concurrent fundamentals fetcher
+Covers concurrent fetching, batched writes, API/time budget deferral and
+the throughput/queue-depth report
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from concurrent_fundamentals_fetcher import (
+    ConcurrentFundamentalsFetcher, FUNDAMENTAL_COLUMNS, fundamentals_row
+)
+
+
+def slow_fetch(delay=0.05, missing=()):
+    def fetch(ticker):
+        time.sleep(delay)
+        if ticker in missing:
+            return None
+        return {'revenue': 100.0, 'net_income': 10.0, 'data_source': 'fmp'}
+    return fetch
+
+
+class TestConcurrentFundamentalsFetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.written = []
+        self.db.execute_values.side_effect = lambda query, rows: self.written.append(rows) or len(rows)
+
+    def test_fetches_concurrently_and_writes_in_batches(self):
+        tickers = [f"T{i}" for i in range(40)]
+        fetcher = ConcurrentFundamentalsFetcher(self.db, fetch_fn=slow_fetch(missing={'T3'}),
+                                                max_workers=10, batch_size=15)
+
+        start = time.monotonic()
+        report = fetcher.run(tickers)
+        elapsed = time.monotonic() - start
+
+        # 40 x 50ms serially would take 2s
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(report.fetched, 39)
+        self.assertEqual(report.failed, 1)
+        self.assertEqual(report.stored, 39)
+        self.assertEqual(sum(len(rows) for rows in self.written), 39)
+        self.assertLessEqual(max(len(rows) for rows in self.written), 15)
+        self.assertEqual(report.write_batches, len(self.written))
+        self.assertGreater(report.throughput_per_minute, 0)
+        self.assertIn('max_queue_depth', report.to_dict())
+
+    def test_budget_exhaustion_defers_remaining_tickers(self):
+        budget = MagicMock()
+        budget.item_cost.return_value = 3
+        remaining = {'calls': 15}
+        lock = threading.Lock()
+
+        def try_spend(calls):
+            with lock:
+                if remaining['calls'] >= calls:
+                    remaining['calls'] -= calls
+                    return True
+                return False
+        budget.try_spend.side_effect = try_spend
+
+        fetcher = ConcurrentFundamentalsFetcher(self.db, fetch_fn=slow_fetch(0.01), max_workers=4)
+        report = fetcher.run([f"T{i}" for i in range(10)], budget=budget)
+
+        self.assertEqual(report.fetched, 5)
+        self.assertEqual(report.deferred, 5)
+        self.assertEqual(report.api_calls_used, 15)
+        self.assertTrue(report.budget_exhausted)
+
+    def test_time_budget_stops_new_work(self):
+        fetcher = ConcurrentFundamentalsFetcher(self.db, fetch_fn=slow_fetch(0.1), max_workers=2)
+        report = fetcher.run([f"T{i}" for i in range(20)], time_budget=0.15)
+
+        self.assertTrue(report.time_limit_reached)
+        self.assertGreater(report.deferred, 0)
+        self.assertEqual(report.fetched + report.deferred, 20)
+
+    def test_write_failure_is_reported_not_raised(self):
+        self.db.execute_values.side_effect = Exception('connection lost')
+        fetcher = ConcurrentFundamentalsFetcher(self.db, fetch_fn=slow_fetch(0), max_workers=2)
+
+        report = fetcher.run(['AAPL', 'MSFT'])
+
+        self.assertEqual(report.fetched, 2)
+        self.assertEqual(report.stored, 0)
+
+    def test_row_leaves_missing_fields_null(self):
+        row = fundamentals_row('AAPL', {'revenue': 5.0, 'data_source': 'yahoo_finance'})
+
+        self.assertEqual(len(row), 5 + len(FUNDAMENTAL_COLUMNS) + 2)
+        self.assertEqual(row[5], 5.0)
+        self.assertIsNone(row[6])
+        self.assertEqual(row[-2], 'yahoo_finance')
+
+
+if __name__ == '__main__':
+    unittest.main()
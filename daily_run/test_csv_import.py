@@ -0,0 +1,218 @@
+"""
+Tests for the streaming CSV import
+Covers vectorized cleaning and rejection reasons, one COPY + upsert per
+chunk with inserted/updated/rejected counts, and file-level failures
+"""
+
+import csv
+import os
+import re
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from csv_import import INDUSTRIES, MARKET_ETF, STOCKS, CsvImporter, main, normalize_chunk
+from exceptions import DatabaseError
+
+BATCH_CSV = """Ticker,Company Name,Industry,Sector,Market Cap (B),Description,Peer A,Peer B
+ aapl ,Apple Inc.,Consumer Electronics,Technology,3400.5B,"Phones, Macs",msft,not a peer!
+$msft,Microsoft,Software,Technology,,N/A,AAPL,
+,No Ticker,Software,Technology,1,x,,
+Ticker,Company Name,Industry,Sector,Market Cap (B),Description,Peer A,Peer B
+THIS_TICKER_IS_FAR_TOO_LONG,Long,Software,Technology,1,x,,
+BRK B,Berkshire,Insurance,Financials,900,,,
+AAPL,Apple Inc. (restated),Consumer Electronics,Technology,3500,,,
+"""
+
+
+def raw(text):
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+        handle.write(text)
+    frame = pd.read_csv(handle.name, dtype=str, keep_default_na=False)
+    os.unlink(handle.name)
+    return frame
+
+
+class TestNormalizeChunk(unittest.TestCase):
+
+    def test_stocks_batch_layout(self):
+        rows, rejections = normalize_chunk(raw(BATCH_CSV), STOCKS)
+
+        self.assertEqual(list(rows['ticker']), ['MSFT', 'BRKB', 'AAPL'])
+        self.assertEqual(rejections, {'missing ticker': 1, 'repeated header': 1, 'ticker longer than 20': 1,
+                                      'duplicate key (last row kept)': 1})
+        apple = rows.iloc[2]
+        self.assertEqual(apple['company_name'], 'Apple Inc. (restated)')
+        self.assertEqual(apple['market_cap_b'], 3500.0)
+        self.assertIsNone(apple['description'])
+        microsoft = rows.iloc[0]
+        self.assertIsNone(microsoft['market_cap_b'])
+        self.assertIsNone(microsoft['description'])
+        self.assertEqual(microsoft['peer_a'], 'AAPL')
+        self.assertNotIn('moat', rows.columns)
+
+    def test_invalid_peer_is_dropped_not_the_row(self):
+        rows, rejections = normalize_chunk(raw(BATCH_CSV.splitlines()[0] + '\n' + BATCH_CSV.splitlines()[1]), STOCKS)
+
+        self.assertEqual(rejections, {})
+        self.assertEqual(rows.iloc[0]['peer_a'], 'MSFT')
+        self.assertIsNone(rows.iloc[0]['peer_b'])
+        self.assertEqual(rows.iloc[0]['market_cap_b'], 3400.5)
+
+    def test_lower_case_headers_and_exclusions(self):
+        frame = raw("ticker,company_name,moat_1,hq_location\nKLA,KLA,Tech,CA\nKLAC,KLA Corp,Tech,CA\n")
+
+        rows, rejections = normalize_chunk(frame, STOCKS, exclude=['kla'])
+
+        self.assertEqual(list(rows['ticker']), ['KLAC'])
+        self.assertEqual(list(rows.columns), ['ticker', 'company_name', 'moat_1', 'hq_location'])
+        self.assertEqual(rejections, {'excluded': 1})
+
+    def test_mapping_files(self):
+        industries, _ = normalize_chunk(raw("Sector,Industry,ETF Name,ETF Ticker\nTech,Software,iShares,igv\n"),
+                                        INDUSTRIES)
+        market, rejections = normalize_chunk(
+            raw("Category,Indicator,ETF/Index Name,Ticker\nRates,10Y,Treasury,^TNX\nRates,,Missing,TLT\n"), MARKET_ETF)
+
+        self.assertEqual(industries.to_dict('records'),
+                         [{'sector': 'Tech', 'industry': 'Software', 'etf_name': 'iShares', 'etf_ticker': 'IGV'}])
+        self.assertEqual(list(market['etf_ticker']), ['^TNX'])
+        self.assertEqual(rejections, {'missing indicator': 1})
+
+    def test_missing_key_column(self):
+        with self.assertRaises(ValueError):
+            normalize_chunk(raw("Company Name\nApple\n"), STOCKS)
+
+
+class MergeCursor:
+    """
+    Cursor honouring the parts of PostgreSQL copy_upsert relies on: the
+    staging table's NOT NULL columns (LIKE copies them, CREATE TABLE AS
+    does not), CSV COPY NULLs and the ON CONFLICT ... COALESCE merge
+    """
+
+    def __init__(self, table, key_columns, not_null, existing):
+        self.table = table
+        self.key_columns = key_columns
+        self.not_null = set(not_null)
+        self.rows = {tuple(row[k] for k in key_columns): dict(row) for row in existing}
+        self.staging_not_null = set()
+        self.staged = []
+        self.counts = (0, 0)
+
+    def execute(self, sql, params=None):
+        if 'CREATE' in sql and 'staging' in sql:
+            self.staging_not_null = self.not_null if f'LIKE {self.table}' in sql else set()
+        elif sql.lstrip().startswith('WITH merged AS'):
+            self.merge(sql)
+
+    def copy_expert(self, sql, buffer):
+        columns = [c.strip() for c in re.search(r'\(([^)]*)\) FROM STDIN', sql).group(1).split(',')]
+        for values in csv.reader(buffer.getvalue().splitlines()):
+            row = {column: value if value != '' else None for column, value in zip(columns, values)}
+            for column in self.staging_not_null:
+                if column in row and row[column] is None:
+                    raise DatabaseError('copy', f'null value in column "{column}" violates not-null constraint')
+            self.staged.append(row)
+
+    def merge(self, sql):
+        keep = set(re.findall(r'(\w+) = COALESCE\(EXCLUDED\.\1, \w+\.\1\)', sql))
+        inserted = updated = 0
+        for row in self.staged:
+            key = tuple(row[k] for k in self.key_columns)
+            if key not in self.rows:
+                missing = [c for c in self.not_null if row.get(c) is None]
+                if missing:
+                    raise DatabaseError('merge', f'null value in column "{missing[0]}"')
+                self.rows[key] = dict(row)
+                inserted += 1
+                continue
+            for column, value in row.items():
+                if value is not None or column not in keep:
+                    self.rows[key][column] = value
+            updated += 1
+        self.staged = []
+        self.counts = (inserted, updated)
+
+    def fetchone(self):
+        return self.counts
+
+
+class TestCsvImporter(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.cursor = self.db.get_cursor.return_value.__enter__.return_value
+        self.cursor.fetchone.return_value = (1, 1)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'batch1.csv')
+        with open(self.path, 'w') as handle:
+            handle.write(BATCH_CSV + "ZZZ,Too,Many,Fields,1,2,3,4,5,6\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_one_upsert_per_chunk(self):
+        with patch('csv_import.mark_quality_dirty') as dirty:
+            report = CsvImporter(self.db, STOCKS, chunk_size=4).import_file(self.path)
+
+        self.assertEqual(report.rows_read, 7)
+        self.assertEqual(report.chunks, 2)
+        self.assertEqual(self.cursor.copy_expert.call_count, 2)
+        self.assertEqual((report.inserted, report.updated), (2, 2))
+        self.assertEqual(report.rejected, 4)
+        self.assertEqual(report.rejections['malformed line'], 1)
+        # The duplicate AAPL rows land in different chunks, so both are merged
+        self.assertNotIn('duplicate key (last row kept)', report.rejections)
+        sql = ' '.join(call[0][0] for call in self.cursor.execute.call_args_list)
+        self.assertIn('ON CONFLICT (ticker) DO UPDATE SET company_name = COALESCE(EXCLUDED.company_name', sql)
+        self.assertIn('last_updated = CURRENT_TIMESTAMP', sql)
+        self.assertEqual(sorted(dirty.call_args_list[0][0][1]), ['AAPL', 'MSFT'])
+        self.assertIn('Rejected: 4', report.format())
+
+    def test_blank_non_key_cell_keeps_existing_value(self):
+        cursor = MergeCursor('market_etf', MARKET_ETF.key_columns,
+                             not_null=('category', 'indicator', 'etf_ticker', 'etf_name'),
+                             existing=[{'category': 'Equity', 'indicator': 'Large Cap',
+                                        'etf_ticker': 'SPY', 'etf_name': 'SPDR S&P 500'}])
+        self.db.get_cursor.return_value.__enter__.return_value = cursor
+        with open(self.path, 'w') as handle:
+            handle.write("Category,Indicator,ETF/Index Name,Ticker\n"
+                         "Equity,Large Cap,,SPY\n"
+                         "Equity,Tech,Technology Select,XLK\n")
+
+        report = CsvImporter(self.db, MARKET_ETF).import_file(self.path)
+
+        self.assertEqual(report.rejections, {})
+        self.assertEqual((report.inserted, report.updated), (1, 1))
+        self.assertEqual(cursor.rows[('Equity', 'Large Cap', 'SPY')]['etf_name'], 'SPDR S&P 500')
+        self.assertEqual(cursor.rows[('Equity', 'Tech', 'XLK')]['etf_name'], 'Technology Select')
+
+    def test_failed_chunk_is_counted_and_import_continues(self):
+        self.db.get_cursor.return_value.__enter__.side_effect = [DatabaseError('operation', 'boom'), self.cursor]
+
+        report = CsvImporter(self.db, STOCKS, chunk_size=4).import_file(self.path)
+
+        self.assertEqual(report.rejections['database error'], 2)
+        self.assertEqual(report.inserted, 1)
+
+    def test_dry_run_and_missing_file(self):
+        report = CsvImporter(self.db, STOCKS, dry_run=True).import_files([self.path, self.path + '.missing'])
+
+        self.db.get_cursor.assert_not_called()
+        self.assertEqual(report.rows_read, 7)
+        self.assertIn(self.path + '.missing', report.failed_files)
+
+    def test_main_exit_code(self):
+        with patch('csv_import.DatabaseManager', return_value=self.db), patch('builtins.print'):
+            self.assertEqual(main([self.path, '--dry-run']), 0)
+            self.assertEqual(main([self.path + '.missing']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
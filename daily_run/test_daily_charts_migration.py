@@ -0,0 +1,160 @@
+"""
+Tests for the daily_charts partition migration
+Covers partition ranges, DDL generation, the migration plan and swap,
+keeping partitions ahead of today and the covering index statements
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from daily_charts_migration import (
+    DailyChartsMigration, build_copy_sql, build_create_sql, covering_index_statements,
+    partition_bounds
+)
+
+COLUMNS = [
+    ('id', 'integer', True, "nextval('daily_charts_id_seq'::regclass)"),
+    ('ticker', 'character varying(10)', False, None),
+    ('date', 'text', True, None),
+    ('open', 'bigint', False, None),
+    ('high', 'bigint', False, None),
+    ('low', 'bigint', False, None),
+    ('close', 'bigint', False, None),
+    ('volume', 'bigint', False, None),
+    ('rsi_14', 'numeric', False, None),
+]
+
+
+def fake_db(date_type='text', relkind='r', children=()):
+    db = MagicMock()
+
+    def fetch_one(query, params=None):
+        if 'format_type' in query:
+            return (date_type, relkind)
+        if 'MIN(date)' in query:
+            return ('2023-03-15', '2024-11-02')
+        if 'pg_get_serial_sequence' in query:
+            return ('public.daily_charts_id_seq',)
+        if 'COUNT(*)' in query:
+            return (1000,)
+        return None
+
+    def execute_query(query, params=None):
+        if 'pg_attribute' in query:
+            return COLUMNS
+        if 'pg_inherits' in query:
+            return [(name,) for name in children]
+        return []
+
+    db.fetch_one.side_effect = fetch_one
+    db.execute_query.side_effect = execute_query
+    cursor = MagicMock()
+    cursor.rowcount = 400
+    db.get_cursor.return_value.__enter__.return_value = cursor
+    return db, cursor
+
+
+class TestPartitionBounds(unittest.TestCase):
+
+    def test_yearly_bounds_include_future_partition(self):
+        bounds = partition_bounds(date(2023, 3, 15), date(2024, 11, 2), 'year', ahead=1)
+
+        self.assertEqual([suffix for suffix, _, _ in bounds], ['y2023', 'y2024', 'y2025'])
+        self.assertEqual(bounds[0][1:], (date(2023, 1, 1), date(2024, 1, 1)))
+
+    def test_monthly_bounds_roll_over_year_end(self):
+        bounds = partition_bounds(date(2024, 11, 20), date(2024, 12, 3), 'month', ahead=1)
+
+        self.assertEqual([suffix for suffix, _, _ in bounds], ['m202411', 'm202412', 'm202501'])
+        self.assertEqual(bounds[-1][1:], (date(2025, 1, 1), date(2025, 2, 1)))
+
+    def test_rejects_unknown_granularity(self):
+        with self.assertRaises(ValueError):
+            partition_bounds(date(2024, 1, 1), date(2024, 1, 1), 'week')
+
+
+class TestDDL(unittest.TestCase):
+
+    def test_create_sql_uses_native_date_and_range_partitioning(self):
+        sql = build_create_sql('daily_charts_partitioned', COLUMNS)
+
+        self.assertIn('date DATE NOT NULL', sql)
+        self.assertIn('ticker character varying(10) NOT NULL', sql)
+        self.assertIn("DEFAULT nextval('daily_charts_id_seq'::regclass) NOT NULL", sql)
+        self.assertTrue(sql.endswith('PARTITION BY RANGE (date)'))
+
+    def test_copy_from_text_filters_to_iso_dates_by_range(self):
+        sql = build_copy_sql('daily_charts', 'daily_charts_partitioned', ['ticker', 'date', 'close'],
+                             date(2024, 1, 1), date(2025, 1, 1), source_is_text=True)
+
+        self.assertIn('SELECT ticker, date::date, close FROM daily_charts', sql)
+        self.assertIn("date >= '2024-01-01' AND date < '2025-01-01'", sql)
+        self.assertIn("date ~ ", sql)
+
+    def test_covering_indexes_trimmed_to_existing_columns(self):
+        ohlcv, snapshot = covering_index_statements('daily_charts', ['ticker', 'date', 'open', 'high',
+                                                                     'low', 'close', 'volume', 'rsi_14'])
+
+        self.assertIn('ON daily_charts (ticker, date DESC) INCLUDE (open, high, low, close, volume)', ohlcv)
+        self.assertIn('INCLUDE (close, volume, rsi_14)', snapshot)
+
+
+class TestDailyChartsMigration(unittest.TestCase):
+
+    def test_dry_run_plans_build_copy_and_swap(self):
+        db, cursor = fake_db()
+        report = DailyChartsMigration(db).migrate('year', dry_run=True)
+
+        self.assertEqual(report.partitions, ['daily_charts_y2023', 'daily_charts_y2024', 'daily_charts_y2025'])
+        statements = report.statements
+        self.assertTrue(statements[0].startswith('LOCK TABLE daily_charts IN SHARE MODE'))
+        copies = [s for s in statements if s.startswith('INSERT INTO')]
+        self.assertEqual(len(copies), 2)
+        rename = statements.index('ALTER TABLE daily_charts RENAME TO daily_charts_text_backup')
+        self.assertLess(statements.index('ALTER TABLE daily_charts_partitioned ADD PRIMARY KEY (ticker, date)'),
+                        rename)
+        self.assertIn('ALTER SEQUENCE public.daily_charts_id_seq OWNED BY daily_charts.id', statements)
+        cursor.execute.assert_not_called()
+
+    def test_migrate_runs_in_one_transaction_and_counts_rows(self):
+        db, cursor = fake_db()
+        report = DailyChartsMigration(db).migrate('year')
+
+        self.assertEqual(db.get_cursor.call_count, 1)
+        self.assertEqual(report.rows_copied, 800)
+        self.assertEqual(report.rows_rejected, 200)
+        cursor.execute.assert_any_call('ANALYZE daily_charts')
+
+    def test_already_partitioned_table_is_left_alone(self):
+        db, cursor = fake_db(date_type='date', relkind='p')
+        report = DailyChartsMigration(db).migrate()
+
+        self.assertTrue(report.already_migrated)
+        db.get_cursor.assert_not_called()
+
+    def test_ensure_partitions_creates_missing_periods_only(self):
+        db, cursor = fake_db(date_type='date', relkind='p',
+                             children=['daily_charts_m202406', 'daily_charts_default'])
+        with patch('daily_charts_migration.date') as fake_date:
+            fake_date.today.return_value = date(2024, 6, 10)
+            fake_date.side_effect = lambda *args: date(*args)
+            created = DailyChartsMigration(db).ensure_partitions(ahead=1)
+
+        self.assertEqual(created, ['daily_charts_m202407'])
+        sql = cursor.execute.call_args[0][0]
+        self.assertIn("FOR VALUES FROM ('2024-07-01') TO ('2024-08-01')", sql)
+
+    def test_ensure_partitions_noop_before_migration(self):
+        db, cursor = fake_db()
+
+        self.assertEqual(DailyChartsMigration(db).ensure_partitions(), [])
+        db.get_cursor.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
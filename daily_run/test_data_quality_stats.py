@@ -0,0 +1,189 @@
+"""
+Tests for pre-aggregated data quality stats
+Covers dirty-ticker tracking from write paths, incremental per-ticker refresh,
+summary bootstrap and the freshness/technical quality read shapes
+"""
+
+import os
+import sys
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import mark_quality_dirty, pop_quality_dirty
+from data_quality_stats import DataQualityStats, TECHNICAL_QUALITY_COLUMNS
+
+
+class RecordingDB:
+    """DatabaseManager stand-in that records statements"""
+
+    def __init__(self, summary_rows=None):
+        self.statements = []
+        self.summary_rows = list(summary_rows or [])
+        self.cursor = MagicMock()
+        self.cursor.execute.side_effect = lambda query, params=None: self.statements.append((query, params))
+
+    @contextmanager
+    def get_cursor(self):
+        yield self.cursor
+
+    def execute_update(self, query, params=None):
+        self.statements.append((query, params))
+        return 1
+
+    def fetch_all_dict(self, query, params=None):
+        self.statements.append((query, params))
+        return [self.summary_rows.pop(0)] if self.summary_rows else []
+
+
+def summary_row(**overrides):
+    row = {
+        'source_table': 'daily_charts', 'total_records': 182000, 'unique_tickers': 700,
+        'missing_data_count': 0, 'duplicate_count': 700, 'invalid_data_count': 3,
+        'earliest_date': date(2024, 1, 2), 'latest_date': date(2024, 6, 28),
+        'today_records': 690, 'week_records': 3450, 'last_updated': None,
+        'technical_quality': {'total_tickers': 700, 'average_quality': 0.85, 'high_quality_count': 600,
+                              'excellent': 500, 'good': 150, 'fair': 30, 'poor': 20},
+        'refreshed_at': datetime(2024, 6, 28, 18, 0),
+    }
+    row.update(overrides)
+    return row
+
+
+class TestDirtyTracking(unittest.TestCase):
+
+    def setUp(self):
+        pop_quality_dirty()
+
+    def test_mark_and_pop(self):
+        mark_quality_dirty('daily_charts', ['AAPL', 'MSFT', None, ''])
+        mark_quality_dirty('daily_charts', ['AAPL'])
+        mark_quality_dirty('company_fundamentals', ['NVDA'])
+
+        self.assertEqual(pop_quality_dirty(), {'daily_charts': {'AAPL', 'MSFT'},
+                                               'company_fundamentals': {'NVDA'}})
+        self.assertEqual(pop_quality_dirty(), {})
+
+    def test_refresh_dirty_only_touches_marked_tickers(self):
+        db = RecordingDB()
+        stats = DataQualityStats(db)
+        mark_quality_dirty('daily_charts', ['MSFT', 'AAPL'])
+        mark_quality_dirty('market_data', ['SPY'])
+
+        refreshed = stats.refresh_dirty()
+
+        self.assertEqual(refreshed, {'daily_charts': 2})
+        delete, aggregate = [(q, p) for q, p in db.statements if 'ticker_quality_stats' in q
+                             and ('DELETE' in q or 'INSERT' in q)][:2]
+        self.assertEqual(delete[1], ('daily_charts', ['AAPL', 'MSFT']))
+        self.assertIn('WHERE ticker = ANY(%(tickers)s)', aggregate[0])
+        self.assertEqual(aggregate[1]['tickers'], ['AAPL', 'MSFT'])
+        for column in TECHNICAL_QUALITY_COLUMNS:
+            self.assertIn(column, aggregate[0])
+        # Summary rolled up from per-ticker stats, never from daily_charts
+        rollup = db.statements[-1][0]
+        self.assertIn('INSERT INTO table_quality_summary', rollup)
+        self.assertNotIn('FROM daily_charts', rollup)
+
+    def test_write_paths_mark_stocks_and_fundamentals(self):
+        import earnings_calendar_service
+        from calculate_fundamental_ratios import DailyFundamentalRatioCalculator
+
+        earnings = earnings_calendar_service.EarningsCalendarService.__new__(
+            earnings_calendar_service.EarningsCalendarService)
+        earnings.conn = MagicMock()
+        earnings.cur = MagicMock()
+        earnings.cur.fetchall.return_value = [('AAPL',), ('KO',)]
+        self.assertEqual(earnings.update_stocks_earnings_dates(), 2)
+        self.assertIn('RETURNING s.ticker', earnings.cur.execute.call_args[0][0])
+
+        ratios = DailyFundamentalRatioCalculator.__new__(DailyFundamentalRatioCalculator)
+        ratios.db = MagicMock()
+        self.assertTrue(ratios.store_ratios('MSFT', {'price_to_earnings': 30.0}))
+
+        self.assertEqual(pop_quality_dirty(), {'stocks': {'AAPL', 'KO'}, 'company_fundamentals': {'MSFT'}})
+
+
+class TestWindowAgeing(unittest.TestCase):
+
+    def test_summary_rollup_recounts_stale_windows_first(self):
+        db = RecordingDB()
+        DataQualityStats(db).refresh_summary('daily_charts')
+
+        age, rollup = db.statements
+        self.assertIn('UPDATE ticker_quality_stats', age[0])
+        self.assertIn('stale.window_start < %(window_start)s::date', age[0])
+        # Only the window's rows are read, and tickers without any get zeros
+        self.assertIn('LEFT JOIN daily_charts src', age[0])
+        self.assertIn('src.date >= %(window_start)s', age[0])
+        for column in TECHNICAL_QUALITY_COLUMNS:
+            self.assertIn(f'src.{column}', age[0])
+        self.assertEqual(age[1]['table'], 'daily_charts')
+        self.assertIn('INSERT INTO table_quality_summary', rollup[0])
+
+    def test_tables_without_a_date_column_have_no_window(self):
+        db = RecordingDB()
+        DataQualityStats(db).refresh_summary('stocks')
+
+        self.assertEqual(len(db.statements), 1)
+        self.assertIn('INSERT INTO table_quality_summary', db.statements[0][0])
+
+    def test_refresh_due_rebuilds_stale_and_unbuilt_tables(self):
+        db = RecordingDB()
+        stats = DataQualityStats(db)
+        db.fetch_all_dict = MagicMock(return_value=[
+            {'source_table': 'daily_charts', 'full_refreshed_at': datetime.now() - timedelta(hours=2)},
+            {'source_table': 'stocks', 'full_refreshed_at': datetime.now() - timedelta(days=8)},
+            {'source_table': 'company_fundamentals', 'full_refreshed_at': None},
+        ])
+
+        rebuilt = stats.refresh_due()
+
+        self.assertEqual(sorted(rebuilt), ['company_fundamentals', 'stocks'])
+        full_scans = [q for q, _ in db.statements if 'INSERT INTO ticker_quality_stats' in q]
+        self.assertEqual(len(full_scans), 2)
+        self.assertFalse(any('FROM daily_charts' in q for q in full_scans))
+        stamped = [p for q, p in db.statements if 'SET full_refreshed_at' in q]
+        self.assertEqual(sorted(stamped), [('company_fundamentals',), ('stocks',)])
+
+
+class TestReads(unittest.TestCase):
+
+    def test_summary_bootstraps_with_full_scan_once(self):
+        db = RecordingDB()
+        stats = DataQualityStats(db)
+        db.fetch_all_dict = MagicMock(side_effect=[[], [summary_row()]])
+
+        summary = stats.summary('daily_charts')
+
+        self.assertEqual(summary['total_records'], 182000)
+        full_scan = [q for q, _ in db.statements if 'FROM daily_charts' in q]
+        self.assertEqual(len(full_scan), 1)
+        self.assertNotIn('ANY(', full_scan[0])
+
+    def test_freshness_shape_matches_database_manager(self):
+        stats = DataQualityStats(RecordingDB(summary_rows=[summary_row()]))
+
+        freshness = stats.freshness('daily_charts')
+
+        self.assertEqual(freshness['latest_date'], '2024-06-28')
+        self.assertEqual(freshness['today_records'], 690)
+        self.assertEqual(freshness['unique_tickers'], 700)
+        self.assertIsNone(stats.summary('market_data'))
+
+    def test_technical_quality(self):
+        stats = DataQualityStats(RecordingDB(summary_rows=[summary_row()]))
+
+        quality = stats.technical_quality()
+
+        self.assertEqual(quality['total_tickers'], 700)
+        self.assertEqual(quality['high_quality_count'], 600)
+        self.assertEqual(quality['low_quality_count'], 20)
+        self.assertEqual(sum(quality['quality_distribution'].values()), 700)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Tests for bulk earnings calendar ingestion
+Covers joining range-call events against stocks, the single batched upsert,
+and per-ticker fetches limited to unresolved tickers
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import earnings_calendar_service
+from earnings_calendar_service import EarningsCalendarService, merge_calendar_events
+
+
+def make_service(known_tickers):
+    """Service without a live database connection"""
+    service = EarningsCalendarService.__new__(EarningsCalendarService)
+    service.api_limiter = MagicMock()
+    service.api_limiter.try_acquire.return_value = True
+    service.api_limiter.ledger.seconds_until_available.return_value = 0
+    service.conn = MagicMock()
+    service.cur = MagicMock()
+    service.cur.fetchall.return_value = [(t, f"{t} Inc") for t in known_tickers]
+    service.max_retries = 1
+    service.base_delay = 0
+    return service
+
+
+def finnhub_response(events):
+    response = MagicMock(status_code=200)
+    response.json.return_value = {'earningsCalendar': events}
+    return response
+
+
+class TestMergeCalendarEvents(unittest.TestCase):
+
+    def test_join_against_stocks_and_prefer_richer_source(self):
+        events = [
+            {'ticker': 'brk.b', 'earnings_date': '2025-08-01', 'data_source': 'alphavantage',
+             'estimate_eps': 4.1},
+            {'ticker': 'BRK.B', 'earnings_date': '2025-08-01', 'data_source': 'finnhub',
+             'estimate_eps': None, 'actual_eps': 4.3},
+            {'ticker': 'ZZZZ', 'earnings_date': '2025-08-01', 'data_source': 'finnhub'},
+        ]
+        rows, unmatched = merge_calendar_events(events, {'BRK-B': 'Berkshire', 'AAPL': 'Apple'})
+
+        self.assertEqual(unmatched, 1)
+        row = rows[('BRK-B', '2025-08-01')]
+        self.assertEqual(row['data_source'], 'finnhub')
+        self.assertEqual(row['estimate_eps'], 4.1)
+        self.assertEqual(row['company_name'], 'Berkshire')
+
+
+class TestBulkEarningsCalendar(unittest.TestCase):
+
+    @patch.object(earnings_calendar_service, 'FINNHUB_API_KEY', 'key')
+    @patch.object(earnings_calendar_service, 'ALPHA_VANTAGE_API_KEY', None)
+    @patch.object(earnings_calendar_service.psycopg2.extras, 'execute_values')
+    @patch.object(earnings_calendar_service.requests, 'get')
+    def test_range_calls_and_single_upsert(self, mock_get, mock_execute_values):
+        mock_get.return_value = finnhub_response([
+            {'symbol': 'AAPL', 'date': '2025-07-30', 'hour': 'amc', 'epsEstimate': 1.4},
+            {'symbol': 'MSFT', 'date': '2025-07-29', 'hour': 'amc', 'epsEstimate': 3.3},
+            {'symbol': 'OTCX', 'date': '2025-07-29', 'hour': 'bmo'},
+        ])
+        service = make_service(['AAPL', 'MSFT', 'NVDA'])
+        budget = MagicMock()
+        budget.try_spend.return_value = True
+
+        result = service.bulk_update_earnings_calendar(days_back=7, days_ahead=52, budget=budget)
+
+        # 60 days in 30-day windows, plus one Alpha Vantage call for the uncovered ticker
+        self.assertEqual(result['range_calls'], 3)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertNotIn('symbol', mock_get.call_args.kwargs['params'])
+        self.assertEqual(mock_execute_values.call_count, 1)
+        values = mock_execute_values.call_args.args[2]
+        self.assertEqual(len(values), 2)
+        self.assertEqual(mock_execute_values.call_args.kwargs['page_size'], 2)
+        self.assertEqual(result['resolved_tickers'], ['AAPL', 'MSFT'])
+        self.assertEqual(result['unmatched_events'], 2)
+
+    @patch.object(earnings_calendar_service.psycopg2.extras, 'execute_values')
+    def test_per_ticker_fetch_only_for_unresolved(self, mock_execute_values):
+        service = make_service(['AAPL', 'MSFT'])
+        service.bulk_update_earnings_calendar = MagicMock(return_value={'resolved_tickers': ['AAPL']})
+        service.fetch_earnings_calendar = MagicMock(return_value={
+            'ticker': 'MSFT', 'earnings_date': '2025-07-29', 'data_source': 'yahoo'})
+
+        with patch.object(earnings_calendar_service.time, 'sleep') as mock_sleep:
+            result = service.process_earnings_calendar_updates(['AAPL', 'MSFT'])
+
+        service.fetch_earnings_calendar.assert_called_once_with('MSFT')
+        mock_sleep.assert_not_called()
+        self.assertEqual(result['per_ticker_stored'], 1)
+        self.assertEqual(mock_execute_values.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
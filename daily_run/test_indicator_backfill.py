@@ -0,0 +1,157 @@
+"""
+Tests for the full-history indicator backfill
+Covers the vectorized indicator frame, Wilder smoothing against the recursive
+form, partition-by-partition writes, resuming from recorded progress and the
+write throttle
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from indicator_backfill import (
+    INDICATOR_COLUMNS, INDICATOR_VERSION, IndicatorBackfill, compute_indicator_frame
+)
+from indicators.adx import wilder_smoothing
+
+
+def price_history(days=300, start='2023-06-01', seed=1):
+    rng = np.random.default_rng(seed)
+    close = 10000 + np.cumsum(rng.normal(0, 150, days))
+    dates = pd.bdate_range(start, periods=days)
+    return pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'open': np.round(close - 50).astype('int64'),
+        'high': np.round(close + 120).astype('int64'),
+        'low': np.round(close - 130).astype('int64'),
+        'close': np.round(close).astype('int64'),
+        'volume': rng.integers(1_000_000, 5_000_000, days),
+    })
+
+
+def fake_db(history, done=(), columns=INDICATOR_COLUMNS, granularity='year'):
+    db = MagicMock()
+
+    def execute_query(query, params=None):
+        if 'information_schema' in query:
+            return [(column,) for column in ['ticker', 'date'] + list(columns)]
+        if 'FROM stocks' in query:
+            return [(ticker,) for ticker in sorted(history['ticker'].unique())]
+        if 'indicator_backfill_progress' in query:
+            return [(ticker,) for ticker in done if ticker in params[1]]
+        if 'ORDER BY ticker, date' in query:
+            rows = history[history['ticker'].isin(params[0])]
+            return list(rows[['ticker', 'date', 'open', 'high', 'low', 'close', 'volume']].itertuples(index=False))
+        return []
+
+    db.execute_query.side_effect = execute_query
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = lambda: [('AAPL',)] * 5
+    db.get_cursor.return_value.__enter__.return_value = cursor
+    return db, cursor
+
+
+class TestIndicatorFrame(unittest.TestCase):
+
+    def test_every_bar_gets_indicators_in_storage_scale(self):
+        prices = price_history()
+        frame = compute_indicator_frame(prices.sample(frac=1, random_state=0))
+
+        self.assertEqual(len(frame), len(prices))
+        self.assertEqual(list(frame['date']), list(prices['date']))
+        self.assertEqual(list(frame.columns), ['date'] + INDICATOR_COLUMNS)
+        # Late bars have every indicator, stored as value * 100 of dollar prices
+        last = frame.iloc[-1]
+        self.assertFalse(last[INDICATOR_COLUMNS].isna().any())
+        self.assertTrue(0 <= last['rsi_14'] <= 10000)
+        self.assertAlmostEqual(last['pivot_woodie'] / 100,
+                               (prices['high'].iloc[-1] + prices['low'].iloc[-1] + 2 * prices['close'].iloc[-1]) / 400,
+                               delta=0.01)
+
+    def test_values_are_causal(self):
+        prices = price_history()
+        full = compute_indicator_frame(prices)
+        truncated = compute_indicator_frame(prices.iloc[:250])
+
+        pd.testing.assert_frame_equal(full.iloc[:250], truncated)
+
+    def test_warmup_bars_are_null(self):
+        frame = compute_indicator_frame(price_history())
+
+        self.assertTrue(frame['ema_200'].iloc[:199].isna().all())
+        self.assertFalse(pd.isna(frame['ema_200'].iloc[199]))
+        self.assertTrue(frame['fib_618'].iloc[:19].isna().all())
+
+    def test_wilder_smoothing_matches_recursive_form(self):
+        series = pd.Series(np.random.default_rng(0).random(120))
+        series.iloc[60] = np.nan
+        expected = pd.Series(np.nan, index=series.index)
+        expected.iloc[13] = series.iloc[:14].sum()
+        for i in range(14, len(series)):
+            expected.iloc[i] = expected.iloc[i - 1] - expected.iloc[i - 1] / 14 + series.iloc[i]
+
+        np.testing.assert_allclose(wilder_smoothing(series, 14), expected, equal_nan=True)
+
+
+class TestIndicatorBackfill(unittest.TestCase):
+
+    def setUp(self):
+        aapl = price_history(start='2023-06-01').assign(ticker='AAPL')
+        msft = price_history(start='2024-01-02', days=120, seed=2).assign(ticker='MSFT')
+        self.history = pd.concat([aapl, msft], ignore_index=True)
+
+    @patch('indicator_backfill.time.sleep')
+    def test_writes_one_range_bounded_update_per_partition(self, sleep):
+        db, cursor = fake_db(self.history)
+        backfill = IndicatorBackfill(db=db, duty_cycle=1.0)
+        backfill.partitions = MagicMock(granularity=MagicMock(return_value='year'))
+
+        report = backfill.run()
+
+        updates = [c for c in cursor.execute.call_args_list if c[0][0].lstrip().startswith('UPDATE daily_charts')]
+        self.assertEqual([c[0][1] for c in updates],
+                         [('2023-01-01', '2024-01-01'), ('2024-01-01', '2025-01-01')])
+        self.assertIn('IS DISTINCT FROM', updates[0][0][0])
+        self.assertEqual(cursor.copy_expert.call_count, 2)
+        self.assertEqual(report.tickers_done, 2)
+        # Each ticker's latest bar is left to the nightly run
+        self.assertEqual(report.rows_computed, len(self.history) - 2)
+        sleep.assert_not_called()
+
+    def test_resume_skips_finished_tickers(self):
+        db, cursor = fake_db(self.history, done=['AAPL'])
+        backfill = IndicatorBackfill(db=db)
+
+        self.assertEqual(backfill.pending_tickers(), ['MSFT'])
+        progress_query = [c for c in db.execute_query.call_args_list if 'indicator_backfill_progress' in c[0][0]]
+        self.assertEqual(progress_query[0][0][1][0], INDICATOR_VERSION)
+
+    def test_failed_batch_is_not_marked_done(self):
+        db, cursor = fake_db(self.history)
+        backfill = IndicatorBackfill(db=db, batch_size=1)
+        backfill.partitions = MagicMock(granularity=MagicMock(return_value='year'))
+        cursor.copy_expert.side_effect = RuntimeError('connection lost')
+
+        report = backfill.run(['AAPL'])
+
+        self.assertEqual(report.tickers_failed, ['AAPL'])
+        self.assertFalse(any('INSERT INTO indicator_backfill_progress' in c[0][0]
+                             for c in cursor.execute.call_args_list))
+
+    @patch('indicator_backfill.time.sleep')
+    def test_throttle_keeps_duty_cycle(self, sleep):
+        backfill = IndicatorBackfill(db=MagicMock(), duty_cycle=0.25, max_rows_per_second=1000)
+
+        self.assertAlmostEqual(backfill._throttle(2.0, 100), 6.0)
+        self.assertAlmostEqual(backfill._throttle(0.1, 5000), 4.9)
+        self.assertEqual(sleep.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
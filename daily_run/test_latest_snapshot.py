@@ -0,0 +1,140 @@
+"""
+Tests for the latest-snapshot table
+Covers table bootstrap, incremental per-ticker refresh, the bulk and cached
+per-ticker reads, and DatabaseManager latest-price reads staying on daily_charts
+"""
+
+import os
+import sys
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import DatabaseManager
+from latest_snapshot import LatestSnapshot, SNAPSHOT_TABLE
+
+
+class SnapshotDB:
+    """DatabaseManager stand-in with a fixed schema and snapshot contents"""
+
+    def __init__(self, exists=True, rows=None):
+        self.exists = exists
+        self.rows = rows or {}
+        self.statements = []
+        self.cursor = MagicMock()
+        self.cursor.execute.side_effect = lambda query, params=None: self.statements.append((query, params))
+
+    @contextmanager
+    def get_cursor(self):
+        yield self.cursor
+
+    def fetch_one(self, query, params=None):
+        return (self.exists,)
+
+    def execute_update(self, query, params=None):
+        self.statements.append((query, params))
+        return 1
+
+    def execute_query(self, query, params=None):
+        self.statements.append((query, params))
+        if 'information_schema' in query:
+            return [('ticker',), ('date',), ('close',), ('vwap',), ('rsi_14',)]
+        if 'FROM stocks' in query:
+            return [('AAPL',), ('MSFT',), ('NVDA',)]
+        return []
+
+    def fetch_all_dict(self, query, params=None):
+        self.statements.append((query, params))
+        tickers = params[0] if params else list(self.rows)
+        return [dict(self.rows[ticker], ticker=ticker) for ticker in tickers if ticker in self.rows]
+
+
+class TestRefresh(unittest.TestCase):
+
+    def test_first_refresh_creates_table_and_covers_every_ticker(self):
+        db = SnapshotDB(exists=False)
+        refreshed = LatestSnapshot(db).refresh(['AAPL'])
+
+        self.assertEqual(refreshed, 3)
+        self.assertTrue(any(f"CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} (LIKE daily_charts)" in q
+                            for q, _ in db.statements))
+        insert, params = db.statements[-1]
+        self.assertEqual(params, {'tickers': ['AAPL', 'MSFT', 'NVDA']})
+
+    def test_incremental_refresh_replaces_only_given_tickers(self):
+        db = SnapshotDB()
+        refreshed = LatestSnapshot(db).refresh(['MSFT', 'AAPL', 'MSFT'])
+
+        self.assertEqual(refreshed, 2)
+        delete, insert = db.statements[-2:]
+        self.assertIn('WHERE ticker = ANY(%s)', delete[0])
+        self.assertEqual(delete[1], (['AAPL', 'MSFT'],))
+        self.assertIn('CROSS JOIN LATERAL', insert[0])
+        self.assertIn('ORDER BY date DESC', insert[0])
+        self.assertIn('dc.ticker, dc.date, dc.close, dc.vwap, dc.rsi_14', insert[0])
+
+    def test_nothing_dirty_is_a_noop(self):
+        db = SnapshotDB()
+
+        self.assertEqual(LatestSnapshot(db).refresh([]), 0)
+        db.cursor.execute.assert_not_called()
+
+
+class TestReads(unittest.TestCase):
+
+    def setUp(self):
+        self.db = SnapshotDB(rows={'AAPL': {'close': 19000, 'vwap': 18950}, 'MSFT': {'close': 41000, 'vwap': 40800}})
+
+    def test_bulk_load_reads_universe_in_one_query(self):
+        snapshot = LatestSnapshot(self.db)
+        rows = snapshot.load()
+
+        self.assertEqual(set(rows), {'AAPL', 'MSFT'})
+        self.assertEqual(len(self.db.statements), 1)
+        self.assertNotIn('WHERE', self.db.statements[0][0])
+
+    def test_preloaded_get_does_not_query_again(self):
+        snapshot = LatestSnapshot(self.db)
+        snapshot.preload()
+        count = len(self.db.statements)
+
+        self.assertEqual(snapshot.get('AAPL')['close'], 19000)
+        self.assertIsNone(snapshot.get('ZZZZ'))
+        self.assertEqual(len(self.db.statements), count)
+
+    def test_missing_table_reads_empty(self):
+        snapshot = LatestSnapshot(SnapshotDB(exists=False))
+
+        self.assertEqual(snapshot.load(), {})
+        self.assertIsNone(snapshot.get('AAPL'))
+
+
+class TestDatabaseManagerLatestPrices(unittest.TestCase):
+
+    # The snapshot is only refreshed by the daily run, so a price written
+    # since then must win over an older snapshot row
+
+    def test_batch_prices_read_daily_charts_not_a_stale_snapshot(self):
+        db = DatabaseManager()
+        db._latest_snapshot = MagicMock()
+        db._latest_snapshot.load.return_value = {'AAPL': {'ticker': 'AAPL', 'close': 19000}}
+        with patch.object(db, 'execute_query', return_value=[('AAPL', 19500), ('MSFT', 41000)]) as query:
+            prices = db.get_latest_prices_batch(['AAPL', 'MSFT'])
+
+        self.assertEqual(prices, {'AAPL': 195.0, 'MSFT': 410.0})
+        self.assertEqual(query.call_args[0][1], ('AAPL', 'MSFT'))
+        db._latest_snapshot.load.assert_not_called()
+
+    def test_latest_price_reads_daily_charts_not_a_stale_snapshot(self):
+        db = DatabaseManager()
+        db._latest_snapshot = MagicMock()
+        db._latest_snapshot.get.return_value = {'ticker': 'AAPL', 'close': 19000}
+        with patch.object(db, 'execute_query', return_value=[(19500,)]):
+            self.assertEqual(db.get_latest_price('AAPL'), 195.0)
+        db._latest_snapshot.get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Tests for the process-wide logging pipeline
+Covers the queue handler / background listener, lazy per-ticker events,
+summary mode, rate-limited progress and phase summaries
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import log_pipeline
+from log_pipeline import EVENT_LOGGER, PhaseLog, configure_logging, set_log_mode, shutdown_logging
+
+
+class Expensive:
+    """Counts how often it is rendered"""
+
+    def __init__(self):
+        self.renders = 0
+        self.threads = []
+
+    def __str__(self):
+        self.renders += 1
+        self.threads.append(threading.current_thread().name)
+        return 'expensive'
+
+
+class TestConfigureLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.saved = (self.root.handlers[:], self.root.level)
+        self.root.handlers = []
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.directory.name, 'logs', 'system.log')
+        self.json_file = os.path.join(self.directory.name, 'events.jsonl')
+        patcher = patch('log_pipeline.atexit.register')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutdown_logging()
+        for handler in log_pipeline._pipeline.handlers:
+            handler.close()
+        log_pipeline._pipeline = None
+        self.root.handlers, level = self.saved
+        self.root.setLevel(level)
+        set_log_mode('verbose')
+        self.directory.cleanup()
+
+    def test_records_are_formatted_on_the_listener_thread(self):
+        pipeline = configure_logging(log_file=self.log_file, console=False)
+        value = Expensive()
+
+        logging.getLogger('daily_run.test').info('value: %s', value)
+        shutdown_logging()
+
+        self.assertEqual(len(self.root.handlers), 1)
+        self.assertIs(self.root.handlers[0], pipeline.handler)
+        # RotatingFileHandler formats once for its rollover check and once to write
+        self.assertGreaterEqual(value.renders, 1)
+        self.assertNotIn(threading.current_thread().name, value.threads)
+        with open(self.log_file) as handle:
+            self.assertIn('INFO - value: expensive', handle.read())
+
+    def test_repeat_calls_add_files_and_adopt_existing_handlers(self):
+        logging.basicConfig(level=logging.INFO)
+        first = configure_logging(log_file=self.log_file)
+        second = configure_logging(log_file=self.log_file, json_file=self.json_file, mode='summary')
+
+        self.assertIs(first, second)
+        self.assertEqual([type(h).__name__ for h in first.handlers],
+                         ['StreamHandler', 'RotatingFileHandler', 'RotatingFileHandler'])
+        self.assertEqual(logging.getLogger(EVENT_LOGGER).level, logging.WARNING)
+        with self.assertRaises(ValueError):
+            configure_logging(mode='quiet')
+
+    def test_json_events_carry_structured_fields(self):
+        configure_logging(json_file=self.json_file, console=False)
+
+        with PhaseLog('technicals', total=2, progress_interval=3600) as phase:
+            phase.event('AAPL', seconds=0.25, stored=12)
+            phase.event('MSFT', 'insufficient_data', 0.01, days=5)
+        shutdown_logging()
+
+        with open(self.json_file) as handle:
+            records = [json.loads(line) for line in handle]
+        events = [record for record in records if record['logger'] == EVENT_LOGGER]
+        self.assertEqual(events[0], {**events[0], 'phase': 'technicals', 'ticker': 'AAPL', 'status': 'ok',
+                                     'index': 1, 'total': 2, 'seconds': 0.25, 'stored': 12})
+        self.assertEqual(events[1]['level'], 'WARNING')
+        self.assertIn('technicals: 1 insufficient_data, 1 ok of 2', records[-1]['message'])
+
+
+class TestPhaseLog(unittest.TestCase):
+
+    def tearDown(self):
+        set_log_mode('verbose')
+
+    def test_summary_mode_skips_successes_without_building_them(self):
+        # assertLogs would lower the logger level, so collect with a plain handler
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        events = logging.getLogger(EVENT_LOGGER)
+        events.addHandler(handler)
+        self.addCleanup(events.removeHandler, handler)
+        set_log_mode('summary')
+
+        with patch('log_pipeline.TickerEvent', wraps=log_pipeline.TickerEvent) as event_class:
+            phase = PhaseLog('scores', total=3, progress_interval=3600)
+            phase.event('AAPL', seconds=0.1)
+            phase.event('MSFT', seconds=0.2)
+            phase.event('TSLA', 'error', 0.3, error='boom')
+
+        self.assertEqual(event_class.call_count, 1)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].levelname, 'ERROR')
+        self.assertEqual(records[0].event.fields, {'error': 'boom'})
+        self.assertEqual(records[0].getMessage(), '❌ [3/3] scores TSLA: error in 0.30s error=boom')
+
+    def test_progress_is_rate_limited(self):
+        clock = iter([0.0, 1.0, 2.0, 40.0, 75.0, 90.0])
+        with patch('log_pipeline.time.monotonic', side_effect=lambda: next(clock)), \
+                self.assertLogs('daily_run.progress', level='INFO') as logs:
+            phase = PhaseLog('technicals', total=4, progress_interval=30)
+            for ticker in ['A', 'B', 'C', 'D']:
+                phase.event(ticker, seconds=1.0)
+            phase.close()
+
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn('technicals: 3/4 (75.0%)', logs.output[0])
+        self.assertIn('technicals: 4/4 (100.0%)', logs.output[1])
+        self.assertIn('🎯 technicals: 4 ok of 4', logs.output[2])
+
+    def test_summary_percentiles_and_slowest(self):
+        phase = PhaseLog('scores', progress_interval=3600)
+        for index, seconds in enumerate([0.1] * 18 + [0.5, 2.0]):
+            phase.event(f"T{index}", seconds=seconds)
+
+        summary = phase.summary()
+
+        self.assertEqual(summary['counts'], {'ok': 20})
+        self.assertEqual(summary['p50_seconds'], 0.1)
+        self.assertEqual(summary['p95_seconds'], 2.0)
+        self.assertEqual(summary['slowest'], {'ticker': 'T19', 'seconds': 2.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Tests for the multi-service data workflow
+Covers the step's batched price writes and how a failed write is reported
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# simple_data_validator is not part of this tree; stub it for the import only
+with patch.dict(sys.modules, {'daily_run.simple_data_validator': MagicMock()}):
+    from daily_run import multi_service_data_workflow
+
+MultiServiceDataWorkflow = multi_service_data_workflow.MultiServiceDataWorkflow
+
+
+def make_workflow():
+    workflow = MultiServiceDataWorkflow.__new__(MultiServiceDataWorkflow)
+    workflow.db = MagicMock()
+    workflow.delay_between_requests = 0
+    workflow._pending_quotes = {}
+    return workflow
+
+
+def upsert_failing_for_finnhub(quotes, source=None):
+    if source == 'finnhub':
+        raise RuntimeError('COPY failed')
+    return {'inserted': len(quotes), 'updated': 0, 'skipped': 0}
+
+
+class TestPriceQuoteFlush(unittest.TestCase):
+
+    def test_quotes_without_price_are_not_queued(self):
+        workflow = make_workflow()
+
+        self.assertFalse(workflow._store_price_data_direct('AAPL', {'volume': 10}, 'yahoo'))
+        self.assertTrue(workflow._store_price_data_direct('MSFT', {'close': 410.5}, 'yahoo'))
+        self.assertEqual(workflow._pending_quotes, {'yahoo': {'MSFT': {'close': 410.5}}})
+
+    def test_flush_writes_one_batch_per_source_and_returns_failures(self):
+        workflow = make_workflow()
+        workflow._store_price_data_direct('AAPL', {'close': 190.0}, 'yahoo')
+        workflow._store_price_data_direct('MSFT', {'close': 410.0}, 'yahoo')
+        workflow._store_price_data_direct('KO', {'price': 60.0}, 'finnhub')
+        workflow.db.upsert_daily_quotes.side_effect = upsert_failing_for_finnhub
+
+        with self.assertLogs(multi_service_data_workflow.logger, level='ERROR'):
+            failed = workflow.flush_price_quotes()
+
+        self.assertEqual(workflow.db.upsert_daily_quotes.call_count, 2)
+        self.assertEqual(list(failed), ['KO'])
+        self.assertIn('COPY failed', failed['KO'])
+        self.assertEqual(workflow._pending_quotes, {})
+
+    def test_step3_marks_tickers_whose_price_was_not_stored(self):
+        workflow = make_workflow()
+
+        def fetch(ticker):
+            workflow._store_price_data_direct(ticker, {'close': 100.0}, 'finnhub' if ticker == 'KO' else 'yahoo')
+            return {'ticker': ticker, 'success': True, 'service_used': 'yahoo', 'error': None}
+
+        workflow._fetch_ticker_multi_service = fetch
+        workflow.db.upsert_daily_quotes.side_effect = upsert_failing_for_finnhub
+
+        with self.assertLogs(multi_service_data_workflow.logger, level='ERROR'):
+            results = workflow.step3_fetch_missing_data_multi_service(['AAPL', 'KO'])
+
+        self.assertTrue(results['AAPL']['success'])
+        self.assertFalse(results['KO']['success'])
+        self.assertIn('COPY failed', results['KO']['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Tests for the pipeline benchmark
+Covers dataset determinism, per-stage results, the memory pass and the
+baseline regression gate
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pipeline_benchmark import (
+    DEFAULT_BASELINE, PipelineBenchmark, SyntheticUniverse, compare_to_baseline, load_baselines, main,
+    parse_stage_thresholds, save_baseline, uncovered_stages
+)
+
+
+def stage(seconds, status='ok'):
+    return {'seconds': seconds, 'status': status, 'items': 10}
+
+
+class TestSyntheticUniverse(unittest.TestCase):
+
+    def test_same_seed_same_data(self):
+        a = SyntheticUniverse(5, 30, seed=7)
+        b = SyntheticUniverse(5, 30, seed=7)
+
+        self.assertEqual(a.tickers, b.tickers)
+        self.assertTrue((a.close == b.close).all())
+        self.assertTrue(a.fundamentals.equals(b.fundamentals))
+        self.assertFalse((SyntheticUniverse(5, 30, seed=8).close == a.close).all())
+        self.assertTrue((a.high >= a.low).all())
+
+
+class TestPipelineBenchmark(unittest.TestCase):
+
+    def test_run_times_selected_stages(self):
+        stages = ['price_ingest', 'indicators', 'ratios_vectorized', 'analyst_scorer', 'fundamental_scorer', 'db_writes']
+        results = PipelineBenchmark(4, 120, stages=stages).run()
+
+        self.assertEqual(list(results['stages']), stages)
+        self.assertEqual(results['stages']['price_ingest']['items'], 4 * 120)
+        for name in stages:
+            self.assertEqual(results['stages'][name]['status'], 'ok', name)
+        self.assertEqual(results['dataset'], {'tickers': 4, 'days': 120, 'seed': results['dataset']['seed']})
+        json.dumps(results)
+
+    def test_memory_pass_compares_window_paths(self):
+        stages = ['price_windows', 'price_windows_dicts']
+        results = PipelineBenchmark(20, 120, stages=stages, memory=True).run()['stages']
+
+        for name in stages:
+            self.assertEqual(results[name]['items'], 20, name)
+            self.assertGreater(results[name]['peak_kib'], 0, name)
+        # 100 dicts and a DataFrame per ticker versus six arrays
+        self.assertLess(results['price_windows']['net_blocks'], results['price_windows_dicts']['net_blocks'])
+        self.assertLess(results['price_windows']['peak_kib'], results['price_windows_dicts']['peak_kib'])
+
+
+class TestBaselineGate(unittest.TestCase):
+
+    def setUp(self):
+        self.baseline = {'stages': {'indicators': stage(2.0), 'db_writes': stage(0.01),
+                                    'fundamental_scorer': stage(0.0, 'skipped')}}
+
+    def test_flags_slowdown_beyond_threshold(self):
+        results = {'stages': {'indicators': stage(2.6), 'db_writes': stage(0.02),
+                              'fundamental_scorer': stage(5.0)}}
+
+        regressions = compare_to_baseline(results, self.baseline, threshold=0.25)
+
+        # db_writes doubled but by less than the noise floor; no baseline for the skipped stage
+        self.assertEqual([r.stage for r in regressions], ['indicators'])
+        self.assertAlmostEqual(regressions[0].slowdown, 0.3)
+
+    def test_stage_threshold_override(self):
+        results = {'stages': {'indicators': stage(2.6)}}
+        self.assertEqual(compare_to_baseline(results, self.baseline, 0.25,
+                                             parse_stage_thresholds(['indicators=0.5'])), [])
+
+    def test_uncovered_stages(self):
+        results = {'stages': {'indicators': stage(2.0), 'fundamental_scorer': stage(5.0),
+                              'history_stream': stage(1.0), 'db_writes': stage(0.0, 'error')}}
+        self.assertEqual(uncovered_stages(results, self.baseline), ['fundamental_scorer', 'history_stream'])
+
+    def test_checked_in_baseline_covers_every_stage(self):
+        baselines = load_baselines(DEFAULT_BASELINE)
+        for size in ('700', '5000'):
+            stages = baselines[size]['stages']
+            self.assertEqual(sorted(stages), sorted(PipelineBenchmark.STAGES), size)
+            for name, result in stages.items():
+                self.assertEqual(result['status'], 'ok', f"{size}/{name}")
+
+    def test_cli_exits_non_zero_on_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            args = ['--tickers', '3', '--days', '60', '--stages', 'ratios_scalar', '--baseline', path]
+            self.assertEqual(main(args + ['--update-baseline']), 0)
+
+            with open(path) as f:
+                baselines = json.load(f)
+            baselines['3']['stages']['ratios_scalar']['seconds'] = -1.0
+            save_baseline(path, baselines['3'])
+
+            self.assertEqual(main(args), 1)
+
+    def test_cli_fails_on_stage_without_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            args = ['--tickers', '3', '--days', '60', '--baseline', path]
+            self.assertEqual(main(args + ['--stages', 'ratios_scalar', '--update-baseline']), 0)
+
+            self.assertEqual(main(args + ['--stages', 'ratios_scalar', 'ratios_vectorized']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
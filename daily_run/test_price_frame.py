@@ -0,0 +1,120 @@
+"""
+Tests for the columnar price frame
+Covers building from cursor tuples and dict rows, NULL/order/duplicate
+handling, zero-copy column access, and the scorer and indicator paths that
+accept a PriceFrame directly
+"""
+
+import logging
+import os
+import sys
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from indicators.rsi import calculate_rsi
+from pipeline_benchmark import SyntheticUniverse
+from price_frame import PriceFrame
+
+# Newest first, as ORDER BY date DESC returns them
+ROWS = [
+    (date(2024, 1, 4), 10100, 10300, 10000, 10200, 1500),
+    ('2024-01-03', 10000, 10200, 9900, 10100, None),
+    (date(2024, 1, 2), 9900, 10100, 9800, None, 1200),
+    (date(2024, 1, 3), 9950, 10150, 9850, 10050, 1100),
+    (None, 1, 1, 1, 1, 1),
+]
+
+
+class TestPriceFrame(unittest.TestCase):
+
+    def test_from_cursor_rows(self):
+        frame = PriceFrame.from_rows(ROWS, scale=100)
+
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(list(frame.date.astype(str)), ['2024-01-03', '2024-01-04'])
+        # Duplicate date keeps the last row; NULL close and NULL date rows are dropped
+        self.assertEqual(list(frame.close), [100.5, 102.0])
+        self.assertEqual(list(frame.volume), [1100, 1500])
+        self.assertEqual((frame.date.dtype, frame.close.dtype, frame.volume.dtype),
+                         (np.dtype('datetime64[D]'), np.dtype('float64'), np.dtype('int64')))
+        self.assertTrue(all(getattr(frame, name).flags['C_CONTIGUOUS'] for name in ('open', 'close', 'volume')))
+        self.assertEqual(frame.nbytes, 2 * 48)
+
+    def test_dict_rows_and_dataframes_build_the_same_frame(self):
+        columns = ('date', 'open', 'high', 'low', 'close', 'volume')
+        from_tuples = PriceFrame.from_rows(ROWS[:2])
+        from_dicts = PriceFrame.from_rows([dict(zip(columns, row)) for row in ROWS[:2]])
+        from_frame = PriceFrame.from_frame(from_tuples.to_frame())
+
+        for name in columns:
+            np.testing.assert_array_equal(getattr(from_dicts, name), getattr(from_tuples, name))
+            np.testing.assert_array_equal(getattr(from_frame, name), getattr(from_tuples, name))
+        self.assertTrue(PriceFrame.from_rows([]).empty)
+
+    def test_columns_and_tail_share_memory(self):
+        frame = PriceFrame.from_frame(SyntheticUniverse(1, 80).ohlcv(0))
+        tail = frame.tail(30)
+
+        self.assertTrue(np.shares_memory(frame['close'].to_numpy(), frame.close))
+        self.assertTrue(np.shares_memory(tail.close, frame.close))
+        self.assertEqual(len(tail), 30)
+        self.assertTrue(np.shares_memory(frame.to_frame()['high'].to_numpy(), frame.high))
+        np.testing.assert_array_equal(calculate_rsi(frame['close']).to_numpy(),
+                                      calculate_rsi(frame.to_frame()['close']).to_numpy())
+
+    def test_database_reads_tuples(self):
+        db = DatabaseManager()
+        with patch.object(db, 'execute_query', return_value=ROWS) as query:
+            frame = db.get_price_frame('AAPL', days=50)
+
+        self.assertEqual(query.call_args[0][1], ('AAPL', 50))
+        self.assertEqual(list(frame.close), [10050.0, 10200.0])
+
+
+class TestUniversalCalculatorWithPriceFrame(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        from calc_technical_scores_universal import UniversalTechnicalScoreCalculator
+        cls.calculator = UniversalTechnicalScoreCalculator()
+        cls.universe = SyntheticUniverse(4, 120)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_same_scores_as_dataframe_input(self):
+        for i in range(4):
+            df = self.universe.ohlcv(i, 100)
+            with patch.object(self.calculator, 'get_clean_ticker_data', return_value=df.iloc[-60:]):
+                expected = self.calculator.calculate_enhanced_technical_scores('X')
+
+            result = self.calculator.calculate_enhanced_technical_scores('X', prices=PriceFrame.from_frame(df))
+
+            self.assertEqual(result['indicators'], expected['indicators'])
+            self.assertEqual(result['technical_score'], expected['technical_score'])
+
+    def test_scaling_fix_copies_only_corrected_columns(self):
+        df = self.universe.ohlcv(0, 60)
+        df.loc[:19, 'close'] *= 100
+        prices = PriceFrame.from_frame(df)
+        original_close = prices.close.copy()
+
+        fixed = self.calculator._apply_intelligent_scaling_fix(prices, 'X')
+
+        np.testing.assert_allclose(fixed.close, self.universe.ohlcv(0, 60)['close'].to_numpy())
+        np.testing.assert_array_equal(prices.close, original_close)
+        self.assertIs(fixed.open, prices.open)
+        self.assertIs(self.calculator._apply_intelligent_scaling_fix(fixed, 'X'), fixed)
+
+
+if __name__ == '__main__':
+    unittest.main()
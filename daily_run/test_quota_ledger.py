@@ -0,0 +1,173 @@
+"""
+Tests for the quota ledger
+Covers minute token buckets, atomic daily counters shared across threads,
+processes and restarts (SQLite backend), and fallback when the store fails
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quota_ledger import (
+    DEFAULT_QUOTAS, MemoryQuotaBackend, QuotaLedger, QuotaLimits, SQLiteQuotaBackend, TokenBucket,
+    account_for_key, normalize_provider
+)
+
+
+def reserve_in_process(path, attempts, queue):
+    """Child process: try to reserve `attempts` calls against the shared ledger file"""
+    ledger = QuotaLedger(SQLiteQuotaBackend(path), limits={'fmp': QuotaLimits(per_day=50)})
+    queue.put(sum(ledger.try_acquire('fmp') for _ in range(attempts)))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_refills_over_the_minute(self):
+        clock = FakeClock()
+        bucket = TokenBucket(per_minute=6, clock=clock)
+
+        self.assertEqual(sum(bucket.try_acquire() for _ in range(10)), 6)
+        self.assertAlmostEqual(bucket.wait_time(), 10.0)
+
+        clock.now = 20.0
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+    def test_drain_after_rate_limit_response(self):
+        bucket = TokenBucket(per_minute=60, clock=FakeClock())
+        bucket.drain()
+        self.assertFalse(bucket.try_acquire())
+
+
+class TestQuotaLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'quota.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_ledger(self, **limits):
+        return QuotaLedger(SQLiteQuotaBackend(self.path), limits=limits)
+
+    def test_provider_aliases(self):
+        self.assertEqual(normalize_provider('alphavantage'), 'alpha_vantage')
+        self.assertEqual(normalize_provider('Alpha Vantage'), 'alpha_vantage')
+        self.assertEqual(normalize_provider('yahoo_finance'), 'yahoo')
+
+    def test_daily_limit_across_threads(self):
+        ledger = self.make_ledger(fmp=QuotaLimits(per_day=150))
+        granted = []
+
+        def worker():
+            granted.append(sum(ledger.try_acquire('fmp') for _ in range(20)))
+
+        threads = [threading.Thread(target=worker) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(granted), 150)
+        self.assertEqual(ledger.calls_today('fmp', refresh=True), 150)
+        self.assertEqual(ledger.remaining_today('fmp'), 0)
+        self.assertFalse(ledger.available('fmp'))
+
+    def test_daily_limit_across_processes(self):
+        queue = multiprocessing.Queue()
+        SQLiteQuotaBackend(self.path)
+        processes = [multiprocessing.Process(target=reserve_in_process, args=(self.path, 30, queue))
+                     for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+
+        self.assertEqual(sum(queue.get(timeout=5) for _ in processes), 50)
+
+    def test_usage_survives_restart(self):
+        self.make_ledger(alpha_vantage=QuotaLimits(per_day=5)).record('alphavantage', n=4)
+
+        restarted = self.make_ledger(alpha_vantage=QuotaLimits(per_day=5))
+        self.assertEqual(restarted.calls_today('alpha_vantage'), 4)
+        self.assertTrue(restarted.try_acquire('alpha_vantage'))
+        self.assertFalse(restarted.try_acquire('alpha_vantage'))
+
+    def test_minute_window_and_accounts(self):
+        ledger = self.make_ledger(finnhub=QuotaLimits(per_minute=2))
+        ledger.set_limits('finnhub', per_minute=2, per_day=3, account='key1')
+
+        self.assertTrue(ledger.try_acquire('finnhub', account='key1'))
+        self.assertTrue(ledger.try_acquire('finnhub', account='key1'))
+        # Minute window exhausted for key1 only; the refused call is not counted
+        self.assertFalse(ledger.try_acquire('finnhub', account='key1'))
+        self.assertEqual(ledger.calls_today('finnhub', account='key1'), 2)
+        self.assertTrue(ledger.try_acquire('finnhub', account='key2'))
+        self.assertIsNone(ledger.remaining_today('finnhub', account='key2'))
+
+        report = ledger.usage_report()
+        self.assertEqual(report['finnhub:key1']['remaining_today'], 1)
+
+    def test_store_failure_falls_back_to_memory(self):
+        backend = MagicMock()
+        backend.name = 'postgres'
+        backend.reserve.side_effect = Exception('connection refused')
+        ledger = QuotaLedger(backend, limits={'fmp': QuotaLimits(per_day=2)})
+
+        self.assertTrue(ledger.try_acquire('fmp'))
+        self.assertTrue(ledger.try_acquire('fmp'))
+        self.assertFalse(ledger.try_acquire('fmp'))
+        self.assertEqual(backend.reserve.call_count, 1)
+
+
+class TestProviderAccounts(unittest.TestCase):
+
+    def test_default_quotas_match_previous_limiter(self):
+        self.assertEqual(DEFAULT_QUOTAS['fmp'], QuotaLimits(per_minute=30, per_day=1000))
+        self.assertEqual(DEFAULT_QUOTAS['alpha_vantage'], QuotaLimits(per_minute=5, per_day=500))
+
+    def test_account_is_derived_from_the_key(self):
+        self.assertEqual(account_for_key('abc'), account_for_key('abc'))
+        self.assertNotEqual(account_for_key('abc'), account_for_key('def'))
+        self.assertNotIn('abc', account_for_key('abc'))
+        self.assertEqual(account_for_key(None), '')
+
+    def test_finnhub_service_and_account_manager_share_a_key(self):
+        from daily_run.finnhub_multi_account_manager import FinnhubMultiAccountManager
+        from daily_run.finnhub_service import FinnhubService
+
+        ledger = QuotaLedger(MemoryQuotaBackend())
+        env = {'FINNHUB_API_KEY': 'abc', 'FINNHUB_API_KEY_1': 'abc', 'FINNHUB_API_KEY_2': 'def'}
+        with patch.dict(os.environ, env), \
+                patch('daily_run.finnhub_multi_account_manager.get_quota_ledger', return_value=ledger), \
+                patch('utility_functions.api_rate_limiter.get_quota_ledger', return_value=ledger):
+            manager = FinnhubMultiAccountManager()
+            service = FinnhubService(db=MagicMock())
+
+        self.assertTrue(service.rate_limiter.try_acquire('finnhub', 'quote', service.quota_account))
+        self.assertTrue(ledger.try_acquire('finnhub', account=manager._account_name(0)))
+
+        # One key, one daily counter, whichever service made the call
+        self.assertEqual(ledger.calls_today('finnhub', manager._account_name(0)), 2)
+        self.assertEqual(ledger.calls_today('finnhub', manager._account_name(1)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
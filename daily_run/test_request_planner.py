@@ -0,0 +1,100 @@
+"""
+Tests for the quota-aware request planner
+Covers value-ordered allocation, provider mix, borrowing and releasing
+unallocated capacity, and planned vs actual reporting
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from quota_ledger import MemoryQuotaBackend, QuotaLedger, QuotaLimits
+from request_planner import PhaseProfile, RequestPlanner
+
+
+def make_ledger(fmp_per_day=100, finnhub_per_minute=60):
+    return QuotaLedger(MemoryQuotaBackend(), limits={
+        'yahoo': QuotaLimits(per_minute=60),
+        'fmp': QuotaLimits(per_minute=10, per_day=fmp_per_day),
+        'finnhub': QuotaLimits(per_minute=finnhub_per_minute),
+    })
+
+
+PROFILES = {
+    'prices': PhaseProfile(100, {'fmp': 0.01, 'yahoo': 0.01}),
+    'analyst': PhaseProfile(70, {'fmp': 1}),
+    'backfill': PhaseProfile(40, {'fmp': 1}),
+    'fundamentals': PhaseProfile(30, {'yahoo': 1, 'fmp': 3}),
+}
+
+
+class TestRequestPlanner(unittest.TestCase):
+
+    def test_high_value_phase_reserved_before_low_value(self):
+        plan = RequestPlanner(make_ledger(fmp_per_day=100), PROFILES).plan(
+            {'backfill': 80, 'analyst': 60})
+
+        self.assertEqual(plan.budget('analyst').allocation, {'fmp': 60})
+        self.assertEqual(plan.budget('backfill').allocation, {'fmp': 40})
+        self.assertEqual(plan.budget('backfill').planned_items, 40)
+        self.assertEqual(plan.pool['fmp'], 0)
+
+        # The early low-value phase cannot eat into the analyst reservation
+        backfill = plan.budget('backfill')
+        self.assertEqual(sum(backfill.try_spend() for _ in range(80)), 40)
+        self.assertTrue(plan.budget('analyst').can_spend(60))
+
+    def test_ties_prefer_providers_without_daily_quota(self):
+        plan = RequestPlanner(make_ledger(), PROFILES).plan({'prices': 700})
+
+        self.assertEqual(plan.budget('prices').allocation, {'yahoo': 7})
+        self.assertEqual(plan.pool['fmp'], 100)
+
+    def test_minute_limited_provider_bounded_by_time_budget(self):
+        plan = RequestPlanner(make_ledger(fmp_per_day=30), PROFILES).plan(
+            {'fundamentals': 700}, time_budgets={'fundamentals': 600})
+
+        budget = plan.budget('fundamentals')
+        # 60/min for 10 minutes on yahoo, the rest on fmp at 3 calls per ticker
+        self.assertEqual(budget.allocation, {'yahoo': 600, 'fmp': 30})
+        self.assertEqual(budget.planned_items, 610)
+        self.assertEqual(budget.item_cost(), 1)
+
+    def test_release_returns_unused_quota_to_later_phases(self):
+        plan = RequestPlanner(make_ledger(fmp_per_day=50), PROFILES).plan(
+            {'analyst': 50, 'backfill': 20})
+        backfill = plan.budget('backfill')
+        self.assertFalse(backfill.can_spend())
+
+        analyst = plan.budget('analyst')
+        analyst.spend(10)
+        plan.release('analyst')
+
+        self.assertEqual(plan.pool['fmp'], 40)
+        self.assertTrue(backfill.try_spend(5))
+        self.assertEqual(backfill.borrowed, {'fmp': 5})
+
+    def test_report_planned_vs_actual(self):
+        plan = RequestPlanner(make_ledger(), PROFILES).plan({'prices': 250, 'analyst': 10})
+        plan.budget('prices').spend(2, 'Yahoo Finance')
+        plan.budget('prices').spend(1, 'FMP')
+
+        report = plan.report()
+        prices = report['phases']['prices']
+        self.assertEqual(prices['planned_calls'], 3)
+        self.assertEqual(prices['actual_by_provider'], {'yahoo': 2, 'fmp': 1})
+        self.assertEqual(prices['borrowed_calls'], 1)
+        self.assertEqual(list(report['phases']), ['prices', 'analyst'])
+        self.assertEqual(report['actual_calls'], 3)
+
+    def test_unplanned_phase_draws_from_pool(self):
+        plan = RequestPlanner(make_ledger(fmp_per_day=5), PROFILES).plan({})
+        budget = plan.budget('backfill')
+
+        self.assertEqual(sum(budget.try_spend() for _ in range(10)), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
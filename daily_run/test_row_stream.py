@@ -0,0 +1,178 @@
+"""
+Tests for streaming reads
+Covers batch prefetching (ordering, bounded read-ahead, early stop, errors),
+row-to-array conversion, per-ticker frames across batch boundaries and the
+DatabaseManager server-side cursor path
+"""
+
+import os
+import sys
+import threading
+import unittest
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import DatabaseManager
+from exceptions import DatabaseError
+from pipeline_benchmark import PipelineBenchmark
+from price_frame import iter_ticker_frames
+from row_stream import iter_batches, prefetch, rows_to_arrays
+
+HISTORY = [
+    ('AAPL', date(2024, 1, 2), 100, 110, 90, 105, 1000),
+    ('AAPL', date(2024, 1, 3), 105, 115, 95, 110, 1100),
+    ('AAPL', date(2024, 1, 4), 110, 120, 100, 115, 1200),
+    ('KO', date(2024, 1, 2), 60, 62, 58, 61, 500),
+    ('MSFT', date(2024, 1, 2), 300, 310, 290, 305, 700),
+    ('MSFT', date(2024, 1, 3), 305, 315, 295, 310, None),
+]
+
+
+def fake_cursor(rows):
+    cursor = MagicMock()
+    remaining = list(rows)
+
+    def fetchmany(size):
+        batch = remaining[:size]
+        del remaining[:size]
+        return batch
+
+    cursor.fetchmany.side_effect = fetchmany
+    cursor.description = [(name,) for name in ('ticker', 'date', 'open', 'high', 'low', 'close', 'volume')]
+    return cursor
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_batches_arrive_in_order_from_a_background_thread(self):
+        threads = []
+
+        def source():
+            for i in range(5):
+                threads.append(threading.current_thread().name)
+                yield [i]
+
+        self.assertEqual(list(prefetch(source(), depth=2)), [[0], [1], [2], [3], [4]])
+        self.assertEqual(set(threads), {'row-stream-prefetch'})
+        self.assertEqual(list(prefetch(iter([[1]]), depth=0)), [[1]])
+
+    def test_read_ahead_is_bounded_and_early_stop_closes_the_source(self):
+        produced = []
+        closed = threading.Event()
+
+        def source():
+            try:
+                for i in range(100):
+                    produced.append(i)
+                    yield i
+            finally:
+                closed.set()
+
+        stream = prefetch(source(), depth=2)
+        self.assertEqual(next(stream), 0)
+        stream.close()
+
+        self.assertTrue(closed.is_set())
+        # One handed over, two queued, at most one more blocked on the full queue
+        self.assertLessEqual(len(produced), 4)
+
+    def test_source_errors_reach_the_consumer(self):
+        def source():
+            yield 1
+            raise ValueError('fetch failed')
+
+        stream = prefetch(source())
+        self.assertEqual(next(stream), 1)
+        with self.assertRaises(ValueError):
+            next(stream)
+
+
+class TestConversion(unittest.TestCase):
+
+    def test_rows_to_arrays(self):
+        rows = [('AAPL', date(2024, 1, 2), Decimal('1.5'), 7),
+                ('KO', '2024-01-03', None, 8),
+                ('MSFT', 'not a date', 'n/a', 9)]
+
+        arrays = rows_to_arrays(rows, ['ticker', 'date', 'close', 'volume'],
+                                {'date': 'datetime64[D]', 'close': 'float64', 'volume': 'int64'})
+
+        self.assertEqual(arrays['ticker'].dtype, object)
+        self.assertEqual(list(arrays['ticker']), ['AAPL', 'KO', 'MSFT'])
+        self.assertEqual(list(arrays['date'][:2].astype(str)), ['2024-01-02', '2024-01-03'])
+        self.assertTrue(np.isnat(arrays['date'][2]))
+        np.testing.assert_array_equal(arrays['close'], [1.5, np.nan, np.nan])
+        self.assertEqual(arrays['volume'].dtype, np.dtype('int64'))
+        self.assertEqual(len(rows_to_arrays([], ['a', 'b'])['b']), 0)
+        with self.assertRaises(ValueError):
+            rows_to_arrays(rows, ['ticker'])
+
+    def test_ticker_frames_span_batch_boundaries(self):
+        for size in (1, 2, 4, 10):
+            frames = dict(iter_ticker_frames(iter_batches(fake_cursor(HISTORY), size), scale=100))
+
+            self.assertEqual(list(frames), ['AAPL', 'KO', 'MSFT'], size)
+            self.assertEqual(list(frames['AAPL'].close), [1.05, 1.10, 1.15])
+            self.assertEqual(list(frames['MSFT'].volume), [700, 0])
+            self.assertEqual(len(frames['KO']), 1)
+
+    def test_benchmark_stream_matches_fetchall(self):
+        benchmark = PipelineBenchmark(12, 60, stages=['history_stream', 'history_fetchall'])
+        benchmark.stage_price_ingest()
+
+        self.assertEqual(benchmark.stage_history_stream(), 12)
+        streamed = dict(benchmark._history_closes)
+        benchmark.stage_history_fetchall()
+        for ticker, close in benchmark._history_closes.items():
+            self.assertAlmostEqual(streamed[ticker], close, places=9)
+
+
+class TestDatabaseStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.cursor = fake_cursor(HISTORY)
+        self.connection = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+        patcher = patch('database.psycopg2.connect', return_value=self.connection)
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DatabaseManager()
+
+    def test_stream_query_uses_a_named_cursor_on_its_own_connection(self):
+        batches = list(self.db.stream_query("SELECT * FROM daily_charts", itersize=4))
+
+        self.assertEqual([len(batch) for batch in batches], [4, 2])
+        self.connection.set_session.assert_called_once_with(readonly=True)
+        self.assertTrue(self.connection.cursor.call_args[1]['name'].startswith('stream_'))
+        self.assertEqual(self.cursor.itersize, 4)
+        self.cursor.close.assert_called_once()
+        self.connection.close.assert_called_once()
+        self.assertIsNone(self.db.connection)
+
+    def test_stream_arrays_and_price_frames(self):
+        chunks = list(self.db.stream_arrays("SELECT ...", itersize=5, dtypes={'close': 'float64'}))
+        self.assertEqual([len(chunk['close']) for chunk in chunks], [5, 1])
+        self.assertEqual(list(chunks[1]['ticker']), ['MSFT'])
+
+        self.cursor.fetchmany.side_effect = fake_cursor(HISTORY).fetchmany.side_effect
+        frames = list(self.db.stream_price_frames(['AAPL', 'MSFT'], since='2024-01-01', scale=100, itersize=2))
+        query, params = self.cursor.execute.call_args[0]
+        self.assertIn('ORDER BY ticker, date', query)
+        self.assertEqual(params, (['AAPL', 'MSFT'], '2024-01-01'))
+        self.assertEqual([ticker for ticker, _ in frames], ['AAPL', 'KO', 'MSFT'])
+
+    def test_failures_raise_database_error_and_close_the_connection(self):
+        self.cursor.execute.side_effect = RuntimeError('relation does not exist')
+
+        with self.assertLogs('database', level='ERROR'), self.assertRaises(DatabaseError):
+            list(self.db.stream_query("SELECT * FROM missing"))
+        self.connection.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,336 @@
+"""
+Tests for the vectorized scoring backtest
+Covers agreement of every vectorized scorer with the per-ticker scorer it
+reproduces, the point-in-time panel (previous bar, forward returns, as-of
+fundamentals) and the hit-rate / bucket evaluation
+"""
+
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring_backtest import (
+    BacktestPanel, ScoreResult, ScoringBacktest, build_panel, default_scorers, evaluate
+)
+
+TICKERS = ['AAPL', 'JPM', 'XOM', 'ZZZ', 'QQQ', 'DIS', 'CAT', 'PFE']
+
+
+def random_panel(dates=60, seed=3):
+    """Stored-unit inputs with NULLs, zeros and out-of-range prices mixed in"""
+    rng = np.random.default_rng(seed)
+    shape = (dates, len(TICKERS))
+    close = rng.choice([2000.0, 18000.0, 4500.0, 60.0, 300000.0], size=shape) * rng.uniform(0.7, 1.3, shape)
+
+    def around(scale, null=0.15, zero=0.03):
+        values = close * rng.uniform(1 - scale, 1 + scale, shape)
+        values[rng.random(shape) < zero] = 0.0
+        values[rng.random(shape) < null] = np.nan
+        return values
+
+    def signed(low, high, null=0.15):
+        values = rng.uniform(low, high, shape)
+        values[rng.random(shape) < null] = np.nan
+        return values
+
+    fields = {
+        'close': close,
+        'prev_close': np.where(rng.random(shape) < 0.1, np.nan, close * rng.uniform(0.85, 1.15, shape)),
+        'vwap': around(0.2), 'ema_20': around(0.1), 'ema_50': around(0.15), 'ema_200': around(0.3),
+        'sma_200': around(0.3),
+        'support_1': around(0.2), 'support_2': around(0.25), 'support_3': around(0.3),
+        'resistance_1': around(0.2), 'resistance_2': around(0.25), 'resistance_3': around(0.3),
+        'rsi_14': signed(0, 120), 'macd_line': signed(-3, 3),
+        'market_cap': signed(-1e9, 3e12), 'revenue_ttm': signed(-1e9, 3e11),
+        'net_income_ttm': signed(-2e10, 4e10), 'total_debt': signed(0, 2e11),
+        'shareholders_equity': signed(-5e10, 2e11), 'current_assets': signed(0, 1e11),
+        'current_liabilities': signed(-1e9, 1e11), 'free_cash_flow': signed(-3e9, 3e10),
+        'ebitda_ttm': signed(-2e9, 5e10),
+    }
+    fields['total_debt'][rng.random(shape) < 0.05] = 0.0
+    dates = pd.bdate_range('2024-01-02', periods=dates).to_numpy(dtype='datetime64[ns]')
+    return BacktestPanel(dates=dates, tickers=list(TICKERS), fields=fields)
+
+
+def value(panel, name, i, j):
+    values = panel.fields.get(name)
+    if values is None or np.isnan(values[i, j]):
+        return None
+    return float(values[i, j])
+
+
+class TestScorerEquivalence(unittest.TestCase):
+    """Each vectorized scorer must rate every (date, ticker) as the per-ticker class does"""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        cls.panel = random_panel()
+        cls.scorers = default_scorers(MagicMock())
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def cells(self):
+        rows, columns = self.panel.shape
+        for i in range(rows):
+            for j in range(columns):
+                yield i, j, self.panel.tickers[j]
+
+    def assert_matches(self, name, scalar_score):
+        result = self.scorers[name].score(self.panel)
+        for i, j, ticker in self.cells():
+            expected = scalar_score(i, j, ticker)
+            if expected is None:
+                self.assertTrue(np.isnan(result.composite[i, j]), (name, i, ticker))
+                self.assertEqual(result.ratings[i, j], -1)
+                continue
+            composite, rating = expected
+            self.assertAlmostEqual(result.composite[i, j], composite, places=6, msg=(name, i, ticker))
+            self.assertEqual(result.labels[result.ratings[i, j]], rating, (name, i, ticker))
+
+    def decisive(self, scorer, takes_ticker=True):
+        p = self.panel
+
+        def score(i, j, ticker):
+            fundamental = {name: value(p, name, i, j) for name in (
+                'market_cap', 'revenue_ttm', 'net_income_ttm', 'total_debt', 'shareholders_equity',
+                'current_assets', 'current_liabilities', 'free_cash_flow', 'ebitda_ttm')}
+            technical = {name: value(p, name, i, j) for name in (
+                'close', 'vwap', 'support_1', 'support_2', 'support_3',
+                'resistance_1', 'resistance_2', 'resistance_3')}
+            technical.update(rsi=value(p, 'rsi_14', i, j), macd=value(p, 'macd_line', i, j),
+                             sma_20=value(p, 'ema_20', i, j), sma_50=value(p, 'ema_50', i, j),
+                             sma_200=value(p, 'ema_200', i, j))
+            history = [(technical['close'], 1000000, None)]
+            if value(p, 'prev_close', i, j) is not None:
+                history.append((value(p, 'prev_close', i, j), 1000000, None))
+
+            if takes_ticker:
+                vwap_sr, _ = scorer.calculate_vwap_sr_score(technical, ticker)
+            else:
+                vwap_sr, _ = scorer.calculate_vwap_sr_score(technical)
+            if vwap_sr is None:
+                return None
+            composite = scorer.calculate_composite_score({
+                'fundamental_health': scorer.calculate_fundamental_health(fundamental),
+                'technical_health': scorer.calculate_technical_health(technical, history),
+                'vwap_sr': vwap_sr,
+            })
+            return composite, scorer.get_rating(composite)
+        return score
+
+    def base_score(self, scorer):
+        p = self.panel
+
+        def score(i, j, ticker):
+            data = {name: value(p, name, i, j) for name in (
+                'market_cap', 'revenue_ttm', 'net_income_ttm', 'total_debt', 'shareholders_equity',
+                'free_cash_flow', 'ebitda_ttm', 'vwap', 'support_1', 'resistance_1', 'rsi_14',
+                'macd_line', 'ema_20', 'ema_50', 'close')}
+            data.update(ticker=ticker, macd_signal=data['macd_line'], sma_200=value(p, 'ema_200', i, j),
+                        volume=1000000, current_price=data['close'])
+            if not scorer.is_price_data_valid(data):
+                return None
+            composite = scorer.calculate_composite_score(scorer.calculate_fundamental_health(data),
+                                                         scorer.calculate_technical_health(data),
+                                                         scorer.calculate_vwap_sr_score(data)['total_score'])
+            return composite, scorer.get_rating(composite)
+        return score
+
+    def full_spectrum(self, scorer, enhanced):
+        p = self.panel
+
+        def score(i, j, ticker):
+            data = {name: value(p, name, i, j) for name in (
+                'market_cap', 'revenue_ttm', 'net_income_ttm', 'total_debt', 'free_cash_flow',
+                'close', 'vwap', 'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200',
+                'support_1', 'resistance_1')}
+            data.update(ticker=ticker, current_price=data['close'], sma_200=value(p, 'sma_200', i, j))
+            data = {k: (np.nan if v is None else v) for k, v in data.items()}
+            if not scorer.is_price_data_valid(data):
+                return None
+            weights = scorer.get_sector_weights(ticker)[1]
+            fundamental = scorer.calculate_fundamental_health(data, weights)
+            technical = scorer.calculate_technical_health(data, weights)
+            vwap_sr = scorer.calculate_vwap_sr_score(data)
+            composite = scorer.calculate_composite_score(fundamental, technical, vwap_sr, weights)
+            rating = scorer.get_rating(composite) if enhanced else scorer.get_rating(composite, weights)
+            return composite, rating
+        return score
+
+    def test_final_optimized_decisive(self):
+        from final_optimized_decisive_scoring import FinalOptimizedDecisiveScorer
+        self.assert_matches('final_optimized_decisive_scoring', self.decisive(FinalOptimizedDecisiveScorer()))
+
+    def test_market_aligned_decisive(self):
+        from market_aligned_decisive_scoring import MarketAlignedDecisiveScorer
+        self.assert_matches('market_aligned_decisive_scoring', self.decisive(MarketAlignedDecisiveScorer()))
+
+    def test_final_decisive(self):
+        from final_decisive_scoring import FinalDecisiveScorer
+        self.assert_matches('final_decisive_scoring', self.decisive(FinalDecisiveScorer()))
+
+    def test_balanced_decisive(self):
+        from balanced_decisive_scoring import BalancedDecisiveScorer
+        self.assert_matches('balanced_decisive_scoring', self.decisive(BalancedDecisiveScorer()))
+
+    def test_decisive_scoring_system(self):
+        from decisive_scoring_system import DecisiveStockScorer
+        self.assert_matches('decisive_scoring_system', self.decisive(DecisiveStockScorer(), takes_ticker=False))
+
+    def test_aggressive_buy_hold(self):
+        from aggressive_buy_hold_scoring import AggressiveBuyHoldScoring
+        self.assert_matches('aggressive_buy_hold_scoring', self.base_score(AggressiveBuyHoldScoring()))
+
+    def test_balanced_realistic(self):
+        from balanced_realistic_scoring import BalancedRealisticScoring
+        self.assert_matches('balanced_realistic_scoring', self.base_score(BalancedRealisticScoring()))
+
+    def test_enhanced_full_spectrum(self):
+        from enhanced_full_spectrum_scoring import EnhancedFullSpectrumScoring
+        scorer = EnhancedFullSpectrumScoring(db=MagicMock())
+        scorer.load_sector_weights()
+        self.assert_matches('enhanced_full_spectrum_scoring', self.full_spectrum(scorer, enhanced=True))
+
+    def test_full_spectrum(self):
+        from full_spectrum_scoring_system import FullSpectrumScoring
+        self.assert_matches('full_spectrum_scoring_system', self.full_spectrum(FullSpectrumScoring(), enhanced=False))
+
+
+def long_prices():
+    rows = []
+    for ticker, closes in (('AAPL', [100, 110, 121, 133.1, 146.41]), ('MSFT', [200, 190, 180])):
+        for n, close in enumerate(closes):
+            rows.append({'ticker': ticker, 'date': f'2024-03-0{n + 4}', 'close': close * 100, 'rsi_14': 50 + n})
+    # MSFT has no bar on the 5th
+    rows = [row for row in rows if not (row['ticker'] == 'MSFT' and row['date'] == '2024-03-05')]
+    rows.append({'ticker': 'MSFT', 'date': '2024-03-08', 'close': 17000, 'rsi_14': 40})
+    return pd.DataFrame(rows)
+
+
+class TestBuildPanel(unittest.TestCase):
+
+    def test_previous_bar_and_forward_returns_follow_each_ticker(self):
+        panel = build_panel(long_prices(), horizons=(1, 2), start='2024-03-05', end='2024-03-07')
+
+        self.assertEqual(panel.tickers, ['AAPL', 'MSFT'])
+        self.assertEqual(panel.shape, (3, 2))
+        np.testing.assert_allclose(panel['prev_close'][:, 0], [10000, 11000, 12100])
+        # MSFT has no rows on the 5th or 7th: its previous bar for the 6th is the 4th
+        # and its next bar is the 8th, outside the scored range
+        np.testing.assert_allclose(panel['prev_close'][:, 1], [np.nan, 20000, np.nan])
+        np.testing.assert_allclose(panel.forward_returns[1][:, 0], [0.1, 0.1, 0.1])
+        np.testing.assert_allclose(panel.forward_returns[1][:, 1], [np.nan, 17000 / 18000 - 1, np.nan])
+        np.testing.assert_allclose(panel.forward_returns[2][:, 0], [0.21, 0.21, np.nan])
+        self.assertTrue(np.isnan(panel['sma_200']).all())
+
+    def test_fundamentals_as_of_with_lag_and_point_in_time_market_cap(self):
+        reports = pd.DataFrame({
+            'ticker': ['AAPL', 'AAPL', 'MSFT'],
+            'available': pd.to_datetime(['2024-03-05', '2024-03-07', '2024-03-20']),
+            'net_income_ttm': [1.0, 2.0, 9.0],
+            'market_cap': [5e6, 6e6, 7e6],
+            'shares_outstanding': [1000.0, np.nan, 50.0],
+        })
+        panel = build_panel(long_prices(), reports, horizons=(1,))
+
+        np.testing.assert_allclose(panel['net_income_ttm'][:, 0], [np.nan, 1.0, 1.0, 2.0, 2.0])
+        self.assertTrue(np.isnan(panel['net_income_ttm'][:, 1]).all())
+        # shares x close while shares are known, the reported figure otherwise
+        np.testing.assert_allclose(panel['market_cap'][:, 0],
+                                   [np.nan, 1000 * 110, 1000 * 121, 6e6, 6e6])
+
+
+class TestEvaluate(unittest.TestCase):
+
+    def test_hit_rate_buckets_and_spread(self):
+        panel = BacktestPanel(
+            dates=np.array(['2024-01-02', '2024-01-03'], dtype='datetime64[ns]'),
+            tickers=['A', 'B', 'C'],
+            fields={'close': np.ones((2, 3))},
+            forward_returns={5: np.array([[0.10, -0.05, 0.02], [-0.04, -0.02, np.nan]])})
+        labels = ('Strong Buy', 'Buy', 'Hold', 'Sell')
+        result = ScoreResult('test', np.array([[90.0, 10.0, 50.0], [80.0, 60.0, np.nan]]),
+                             np.array([[0, 3, 2], [1, 2, -1]], dtype=np.int8), labels)
+
+        stats = evaluate(panel, result, 5)
+
+        self.assertEqual(stats.observations, 5)
+        self.assertAlmostEqual(stats.coverage, 5 / 6)
+        # Strong Buy up, Buy down, Sell down -> 2 of 3 directional calls right
+        self.assertAlmostEqual(stats.hit_rate, 2 / 3)
+        self.assertAlmostEqual(stats.spread, (0.10 - 0.04) / 2 - (-0.05))
+        buckets = {bucket.rating: bucket for bucket in stats.buckets}
+        self.assertIsNone(buckets['Hold'].hit_rate)
+        self.assertEqual(buckets['Hold'].observations, 2)
+        self.assertAlmostEqual(buckets['Strong Buy'].excess_return, 0.10 - (0.10 - 0.05 + 0.02) / 3)
+        # Fewer names than MIN_IC_NAMES on every date
+        self.assertIsNone(stats.information_coefficient)
+
+    def test_information_coefficient_is_mean_daily_rank_correlation(self):
+        scores = np.array([[1.0, 2, 3, 4, 5, 6], [6, 5, 4, 3, 2, np.nan], [1, 2, 3, 4, 5, 6]])
+        returns = np.array([[0.01, 0.02, 0.03, 0.04, 0.05, 0.06],
+                            [0.01, 0.02, 0.03, 0.04, 0.05, 0.06],
+                            [0.5, 0.2, 0.3, np.nan, 0.1, np.nan]])
+        panel = BacktestPanel(dates=np.arange(3).astype('datetime64[D]').astype('datetime64[ns]'),
+                              tickers=list('ABCDEF'), fields={'close': np.ones((3, 6))},
+                              forward_returns={5: returns})
+        result = ScoreResult('test', scores, np.zeros((3, 6), dtype=np.int8), ('Hold',))
+
+        # +1 on the first date, -1 on the second, the third has too few names
+        self.assertAlmostEqual(evaluate(panel, result, 5).information_coefficient, 0.0)
+
+
+class TestScoringBacktest(unittest.TestCase):
+
+    def test_run_loads_in_batches_and_reports_every_scorer_and_horizon(self):
+        rng = np.random.default_rng(0)
+        dates = pd.bdate_range('2024-01-02', periods=40).strftime('%Y-%m-%d')
+        history = [(ticker, day, float(10000 + rng.normal(0, 300)), 1e6, 5000.0)
+                   for ticker in ('AAPL', 'MSFT', 'KO') for day in dates]
+        db = MagicMock()
+
+        def execute_query(query, params=None):
+            if 'information_schema' in query:
+                if params == ('daily_charts',):
+                    return [('ticker',), ('date',), ('close',), ('volume',), ('rsi_14',)]
+                return [('ticker',), ('report_date',), ('net_income',)]
+            if 'FROM stocks' in query:
+                return [('AAPL',), ('KO',), ('MSFT',)]
+            if 'FROM daily_charts' in query:
+                return [row for row in history if row[0] in params[0] and params[1] <= row[1] <= params[2]]
+            if 'FROM company_fundamentals' in query:
+                return [('AAPL', '2023-12-31', None, 5e9)]
+            return []
+
+        db.execute_query.side_effect = execute_query
+        backtest = ScoringBacktest(db=db, batch_size=2)
+        report = backtest.run('2024-01-10', '2024-02-09', horizons=(1, 5),
+                              scorers=['final_optimized_decisive_scoring', 'balanced_realistic_scoring'])
+
+        price_queries = [c for c in db.execute_query.call_args_list if 'FROM daily_charts' in c[0][0]]
+        self.assertEqual([c[0][1][0] for c in price_queries], [['AAPL', 'KO'], ['MSFT']])
+        self.assertEqual((report.tickers, report.start), (3, '2024-01-10'))
+        self.assertEqual([(r.scorer, r.horizon) for r in report.results], [
+            ('final_optimized_decisive_scoring', 1), ('final_optimized_decisive_scoring', 5),
+            ('balanced_realistic_scoring', 1), ('balanced_realistic_scoring', 5)])
+        self.assertTrue(all(r.observations > 0 for r in report.results))
+        self.assertIn('balanced_realistic_scoring - 5-bar forward return', report.format())
+
+    def test_unknown_scorer_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ScoringBacktest(db=MagicMock()).run('2024-01-01', scorers=['nope'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Tests for the universe snapshot and scoring plugins
+Covers the constant number of snapshot queries, the ticker_latest_snapshot
+fallback, snapshot views matching what each scorer family's get_stock_data
+built, and running several variants over one snapshot without further queries
+"""
+
+import logging
+import os
+import sys
+import unittest
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring_plugins import (
+    STOCK_COLUMNS, LegacyScorerPlugin, available_plugins, combined_view, compare,
+    decisive_view, full_spectrum_view
+)
+from universe_snapshot import UniverseSnapshotLoader
+
+TECHNICAL = ['close', 'vwap', 'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200',
+             'support_1', 'support_2', 'support_3', 'resistance_1', 'resistance_2', 'resistance_3']
+LATEST = date(2025, 6, 30)
+
+
+def universe(seed=7):
+    """stocks rows, latest rows and newest-first history for a few tickers"""
+    rng = np.random.default_rng(seed)
+    stocks, latest, history = {}, {}, {}
+    for ticker, price in (('AAPL', 19500), ('JPM', 17000), ('XOM', 11000), ('KO', 6200), ('CAT', 30000)):
+        stocks[ticker] = {column: float(rng.uniform(1e8, 5e11)) for column in STOCK_COLUMNS}
+        stocks[ticker].update(ticker=ticker, sector='Industrials', industry=None, net_income_ttm=None)
+        closes = price * np.cumprod(rng.uniform(0.97, 1.03, 120))
+        rows = [{'ticker': ticker, 'date': LATEST - timedelta(days=n), 'open': c, 'high': c, 'low': c,
+                 'close': c, 'volume': 1e6 + n} for n, c in enumerate(closes)]
+        history[ticker] = rows
+        row = {column: float(closes[0] * rng.uniform(0.9, 1.1)) for column in TECHNICAL}
+        row.update(ticker=ticker, date=LATEST, close=float(closes[0]), rsi_14=float(rng.uniform(20, 80)),
+                   macd_line=float(rng.normal()), volume=None, sma_200=None, support_3=None)
+        latest[ticker] = row
+    return stocks, latest, history
+
+
+def fake_db(snapshot_table=True):
+    stocks, latest, history = universe()
+    db = MagicMock()
+
+    def fetch_all_dict(query, params=None):
+        if 'FROM stocks' in query:
+            wanted = params[0] if params else sorted(stocks)
+            return [stocks[t] for t in sorted(stocks) if t in wanted]
+        if 'DISTINCT ON' in query:
+            return [latest[t] for t in params[0] if t in latest]
+        if 'ROW_NUMBER' in query:
+            rows = []
+            for ticker in params[0]:
+                bars = [bar for bar in history.get(ticker, []) if bar['date'].isoformat() >= params[1]]
+                rows += bars[:params[-1]]
+            return rows
+        return []
+
+    db.fetch_all_dict.side_effect = fetch_all_dict
+    db.get_latest_snapshots.side_effect = lambda tickers=None, columns=None: (
+        {t: latest[t] for t in tickers if t in latest} if snapshot_table else {})
+    return db, (stocks, latest, history)
+
+
+class TestUniverseSnapshotLoader(unittest.TestCase):
+
+    def test_loads_universe_in_constant_queries(self):
+        db, (stocks, latest, history) = fake_db()
+        snapshot = UniverseSnapshotLoader(db, batch_size=2).load()
+
+        self.assertEqual(snapshot.tickers, ['AAPL', 'CAT', 'JPM', 'KO', 'XOM'])
+        # stocks scan + ticker_latest_snapshot read + 3 history batches
+        self.assertEqual(snapshot.queries, 5)
+        self.assertEqual(db.fetch_all_dict.call_count, 4)
+        history_calls = [c for c in db.fetch_all_dict.call_args_list if 'ROW_NUMBER' in c[0][0]]
+        self.assertEqual([c[0][1][0] for c in history_calls], [['AAPL', 'CAT'], ['JPM', 'KO'], ['XOM']])
+        self.assertEqual(history_calls[0][0][1][1], (LATEST - timedelta(days=170)).isoformat())
+
+        rows = snapshot.price_history('KO', limit=3)
+        self.assertEqual(rows, [(history['KO'][n]['close'], history['KO'][n]['volume'], history['KO'][n]['date'])
+                                for n in range(3)])
+        self.assertEqual(len(snapshot.price_history('KO')), 100)
+        np.testing.assert_allclose(snapshot.history_matrix('close', 2)[3], [history['KO'][0]['close'],
+                                                                           history['KO'][1]['close']])
+        self.assertEqual(snapshot.column('rsi_14')[0], latest['AAPL']['rsi_14'])
+        self.assertEqual(snapshot.column('market_cap')[1], stocks['CAT']['market_cap'])
+        self.assertTrue(np.isnan(snapshot.column('net_income_ttm')).all())
+
+    def test_falls_back_to_distinct_on_without_snapshot_table(self):
+        db, _ = fake_db(snapshot_table=False)
+        snapshot = UniverseSnapshotLoader(db).load(['KO', 'AAPL', 'MISSING'])
+
+        self.assertEqual(snapshot.tickers, ['AAPL', 'KO', 'MISSING'])
+        self.assertTrue(any('DISTINCT ON' in c[0][0] for c in db.fetch_all_dict.call_args_list))
+        self.assertEqual(sorted(snapshot.technicals), ['AAPL', 'KO'])
+        self.assertIsNone(snapshot.fundamental('MISSING'))
+
+
+class TestSnapshotViews(unittest.TestCase):
+    """Each view must hand a scorer the same dict its own get_stock_data built"""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        db, cls.data = fake_db()
+        cls.snapshot = UniverseSnapshotLoader(db).load()
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def scorer_db(self, ticker, stock_columns, technical_columns, history_columns=None):
+        stocks, latest, history = self.data
+        db = MagicMock()
+        cursor = db.connection.cursor.return_value
+        cursor.fetchone.side_effect = [tuple(stocks[ticker].get(c) for c in stock_columns),
+                                       tuple(latest[ticker].get(c) for c in technical_columns)]
+        if history_columns:
+            cursor.fetchall.return_value = [tuple(bar[c] for c in history_columns)
+                                            for bar in history[ticker][:100]]
+        db.get_latest_snapshot.return_value = None
+        return db
+
+    def test_decisive_view(self):
+        from final_optimized_decisive_scoring import FinalOptimizedDecisiveScorer
+        scorer = FinalOptimizedDecisiveScorer()
+        scorer.db = self.scorer_db('JPM', STOCK_COLUMNS, TECHNICAL[:1] + ['vwap'] + TECHNICAL[7:] + [
+            'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200'], ['close', 'volume', 'date'])
+
+        self.assertEqual(decisive_view(self.snapshot, 'JPM', scorer), scorer.get_stock_data('JPM'))
+
+    def test_combined_view_uses_the_scorers_sector_mapping(self):
+        from comprehensive_ai_comparison_table import ComprehensiveAIComparison
+        scorer = ComprehensiveAIComparison()
+        scorer.db = self.scorer_db('XOM', STOCK_COLUMNS, TECHNICAL[:1] + ['vwap'] + TECHNICAL[7:] + [
+            'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200'])
+
+        view = combined_view(self.snapshot, 'XOM', scorer)
+        self.assertEqual(view, scorer.get_stock_data('XOM'))
+        self.assertEqual(view['sector'], 'Energy')
+
+    def test_full_spectrum_view(self):
+        from full_spectrum_scoring_system import FullSpectrumScoring
+        scorer = FullSpectrumScoring()
+        scorer.db = self.scorer_db(
+            'KO', ['market_cap', 'revenue_ttm', 'net_income_ttm', 'total_debt', 'free_cash_flow',
+                   'shares_outstanding', 'sector', 'industry', 'book_value_per_share'],
+            ['close', 'vwap', 'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'sma_200'] + TECHNICAL[7:] + ['volume', 'date'])
+
+        view = full_spectrum_view(self.snapshot, 'KO', scorer)
+        expected = scorer.get_stock_data('KO')
+        self.assertEqual({k: v for k, v in view.items() if k in expected}, expected)
+
+
+class TestCompare(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_variants_share_one_snapshot(self):
+        db, _ = fake_db()
+        snapshot = UniverseSnapshotLoader(db).load(['AAPL', 'JPM', 'XOM', 'KO', 'CAT', 'NOPE'])
+        queries = db.fetch_all_dict.call_count
+        plugins = available_plugins(MagicMock())
+        names = ['final_optimized_decisive_scoring', 'vectorized:final_optimized_decisive_scoring',
+                 'balanced_decisive_scoring', 'comprehensive_ai_comparison_table',
+                 'enhanced_sector_based_scoring', 'enhanced_full_spectrum_scoring',
+                 'vectorized:enhanced_full_spectrum_scoring']
+
+        report = compare(snapshot, [plugins[name] for name in names])
+
+        self.assertEqual(db.fetch_all_dict.call_count, queries)
+        results = {result.plugin: result for result in report.results}
+        for name in names:
+            self.assertEqual(results[name].errors, {}, name)
+            self.assertIn('NOPE', results[name].skipped)
+        # The per-ticker class and its vectorized port agree (EFS rounds to 2 places)
+        for legacy, vectorized in (('final_optimized_decisive_scoring', 'vectorized:final_optimized_decisive_scoring'),
+                                   ('enhanced_full_spectrum_scoring', 'vectorized:enhanced_full_spectrum_scoring')):
+            self.assertEqual(sorted(results[legacy].scores), sorted(results[vectorized].scores))
+            for ticker, score in results[legacy].scores.items():
+                self.assertAlmostEqual(results[vectorized].scores[ticker]['composite_score'],
+                                       score['composite_score'], delta=0.005)
+                self.assertEqual(results[vectorized].scores[ticker]['rating'], score['rating'])
+        frame = report.to_frame()
+        self.assertIn('comprehensive_ai_comparison_table_rating', frame.columns)
+        self.assertIn('enhanced_sector_based_scoring', report.format())
+
+    def test_failing_scorer_is_reported_not_raised(self):
+        db, _ = fake_db()
+        snapshot = UniverseSnapshotLoader(db).load(['AAPL'])
+        broken = LegacyScorerPlugin('broken', MagicMock(side_effect=RuntimeError('boom')), decisive_view)
+
+        report = compare(snapshot, [broken])
+
+        self.assertEqual(report.results[0].errors, {'*': 'boom'})
+
+
+if __name__ == '__main__':
+    unittest.main()
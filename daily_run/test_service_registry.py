@@ -0,0 +1,142 @@
+"""
+Tests for the lazy service registry
+Covers first-use construction, failed services, the LazyService attribute,
+closing only built services, the multi-service fallback skipping services it
+cannot use, and the startup report's importtime parsing
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from enhanced_multi_service_manager import EnhancedMultiServiceManager
+from service_registry import LazyService, ServiceRegistry, init_timings
+from startup_report import parse_importtime, StartupReport
+
+
+class Owner:
+    yahoo_service = LazyService()
+    fmp_service = LazyService()
+
+    def __init__(self, yahoo_factory, fmp_factory):
+        self.services = ServiceRegistry('owner')
+        self.services.register('yahoo_service', yahoo_factory)
+        self.services.register('fmp_service', fmp_factory)
+
+
+class TestServiceRegistry(unittest.TestCase):
+
+    def test_service_built_once_on_first_access(self):
+        factory = MagicMock(return_value='client')
+        registry = ServiceRegistry('test').register('yahoo', factory)
+
+        self.assertEqual(registry.pending(), ['yahoo'])
+        factory.assert_not_called()
+        self.assertEqual(registry['yahoo'], 'client')
+        self.assertEqual(registry.get('yahoo'), 'client')
+        factory.assert_called_once()
+        self.assertEqual(registry.pending(), [])
+        self.assertIn('test.yahoo', [name for name, _ in init_timings()])
+
+    def test_failed_factory_drops_service(self):
+        registry = ServiceRegistry('test')
+        registry.register('broken', MagicMock(side_effect=RuntimeError('no api key')))
+        registry.register('empty', MagicMock(return_value=None))
+
+        self.assertIn('broken', registry)
+        self.assertIsNone(registry.get('broken'))
+        self.assertIsNone(registry.get('empty'))
+        self.assertNotIn('broken', registry)
+        self.assertEqual(len(registry), 0)
+        with self.assertRaises(KeyError):
+            registry['broken']
+        self.assertEqual(registry.failed()['broken'], 'no api key')
+
+    def test_membership_and_built_never_construct(self):
+        factory = MagicMock(return_value='client')
+        registry = ServiceRegistry('test').register('finnhub', factory)
+
+        self.assertIn('finnhub', registry)
+        self.assertEqual(list(registry), ['finnhub'])
+        self.assertEqual(registry.built(), {})
+        factory.assert_not_called()
+
+
+class TestLazyService(unittest.TestCase):
+
+    def test_attribute_reads_build_and_assignment_installs(self):
+        fmp_factory = MagicMock(return_value='fmp')
+        owner = Owner(MagicMock(return_value='yahoo'), fmp_factory)
+
+        self.assertEqual(owner.yahoo_service, 'yahoo')
+        owner.fmp_service = 'mock fmp'
+        self.assertEqual(owner.fmp_service, 'mock fmp')
+        fmp_factory.assert_not_called()
+
+    def test_instances_do_not_share_services(self):
+        first = Owner(MagicMock(return_value='a'), MagicMock())
+        second = Owner(MagicMock(return_value='b'), MagicMock())
+
+        self.assertEqual((first.yahoo_service, second.yahoo_service), ('a', 'b'))
+
+
+class TestFallbackSkipsUnusableServices(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = EnhancedMultiServiceManager.__new__(EnhancedMultiServiceManager)
+        self.manager.logger = MagicMock()
+        self.manager.error_handler = MagicMock()
+        self.manager.service_instances = ServiceRegistry('test')
+        self.manager.service_instances.register('broken', MagicMock(side_effect=RuntimeError('no api key')))
+        self.manager.service_instances['pricing_only'] = MagicMock(spec=['get_data'])
+        self.manager.service_instances['yahoo'] = MagicMock()
+        self.manager.service_instances['yahoo'].get_fundamental_data.return_value = {'pe_ratio': 20}
+        self.manager.get_optimal_service_order = MagicMock(return_value=['broken', 'pricing_only', 'yahoo'])
+        self.manager._validate_result = MagicMock(return_value=True)
+        self.manager._record_api_call = MagicMock(return_value=True)
+        self.manager._record_failed_call = MagicMock()
+        self.manager._record_successful_call = MagicMock()
+        self.breakers = {}
+        self.manager._circuit_breaker = lambda service_id, data_type: self.breakers.setdefault(service_id, MagicMock())
+
+    def test_quota_and_breaker_only_charged_for_usable_services(self):
+        result, service_id = self.manager.fetch_data_with_fallback('AAPL', 'fundamentals')
+
+        self.assertEqual((result, service_id), ({'pe_ratio': 20}, 'yahoo'))
+        self.manager._record_api_call.assert_called_once_with('yahoo')
+        self.manager._record_failed_call.assert_not_called()
+        self.assertEqual(list(self.breakers), ['yahoo'])
+
+
+class TestStartupReport(unittest.TestCase):
+
+    STDERR = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       178 |        178 |     _io",
+        "import time:      1200 |       5400 |   pandas",
+        "import time:       900 |       7100 | daily_trading_system",
+        "WARNING: something else on stderr",
+    ])
+
+    def test_parse_importtime_reads_times_and_depth(self):
+        modules = parse_importtime(self.STDERR)
+
+        self.assertEqual([m.name for m in modules], ['_io', 'pandas', 'daily_trading_system'])
+        self.assertEqual([m.depth for m in modules], [2, 1, 0])
+        self.assertEqual(modules[1].cumulative_ms, 5.4)
+
+    def test_report_lists_slowest_imports_and_deferred_services(self):
+        report = StartupReport(total_import_ms=7.1, modules=parse_importtime(self.STDERR),
+                               pending_services=['batch_price_processor'])
+        text = report.format(top=2)
+
+        self.assertIn('daily_trading_system', text)
+        self.assertNotIn('_io', text)
+        self.assertIn('Deferred until first use: batch_price_processor', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Tests for the set-based ticker purge
+Covers FK-safe delete order with one DELETE per table, the single
+transaction, batched reference counts, dry runs, the compressed archive and
+the delete paths that go through it
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from exceptions import DatabaseError
+from stock_existence_checker import ExistenceCheckResult, StockExistenceChecker
+from ticker_purge import PURGE_TABLES, TickerPurger
+
+PRESENT = ['stocks', 'daily_charts', 'company_fundamentals', 'ticker_latest_snapshot']
+
+
+class FakeCursor:
+    """Records statements; rowcount per table comes from `rows`"""
+
+    def __init__(self, rows, fail_on=None):
+        self.rows = rows
+        self.fail_on = fail_on
+        self.statements = []
+        self.rowcount = 0
+        self._result = []
+
+    def execute(self, query, params=None):
+        self.statements.append((' '.join(query.split()), params))
+        table = query.split()[2]
+        if table == self.fail_on:
+            raise RuntimeError(f"cannot delete from {table}")
+        self.rowcount = self.rows.get(table, 0)
+        self._result = [('PBCT',), ('PLAN',)] if table == 'stocks' else []
+
+    def fetchall(self):
+        return self._result
+
+    def mogrify(self, query, params):
+        return query.replace('%s', "ARRAY['PBCT','PLAN']").encode()
+
+    def copy_expert(self, query, file):
+        table = query.split('FROM ')[1].split()[0]
+        file.write(f"ticker,value\nPBCT,{table}\n")
+
+
+def fake_db(cursor):
+    db = MagicMock()
+    db.execute_query.side_effect = lambda query, params=None: (
+        [(table,) for table in PRESENT] if 'information_schema' in query else
+        [('daily_charts', 'PBCT', 250), ('stocks', 'PBCT', 1), ('stocks', 'PLAN', 1)])
+
+    class Transaction:
+        def __enter__(self):
+            return cursor
+
+        def __exit__(self, exc_type, exc, tb):
+            db.committed = exc_type is None
+            db.rolled_back = exc_type is not None
+            if exc_type:
+                raise DatabaseError('operation', str(exc))
+
+    db.get_cursor.side_effect = Transaction
+    return db
+
+
+class TestTickerPurger(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_one_delete_per_table_in_fk_order_and_one_transaction(self):
+        cursor = FakeCursor({'daily_charts': 500, 'company_fundamentals': 2, 'stocks': 2})
+        db = fake_db(cursor)
+
+        with patch('ticker_purge.mark_quality_dirty') as dirty:
+            report = TickerPurger(db).purge(['PLAN', 'PBCT', 'PLAN', None])
+
+        self.assertEqual(db.get_cursor.call_count, 1)
+        self.assertTrue(db.committed)
+        tables = [statement.split()[2] for statement, _ in cursor.statements]
+        self.assertEqual(tables, [t for t in PURGE_TABLES if t in PRESENT])
+        self.assertEqual(tables[-1], 'stocks')
+        self.assertTrue(all(params == (['PBCT', 'PLAN'],) for _, params in cursor.statements))
+        self.assertTrue(all('WHERE ticker = ANY(%s)' in statement for statement, _ in cursor.statements))
+        self.assertEqual(report.deleted, {'daily_charts': 500, 'company_fundamentals': 2, 'stocks': 2})
+        self.assertEqual(report.removed_tickers, ['PBCT', 'PLAN'])
+        self.assertEqual(sorted(call[0][0] for call in dirty.call_args_list),
+                         ['company_fundamentals', 'daily_charts', 'stocks'])
+
+    def test_failure_rolls_back_everything(self):
+        cursor = FakeCursor({'daily_charts': 500}, fail_on='stocks')
+        db = fake_db(cursor)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        with patch('ticker_purge.mark_quality_dirty') as dirty:
+            report = TickerPurger(db, archive_dir=directory.name).purge(['PBCT'])
+
+        self.assertFalse(report.success)
+        self.assertTrue(db.rolled_back)
+        self.assertIsNone(report.archive_path)
+        self.assertEqual(os.listdir(directory.name), [])
+        dirty.assert_not_called()
+
+    def test_archive_written_before_deletes(self):
+        cursor = FakeCursor({'stocks': 2})
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        with patch('ticker_purge.mark_quality_dirty'):
+            report = TickerPurger(fake_db(cursor), archive_dir=directory.name).purge(['PBCT', 'PLAN'])
+
+        with zipfile.ZipFile(report.archive_path) as archive:
+            self.assertEqual(sorted(archive.namelist()),
+                             sorted(['tickers.txt'] + [f"{t}.csv" for t in PRESENT]))
+            self.assertEqual(archive.read('stocks.csv').decode(), "ticker,value\nPBCT,stocks\n")
+            self.assertEqual(archive.getinfo('daily_charts.csv').compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_dry_run_counts_in_one_query(self):
+        cursor = FakeCursor({})
+        db = fake_db(cursor)
+
+        report = TickerPurger(db).purge(['PBCT', 'PLAN'], dry_run=True)
+
+        db.get_cursor.assert_not_called()
+        counts_query = db.execute_query.call_args_list[-1][0][0]
+        self.assertEqual(counts_query.count('UNION ALL'), len(PRESENT) - 1)
+        self.assertEqual(report.deleted, {'daily_charts': 250, 'stocks': 2})
+        self.assertEqual(report.removed_tickers, ['PBCT', 'PLAN'])
+        self.assertIn('would remove 2/2', report.format())
+
+
+class TestStockExistenceCheckerPurge(unittest.TestCase):
+
+    def test_delisted_stocks_removed_in_one_purge(self):
+        cursor = FakeCursor({'stocks': 2})
+        checker = StockExistenceChecker(fake_db(cursor), MagicMock())
+
+        def result(ticker, remove):
+            return ExistenceCheckResult(ticker, [], [], [], [], 4, remove, datetime.now())
+
+        with patch('ticker_purge.mark_quality_dirty'):
+            outcome = checker.remove_delisted_stocks({'PBCT': result('PBCT', True), 'AAPL': result('AAPL', False),
+                                                      'PLAN': result('PLAN', True)})
+
+        self.assertEqual(outcome, {'removed': 2, 'errors': 0})
+        self.assertTrue(all(params == (['PBCT', 'PLAN'],) for _, params in cursor.statements))
+
+    def test_failed_purge_reports_errors(self):
+        cursor = FakeCursor({}, fail_on='stocks')
+        checker = StockExistenceChecker(fake_db(cursor), MagicMock())
+        result = ExistenceCheckResult('PBCT', [], [], [], [], 4, True, datetime.now())
+
+        with patch('ticker_purge.mark_quality_dirty'), \
+                patch.object(checker.error_handler, 'log_error') as log_error:
+            outcome = checker.remove_delisted_stocks({'PBCT': result})
+
+        self.assertEqual(outcome, {'removed': 0, 'errors': 1})
+        self.assertEqual(log_error.call_args[0][3], {'tickers': ['PBCT']})
+
+
+class TestBasicDelistedCleanup(unittest.TestCase):
+
+    def test_candidates_removed_in_one_purge(self):
+        from daily_trading_system import DailyTradingSystem
+        cursor = FakeCursor({'daily_charts': 500, 'stocks': 2})
+        system = DailyTradingSystem.__new__(DailyTradingSystem)
+        system.db = fake_db(cursor)
+        system.error_handler = MagicMock()
+
+        with patch('ticker_purge.mark_quality_dirty'), self.assertLogs('daily_trading_system', level='INFO'):
+            result = system._basic_delisted_cleanup()
+
+        self.assertEqual(system.db.get_cursor.call_count, 1)
+        self.assertEqual(result['removed_count'], 2)
+        self.assertTrue(all(len(params[0]) == 19 for _, params in cursor.statements))
+        self.assertEqual([statement.split()[2] for statement, _ in cursor.statements][-1], 'stocks')
+
+
+if __name__ == '__main__':
+    unittest.main()
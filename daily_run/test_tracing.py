@@ -0,0 +1,137 @@
+"""
+Tests for run tracing
+Covers streaming histogram accuracy, nested/sampled spans, OTLP JSON export
+and the per-phase profiling modes
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from tracing import StreamingHistogram, Tracer
+
+
+class TestStreamingHistogram(unittest.TestCase):
+
+    def test_quantiles_within_precision_and_memory_bounded(self):
+        rng = random.Random(1)
+        values = [rng.lognormvariate(-3, 1) for _ in range(50000)]
+        histogram = StreamingHistogram(precision=0.02)
+        for value in values:
+            histogram.record(value)
+
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(histogram.quantile(q) / exact, 1, delta=0.03)
+        self.assertEqual(histogram.count, 50000)
+        self.assertLess(len(histogram.buckets), 1000)
+
+
+class TestTracer(unittest.TestCase):
+
+    def test_nested_spans_share_trace_and_link_parents(self):
+        tracer = Tracer(sample_rate=1.0)
+        with tracer.span('daily_run', kind='server'):
+            with tracer.phase('daily_prices'):
+                with tracer.span('technicals.ticker', sample_key='AAPL', ticker='AAPL'):
+                    with tracer.span('technicals.db_read'):
+                        pass
+
+        spans = {span.name: span for span in tracer.spans}
+        self.assertEqual(len({span.trace_id for span in tracer.spans}), 1)
+        self.assertIsNone(spans['daily_run'].parent_id)
+        self.assertEqual(spans['daily_prices'].parent_id, spans['daily_run'].span_id)
+        self.assertEqual(spans['technicals.db_read'].parent_id, spans['technicals.ticker'].span_id)
+        self.assertIsNone(tracer.current_span)
+
+    def test_unsampled_tickers_still_feed_histograms(self):
+        tracer = Tracer(sample_rate=0.2)
+        tickers = [f"T{i}" for i in range(500)]
+        with tracer.span('daily_run'):
+            for ticker in tickers:
+                with tracer.span('scores.ticker', sample_key=ticker):
+                    with tracer.span('scores.db_write'):
+                        pass
+
+        recorded = [span for span in tracer.spans if span.name == 'scores.ticker']
+        self.assertTrue(50 < len(recorded) < 150)
+        self.assertEqual(len([s for s in tracer.spans if s.name == 'scores.db_write']), len(recorded))
+        self.assertEqual(tracer.summary()['scores.db_write']['count'], 500)
+        # Same tickers are sampled on every run
+        self.assertEqual([t for t in tickers if tracer.sampled(t)],
+                         [t for t in tickers if Tracer(sample_rate=0.2).sampled(t)])
+
+    def test_span_buffer_is_bounded(self):
+        tracer = Tracer(sample_rate=1.0, max_spans=10)
+        for _ in range(25):
+            with tracer.span('step'):
+                pass
+        self.assertEqual(len(tracer.spans), 10)
+        self.assertEqual(tracer.dropped_spans, 15)
+        self.assertEqual(tracer.summary()['step']['count'], 25)
+
+    def test_exception_marks_span_error_and_propagates(self):
+        tracer = Tracer()
+        with self.assertRaises(ValueError):
+            with tracer.span('compute'):
+                raise ValueError('bad data')
+        self.assertIn('ValueError', tracer.spans[0].error)
+
+    def test_otlp_export(self):
+        tracer = Tracer(service_name='dts', sample_rate=1.0)
+        with tracer.span('daily_run', kind='server', force_run=True):
+            with tracer.span('technicals.compute', days=100):
+                pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = tracer.export(os.path.join(tmp, 'trace.json'))
+            with open(path) as f:
+                payload = json.load(f)
+            with open(os.path.join(tmp, 'trace_summary.json')) as f:
+                summary = json.load(f)
+
+        resource = payload['resourceSpans'][0]
+        self.assertEqual(resource['resource']['attributes'][0],
+                         {'key': 'service.name', 'value': {'stringValue': 'dts'}})
+        spans = {span['name']: span for span in resource['scopeSpans'][0]['spans']}
+        self.assertEqual(len(spans['daily_run']['traceId']), 32)
+        self.assertEqual(spans['daily_run']['kind'], 2)
+        self.assertEqual(spans['technicals.compute']['parentSpanId'], spans['daily_run']['spanId'])
+        self.assertIn({'key': 'days', 'value': {'intValue': '100'}}, spans['technicals.compute']['attributes'])
+        self.assertGreaterEqual(int(spans['daily_run']['endTimeUnixNano']),
+                                int(spans['daily_run']['startTimeUnixNano']))
+        self.assertIn('technicals.compute', summary['spans'])
+
+    def test_profile_modes_write_flame_graph_input(self):
+        def busy():
+            end = time.perf_counter() + 0.05
+            while time.perf_counter() < end:
+                sum(range(100))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode, suffix in (('cprofile', '.pstats'), ('sample', '.folded')):
+                tracer = Tracer(profile=mode, profile_dir=tmp)
+                with tracer.phase('daily_prices'):
+                    busy()
+                self.assertEqual(len(tracer.profiles), 1)
+                self.assertTrue(tracer.profiles[0].endswith(suffix))
+                self.assertGreater(os.path.getsize(tracer.profiles[0]), 0)
+
+            with open(tracer.profiles[0]) as f:
+                line = f.readline()
+            self.assertIn('busy (test_tracing.py', line)
+
+        with self.assertRaises(ValueError):
+            Tracer(profile='perf')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+"""
+Ticker Purge
+
+Set-based removal of delisted / obsolete tickers from every table that
+holds per-ticker rows.
+
+The delisted paths used to delete one ticker at a time, with an existence
+check and a DELETE per table per ticker (and a COUNT per table per ticker
+to look for references first). TickerPurger takes the whole list:
+
+- one information_schema query finds which of PURGE_TABLES exist and have
+  a ticker column
+- reference_counts() counts rows per table and ticker in one UNION ALL query
+- purge() runs one DELETE ... WHERE ticker = ANY(%s) per table, dependent
+  tables first and stocks last, inside a single transaction, so a failure
+  leaves every table untouched
+
+With an archive directory the rows are first copied (same transaction) into
+a zip archive holding one deflate-compressed CSV per table, so a purge can be
+inspected or restored with COPY ... FROM.
+
+Usage:
+    python ticker_purge.py PBCT PLAN QTS --archive-dir ../archives/delisted
+    python ticker_purge.py PBCT --dry-run
+"""
+
+import argparse
+import io
+import logging
+import os
+import time
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .database import DatabaseManager, mark_quality_dirty
+    from .data_quality_stats import QUALITY_TABLES
+except ImportError:
+    from database import DatabaseManager, mark_quality_dirty
+    from data_quality_stats import QUALITY_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Delete order: tables referencing stocks first, stocks last
+PURGE_TABLES = [
+    'ticker_latest_snapshot',
+    'daily_charts',
+    'technical_indicators',
+    'company_fundamentals',
+    'financial_ratios',
+    'investor_scores',
+    'company_scores',
+    'enhanced_scores',
+    'earnings_calendar',
+    'recompute_watermarks',
+    'stocks',
+]
+
+
+@dataclass
+class PurgeReport:
+    """What a purge removed (or, for a dry run, would remove)"""
+    requested: List[str]
+    deleted: Dict[str, int] = field(default_factory=dict)
+    removed_tickers: List[str] = field(default_factory=list)
+    archive_path: Optional[str] = None
+    seconds: float = 0.0
+    dry_run: bool = False
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.deleted.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            'requested': len(self.requested),
+            'removed_tickers': self.removed_tickers,
+            'deleted': dict(self.deleted),
+            'total_rows': self.total_rows,
+            'archive_path': self.archive_path,
+            'seconds': round(self.seconds, 2),
+            'dry_run': self.dry_run,
+            'error': self.error,
+        }
+
+    def format(self) -> str:
+        verb = 'would remove' if self.dry_run else 'removed'
+        lines = [f"🗑️ Purge {verb} {len(self.removed_tickers)}/{len(self.requested)} tickers, "
+                 f"{self.total_rows} rows in {self.seconds:.2f}s"]
+        for table, rows in self.deleted.items():
+            lines.append(f"   {table}: {rows}")
+        if self.archive_path:
+            lines.append(f"   📦 Archived to {self.archive_path}")
+        if self.error:
+            lines.append(f"   ❌ Rolled back: {self.error}")
+        return '\n'.join(lines)
+
+
+class TickerPurger:
+    """Removes a set of tickers from all per-ticker tables in one transaction"""
+
+    def __init__(self, db: DatabaseManager = None, tables: List[str] = None,
+                 archive_dir: Optional[str] = None):
+        """
+        Args:
+            db: Database manager
+            tables: Candidate tables in delete order (stocks last)
+            archive_dir: Directory for compressed archives of purged rows; None skips archiving
+        """
+        self.db = db or DatabaseManager()
+        self.tables = tables or PURGE_TABLES
+        self.archive_dir = archive_dir
+
+    def existing_tables(self) -> List[str]:
+        """Candidate tables that exist and have a ticker column, in delete order"""
+        rows = self.db.execute_query("""
+            SELECT DISTINCT table_name
+            FROM information_schema.columns
+            WHERE column_name = 'ticker'
+              AND table_schema = current_schema()
+              AND table_name = ANY(%s)
+        """, (self.tables,))
+        present = {row[0] for row in rows}
+        return [table for table in self.tables if table in present]
+
+    def reference_counts(self, tickers: Iterable[str], tables: List[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Row counts per ticker and table, in one query.
+
+        Returns:
+            {ticker: {table: rows}} for tickers with at least one row
+        """
+        tickers = sorted(set(tickers))
+        tables = self.existing_tables() if tables is None else tables
+        if not tickers or not tables:
+            return {}
+        query = ' UNION ALL '.join(
+            f"SELECT '{table}' AS source_table, ticker, COUNT(*) FROM {table} "
+            f"WHERE ticker = ANY(%(tickers)s) GROUP BY ticker"
+            for table in tables)
+        counts: Dict[str, Dict[str, int]] = {}
+        for table, ticker, rows in self.db.execute_query(query, {'tickers': tickers}):
+            counts.setdefault(ticker, {})[table] = rows
+        return counts
+
+    def _archive(self, cursor, tables: List[str], tickers: List[str]) -> str:
+        """Copy the rows about to be purged into <archive_dir>/purge_<timestamp>.zip"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"purge_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.zip")
+        try:
+            with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr('tickers.txt', '\n'.join(tickers) + '\n')
+                for table in tables:
+                    query = cursor.mogrify(f"SELECT * FROM {table} WHERE ticker = ANY(%s)", (tickers,))
+                    if isinstance(query, bytes):
+                        query = query.decode()
+                    with archive.open(f"{table}.csv", 'w') as member:
+                        with io.TextIOWrapper(member, encoding='utf-8') as text:
+                            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", text)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return path
+
+    def purge(self, tickers: Iterable[str], dry_run: bool = False) -> PurgeReport:
+        """
+        Delete every row of the given tickers from all per-ticker tables.
+
+        Args:
+            tickers: Tickers to remove
+            dry_run: Only count what would be deleted
+
+        Returns:
+            PurgeReport; on failure nothing is deleted and report.error is set
+        """
+        started = time.time()
+        tickers = sorted({ticker for ticker in tickers if ticker})
+        report = PurgeReport(requested=tickers, dry_run=dry_run)
+        if not tickers:
+            return report
+
+        try:
+            tables = self.existing_tables()
+            if dry_run:
+                counts = self.reference_counts(tickers, tables)
+                for table in tables:
+                    rows = sum(per_table.get(table, 0) for per_table in counts.values())
+                    if rows:
+                        report.deleted[table] = rows
+                report.removed_tickers = sorted(t for t, per_table in counts.items() if 'stocks' in per_table)
+            else:
+                with self.db.get_cursor() as cursor:
+                    if self.archive_dir:
+                        report.archive_path = self._archive(cursor, tables, tickers)
+                    for table in tables:
+                        returning = " RETURNING ticker" if table == 'stocks' else ""
+                        cursor.execute(f"DELETE FROM {table} WHERE ticker = ANY(%s){returning}", (tickers,))
+                        if cursor.rowcount:
+                            report.deleted[table] = cursor.rowcount
+                        if returning:
+                            report.removed_tickers = sorted({row[0] for row in cursor.fetchall()})
+                for table in report.deleted:
+                    if table in QUALITY_TABLES:
+                        mark_quality_dirty(table, tickers)
+        except Exception as e:
+            logger.error(f"❌ Purge of {len(tickers)} tickers failed: {e}")
+            report.error = str(e)
+            if report.archive_path and os.path.exists(report.archive_path):
+                os.remove(report.archive_path)
+            report.archive_path = None
+
+        report.seconds = time.time() - started
+        logger.info(report.format())
+        return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Remove tickers from every per-ticker table in one transaction')
+    parser.add_argument('tickers', nargs='+', help='Tickers to purge')
+    parser.add_argument('--archive-dir', default=None, help='Write purged rows to a compressed archive here first')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be deleted')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    report = TickerPurger(archive_dir=args.archive_dir).purge([t.upper() for t in args.tickers], dry_run=args.dry_run)
+    print(report.format())
+    return 0 if report.success else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
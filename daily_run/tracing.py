@@ -0,0 +1,384 @@
+"""
+Tracing
+
+Low-overhead nested spans for the daily run: run -> phase -> ticker -> sub-step
+(db_read, compute, api_call, db_write). Every span feeds a streaming histogram
+keyed by span name, so per-stage latency stats cost constant memory however
+many tickers are processed. Span records themselves are sampled (per ticker,
+deterministically, so the same tickers are traced run to run) and kept in a
+bounded buffer; they export as OpenTelemetry (OTLP/JSON) trace data that
+Jaeger, Tempo or any OTLP collector can load.
+
+Profiling is opt-in per phase:
+- 'cprofile' writes <phase>.pstats (snakeviz, flameprof, gprof2dot)
+- 'sample' runs a stack sampler and writes <phase>.folded, the collapsed-stack
+  input for flamegraph.pl, speedscope or inferno
+"""
+
+import cProfile
+import contextvars
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+# OTLP enum values
+_SPAN_KIND = {'internal': 1, 'server': 2, 'client': 3, 'producer': 4, 'consumer': 5}
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+class StreamingHistogram:
+    """
+    Log-bucketed latency histogram with bounded memory.
+
+    Values land in buckets whose width grows geometrically, so quantiles are
+    accurate to about `precision` relative error while the bucket count stays
+    in the hundreds for anything from microseconds to hours.
+    """
+
+    __slots__ = ('precision', '_log_base', 'buckets', 'count', 'total', 'min', 'max')
+
+    def __init__(self, precision: float = 0.02):
+        self.precision = precision
+        self._log_base = math.log1p(precision)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float):
+        value = max(value, 1e-9)
+        index = int(math.log(value) / self._log_base)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Bucket midpoint, clamped to what was actually observed
+                value = math.exp((index + 0.5) * self._log_base)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'total': round(self.total, 4),
+            'mean': round(self.mean, 6),
+            'min': round(self.min, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'p99': round(self.quantile(0.99), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class Span:
+    """One timed operation; recorded spans keep ids and attributes for export"""
+
+    __slots__ = ('tracer', 'name', 'kind', 'recording', 'trace_id', 'span_id', 'parent_id',
+                 'attributes', 'start_ns', 'end_ns', 'error', '_start', 'duration')
+
+    def __init__(self, tracer: 'Tracer', name: str, kind: str, recording: bool,
+                 parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.recording = recording
+        self.attributes = attributes
+        self.error = None
+        self.duration = 0.0
+        self.end_ns = 0
+        if recording:
+            self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+            self.span_id = f"{random.getrandbits(64):016x}"
+            self.parent_id = parent.span_id if parent is not None else None
+            self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any):
+        if self.recording:
+            self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        self.duration = time.perf_counter() - self._start
+        if self.recording:
+            self.end_ns = self.start_ns + int(self.duration * 1e9)
+        self.tracer._finish(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': _SPAN_KIND.get(self.kind, 1),
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': _otlp_attributes(self.attributes),
+            'status': ({'code': _STATUS_ERROR, 'message': self.error} if self.error
+                       else {'code': _STATUS_OK}),
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            encoded = {'boolValue': value}
+        elif isinstance(value, int):
+            encoded = {'intValue': str(value)}
+        elif isinstance(value, float):
+            encoded = {'doubleValue': value}
+        else:
+            encoded = {'stringValue': str(value)}
+        result.append({'key': key, 'value': encoded})
+    return result
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed stacks"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write_folded(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Tracer:
+    """
+    Collects spans and per-name latency histograms for one service.
+
+    Args:
+        service_name: OTLP resource service.name
+        sample_rate: Fraction of sample_key'd spans (tickers) whose spans are recorded
+        max_spans: Recorded spans kept for export; older spans are dropped first
+        profile: None, 'cprofile' or 'sample' to profile each phase
+        profile_dir: Where per-phase profiles are written
+    """
+
+    def __init__(self, service_name: str = 'daily_trading_system', sample_rate: float = 0.1,
+                 max_spans: int = 20000, profile: Optional[str] = None,
+                 profile_dir: str = os.path.join('logs', 'profiles')):
+        if profile is not None and profile not in PROFILE_MODES:
+            raise ValueError(f"profile must be one of {PROFILE_MODES}, got {profile!r}")
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.spans: deque = deque(maxlen=max_spans)
+        self.dropped_spans = 0
+        self.histograms: Dict[str, StreamingHistogram] = {}
+        self.profiles: List[str] = []
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar = contextvars.ContextVar(f"span_{id(self)}", default=None)
+
+    def sampled(self, key: str) -> bool:
+        """Deterministic per-key sampling decision"""
+        if self.sample_rate >= 1:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        return zlib.crc32(str(key).encode()) < self.sample_rate * 0xFFFFFFFF
+
+    @property
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, kind: str = 'internal', sample_key: Optional[str] = None,
+             parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+        """
+        Time a block as a child of the current span.
+
+        A span is recorded only when its parent is recorded and, if sample_key
+        is given, the key is sampled; its duration always feeds the histogram.
+        Pass parent explicitly from worker threads, which do not inherit the
+        current span.
+        """
+        parent = parent if parent is not None else self._current.get()
+        recording = parent.recording if parent is not None else True
+        if recording and sample_key is not None:
+            recording = self.sampled(sample_key)
+        span = Span(self, name, kind, recording, parent, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            self._current.reset(token)
+            span.end()
+
+    def record(self, name: str, duration: float):
+        """Feed a duration measured elsewhere into the histogram for name"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = StreamingHistogram()
+            histogram.record(duration)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = StreamingHistogram()
+            histogram.record(span.duration)
+            if span.recording:
+                if len(self.spans) == self.spans.maxlen:
+                    self.dropped_spans += 1
+                self.spans.append(span)
+
+    @contextmanager
+    def phase(self, name: str, **attributes) -> Iterator[Span]:
+        """Span for a pipeline phase, profiled when profiling is enabled"""
+        with self.span(name, phase=name, **attributes) as span:
+            if not self.profile:
+                yield span
+                return
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            if self.profile == 'cprofile':
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield span
+                finally:
+                    profiler.disable()
+                    path = os.path.join(self.profile_dir, f"{name}_{stamp}.pstats")
+                    profiler.dump_stats(path)
+                    self._profile_written(span, path)
+            else:
+                sampler = StackSampler(threading.get_ident()).start()
+                try:
+                    yield span
+                finally:
+                    sampler.stop()
+                    path = os.path.join(self.profile_dir, f"{name}_{stamp}.folded")
+                    sampler.write_folded(path)
+                    self._profile_written(span, path)
+
+    def _profile_written(self, span: Span, path: str):
+        self.profiles.append(path)
+        span.set_attribute('profile.path', path)
+        logger.info(f"🔥 Profile for {span.name} written to {path}")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Latency stats per span name"""
+        with self._lock:
+            return {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Recorded spans as an OTLP/JSON ExportTraceServiceRequest"""
+        with self._lock:
+            spans = [span.to_otlp() for span in self.spans]
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': spans,
+                }],
+            }]
+        }
+
+    def export(self, path: str) -> str:
+        """Write recorded spans (OTLP/JSON) plus the histogram summary next to it"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_otlp(), f)
+        summary_path = os.path.splitext(path)[0] + '_summary.json'
+        with open(summary_path, 'w') as f:
+            json.dump({'service': self.service_name, 'sample_rate': self.sample_rate,
+                       'recorded_spans': len(self.spans), 'dropped_spans': self.dropped_spans,
+                       'profiles': self.profiles, 'spans': self.summary()}, f, indent=2)
+        logger.info(f"🧭 Trace with {len(self.spans)} spans written to {path}")
+        return path
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.histograms.clear()
+            self.profiles = []
+            self.dropped_spans = 0
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer (created with defaults on first use)"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def configure_tracer(**options) -> Tracer:
+    """Replace the process-wide tracer, e.g. to change sampling or enable profiling"""
+    global _tracer
+    with _tracer_lock:
+        _tracer = Tracer(**options)
+    return _tracer
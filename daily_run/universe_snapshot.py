@@ -0,0 +1,233 @@
+"""
+Universe Snapshot
+
+Everything the scoring variants read about a ticker, loaded for the whole
+universe in a handful of set-based queries: the stocks row (fundamentals),
+the newest daily_charts row (close, VWAP, indicators, support/resistance)
+and the most recent price history as NumPy arrays.
+
+The scorers used to fetch this per ticker - stocks row, latest daily_charts
+row, 100-bar history - so comparing N variants over 700 tickers cost
+N x 700 x 3 round-trips. A snapshot is loaded once (stocks: one scan; latest
+rows: one read of ticker_latest_snapshot, or one DISTINCT ON scan when that
+table does not exist; history: one windowed query per batch of tickers) and
+then shared by every scorer plugin (see scoring_plugins.py).
+
+Rows are kept as the database returned them so per-ticker scorers see the
+same values (None for NULL) as their own queries gave them; column() and
+history_matrix() expose the same data as float arrays aligned with
+snapshot.tickers for vectorized scorers.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .database import DatabaseManager
+except ImportError:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+HISTORY_DAYS = 100
+
+
+@dataclass
+class UniverseSnapshot:
+    """Fundamentals, latest indicators and recent price history for a set of tickers"""
+    tickers: List[str]
+    fundamentals: Dict[str, Dict] = field(default_factory=dict)
+    technicals: Dict[str, Dict] = field(default_factory=dict)
+    history: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+    history_days: int = HISTORY_DAYS
+    queries: int = 0
+    load_seconds: float = 0.0
+    _columns: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    # Per-ticker access (row-shaped, as the per-ticker scorers expect) --------
+
+    def fundamental(self, ticker: str) -> Optional[Dict]:
+        """The ticker's stocks row, or None"""
+        return self.fundamentals.get(ticker)
+
+    def technical(self, ticker: str) -> Optional[Dict]:
+        """The ticker's newest daily_charts row, or None"""
+        return self.technicals.get(ticker)
+
+    def price_history(self, ticker: str, columns: Iterable[str] = ('close', 'volume', 'date'),
+                      limit: int = None) -> List[tuple]:
+        """
+        Newest-first history rows, like ``SELECT <columns> ... ORDER BY date DESC LIMIT n``.
+
+        Dates come back as datetime.date; prices and volume as floats (None for NULL).
+        """
+        bars = self.history.get(ticker)
+        if not bars:
+            return []
+        values = []
+        for column in columns:
+            array = bars[column]
+            if column == 'date':
+                values.append([pd.Timestamp(d).date() if not pd.isna(d) else None for d in array])
+            else:
+                values.append([None if np.isnan(v) else float(v) for v in array])
+        rows = list(zip(*values))
+        return rows[:limit] if limit is not None else rows
+
+    # Columnar access (aligned with self.tickers) -----------------------------
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        One value per ticker as float64 (NaN for NULL or missing).
+
+        Latest daily_charts columns take precedence over stocks columns of the
+        same name.
+        """
+        if name not in self._columns:
+            values = []
+            for ticker in self.tickers:
+                row = self.technicals.get(ticker) or {}
+                if name not in row:
+                    row = self.fundamentals.get(ticker) or {}
+                values.append(row.get(name))
+            self._columns[name] = pd.to_numeric(pd.Series(values, dtype=object),
+                                                errors='coerce').to_numpy(dtype='float64')
+        return self._columns[name]
+
+    def history_matrix(self, column: str = 'close', length: int = None) -> np.ndarray:
+        """(tickers x length) newest-first history of one column, NaN-padded"""
+        length = length or self.history_days
+        matrix = np.full((len(self.tickers), length), np.nan)
+        for i, ticker in enumerate(self.tickers):
+            bars = self.history.get(ticker)
+            if bars:
+                values = bars[column][:length]
+                matrix[i, :len(values)] = values
+        return matrix
+
+
+class UniverseSnapshotLoader:
+    """Builds a UniverseSnapshot with a constant number of queries"""
+
+    def __init__(self, db: DatabaseManager = None, table: str = 'daily_charts',
+                 history_days: int = HISTORY_DAYS, batch_size: int = 250):
+        """
+        Args:
+            db: Database manager
+            table: Price table the latest rows and history come from
+            history_days: Bars of history kept per ticker (newest first)
+            batch_size: Tickers per history query
+        """
+        self.db = db or DatabaseManager()
+        self.table = table
+        self.history_days = history_days
+        self.batch_size = batch_size
+        self._queries = 0
+
+    def _query(self, query: str, params: tuple = None) -> List[Dict]:
+        self._queries += 1
+        return self.db.fetch_all_dict(query, params)
+
+    def load_fundamentals(self, tickers: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """stocks rows keyed by ticker (all tickers when none are given)"""
+        query = "SELECT * FROM stocks WHERE ticker IS NOT NULL"
+        params = None
+        if tickers is not None:
+            query += " AND ticker = ANY(%s)"
+            params = (tickers,)
+        return {row['ticker']: row for row in self._query(query + " ORDER BY ticker", params)}
+
+    def load_technicals(self, tickers: List[str]) -> Dict[str, Dict]:
+        """Newest price-table row per ticker, from ticker_latest_snapshot when it exists"""
+        if not tickers:
+            return {}
+        if self.table == 'daily_charts':
+            rows = self.db.get_latest_snapshots(tickers)
+            self._queries += 1
+            if rows:
+                return rows
+        rows = self._query(f"""
+            SELECT DISTINCT ON (ticker) *
+            FROM {self.table}
+            WHERE ticker = ANY(%s)
+            ORDER BY ticker, date DESC
+        """, (tickers,))
+        return {row['ticker']: row for row in rows}
+
+    def _history_floor(self, technicals: Dict[str, Dict]) -> Optional[str]:
+        """
+        Lower date bound that still covers history_days bars for every ticker.
+
+        Bounding the window lets the planner skip old partitions; the bound is
+        taken from the oldest latest-row date so stale tickers keep their history.
+        """
+        dates = pd.to_datetime(pd.Series([row.get('date') for row in technicals.values()], dtype=object),
+                               errors='coerce').dropna()
+        if dates.empty:
+            return None
+        calendar_days = int(self.history_days * 7 / 5) + 30
+        return (dates.min() - timedelta(days=calendar_days)).date().isoformat()
+
+    def load_history(self, tickers: List[str], floor: Optional[str] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """Newest-first OHLCV arrays per ticker, history_days bars at most"""
+        history = {}
+        date_filter = "AND date >= %s" if floor else ""
+        for i in range(0, len(tickers), self.batch_size):
+            batch = tickers[i:i + self.batch_size]
+            params = (batch, floor, self.history_days) if floor else (batch, self.history_days)
+            rows = self._query(f"""
+                SELECT ticker, date, {', '.join(HISTORY_COLUMNS)}
+                FROM (
+                    SELECT ticker, date, {', '.join(HISTORY_COLUMNS)},
+                           ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS bar
+                    FROM {self.table}
+                    WHERE ticker = ANY(%s) {date_filter}
+                ) recent
+                WHERE bar <= %s
+                ORDER BY ticker, date DESC
+            """, params)
+            if not rows:
+                continue
+            frame = pd.DataFrame(rows, columns=['ticker', 'date'] + HISTORY_COLUMNS)
+            for column in HISTORY_COLUMNS:
+                frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+            frame['date'] = pd.to_datetime(frame['date'], errors='coerce')
+            for ticker, bars in frame.groupby('ticker', sort=False):
+                history[ticker] = {'date': bars['date'].to_numpy(dtype='datetime64[D]')}
+                history[ticker].update({column: bars[column].to_numpy() for column in HISTORY_COLUMNS})
+        return history
+
+    def load(self, tickers: Optional[Iterable[str]] = None) -> UniverseSnapshot:
+        """
+        Load a snapshot of the given tickers, or of every ticker in stocks.
+
+        Tickers without a stocks row are kept (the scorers decide what a
+        missing row means), tickers are returned sorted.
+        """
+        started = time.time()
+        self._queries = 0
+        requested = sorted(set(tickers)) if tickers is not None else None
+        fundamentals = self.load_fundamentals(requested)
+        universe = requested if requested is not None else sorted(fundamentals)
+
+        members = set(universe)
+        technicals = {ticker: row for ticker, row in self.load_technicals(universe).items() if ticker in members}
+        history = self.load_history(universe, self._history_floor(technicals))
+
+        snapshot = UniverseSnapshot(
+            tickers=universe, fundamentals=fundamentals, technicals=technicals, history=history,
+            history_days=self.history_days, queries=self._queries, load_seconds=time.time() - started)
+        logger.info(f"📸 Universe snapshot: {len(universe)} tickers "
+                    f"({len(fundamentals)} fundamentals, {len(technicals)} latest rows, "
+                    f"{len(history)} histories) in {snapshot.queries} queries, {snapshot.load_seconds:.1f}s")
+        return snapshot
@@ -0,0 +1,288 @@
+"""
+Vectorized Ratio Engine
+
+Columnar counterpart of SelfCalculatedFundamentalRatioCalculator. Loads the
+latest company_fundamentals row (plus the prior period for growth) for every
+ticker in one query, then computes all valuation, profitability, health,
+efficiency, growth, quality, market and intrinsic-value ratios with
+NaN-safe array arithmetic. The result is one ratios frame for the whole
+universe, indexed by ticker.
+
+Formulas follow the scalar calculator; where the scalar code would raise on
+a NULL column (and silently drop the rest of a ratio group), missing inputs
+are treated as missing and only the affected ratios come out empty.
+
+Not wired into the nightly ratio phases on purpose. Those phases use
+EnhancedRatioCalculatorV5 (calculate_fundamental_ratios.py) and the inline
+ratios in DailyTradingSystem._calculate_fundamental_ratios. Their formulas
+differ from the calculators this engine has parity tests against
+(test_vectorized_ratio_engine), so switching them over would change stored
+values. Until the nightly formulas are consolidated, callers are the
+pipeline benchmark and ad-hoc universe runs (VectorizedRatioEngine).
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FUNDAMENTAL_COLUMNS = [
+    'revenue', 'gross_profit', 'operating_income', 'net_income', 'ebitda',
+    'eps_diluted', 'book_value_per_share',
+    'total_assets', 'total_debt', 'total_equity', 'cash_and_equivalents',
+    'operating_cash_flow', 'free_cash_flow', 'capex',
+    'shares_outstanding', 'shares_float',
+    'current_assets', 'current_liabilities', 'inventory',
+    'accounts_receivable', 'accounts_payable', 'cost_of_goods_sold',
+    'interest_expense', 'retained_earnings', 'total_liabilities',
+    'earnings_growth_yoy'
+]
+
+# Prior-period columns used for growth metrics
+GROWTH_COLUMNS = ['revenue', 'net_income', 'free_cash_flow']
+
+RATIO_COLUMNS = [
+    'pe_ratio', 'pb_ratio', 'ps_ratio', 'ev_ebitda', 'peg_ratio',
+    'roe', 'roa', 'roic', 'gross_margin', 'operating_margin', 'net_margin',
+    'debt_to_equity', 'current_ratio', 'quick_ratio', 'interest_coverage', 'altman_z_score',
+    'asset_turnover', 'inventory_turnover', 'receivables_turnover',
+    'revenue_growth_yoy', 'earnings_growth_yoy', 'fcf_growth_yoy',
+    'fcf_to_net_income', 'cash_conversion_cycle',
+    'market_cap', 'enterprise_value', 'graham_number'
+]
+
+
+def _present(values: np.ndarray) -> np.ndarray:
+    """Vectorized equivalent of the scalar calculator's truthiness checks"""
+    return ~np.isnan(values) & (values != 0)
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """NaN-safe element-wise division (x/0 -> NaN instead of inf)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def compute_ratios(fundamentals: pd.DataFrame, prices: pd.Series) -> pd.DataFrame:
+    """
+    Compute all ratios for every ticker in one pass.
+
+    Args:
+        fundamentals: One row per ticker (index = ticker) with FUNDAMENTAL_COLUMNS
+                      and optional '<column>_previous' columns for growth and
+                      average-balance calculations
+        prices: Current price in dollars per ticker
+
+    Returns:
+        DataFrame indexed by ticker with RATIO_COLUMNS (NaN where not computable)
+    """
+    n = len(fundamentals)
+    nan = np.full(n, np.nan)
+
+    def col(name: str) -> np.ndarray:
+        if name in fundamentals.columns:
+            return pd.to_numeric(fundamentals[name], errors='coerce').to_numpy(dtype='float64')
+        return nan.copy()
+
+    def where(mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+        return np.where(mask, values, np.nan)
+
+    price = pd.to_numeric(prices.reindex(fundamentals.index), errors='coerce').to_numpy(dtype='float64')
+
+    revenue, gross_profit = col('revenue'), col('gross_profit')
+    operating_income, net_income, ebitda = col('operating_income'), col('net_income'), col('ebitda')
+    eps_diluted, bvps = col('eps_diluted'), col('book_value_per_share')
+    total_assets, total_debt, total_equity = col('total_assets'), col('total_debt'), col('total_equity')
+    cash, fcf = col('cash_and_equivalents'), col('free_cash_flow')
+    shares, shares_float = col('shares_outstanding'), col('shares_float')
+    current_assets, current_liabilities = col('current_assets'), col('current_liabilities')
+    inventory, receivables, payables = col('inventory'), col('accounts_receivable'), col('accounts_payable')
+    cogs, interest_expense = col('cost_of_goods_sold'), col('interest_expense')
+    retained_earnings, total_liabilities = col('retained_earnings'), col('total_liabilities')
+    earnings_growth_input = col('earnings_growth_yoy')
+
+    ratios: Dict[str, np.ndarray] = {}
+
+    # Valuation
+    eps = _divide(net_income, shares)
+    eps_to_use = np.where(np.isnan(eps_diluted), eps, eps_diluted)
+    ratios['pe_ratio'] = where(_present(net_income) & _present(shares) & (eps > 0), _divide(price, eps_to_use))
+
+    book_value = np.where(_present(bvps), bvps, _divide(total_equity, shares))
+    ratios['pb_ratio'] = where(_present(total_equity) & _present(shares) & (book_value > 0), _divide(price, book_value))
+
+    sales_per_share = _divide(revenue, np.where(np.isnan(shares_float), shares, shares_float))
+    ratios['ps_ratio'] = where(_present(revenue) & _present(shares) & (sales_per_share > 0), _divide(price, sales_per_share))
+
+    market_cap = where(_present(shares), price * shares)
+    enterprise_value = market_cap + np.nan_to_num(total_debt) - np.nan_to_num(cash) + np.nan_to_num(col('minority_interest'))
+    ratios['ev_ebitda'] = where(_present(enterprise_value) & (ebitda > 0), _divide(enterprise_value, ebitda))
+
+    ratios['peg_ratio'] = where(_present(ratios['pe_ratio']) & (earnings_growth_input > 0),
+                                _divide(ratios['pe_ratio'], earnings_growth_input))
+
+    # Profitability
+    equity_previous, assets_previous = col('total_equity_previous'), col('total_assets_previous')
+    average_equity = np.where(_present(equity_previous), (total_equity + equity_previous) / 2, total_equity)
+    average_assets = np.where(_present(assets_previous), (total_assets + assets_previous) / 2, total_assets)
+
+    ratios['roe'] = where(_present(net_income) & _present(total_equity) & (average_equity > 0),
+                          _divide(net_income, average_equity) * 100)
+    ratios['roa'] = where(_present(net_income) & _present(total_assets) & (average_assets > 0),
+                          _divide(net_income, average_assets) * 100)
+
+    invested_capital = total_assets - total_debt
+    ratios['roic'] = where(_present(operating_income) & _present(total_assets) & _present(total_debt) & (invested_capital > 0),
+                           _divide(operating_income, invested_capital) * 100)
+
+    has_revenue = _present(revenue)
+    ratios['gross_margin'] = where(has_revenue & _present(gross_profit), _divide(gross_profit, revenue) * 100)
+    ratios['operating_margin'] = where(has_revenue & _present(operating_income), _divide(operating_income, revenue) * 100)
+    ratios['net_margin'] = where(has_revenue & _present(net_income), _divide(net_income, revenue) * 100)
+
+    # Financial health
+    ratios['debt_to_equity'] = where(_present(total_debt) & (total_equity > 0), _divide(total_debt, total_equity))
+    ratios['current_ratio'] = where(_present(current_assets) & (current_liabilities > 0),
+                                    _divide(current_assets, current_liabilities))
+    ratios['quick_ratio'] = where(_present(current_assets) & _present(inventory) & (current_liabilities > 0),
+                                  _divide(current_assets - inventory, current_liabilities))
+    ratios['interest_coverage'] = where(_present(operating_income) & (interest_expense > 0),
+                                        _divide(operating_income, interest_expense))
+
+    def fill(values: np.ndarray, default: float) -> np.ndarray:
+        return np.where(np.isnan(values), default, values)
+
+    z_assets = fill(total_assets, 1)
+    ratios['altman_z_score'] = (
+        1.2 * _divide(fill(current_assets, 0) - fill(current_liabilities, 0), z_assets) +
+        1.4 * _divide(fill(retained_earnings, 0), z_assets) +
+        3.3 * _divide(fill(operating_income, 0), z_assets) +
+        0.6 * _divide(fill(total_equity, 1), fill(total_liabilities, 0)) +
+        1.0 * _divide(fill(revenue, 1), z_assets)
+    )
+
+    # Efficiency
+    ratios['asset_turnover'] = where(has_revenue & _present(total_assets) & (average_assets > 0),
+                                     _divide(revenue, average_assets))
+    ratios['inventory_turnover'] = where(_present(cogs) & (inventory > 0), _divide(cogs, inventory))
+    ratios['receivables_turnover'] = where(has_revenue & (receivables > 0), _divide(revenue, receivables))
+
+    # Growth (latest period vs the one before it)
+    for output, column in (('revenue_growth_yoy', 'revenue'), ('earnings_growth_yoy', 'net_income'),
+                           ('fcf_growth_yoy', 'free_cash_flow')):
+        current, previous = col(column), col(f'{column}_previous')
+        ratios[output] = where(_present(current) & (previous > 0), _divide(current - previous, previous) * 100)
+
+    # Quality
+    ratios['fcf_to_net_income'] = where(_present(fcf) & (net_income > 0), _divide(fcf, net_income))
+    cogs_or_one = fill(cogs, 1)
+    ratios['cash_conversion_cycle'] = where(
+        _present(inventory) & _present(receivables) & _present(payables),
+        _divide(inventory, cogs_or_one) * 365 + _divide(receivables, fill(revenue, 1)) * 365
+        - _divide(payables, cogs_or_one) * 365
+    )
+
+    # Market
+    ratios['market_cap'] = market_cap
+    ratios['enterprise_value'] = where(_present(enterprise_value), enterprise_value)
+
+    # Intrinsic value
+    with np.errstate(invalid='ignore'):
+        graham = np.sqrt(22.5 * eps_diluted * bvps)
+    ratios['graham_number'] = where((eps_diluted > 0) & (bvps > 0), graham)
+
+    frame = pd.DataFrame(ratios, index=fundamentals.index)[RATIO_COLUMNS]
+    frame = frame.where(np.isfinite(frame))
+    return frame.round(6)
+
+
+def ratio_frame_to_dicts(frame: pd.DataFrame) -> Dict[str, Dict[str, Optional[float]]]:
+    """Convert a ratios frame to {ticker: {ratio: value or None}}"""
+    cleaned = frame.astype(object).where(frame.notna(), None)
+    return cleaned.to_dict(orient='index')
+
+
+class VectorizedRatioEngine:
+    """
+    Computes fundamental ratios for the whole universe from columnar data.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def load_fundamentals(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load the latest and prior-period fundamentals for all tickers in one query.
+
+        Args:
+            tickers: Optional subset of tickers; None loads the whole table
+
+        Returns:
+            DataFrame indexed by ticker with FUNDAMENTAL_COLUMNS and
+            '<column>_previous' growth columns
+        """
+        ticker_filter = "WHERE ticker = ANY(%s)" if tickers else ""
+        previous_columns = ', '.join(
+            f"MAX({column}) FILTER (WHERE rn = 2) AS {column}_previous" for column in GROWTH_COLUMNS
+        )
+        latest_columns = ', '.join(
+            f"MAX({column}) FILTER (WHERE rn = 1) AS {column}" for column in FUNDAMENTAL_COLUMNS
+        )
+        query = f"""
+        WITH ranked AS (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY report_date DESC) AS rn
+            FROM company_fundamentals
+            {ticker_filter}
+        )
+        SELECT ticker, {latest_columns}, {previous_columns}
+        FROM ranked
+        WHERE rn <= 2
+        GROUP BY ticker
+        """
+        columns = ['ticker'] + FUNDAMENTAL_COLUMNS + [f"{column}_previous" for column in GROWTH_COLUMNS]
+        rows = self.db.execute_query(query, (list(tickers),) if tickers else None)
+        frame = pd.DataFrame(rows or [], columns=columns).set_index('ticker')
+        return frame.apply(pd.to_numeric, errors='coerce')
+
+    def load_prices(self, tickers: Optional[List[str]] = None) -> pd.Series:
+        """Load the latest close (dollars) per ticker from daily_charts"""
+        ticker_filter = "WHERE ticker = ANY(%s)" if tickers else ""
+        query = f"""
+        SELECT DISTINCT ON (ticker) ticker, close
+        FROM daily_charts
+        {ticker_filter}
+        ORDER BY ticker, date DESC
+        """
+        rows = self.db.execute_query(query, (list(tickers),) if tickers else None)
+        prices = pd.DataFrame(rows or [], columns=['ticker', 'close']).set_index('ticker')['close']
+        return pd.to_numeric(prices, errors='coerce') / 100.0
+
+    def calculate_universe_ratios(self, tickers: Optional[List[str]] = None,
+                                  prices: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        Calculate ratios for all (or the given) tickers.
+
+        Args:
+            tickers: Optional subset of tickers
+            prices: Optional current prices in dollars; loaded from daily_charts if omitted
+
+        Returns:
+            Ratios frame indexed by ticker
+        """
+        fundamentals = self.load_fundamentals(tickers)
+        if fundamentals.empty:
+            logger.warning("No fundamental data found for ratio calculation")
+            return pd.DataFrame(columns=RATIO_COLUMNS)
+
+        if prices is None:
+            prices = self.load_prices(tickers)
+
+        ratios = compute_ratios(fundamentals, prices)
+        logger.info(f"Calculated ratios for {len(ratios)} tickers "
+                    f"({int(ratios.notna().sum().sum())} non-empty values)")
+        return ratios
@@ -15,9 +15,9 @@ from dataclasses import dataclass
 import numpy as np
 
 try:
-    from .database import DatabaseManager
+    from .database import DatabaseManager, mark_quality_dirty
 except ImportError:
-    from database import DatabaseManager
+    from database import DatabaseManager, mark_quality_dirty
 try:
     from .error_handler import ErrorHandler
 except ImportError:
@@ -317,6 +317,7 @@ class YahooFinanceService:
             db_data['period_type'] = 'ttm'
             
             self.db.execute_query(sql, db_data)
+            mark_quality_dirty('company_fundamentals', [ticker])
             self.logger.info(f"Successfully stored fundamental data for {ticker}")
             return True
             
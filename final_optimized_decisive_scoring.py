@@ -62,19 +62,22 @@ class FinalOptimizedDecisiveScorer:
             
             fundamental_data = cursor.fetchone()
             
-            # Get technical data
-            cursor.execute("""
-                SELECT 
-                    close, vwap, support_1, support_2, support_3,
-                    resistance_1, resistance_2, resistance_3,
-                    rsi_14, macd_line, ema_20, ema_50, ema_200
-                FROM daily_charts 
-                WHERE ticker = %s 
-                ORDER BY date DESC 
-                LIMIT 1
-            """, (ticker,))
-            
-            technical_data = cursor.fetchone()
+            # Get technical data (maintained latest snapshot, else newest daily_charts row)
+            technical_columns = ['close', 'vwap', 'support_1', 'support_2', 'support_3',
+                                 'resistance_1', 'resistance_2', 'resistance_3',
+                                 'rsi_14', 'macd_line', 'ema_20', 'ema_50', 'ema_200']
+            snapshot = self.db.get_latest_snapshot(ticker)
+            if snapshot is not None:
+                technical_data = tuple(snapshot.get(column) for column in technical_columns)
+            else:
+                cursor.execute(f"""
+                    SELECT {', '.join(technical_columns)}
+                    FROM daily_charts 
+                    WHERE ticker = %s 
+                    ORDER BY date DESC 
+                    LIMIT 1
+                """, (ticker,))
+                technical_data = cursor.fetchone()
             
             # Get price history for momentum calculation
             cursor.execute("""
@@ -586,6 +589,7 @@ class FinalOptimizedDecisiveScorer:
             ]
         
         results = []
+        self.db.latest_snapshot.preload(test_tickers)
         
         for ticker in test_tickers:
             result = self.score_stock(ticker)
@@ -21,6 +21,7 @@ sys.path.append('daily_run')
 try:
     from database import DatabaseManager
     from config import Config
+    from ticker_purge import TickerPurger
 except ImportError as e:
     print(f"Error importing required modules: {e}")
     print("Make sure you're running this script from the project root directory")
@@ -43,6 +44,7 @@ class EnhancedStockTickerManager:
     def __init__(self):
         """Initialize the ticker manager"""
         self.db = DatabaseManager()
+        self.purger = TickerPurger(self.db)
         self.tickers_to_delete = [
             'PBCT', 'PLAN', 'QTS', 'RXN', 'SAI', 'SC', 'SHI', 'SHLX', 
             'SNP', 'SYNC', 'AFTY', 'TIF', 'PTR'
@@ -60,42 +62,21 @@ class EnhancedStockTickerManager:
             Dictionary of table names and row counts that reference this ticker
         """
         try:
-            # Common tables that might reference tickers
-            reference_tables = [
-                'daily_charts', 'technical_indicators', 'company_fundamentals',
-                'financial_ratios', 'investor_scores'
-            ]
-            
-            references = {}
-            for table in reference_tables:
-                try:
-                    # Check if table exists and has ticker column
-                    check_query = f"""
-                    SELECT EXISTS (
-                        SELECT 1 FROM information_schema.columns 
-                        WHERE table_name = %s AND column_name = 'ticker'
-                    )
-                    """
-                    table_exists = self.db.fetch_one(check_query, (table,))
-                    
-                    if table_exists and table_exists[0]:
-                        # Check for references
-                        ref_query = f"SELECT COUNT(*) FROM {table} WHERE ticker = %s"
-                        ref_count = self.db.fetch_one(ref_query, (ticker,))
-                        
-                        if ref_count and ref_count[0] > 0:
-                            references[table] = ref_count[0]
-                            
-                except Exception as e:
-                    logger.warning(f"Could not check table {table}: {e}")
-                    continue
-            
-            return references
-            
+            return self.find_references([ticker]).get(ticker, {})
         except Exception as e:
             logger.error(f"Error checking foreign key references for {ticker}: {e}")
             return {}
     
+    def find_references(self, tickers: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Rows referencing each ticker outside the stocks table, counted in one query
+        
+        Returns:
+            {ticker: {table: row_count}} for referenced tickers only
+        """
+        reference_tables = [table for table in self.purger.existing_tables() if table != 'stocks']
+        return self.purger.reference_counts(tickers, reference_tables)
+    
     def delete_ticker_with_references(self, ticker: str, cascade_delete: bool = False) -> bool:
         """
         Delete a ticker and handle foreign key references
@@ -107,77 +88,7 @@ class EnhancedStockTickerManager:
         Returns:
             True if successful, False otherwise
         """
-        logger.info(f"Processing ticker {ticker} for deletion...")
-        
-        try:
-            # Check for foreign key references
-            references = self.check_foreign_key_references(ticker)
-            
-            if references and not cascade_delete:
-                logger.warning(f"Ticker {ticker} has references in: {references}")
-                logger.warning(f"Skipping deletion of {ticker} due to foreign key references")
-                return False
-            
-            if references and cascade_delete:
-                logger.info(f"Ticker {ticker} has references in: {references}")
-                logger.info(f"Proceeding with cascade deletion...")
-                
-                # Start transaction
-                self.db.begin_transaction()
-                
-                try:
-                    # Delete from reference tables first
-                    for table, row_count in references.items():
-                        delete_ref_query = f"DELETE FROM {table} WHERE ticker = %s"
-                        ref_result = self.db.execute_update(delete_ref_query, (ticker,))
-                        logger.info(f"Deleted {ref_result} rows from {table} table")
-                    
-                    # Now delete from stocks table
-                    delete_stock_query = "DELETE FROM stocks WHERE ticker = %s"
-                    stock_result = self.db.execute_update(delete_stock_query, (ticker,))
-                    
-                    if stock_result > 0:
-                        logger.info(f"Successfully deleted ticker {ticker} with all references")
-                        self.db.commit()
-                        return True
-                    else:
-                        logger.error(f"No rows deleted from stocks table for {ticker}")
-                        self.db.rollback()
-                        return False
-                        
-                except Exception as e:
-                    logger.error(f"Error during cascade deletion of {ticker}: {e}")
-                    self.db.rollback()
-                    return False
-            
-            else:
-                # No references, safe to delete
-                logger.info(f"Ticker {ticker} has no references, safe to delete")
-                
-                # Start transaction
-                self.db.begin_transaction()
-                
-                try:
-                    delete_query = "DELETE FROM stocks WHERE ticker = %s"
-                    result = self.db.execute_update(delete_query, (ticker,))
-                    
-                    if result > 0:
-                        logger.info(f"Successfully deleted ticker: {ticker}")
-                        self.db.commit()
-                        return True
-                    else:
-                        logger.warning(f"No rows deleted for ticker: {ticker}")
-                        self.db.rollback()
-                        return False
-                        
-                except Exception as e:
-                    logger.error(f"Error deleting ticker {ticker}: {e}")
-                    self.db.rollback()
-                    return False
-                    
-        except Exception as e:
-            logger.error(f"Error processing ticker {ticker}: {e}")
-            return False
+        return self.delete_tickers([ticker], cascade_delete) == 1
     
     def delete_tickers(self, tickers: List[str], cascade_delete: bool = False) -> int:
         """
@@ -198,15 +109,23 @@ class EnhancedStockTickerManager:
         if cascade_delete:
             logger.info("Cascade delete mode: Will delete all related data")
         
-        deleted_count = 0
-        failed_tickers = []
+        to_delete = list(tickers)
+        if not cascade_delete:
+            try:
+                references = self.find_references(tickers)
+            except Exception as e:
+                logger.error(f"Could not check references, nothing deleted: {e}")
+                return 0
+            for ticker, tables in references.items():
+                logger.warning(f"Ticker {ticker} has references in: {tables}")
+                logger.warning(f"Skipping deletion of {ticker} due to foreign key references")
+            to_delete = [ticker for ticker in tickers if ticker not in references]
         
-        for ticker in tickers:
-            success = self.delete_ticker_with_references(ticker, cascade_delete)
-            if success:
-                deleted_count += 1
-            else:
-                failed_tickers.append(ticker)
+        # One DELETE per table for all tickers, in a single transaction
+        report = self.purger.purge(to_delete)
+        removed = set(report.removed_tickers) if report.success else set()
+        deleted_count = len(removed)
+        failed_tickers = [ticker for ticker in tickers if ticker not in removed]
         
         if failed_tickers:
             logger.warning(f"Failed to delete {len(failed_tickers)} tickers: {failed_tickers}")
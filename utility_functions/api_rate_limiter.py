@@ -1,79 +1,55 @@
 import os
-import psycopg2
+import sys
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+try:
+    from daily_run.quota_ledger import get_quota_ledger, normalize_provider
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'daily_run'))
+    from quota_ledger import get_quota_ledger, normalize_provider
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'port': os.getenv('DB_PORT'),
-    'dbname': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD')
-}
-
-API_LIMITS = {
-    'yahoo': {'calls_per_hour': 2000, 'calls_per_day': 20000, 'reset_hour': 0},
-    'finnhub': {'calls_per_minute': 60, 'calls_per_day': 86400, 'reset_hour': 0},
-    'alphavantage': {'calls_per_minute': 5, 'calls_per_day': 500, 'reset_hour': 0},
-    'fmp': {'calls_per_minute': 30, 'calls_per_day': 1000, 'reset_hour': 0}  # Free tier limits
-}
 
 class APIRateLimiter:
-    def __init__(self):
-        self.conn = psycopg2.connect(**DB_CONFIG)
-        self.cur = self.conn.cursor()
+    """
+    Per-provider API limiter used by the older services.
+
+    Counting is delegated to the shared quota ledger (daily_run/quota_ledger.py),
+    so these services draw from the same minute windows and daily budgets as
+    the multi-service manager. Quotas are tracked per provider; the endpoint
+    argument is kept for compatibility with existing callers.
+    """
+
+    def __init__(self, ledger=None):
+        self.ledger = ledger or get_quota_ledger()
 
-    def check_limit(self, provider: str, endpoint: str) -> bool:
+    def check_limit(self, provider: str, endpoint: str = None, account: str = '') -> bool:
         """Return True if under limit, False if limit reached."""
-        today = datetime.utcnow().date()
-        self.cur.execute(
-            "SELECT calls_made, calls_limit FROM api_usage_tracking WHERE api_provider=%s AND date=%s AND endpoint=%s",
-            (provider, today, endpoint)
-        )
-        row = self.cur.fetchone()
-        if row:
-            calls_made, calls_limit = row
-            limit = API_LIMITS[provider]['calls_per_day']
-            return calls_made < limit
-        else:
-            return True  # No record yet, under limit
+        return self.ledger.available(provider, account)
+
+    def try_acquire(self, provider: str, endpoint: str = None, account: str = '') -> bool:
+        """Atomically check and count one call; prefer this over check_limit + record_call."""
+        return self.ledger.try_acquire(provider, account=account)
+
+    def record_call(self, provider: str, endpoint: str = None, account: str = '') -> None:
+        self.ledger.record(provider, account=account)
 
-    def record_call(self, provider: str, endpoint: str) -> None:
-        today = datetime.utcnow().date()
-        self.cur.execute(
-            "SELECT calls_made FROM api_usage_tracking WHERE api_provider=%s AND date=%s AND endpoint=%s",
-            (provider, today, endpoint)
-        )
-        row = self.cur.fetchone()
-        if row:
-            self.cur.execute(
-                "UPDATE api_usage_tracking SET calls_made = calls_made + 1 WHERE api_provider=%s AND date=%s AND endpoint=%s",
-                (provider, today, endpoint)
-            )
-        else:
-            self.cur.execute(
-                "INSERT INTO api_usage_tracking (api_provider, date, endpoint, calls_made, calls_limit) VALUES (%s, %s, %s, 1, %s)",
-                (provider, today, endpoint, API_LIMITS[provider]['calls_per_day'])
-            )
-        self.conn.commit()
+    def get_rate_limit(self, provider: str, endpoint: str = None):
+        """Calls allowed per minute for the provider (None if unlimited)"""
+        return self.ledger.limits(provider).per_minute
 
     def get_next_available_time(self, provider: str) -> datetime:
         now = datetime.utcnow()
-        reset_hour = API_LIMITS[provider].get('reset_hour', 0)
-        tomorrow = now + timedelta(days=1)
-        reset_time = datetime.combine(tomorrow.date(), datetime.min.time()) + timedelta(hours=reset_hour)
-        return reset_time
+        if self.ledger.remaining_today(provider) == 0:
+            return datetime.combine((now + timedelta(days=1)).date(), datetime.min.time())
+        return now + timedelta(seconds=self.ledger.seconds_until_available(provider))
 
     def queue_request(self, provider: str, request_data: dict) -> None:
         # For demo: just print, in production use a real queue
-        print(f"Queued request for {provider}: {request_data}")
+        print(f"Queued request for {normalize_provider(provider)}: {request_data}")
 
     def close(self):
-        self.cur.close()
-        self.conn.close()
+        # The ledger is shared process-wide; nothing to release per limiter
+        pass
 
 if __name__ == "__main__":
     # Simple test
@@ -84,4 +60,4 @@ if __name__ == "__main__":
     limiter.record_call(provider, endpoint)
     print('Recorded call.')
     print('Next available time:', limiter.get_next_available_time(provider))
-    limiter.close() 
\ No newline at end of file
+    limiter.close()
@@ -90,7 +90,7 @@ class ComprehensiveTechnicalCalculator:
             'williams_r'
         ]
     
-    def calculate_all_indicators(self, ticker: str, price_data: List[Dict]) -> Optional[Dict]:
+    def calculate_all_indicators(self, ticker: str, price_data) -> Optional[Dict]:
         """
         Calculate ALL technical indicators for a single ticker
         Returns comprehensive dictionary with all calculated indicators
@@ -135,29 +135,18 @@ class ComprehensiveTechnicalCalculator:
             logger.error(f"Error calculating indicators for {ticker}: {e}")
             return None
     
-    def _prepare_price_data(self, price_data: List[Dict]) -> Optional[pd.DataFrame]:
-        """Prepare price data for calculations"""
+    def _prepare_price_data(self, price_data) -> Optional[pd.DataFrame]:
+        """Prepare price data (a PriceFrame or List[Dict] rows) for calculations"""
         try:
-            df = pd.DataFrame(price_data)
-            if df.empty:
-                return None
-                
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-            df = df.dropna(subset=['date'])
+            from price_frame import PriceFrame
             
-            if df.empty:
+            if not isinstance(price_data, PriceFrame):
+                price_data = PriceFrame.from_rows(price_data)
+            if price_data.empty:
                 return None
             
-            df.set_index('date', inplace=True)
-            df.sort_index(inplace=True)
-            
-            # Ensure numeric columns
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # Remove rows with NaN values in price columns
-            df = df.dropna(subset=['close'])
+            # Typed, sorted and without missing dates/closes already; the frame shares its arrays
+            df = price_data.to_frame().set_index('date')
             
             # Robust data cleaning to handle mixed scaling in database
             # Detect and correct inconsistent price scaling
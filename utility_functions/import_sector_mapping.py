@@ -1,59 +1,19 @@
-import psycopg2
-import pandas as pd
+"""
+Import sector_industry_etf_mapping.csv into the industries table (see daily_run/csv_import.py)
 
-# Database connection info (Railway)
-DB_HOST = 'yamanote.proxy.rlwy.net'
-DB_PORT = 38837
-DB_NAME = 'railway'
-DB_USER = 'postgres'
-DB_PASSWORD = 'KNNUYcidcJqFkwmctFdAnjvYdijsZocv'
+Database settings come from the environment like every other script.
+"""
 
-# CSV path
-csv_path = 'pre_filled_stocks/sector_industry_etf_mapping.csv'
-
-# Connect to the database
-conn = psycopg2.connect(
-    host=DB_HOST,
-    port=DB_PORT,
-    dbname=DB_NAME,
-    user=DB_USER,
-    password=DB_PASSWORD
-)
-cur = conn.cursor()
+import os
+import sys
 
-# Create the industries table if it does not exist
-cur.execute("""
-    CREATE TABLE IF NOT EXISTS industries (
-        id SERIAL PRIMARY KEY,
-        sector VARCHAR NOT NULL,
-        industry VARCHAR NOT NULL,
-        etf_name VARCHAR NOT NULL,
-        etf_ticker VARCHAR NOT NULL,
-        UNIQUE(sector, industry, etf_ticker)
-    );
-""")
-conn.commit()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'daily_run'))
 
-# Read the CSV
-df = pd.read_csv(csv_path)
+from csv_import import import_csv_files
 
-# Insert or update each row
-for _, row in df.iterrows():
-    cur.execute("""
-        INSERT INTO industries (sector, industry, etf_name, etf_ticker)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (sector, industry, etf_ticker) DO UPDATE SET
-            etf_name=EXCLUDED.etf_name;
-    """,
-    (
-        row['Sector'],
-        row['Industry'],
-        row['ETF Name'],
-        row['ETF Ticker'],
-    ))
-conn.commit()
-
-cur.close()
-conn.close()
+# CSV path
+csv_path = 'pre_filled_stocks/sector_industry_etf_mapping.csv'
 
-print('Industries table created and updated with sector_industry_etf_mapping.csv.') 
\ No newline at end of file
+if __name__ == "__main__":
+    report = import_csv_files([csv_path], 'industries')
+    print(report.format())